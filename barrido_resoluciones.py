@@ -0,0 +1,223 @@
+"""
+Barrido de tamaños de entrada de los modelos de placas sobre datos propios.
+
+Para cada tamaño (y cada modo de letterbox) mide la latencia p50/p95 y:
+    - modelo de caracteres, sobre recortes de placa (placas/detecciones y
+      las capturas de placa del almacén de artefactos): cuántos se leen con
+      formato de placa válido y cuántos aciertan la etiqueta. La etiqueta es
+      la de --etiquetas ({"archivo.png": "ABC123"}), o la placa que el
+      almacén asoció a la captura, o lo leído al tamaño más grande.
+    - detector, sobre frames completos (--frames: carpeta de imágenes o
+      video): recall = frames con placa (conf >= CONFIANZA_DETECCION_PLACA)
+      sobre los frames en que algún tamaño la encontró.
+
+Recomienda, por modelo, el tamaño más chico cuyo recall queda a menos de
+--tolerancia del mejor; con --aplicar lo fija en el perfil del equipo
+(como `python -m core.calibracion --fijar`).
+
+Uso:
+    python barrido_resoluciones.py
+    python barrido_resoluciones.py --frames grabaciones/entrada.mp4 --tamanos 320,416,480,640
+    python barrido_resoluciones.py --etiquetas etiquetas.json --letterbox rect,cuadrado --aplicar
+"""
+
+import argparse
+import io
+import json
+import os
+import re
+import sys
+import time
+from contextlib import redirect_stdout
+from pathlib import Path
+
+BASE_DIR = Path(__file__).parent
+sys.path.insert(0, str(BASE_DIR))
+
+from core import config
+from core.modelos import cargar_yolo, imagenes_calibracion
+from core.utils import resumen_latencias
+from placas.prueba_numero_letra import CONFIANZA_CARACTERES, MODELO_PATH, placa_desde_resultado
+
+TAMANOS = (160, 224, 320, 416, 480, 640)
+PLACA_VALIDA = re.compile(r"^[A-Z]{3}[0-9]{3}$")
+
+
+# ==========================================
+# 1. DATOS
+# ==========================================
+
+def recortes(carpeta, limite: int, etiquetas: dict):
+    """[(ruta, etiqueta o None)] de los recortes de placa disponibles."""
+    from core.artefactos import buscar_artefactos
+
+    datos = [(ruta, etiquetas.get(ruta.name)) for ruta in imagenes_calibracion(carpeta, limite)]
+    for fila in buscar_artefactos(tipo="placa_captura", limite=limite):
+        ruta = Path(fila["ruta"])
+        if ruta.exists():
+            datos.append((ruta, etiquetas.get(ruta.name) or fila["placa"]))
+    return datos
+
+
+def frames_de(fuente, limite: int, cada: int = 15):
+    """Frames de una carpeta de imágenes o de un video (uno cada `cada`)."""
+    import cv2
+
+    fuente = Path(fuente)
+    if fuente.is_dir():
+        return [cv2.imread(str(ruta)) for ruta in imagenes_calibracion(fuente, limite)]
+    frames, numero = [], 0
+    cap = cv2.VideoCapture(str(fuente))
+    while len(frames) < limite:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        if numero % cada == 0:
+            frames.append(frame)
+        numero += 1
+    cap.release()
+    return frames
+
+
+# ==========================================
+# 2. MEDICIONES
+# ==========================================
+
+def _predecir(modelo, entrada, imgsz, letterbox, conf):
+    inicio = time.perf_counter()
+    resultado = modelo.predict(entrada, imgsz=imgsz, rect=letterbox != "cuadrado", conf=conf, verbose=False)[0]
+    return resultado, (time.perf_counter() - inicio) * 1000
+
+
+def barrer_caracteres(modelo, datos, tamanos, modos):
+    """{(tamaño, modo): {"latencia", "lecturas"}} sobre los recortes."""
+    resultados = {}
+    with redirect_stdout(io.StringIO()):  # placa_desde_resultado imprime cada lectura
+        for tamano in tamanos:
+            for modo in modos:
+                _predecir(modelo, str(datos[0][0]), tamano, modo, CONFIANZA_CARACTERES)  # calentar
+                tiempos, lecturas = [], []
+                for ruta, _ in datos:
+                    r, ms = _predecir(modelo, str(ruta), tamano, modo, CONFIANZA_CARACTERES)
+                    tiempos.append(ms)
+                    lecturas.append(placa_desde_resultado(r))
+                resultados[(tamano, modo)] = {"latencia": resumen_latencias(tiempos), "lecturas": lecturas}
+    return resultados
+
+
+def barrer_detector(modelo, frames, tamanos, modos):
+    """{(tamaño, modo): {"latencia", "con_placa": [bool por frame]}}."""
+    resultados = {}
+    for tamano in tamanos:
+        for modo in modos:
+            _predecir(modelo, frames[0], tamano, modo, 0.25)
+            tiempos, con_placa = [], []
+            for frame in frames:
+                r, ms = _predecir(modelo, frame, tamano, modo, 0.25)
+                tiempos.append(ms)
+                con_placa.append(any(float(c) >= config.CONFIANZA_DETECCION_PLACA for c in r.boxes.conf))
+            resultados[(tamano, modo)] = {"latencia": resumen_latencias(tiempos), "con_placa": con_placa}
+    return resultados
+
+
+def _recomendar(recalls: dict, tolerancia: float):
+    """La combinación de menor tamaño cuyo recall queda a menos de `tolerancia` del mejor."""
+    mejor = max(recalls.values())
+    candidatas = [clave for clave, recall in recalls.items() if recall >= mejor - tolerancia]
+    return min(candidatas, key=lambda clave: clave[0])
+
+
+# ==========================================
+# 3. REPORTE
+# ==========================================
+
+def reporte_caracteres(resultados, datos, tolerancia):
+    mayor = max(resultados, key=lambda clave: clave[0])
+    # Sin etiqueta: lo leído con el tamaño más grande (el comportamiento de siempre)
+    etiquetas = [e or leido for (_, e), leido in zip(datos, resultados[mayor]["lecturas"])]
+    con_etiqueta = sum(e is not None for e in etiquetas)
+
+    print(f"\n🔤 Modelo de caracteres: {len(datos)} recortes ({con_etiqueta} con etiqueta)")
+    print("-" * 90)
+    recalls = {}
+    for (tamano, modo), r in resultados.items():
+        validas = sum(bool(l and PLACA_VALIDA.match(l)) for l in r["lecturas"])
+        aciertos = sum(l is not None and l == e for l, e in zip(r["lecturas"], etiquetas))
+        recalls[(tamano, modo)] = aciertos / max(1, con_etiqueta)
+        print(f"   imgsz {tamano:>4} {modo:<9} p50 {r['latencia']['p50']:7.1f} ms | "
+              f"p95 {r['latencia']['p95']:7.1f} ms | formato válido {validas / len(datos):6.1%} | "
+              f"aciertos {recalls[(tamano, modo)]:6.1%}")
+    print("-" * 90)
+    return _recomendar(recalls, tolerancia)
+
+
+def reporte_detector(resultados, frames, tolerancia):
+    positivos = [any(r["con_placa"][i] for r in resultados.values()) for i in range(len(frames))]
+    total = max(1, sum(positivos))
+
+    print(f"\n🚗 Detector de placas: {len(frames)} frames ({sum(positivos)} con placa en algún tamaño)")
+    print("-" * 90)
+    recalls = {}
+    for (tamano, modo), r in resultados.items():
+        recalls[(tamano, modo)] = sum(c and p for c, p in zip(r["con_placa"], positivos)) / total
+        print(f"   imgsz {tamano:>4} {modo:<9} p50 {r['latencia']['p50']:7.1f} ms | "
+              f"p95 {r['latencia']['p95']:7.1f} ms | recall {recalls[(tamano, modo)]:6.1%}")
+    print("-" * 90)
+    return _recomendar(recalls, tolerancia)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Barrido de tamaños de entrada de los modelos de placas")
+    parser.add_argument("--tamanos", default=",".join(map(str, TAMANOS)))
+    parser.add_argument("--letterbox", default="rect", help="rect, cuadrado o ambos separados por coma")
+    parser.add_argument("--recortes", default=str(config.CARPETA_CALIBRACION_INT8))
+    parser.add_argument("--etiquetas", help="JSON {nombre_de_archivo: placa}")
+    parser.add_argument("--frames", help="carpeta de frames completos o video para el detector")
+    parser.add_argument("--limite", type=int, default=200)
+    parser.add_argument("--tolerancia", type=float, default=0.01)
+    parser.add_argument("--aplicar", action="store_true", help="fijar los tamaños recomendados en el perfil")
+    args = parser.parse_args()
+
+    tamanos = [int(t) for t in args.tamanos.split(",")]
+    modos = args.letterbox.split(",")
+    etiquetas = {}
+    if args.etiquetas:
+        with open(args.etiquetas, encoding="utf-8") as f:
+            etiquetas = json.load(f)
+
+    # Siempre el .pt salvo un formato exportado con ejes dinámicos: TorchScript tiene tamaño fijo
+    formato = "pt" if config.FORMATO_MODELOS == "torchscript" else config.FORMATO_MODELOS
+    elegidos = {}
+
+    datos = recortes(args.recortes, args.limite, etiquetas)
+    if datos:
+        modelo = cargar_yolo(MODELO_PATH, "ocr_placas", formato=formato, calentar=False)
+        tamano, modo = reporte_caracteres(barrer_caracteres(modelo, datos, tamanos, modos), datos, args.tolerancia)
+        print(f"   👉 Recomendado: TAMANO_ENTRADA_CARACTERES={tamano} LETTERBOX_CARACTERES={modo}")
+        elegidos["TAMANO_ENTRADA_CARACTERES"] = tamano
+    else:
+        print(f"⚠️  No hay recortes de placa en {args.recortes} ni en el almacén de artefactos")
+
+    if args.frames:
+        frames = frames_de(args.frames, args.limite)
+        if frames:
+            modelo = cargar_yolo(config.MODELO_DETECTOR_PLACAS, "detector_placas", formato=formato, calentar=False)
+            tamano, modo = reporte_detector(barrer_detector(modelo, frames, tamanos, modos), frames, args.tolerancia)
+            print(f"   👉 Recomendado: TAMANO_ENTRADA_DETECTOR={tamano} LETTERBOX_DETECTOR={modo}")
+            elegidos["TAMANO_ENTRADA_DETECTOR"] = tamano
+        else:
+            print(f"⚠️  No se pudieron leer frames de {args.frames}")
+    else:
+        print("ℹ️  Sin --frames no se barre el detector (los recortes no sirven para él)")
+
+    if args.aplicar and elegidos:
+        from core.calibracion import fijar_manual
+
+        fijar_manual(elegidos)
+        print(f"✅ Fijado en {config.RUTA_PERFIL_HOST}: {elegidos}")
+        if os.getenv("TAMANO_ENTRADA_CARACTERES") or os.getenv("TAMANO_ENTRADA_DETECTOR"):
+            print("⚠️  Hay variables de entorno con estos nombres: ganan sobre el perfil")
+
+
+if __name__ == "__main__":
+    main()
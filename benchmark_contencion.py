@@ -0,0 +1,114 @@
+"""
+Benchmark de contención de CPU: YOLO (torch) y DeepFace (TensorFlow) a la vez.
+
+Corre dos veces en procesos nuevos (los hilos de torch y TensorFlow solo se
+fijan al arrancar): sin presupuesto (USAR_PRESUPUESTO_HILOS=0, cada uno con
+todos los núcleos) y con el presupuesto de core/recursos.py. En cada corrida
+un hilo infiere el detector de placas sin parar y otro pide comparaciones
+al trabajador DeepFace, durante --segundos; al final compara p50/p95/p99 de
+cada rol y los cambios de contexto involuntarios.
+
+Uso:
+    python benchmark_contencion.py --segundos 30
+    python benchmark_contencion.py --frame captura.jpg --referencia face/imagenes_descargadas/foto.jpg
+    FIJAR_NUCLEOS=1 python benchmark_contencion.py
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).parent
+sys.path.insert(0, str(BASE_DIR))
+
+
+def corrida(args):
+    """Una corrida con el entorno tal como vino; imprime las métricas como JSON (última línea)."""
+    import cv2
+    import numpy as np
+
+    import main_integrated as flujo  # aplica el presupuesto "yolo" si está activo
+    from core.deepface_persistente import TrabajadorDeepFace
+    from core.modelos import cargar_detector_placas, opciones_inferencia
+    from core.recursos import medir_inferencia, metricas_contencion
+
+    frame = cv2.imread(args.frame) if args.frame else np.random.randint(0, 255, (720, 1280, 3), dtype=np.uint8)
+    ruta_frame = args.frame or os.path.join(tempfile.mkdtemp(), "frame.jpg")
+    if not args.frame:
+        cv2.imwrite(ruta_frame, frame)
+
+    detector = cargar_detector_placas()
+    trabajador = TrabajadorDeepFace(flujo.PYTHON_DEEPFACE).iniciar()
+    trabajador.comparar(ruta_frame, args.referencia or ruta_frame)  # embedding de referencia fuera de la medición
+
+    fin = time.monotonic() + args.segundos
+    opciones = opciones_inferencia("detector")
+
+    def yolo():
+        while time.monotonic() < fin:
+            with medir_inferencia("yolo"):
+                detector(frame, verbose=False, **opciones)
+
+    def deepface():
+        while time.monotonic() < fin:
+            trabajador.comparar(ruta_frame, args.referencia or ruta_frame)  # mide "deepface" por dentro
+
+    hilos = [threading.Thread(target=yolo), threading.Thread(target=deepface)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    trabajador.cerrar()
+    print(json.dumps(metricas_contencion()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Contención de CPU entre YOLO y DeepFace")
+    parser.add_argument("--segundos", type=float, default=20)
+    parser.add_argument("--frame", help="imagen para el detector (por defecto ruido 1280x720)")
+    parser.add_argument("--referencia", help="foto de referencia para DeepFace (por defecto el mismo frame)")
+    parser.add_argument("--corrida", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.corrida:
+        corrida(args)
+        return
+
+    resultados = {}
+    for modo, valor in (("sin presupuesto", "0"), ("con presupuesto", "1")):
+        print(f"⏳ {modo} ({args.segundos:g}s)...")
+        proceso = subprocess.run(
+            [sys.executable, __file__, "--corrida", *sys.argv[1:]],
+            capture_output=True, text=True, cwd=str(BASE_DIR),
+            env={**os.environ, "USAR_PRESUPUESTO_HILOS": valor},
+        )
+        if proceso.returncode != 0:
+            print(f"❌ La corrida {modo} falló:\n{proceso.stderr[-2000:]}")
+            return
+        resultados[modo] = json.loads(proceso.stdout.strip().splitlines()[-1])
+
+    base, nuevo = resultados["sin presupuesto"], resultados["con presupuesto"]
+    print(f"\n📊 YOLO + DeepFace a la vez en {nuevo['nucleos']} núcleos, presupuesto {nuevo['presupuesto']}")
+    print("-" * 100)
+    for rol in ("yolo", "deepface"):
+        for modo, m in resultados.items():
+            r = m["latencias"].get(rol)
+            if r:
+                print(f"   {rol:<9} {modo:<16} p50 {r['p50']:7.1f} ms | p95 {r['p95']:7.1f} ms | "
+                      f"p99 {r['p99']:7.1f} ms (n={r['n']})")
+        if rol in base["latencias"] and rol in nuevo["latencias"]:
+            print(f"   {'':<9} {'diferencia':<16} p95 {nuevo['latencias'][rol]['p95'] - base['latencias'][rol]['p95']:+7.1f} ms"
+                  f" | p99 {nuevo['latencias'][rol]['p99'] - base['latencias'][rol]['p99']:+7.1f} ms")
+    print(f"   Cambios de contexto involuntarios/s: {base['cambios_involuntarios_s']} -> "
+          f"{nuevo['cambios_involuntarios_s']}")
+    print("-" * 100)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Benchmark de los formatos de los modelos de placas en CPU.
+
+Para el detector de placas y el modelo de caracteres carga cada formato
+(pt, onnx, openvino y, con --int8, sus versiones INT8) desde la cache de
+core/modelos.py y mide con las mismas entradas que usa la portería:
+    - detector: frames BGR con imgsz=TAMANO_ENTRADA_DETECTOR
+    - OCR: rutas de recortes, como leer_placa, con imgsz=TAMANO_ENTRADA_CARACTERES
+la latencia (p50/p95 y su diferencia con pt) y la concordancia con el .pt
+(mismas cajas; en el OCR además la misma placa leída).
+
+Uso:
+    python benchmark_modelos.py --formatos pt,onnx,openvino --int8 --repeticiones 3
+    python benchmark_modelos.py --imagenes placas/detecciones
+"""
+
+import argparse
+import io
+import sys
+import time
+from contextlib import redirect_stdout
+from pathlib import Path
+
+BASE_DIR = Path(__file__).parent
+sys.path.insert(0, str(BASE_DIR))
+
+from core import config
+from core.modelos import FORMATOS_INT8, cargar_yolo, concordancia, imagenes_calibracion, tiempos_modelos
+from core.utils import resumen_latencias
+from placas.prueba_numero_letra import CONFIANZA_CARACTERES, MODELO_PATH, placa_desde_resultado
+
+
+def medir(modelo, entradas, imgsz, conf, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        for entrada in entradas:
+            inicio = time.perf_counter()
+            modelo.predict(entrada, imgsz=imgsz, conf=conf, verbose=False)
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+    return resumen_latencias(tiempos)
+
+
+def placas_iguales(referencia, candidato, rutas, imgsz):
+    """Fracción de recortes en que los dos modelos leen la misma placa."""
+    iguales = 0
+    with redirect_stdout(io.StringIO()):  # placa_desde_resultado imprime cada lectura
+        for ruta in rutas:
+            a = referencia.predict(str(ruta), imgsz=imgsz, conf=CONFIANZA_CARACTERES, verbose=False)[0]
+            b = candidato.predict(str(ruta), imgsz=imgsz, conf=CONFIANZA_CARACTERES, verbose=False)[0]
+            iguales += placa_desde_resultado(a) == placa_desde_resultado(b)
+    return iguales / len(rutas)
+
+
+def comparar(nombre, ruta, imgsz, conf, variantes, imagenes, repeticiones, es_ocr):
+    import cv2
+
+    # El detector recibe frames y el OCR rutas, igual que en el flujo
+    entradas = [str(r) for r in imagenes] if es_ocr else [cv2.imread(str(r)) for r in imagenes]
+
+    print(f"\n📊 {nombre} ({ruta}, imgsz {imgsz}, {len(imagenes)} imágenes x {repeticiones})")
+    print("-" * 100)
+    referencia = latencia_base = None
+    for formato, int8 in variantes:
+        etiqueta = f"{nombre}[{formato}{'+int8' if int8 else ''}]"
+        try:
+            modelo = cargar_yolo(ruta, etiqueta, formato=formato, imgsz=imgsz, int8=int8)
+        except Exception as e:
+            print(f"   {formato + ('+int8' if int8 else ''):<16} ❌ no se pudo cargar: {e}")
+            continue
+        real = tiempos_modelos()[etiqueta]["formato"]  # el INT8 rechazado o una conversión fallida cae a otro
+        r = medir(modelo, entradas, imgsz, conf, repeticiones)
+
+        if referencia is None:
+            referencia, latencia_base = modelo, r["p50"]
+        coincidencia = concordancia(referencia, modelo, imagenes, imgsz, conf)
+        linea = (f"   {real:<16} p50 {r['p50']:7.1f} ms ({r['p50'] - latencia_base:+7.1f}) | "
+                 f"p95 {r['p95']:7.1f} ms | cajas iguales {coincidencia:6.1%} ({coincidencia - 1:+.1%})")
+        if es_ocr:
+            linea += f" | placas iguales {placas_iguales(referencia, modelo, imagenes, imgsz):6.1%}"
+        print(linea)
+    print("-" * 100)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de formatos de los modelos de placas")
+    parser.add_argument("--formatos", default="pt,onnx,openvino",
+                        help="lista separada por comas; el primero es la referencia")
+    parser.add_argument("--int8", action="store_true", help="agregar las variantes INT8 (onnx, openvino)")
+    parser.add_argument("--imagenes", default=str(config.CARPETA_CALIBRACION_INT8))
+    parser.add_argument("--limite", type=int, default=50)
+    parser.add_argument("--repeticiones", type=int, default=3)
+    args = parser.parse_args()
+
+    imagenes = imagenes_calibracion(args.imagenes, args.limite)
+    if not imagenes:
+        print(f"❌ No hay imágenes en {args.imagenes}")
+        return
+
+    variantes = []
+    for formato in args.formatos.split(","):
+        variantes.append((formato, False))
+        if args.int8 and formato in FORMATOS_INT8:
+            variantes.append((formato, True))
+
+    comparar("detector_placas", config.MODELO_DETECTOR_PLACAS, config.TAMANO_ENTRADA_DETECTOR, 0.5,
+             variantes, imagenes, args.repeticiones, es_ocr=False)
+    comparar("ocr_placas", MODELO_PATH, config.TAMANO_ENTRADA_CARACTERES, CONFIANZA_CARACTERES,
+             variantes, imagenes, args.repeticiones, es_ocr=True)
+
+
+if __name__ == "__main__":
+    main()
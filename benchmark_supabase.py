@@ -0,0 +1,132 @@
+"""
+Benchmark del cliente de Supabase contra el servidor falso local.
+
+Mide la latencia del lado del cliente (p50/p95/p99) de las cuatro
+operaciones que usa la portería, primero en serie con las funciones de
+peticiones_supaBase.py y luego en paralelo con el cliente asíncrono.
+
+Uso:
+    python benchmark_supabase.py --latencia-ms 40 --tasa-error 0.02 --repeticiones 50
+"""
+
+import argparse
+import asyncio
+import io
+import os
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+from pathlib import Path
+
+BASE_DIR = Path(__file__).parent
+sys.path.insert(0, str(BASE_DIR))
+
+from servicios.servidor_falso import iniciar_servidor_falso
+
+
+def medir(nombre, funcion, repeticiones):
+    from core.utils import resumen_latencias
+
+    tiempos, errores = [], 0
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        try:
+            # Los prints de las funciones no cuentan ni ensucian el reporte
+            with redirect_stdout(io.StringIO()):
+                resultado = funcion()
+            if resultado is None:
+                errores += 1
+        except Exception:
+            errores += 1
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+
+    r = resumen_latencias(tiempos)
+    print(f"   {nombre:<30} p50 {r['p50']:7.1f} ms | p95 {r['p95']:7.1f} ms | "
+          f"p99 {r['p99']:7.1f} ms | errores {errores}/{repeticiones}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del cliente Supabase")
+    parser.add_argument("--latencia-ms", type=float, default=30)
+    parser.add_argument("--jitter-ms", type=float, default=10)
+    parser.add_argument("--tasa-error", type=float, default=0)
+    parser.add_argument("--repeticiones", type=int, default=30)
+    args = parser.parse_args()
+
+    servidor, url, _ = iniciar_servidor_falso(
+        latencia_ms=args.latencia_ms, jitter_ms=args.jitter_ms, tasa_error=args.tasa_error
+    )
+
+    # Apuntar los módulos al servidor falso ANTES de importarlos
+    # (y no tocar la réplica, la cola ni la cache reales)
+    os.environ["SUPABASE_URL"] = url
+    os.environ["SUPABASE_SERVICE_ROLE"] = "clave-de-prueba"
+    temporal = tempfile.mkdtemp(prefix="benchmark_supabase_")
+    os.environ["DATOS_DIR"] = temporal
+    os.environ["RUTA_CACHE_BIOMETRIA"] = str(Path(temporal) / "cache_biometria")
+    os.environ["FRESCURA_CACHE_BIOMETRIA"] = "0"
+
+    from servicios import peticiones_supaBase as api
+    from servicios.cliente_async import ClienteSupabaseAsync
+
+    with redirect_stdout(io.StringIO()):
+        conductor = api.obtener_conductor_por_placa("TRF088")
+    if not conductor:
+        print("❌ El servidor falso no respondió a la consulta inicial")
+        return
+
+    print(f"\n📊 Latencia del cliente contra {url} "
+          f"({args.latencia_ms}±{args.jitter_ms} ms, errores {args.tasa_error:.0%})")
+    print("-" * 90)
+
+    for nombre, funcion in [
+        ("obtener_conductor_por_placa", lambda: api.obtener_conductor_por_placa("TRF088")),
+        ("descargar_foto_biometria", lambda: api.descargar_foto_biometria(conductor["foto_biometria"])),
+        ("registrar_acceso", lambda: api.registrar_acceso(
+            usuario_id=conductor["id"], vehiculo_id=conductor["vehiculo_id"], placa="TRF088")),
+        ("crear_notificacion", lambda: api.crear_notificacion(
+            usuario_id=conductor["id"], titulo="Benchmark", mensaje="Prueba")),
+    ]:
+        medir(nombre, funcion, args.repeticiones)
+
+    async def evento_async(cliente):
+        return await asyncio.gather(
+            cliente.obtener_conductor_por_placa("TRF088"),
+            cliente.descargar_foto_biometria(conductor["foto_biometria"]),
+            cliente.registrar_acceso(usuario_id=conductor["id"],
+                                     vehiculo_id=conductor["vehiculo_id"], placa="TRF088"),
+            cliente.crear_notificacion(usuario_id=conductor["id"],
+                                       titulo="Benchmark", mensaje="Prueba"),
+        )
+
+    async def correr_async():
+        async with ClienteSupabaseAsync() as cliente:
+            tiempos = []
+            for _ in range(args.repeticiones):
+                inicio = time.perf_counter()
+                try:
+                    with redirect_stdout(io.StringIO()):
+                        await evento_async(cliente)
+                except Exception:
+                    pass
+                tiempos.append((time.perf_counter() - inicio) * 1000)
+            return tiempos
+
+    tiempos_async = asyncio.run(correr_async())
+
+    from core.utils import resumen_latencias
+    r = resumen_latencias(tiempos_async)
+    print(f"   {'4 operaciones en paralelo':<30} p50 {r['p50']:7.1f} ms | p95 {r['p95']:7.1f} ms | "
+          f"p99 {r['p99']:7.1f} ms")
+    print("-" * 90)
+
+    from servicios.resiliencia import estado_resiliencia
+    estado = estado_resiliencia()
+    print(f"   Circuito: {estado['circuito']['estado']} | coberturas lanzadas: "
+          f"{estado['coberturas']} (ganadoras: {estado['coberturas_ganadoras']})")
+    servidor.shutdown()
+
+
+if __name__ == "__main__":
+    main()
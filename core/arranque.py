@@ -0,0 +1,161 @@
+"""
+Arranque rápido de la portería.
+
+    - hito("vista_previa"): ms desde que arrancó el proceso (se imprime al final
+      con imprimir_hitos()), para ver cuánto tarda cada fase en cada equipo
+    - cargar_en_segundo_plano("ocr_placas", cargar_modelo): carga un modelo en
+      un hilo aparte; quien lo necesite espera el Future (o sigue sin él)
+    - reporte_importaciones("main_integrated"): qué módulos pesan al importar,
+      a partir de `python -X importtime`
+
+Para que los hitos cuenten desde el inicio, el programa importa este
+módulo antes que cualquier otro pesado (cv2, requests, ultralytics).
+
+Uso:
+    python -m core.arranque                       # importaciones de main_integrated
+    python -m core.arranque daemon_parqueadero 25
+"""
+
+import re
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from core.config import BASE_DIR
+
+_INICIO = time.perf_counter()
+
+_hitos = []   # (nombre, ms desde el inicio)
+_cargas = {}  # nombre -> Future
+_lock = threading.Lock()
+_ejecutor = ThreadPoolExecutor(max_workers=3, thread_name_prefix="carga")
+
+
+# ==========================================
+# 1. HITOS
+# ==========================================
+
+def hito(nombre: str):
+    """Marca el momento (ms desde el inicio del proceso) y lo retorna."""
+    ms = (time.perf_counter() - _INICIO) * 1000
+    with _lock:
+        if not any(n == nombre for n, _ in _hitos):
+            _hitos.append((nombre, ms))
+    return ms
+
+
+def hitos():
+    with _lock:
+        return dict(_hitos)
+
+
+def imprimir_hitos():
+    with _lock:
+        lista = sorted(_hitos, key=lambda h: h[1])
+    if lista:
+        print("🚦 Arranque: " + " | ".join(f"{nombre} {ms:.0f} ms" for nombre, ms in lista))
+
+
+# ==========================================
+# 2. CARGAS EN SEGUNDO PLANO
+# ==========================================
+
+def cargar_en_segundo_plano(nombre: str, funcion, *args):
+    """
+    Lanza `funcion(*args)` en un hilo de carga (una sola vez por nombre) y
+    retorna su Future. Al terminar queda el hito "<nombre>_listo". Si la
+    carga falla se olvida: el siguiente llamado la vuelve a intentar.
+    """
+    def _cargar():
+        resultado = funcion(*args)
+        hito(f"{nombre}_listo")
+        return resultado
+
+    def _olvidar_si_fallo(futuro):
+        if futuro.exception() is not None:
+            with _lock:
+                if _cargas.get(nombre) is futuro:
+                    del _cargas[nombre]
+
+    with _lock:
+        futuro = _cargas.get(nombre)
+        if futuro is not None:
+            return futuro
+        futuro = _cargas[nombre] = _ejecutor.submit(_cargar)
+    # Fuera del lock: si ya terminó, el callback corre aquí mismo y lo toma
+    futuro.add_done_callback(_olvidar_si_fallo)
+    return futuro
+
+
+def carga(nombre: str):
+    """Future de una carga lanzada antes (o None)."""
+    with _lock:
+        return _cargas.get(nombre)
+
+
+def esperar_cargas(timeout: float = None):
+    """Espera todas las cargas lanzadas; retorna {nombre: error o None}."""
+    with _lock:
+        pendientes = dict(_cargas)
+    errores = {}
+    for nombre, futuro in pendientes.items():
+        try:
+            futuro.result(timeout=timeout)
+            errores[nombre] = None
+        except Exception as e:
+            errores[nombre] = e
+    return errores
+
+
+# ==========================================
+# 3. REPORTE DE IMPORTACIONES (-X importtime)
+# ==========================================
+
+_LINEA_IMPORTTIME = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|( *)(\S+)")
+
+
+def reporte_importaciones(modulo: str = "main_integrated", limite: int = 15, profundidad: int = 3):
+    """
+    Importa `modulo` en un Python nuevo con -X importtime. Retorna
+    {"total_ms", "modulos": [(nombre, propio_ms, acumulado_ms)]} con los
+    `limite` módulos más pesados (acumulado) hasta `profundidad` niveles
+    de importación bajo `modulo`.
+    """
+    proceso = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {modulo}"],
+        capture_output=True, text=True, cwd=str(BASE_DIR)
+    )
+    modulos, total = [], 0.0
+    for linea in proceso.stderr.splitlines():
+        m = _LINEA_IMPORTTIME.match(linea)
+        if not m:
+            continue
+        propio, acumulado, nivel, nombre = int(m[1]) / 1000, int(m[2]) / 1000, (len(m[3]) - 1) // 2, m[4]
+        if nivel == 0:  # importaciones de primer nivel: su acumulado suma el total
+            total += acumulado
+        if nivel <= profundidad:
+            modulos.append((nombre, propio, acumulado))
+
+    modulos.sort(key=lambda x: -x[2])
+    return {"total_ms": round(total, 1), "modulos": modulos[:limite], "error": proceso.returncode != 0}
+
+
+def imprimir_reporte_importaciones(modulo: str = "main_integrated", limite: int = 15):
+    reporte = reporte_importaciones(modulo, limite)
+    print(f"\n📦 import {modulo}: {reporte['total_ms']:.0f} ms en total")
+    if reporte["error"]:
+        print("   ⚠️  La importación falló (faltan dependencias en este entorno)")
+    print(f"   {'módulo':<45} {'propio ms':>10} {'acumulado ms':>13}")
+    for nombre, propio, acumulado in reporte["modulos"]:
+        print(f"   {nombre:<45} {propio:>10.1f} {acumulado:>13.1f}")
+    return reporte
+
+
+if __name__ == "__main__":
+    argumentos = sys.argv[1:]
+    imprimir_reporte_importaciones(
+        argumentos[0] if argumentos else "main_integrated",
+        int(argumentos[1]) if len(argumentos) > 1 else 15
+    )
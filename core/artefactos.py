@@ -0,0 +1,322 @@
+"""
+Almacén acotado de artefactos (capturas de placa y rostro) por evento.
+
+Reemplaza las carpetas temp/<placa>/ y las globales PLACA_ACTUAL /
+CARPETA_PLACA_ACTUAL: cada captura se guarda con el id del evento, así
+dos vehículos en el pipeline nunca se pisan los archivos:
+
+    CARPETA_ARTEFACTOS/2026-10-19/3fa2b9c1_placa_captura.jpg
+
+guardar_artefacto() retorna la ruta enseguida y escribe el JPEG en un
+hilo aparte; quien vaya a abrir el archivo llama antes a
+esperar_artefacto(ruta). Un índice SQLite (RUTA_INDICE_ARTEFACTOS) permite
+buscar evidencia por placa y fecha, y la retención (por antigüedad y por
+cuota total) mantiene estable el uso de disco.
+
+Uso:
+    python -m core.artefactos                       # estadísticas
+    python -m core.artefactos ABC123                # capturas de una placa
+    python -m core.artefactos ABC123 --desde 2026-10-01
+    python -m core.artefactos --limpiar             # aplicar retención ahora
+"""
+
+import os
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+from core.config import (
+    CARPETA_ARTEFACTOS,
+    RUTA_INDICE_ARTEFACTOS,
+    RETENCION_ARTEFACTOS_DIAS,
+    CUOTA_ARTEFACTOS_MB,
+    INTERVALO_LIMPIEZA_ARTEFACTOS,
+)
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS artefactos (
+    ruta TEXT PRIMARY KEY,
+    evento TEXT NOT NULL,
+    placa TEXT,
+    tipo TEXT NOT NULL,
+    bytes INTEGER NOT NULL,
+    creado REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_artefactos_placa ON artefactos (placa, creado);
+CREATE INDEX IF NOT EXISTS idx_artefactos_evento ON artefactos (evento);
+CREATE INDEX IF NOT EXISTS idx_artefactos_creado ON artefactos (creado);
+"""
+
+_local = threading.local()
+_escritor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="artefactos")
+_pendientes = {}  # ruta -> Future de la escritura
+_lock = threading.Lock()
+_hilo_limpieza = None
+
+
+def _conexion():
+    con = getattr(_local, "conexion", None)
+    if con is None or _local.ruta != RUTA_INDICE_ARTEFACTOS:
+        # Primera vez en el hilo, o usar_almacen() cambió de índice
+        RUTA_INDICE_ARTEFACTOS.parent.mkdir(parents=True, exist_ok=True)
+        con = sqlite3.connect(str(RUTA_INDICE_ARTEFACTOS), timeout=5, isolation_level=None)
+        con.row_factory = sqlite3.Row
+        con.execute("PRAGMA journal_mode=WAL")
+        con.executescript(_ESQUEMA)
+        _local.conexion, _local.ruta = con, RUTA_INDICE_ARTEFACTOS
+    return con
+
+
+def usar_almacen(carpeta, indice):
+    """
+    Cambia la carpeta y el índice de este proceso (p. ej. el replay usa los
+    suyos para no mezclar sus capturas con las de la portería).
+    """
+    global CARPETA_ARTEFACTOS, RUTA_INDICE_ARTEFACTOS
+    drenar_artefactos()  # lo pendiente se indexa donde se programó
+    CARPETA_ARTEFACTOS, RUTA_INDICE_ARTEFACTOS = Path(carpeta), Path(indice)
+
+
+def nuevo_evento():
+    """Id de evento para capturas que no vienen con una LineaTiempo."""
+    return uuid.uuid4().hex[:8]
+
+
+# ==========================================
+# 1. GUARDAR
+# ==========================================
+
+def _escribir(imagen, ruta: str, evento: str, placa, tipo: str, creado: float):
+    import cv2
+
+    if not cv2.imwrite(ruta, imagen):
+        raise OSError(f"No se pudo escribir {ruta}")
+    _conexion().execute(
+        "INSERT OR REPLACE INTO artefactos (ruta, evento, placa, tipo, bytes, creado) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        (ruta, evento, placa.upper() if placa else None, tipo, os.path.getsize(ruta), creado)
+    )
+
+
+def _terminar(ruta: str, futuro):
+    with _lock:
+        _pendientes.pop(ruta, None)
+    error = futuro.exception()
+    if error is not None:
+        print(f"⚠️  Error guardando artefacto {ruta}: {error}")
+
+
+def guardar_artefacto(imagen, nombre: str, evento: str = None, placa: str = None, tipo: str = None):
+    """
+    Programa la escritura de `imagen` (no modificarla después) y retorna
+    su ruta sin esperar. `tipo` por defecto es el nombre sin extensión.
+    """
+    evento = evento or nuevo_evento()
+    creado = time.time()
+    carpeta = CARPETA_ARTEFACTOS / datetime.fromtimestamp(creado).strftime("%Y-%m-%d")
+    carpeta.mkdir(parents=True, exist_ok=True)
+    ruta = str(carpeta / f"{evento}_{nombre}")
+    tipo = tipo or os.path.splitext(nombre)[0]
+
+    with _lock:
+        futuro = _escritor.submit(_escribir, imagen, ruta, evento, placa, tipo, creado)
+        _pendientes[ruta] = futuro
+    futuro.add_done_callback(lambda f: _terminar(ruta, f))
+    return ruta
+
+
+def esperar_artefacto(ruta, timeout: float = 10):
+    """Espera a que `ruta` esté escrita en disco (inmediato si no estaba pendiente). Retorna la ruta."""
+    with _lock:
+        futuro = _pendientes.get(str(ruta)) if ruta else None
+    if futuro is not None:
+        try:
+            futuro.result(timeout=timeout)
+        except Exception:
+            pass  # ya se avisó en _terminar; quien lea verá que el archivo no existe
+    return ruta
+
+
+def asociar_placa(evento: str, placa: str):
+    """Anota la placa (conocida después del OCR) en todas las capturas del evento."""
+    # Las escrituras pendientes del evento deben quedar indexadas antes del UPDATE
+    with _lock:
+        pendientes = [f for r, f in _pendientes.items() if os.path.basename(r).startswith(f"{evento}_")]
+    for futuro in pendientes:
+        try:
+            futuro.result(timeout=10)
+        except Exception:
+            pass
+    _conexion().execute("UPDATE artefactos SET placa = ? WHERE evento = ?", (placa.upper(), evento))
+
+
+# ==========================================
+# 2. BÚSQUEDA
+# ==========================================
+
+def _a_timestamp(valor):
+    if valor is None or isinstance(valor, (int, float)):
+        return valor
+    if isinstance(valor, datetime):
+        return valor.timestamp()
+    return datetime.fromisoformat(str(valor)).timestamp()
+
+
+def buscar_artefactos(placa: str = None, desde=None, hasta=None, tipo: str = None,
+                      evento: str = None, limite: int = 100):
+    """
+    Capturas más recientes primero. `desde` / `hasta` aceptan timestamp,
+    datetime o texto ISO ("2026-10-01" o "2026-10-01T08:00").
+    """
+    condiciones, parametros = [], []
+    for columna, operador, valor in (
+        ("placa", "=", placa.upper() if placa else None),
+        ("creado", ">=", _a_timestamp(desde)),
+        ("creado", "<=", _a_timestamp(hasta)),
+        ("tipo", "=", tipo),
+        ("evento", "=", evento),
+    ):
+        if valor is not None:
+            condiciones.append(f"{columna} {operador} ?")
+            parametros.append(valor)
+
+    donde = f"WHERE {' AND '.join(condiciones)}" if condiciones else ""
+    filas = _conexion().execute(
+        f"SELECT * FROM artefactos {donde} ORDER BY creado DESC LIMIT ?", (*parametros, limite)
+    ).fetchall()
+    return [dict(f) for f in filas]
+
+
+def estadisticas_artefactos():
+    fila = _conexion().execute(
+        "SELECT COUNT(*) AS n, COALESCE(SUM(bytes), 0) AS bytes, MIN(creado) AS desde, "
+        "COUNT(DISTINCT evento) AS eventos FROM artefactos"
+    ).fetchone()
+    with _lock:
+        pendientes = len(_pendientes)
+    return {
+        "artefactos": fila["n"],
+        "eventos": fila["eventos"],
+        "mb": round(fila["bytes"] / 1024 / 1024, 1),
+        "cuota_mb": CUOTA_ARTEFACTOS_MB,
+        "mas_antiguo": datetime.fromtimestamp(fila["desde"]).isoformat(timespec="seconds")
+        if fila["desde"] else None,
+        "escrituras_pendientes": pendientes,
+    }
+
+
+# ==========================================
+# 3. RETENCIÓN
+# ==========================================
+
+def _borrar(filas):
+    """Borra archivo y fila; retorna las rutas que no se pudieron borrar (quedan en el índice)."""
+    con = _conexion()
+    fallidas = []
+    for fila in filas:
+        try:
+            os.remove(fila["ruta"])
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"⚠️  No se pudo borrar {fila['ruta']}: {e}")
+            fallidas.append(fila["ruta"])
+            continue
+        con.execute("DELETE FROM artefactos WHERE ruta = ?", (fila["ruta"],))
+    return fallidas
+
+
+def _borrar_carpetas_vacias():
+    if not CARPETA_ARTEFACTOS.exists():
+        return
+    hoy = datetime.now().strftime("%Y-%m-%d")
+    for carpeta in CARPETA_ARTEFACTOS.iterdir():
+        if carpeta.is_dir() and carpeta.name != hoy and not any(carpeta.iterdir()):
+            carpeta.rmdir()
+
+
+def aplicar_retencion(dias: float = RETENCION_ARTEFACTOS_DIAS, cuota_mb: float = CUOTA_ARTEFACTOS_MB):
+    """Borra por antigüedad y luego lo más viejo hasta quedar bajo la cuota. Retorna cuántos borró."""
+    con = _conexion()
+    limite = time.time() - dias * 86400
+    viejos = con.execute("SELECT ruta FROM artefactos WHERE creado < ?", (limite,)).fetchall()
+    # Las que no se pueden borrar (permisos, archivo abierto) siguen en el índice: no se reintentan aquí
+    fallidas = set(_borrar(viejos))
+    borrados = len(viejos) - len(fallidas)
+
+    cuota = cuota_mb * 1024 * 1024
+    total = con.execute("SELECT COALESCE(SUM(bytes), 0) FROM artefactos").fetchone()[0]
+    while total > cuota:
+        lote = [f for f in con.execute(
+            "SELECT ruta, bytes FROM artefactos ORDER BY creado LIMIT ?", (200 + len(fallidas),)
+        ).fetchall() if f["ruta"] not in fallidas]
+        if not lote:
+            break
+        # Solo lo necesario para bajar de la cuota
+        sobran, seleccion = total - cuota, []
+        for fila in lote:
+            if sobran <= 0:
+                break
+            seleccion.append(fila)
+            sobran -= fila["bytes"]
+        nuevas = _borrar(seleccion)
+        fallidas.update(nuevas)
+        borrados += len(seleccion) - len(nuevas)
+        if len(nuevas) == len(seleccion):
+            break  # esta pasada no borró nada: no insistir
+        total = con.execute("SELECT COALESCE(SUM(bytes), 0) FROM artefactos").fetchone()[0]
+
+    _borrar_carpetas_vacias()
+    if borrados:
+        print(f"🧹 Artefactos: {borrados} capturas borradas por retención "
+              f"({total / 1024 / 1024:.1f} MB en uso)")
+    return borrados
+
+
+def _ciclo_limpieza(intervalo):
+    while True:
+        try:
+            aplicar_retencion()
+        except Exception as e:
+            print(f"⚠️  Error aplicando retención de artefactos: {e}")
+        time.sleep(intervalo)
+
+
+def iniciar_limpieza_artefactos(intervalo: float = INTERVALO_LIMPIEZA_ARTEFACTOS):
+    """Aplica la retención al arrancar y luego cada `intervalo` segundos en segundo plano."""
+    global _hilo_limpieza
+    with _lock:
+        if _hilo_limpieza is not None:
+            return
+        _hilo_limpieza = threading.Thread(
+            target=_ciclo_limpieza, args=(intervalo,), name="limpieza-artefactos", daemon=True
+        )
+        _hilo_limpieza.start()
+
+
+def drenar_artefactos(timeout: float = 10):
+    """Espera a que terminen las escrituras pendientes (al salir del programa)."""
+    with _lock:
+        pendientes = list(_pendientes.values())
+    for futuro in pendientes:
+        try:
+            futuro.result(timeout=timeout)
+        except Exception:
+            pass
+
+
+if __name__ == "__main__":
+    argumentos = sys.argv[1:]
+    if "--limpiar" in argumentos:
+        aplicar_retencion()
+    elif argumentos and not argumentos[0].startswith("--"):
+        desde = argumentos[argumentos.index("--desde") + 1] if "--desde" in argumentos else None
+        for a in buscar_artefactos(placa=argumentos[0], desde=desde):
+            fecha = datetime.fromtimestamp(a["creado"]).isoformat(sep=" ", timespec="seconds")
+            print(f"{fecha}  [{a['evento']}]  {a['tipo']:<16} {a['bytes'] / 1024:7.1f} KB  {a['ruta']}")
+    print(estadisticas_artefactos())
@@ -0,0 +1,197 @@
+"""
+Bus de frames en memoria compartida entre procesos.
+
+Hasta ahora, para que el trabajador DeepFace (otro proceso, otro venv)
+viera un frame había que hacer cv2.imwrite a temp/temp_frame_compare.jpg
+y que él lo volviera a leer: codificar y decodificar JPEG y pasar por
+disco en cada comparación. El bus es un anillo de casillas de tamaño
+fijo en multiprocessing.shared_memory; quien captura publica el frame y
+le pasa al otro proceso solo una referencia pequeña (nombre del bus,
+casilla y número de secuencia), que este lee sin copiar.
+
+    bus = BusFrames.crear("rostro")              # proceso que captura
+    ref = bus.publicar(frame)                    # {"bus": ..., "casilla": 2, "secuencia": 17}
+    trabajador.comparar(ref, ...)                # viaja como JSON
+
+    frame = frame_desde_referencia(ref)          # proceso lector: vista numpy, sin copia
+
+Cada casilla guarda su número de secuencia (0 mientras se escribe), así
+el lector sabe si el frame que tiene en la mano sigue siendo el mismo
+(vigente(ref)). El escritor avanza por las casillas en orden, de modo
+que un lector que responde antes de que se publiquen SLOTS_BUS_FRAMES
+frames más nunca ve su casilla pisada; los consumidores actuales esperan
+la respuesta antes de publicar el siguiente frame.
+
+Solo frames uint8 (lo que entrega la cámara) de hasta el tamaño con que
+se creó el bus.
+"""
+
+import atexit
+import os
+import threading
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from core.config import SLOTS_BUS_FRAMES, TAMANO_MAXIMO_FRAME_BUS
+
+# Cabecera: [casillas, bytes_por_casilla, publicados] y por casilla [secuencia, alto, ancho, canales]
+_CAMPOS_GLOBALES = 3
+_CAMPOS_CASILLA = 4
+
+_creados = {}  # nombre -> BusFrames creados por este proceso
+
+
+class BusFrames:
+    def __init__(self, memoria: shared_memory.SharedMemory, propietario: bool):
+        self.memoria = memoria
+        self.nombre = memoria.name
+        self.propietario = propietario
+        globales = np.ndarray((_CAMPOS_GLOBALES,), dtype=np.int64, buffer=memoria.buf)
+        self.casillas = int(globales[0])
+        self.bytes_casilla = int(globales[1])
+        self._globales = globales
+        self._cabecera = np.ndarray(
+            (self.casillas, _CAMPOS_CASILLA), dtype=np.int64, buffer=memoria.buf,
+            offset=_CAMPOS_GLOBALES * 8
+        )
+        self._inicio_datos = (_CAMPOS_GLOBALES + self.casillas * _CAMPOS_CASILLA) * 8
+        self._lock = threading.Lock()
+
+    # ------------------------------------------
+    # Crear / abrir
+    # ------------------------------------------
+
+    @classmethod
+    def crear(cls, rol: str, casillas: int = SLOTS_BUS_FRAMES, bytes_casilla: int = TAMANO_MAXIMO_FRAME_BUS):
+        """Crea el bus del proceso para `rol`; se libera al salir del programa."""
+        cabecera = (_CAMPOS_GLOBALES + casillas * _CAMPOS_CASILLA) * 8
+        memoria = shared_memory.SharedMemory(
+            name=f"parq_{os.getpid()}_{rol}", create=True, size=cabecera + casillas * bytes_casilla
+        )
+        np.ndarray((_CAMPOS_GLOBALES,), dtype=np.int64, buffer=memoria.buf)[:] = (casillas, bytes_casilla, 0)
+        bus = cls(memoria, propietario=True)
+        bus._cabecera[:] = 0
+        _creados[bus.nombre] = bus
+        atexit.register(bus.cerrar)
+        return bus
+
+    @classmethod
+    def abrir(cls, nombre: str):
+        """Se conecta (como lector) a un bus creado por otro proceso."""
+        if nombre in _creados:
+            return _creados[nombre]  # mismo proceso: no hace falta otra conexión
+        memoria = shared_memory.SharedMemory(name=nombre)
+        try:
+            # Python < 3.13 registra también al lector en el resource_tracker,
+            # que borraría el segmento al terminar este proceso
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(memoria._name, "shared_memory")
+        except Exception:
+            pass
+        return cls(memoria, propietario=False)
+
+    # ------------------------------------------
+    # Escribir / leer
+    # ------------------------------------------
+
+    def publicar(self, frame):
+        """Copia el frame a la siguiente casilla. Retorna la referencia para el lector."""
+        if frame.dtype != np.uint8:
+            raise ValueError(f"El bus solo transporta frames uint8 (llegó {frame.dtype})")
+        if frame.nbytes > self.bytes_casilla:
+            raise ValueError(f"Frame de {frame.nbytes} bytes no cabe en casillas de {self.bytes_casilla}")
+
+        alto, ancho = frame.shape[:2]
+        canales = frame.shape[2] if frame.ndim == 3 else 1
+        with self._lock:
+            secuencia = int(self._globales[2]) + 1
+            casilla = secuencia % self.casillas
+            self._cabecera[casilla, 0] = 0  # escribiendo: ningún lector debe confiar en ella
+            self._vista(casilla, alto, ancho, canales)[...] = frame.reshape(alto, ancho, canales)
+            self._cabecera[casilla, 1:] = (alto, ancho, canales)
+            self._cabecera[casilla, 0] = secuencia
+            self._globales[2] = secuencia
+        return {"bus": self.nombre, "casilla": casilla, "secuencia": secuencia}
+
+    def _vista(self, casilla, alto, ancho, canales):
+        return np.ndarray(
+            (alto, ancho, canales), dtype=np.uint8, buffer=self.memoria.buf,
+            offset=self._inicio_datos + casilla * self.bytes_casilla
+        )
+
+    def vigente(self, ref: dict):
+        """True si la casilla todavía tiene el frame de la referencia."""
+        return int(self._cabecera[ref["casilla"], 0]) == ref["secuencia"]
+
+    def leer(self, ref: dict):
+        """Vista (sin copia) del frame de la referencia, o None si ya fue reemplazado."""
+        if not self.vigente(ref):
+            return None
+        alto, ancho, canales = (int(v) for v in self._cabecera[ref["casilla"], 1:])
+        vista = self._vista(ref["casilla"], alto, ancho, canales)
+        return vista if canales > 1 else vista[:, :, 0]
+
+    def cerrar(self):
+        memoria, self.memoria = self.memoria, None
+        if memoria is None:
+            return
+        if self.propietario:
+            _creados.pop(self.nombre, None)
+        # Las vistas numpy mantienen exportado el buffer; se sueltan antes de cerrar
+        self._globales = self._cabecera = None
+        try:
+            memoria.close()
+        except BufferError:
+            pass  # algún lector de este proceso aún tiene una vista; el SO libera al salir
+        if self.propietario:
+            try:
+                memoria.unlink()
+            except FileNotFoundError:
+                pass
+
+
+# ==========================================
+# LECTORES EN OTROS PROCESOS
+# ==========================================
+
+_abiertos = {}  # nombre -> BusFrames (un lector conectado una sola vez por bus)
+_abiertos_lock = threading.Lock()
+
+
+def frame_desde_referencia(ref: dict):
+    """Frame de una referencia de otro proceso (vista sin copia) o None si ya no está."""
+    with _abiertos_lock:
+        bus = _abiertos.get(ref["bus"])
+        if bus is None:
+            bus = _abiertos[ref["bus"]] = BusFrames.abrir(ref["bus"])
+    return bus.leer(ref)
+
+
+def vigente(ref: dict):
+    bus = _abiertos.get(ref["bus"])
+    return bus is not None and bus.vigente(ref)
+
+
+def olvidar_bus(nombre: str):
+    """Desconecta al lector de un bus (p. ej. cuando el proceso escritor terminó)."""
+    with _abiertos_lock:
+        bus = _abiertos.pop(nombre, None)
+    if bus is not None and not bus.propietario:
+        bus.cerrar()
+
+
+# ==========================================
+# BUS DEL PROCESO (uno por rol)
+# ==========================================
+
+_buses = {}
+_buses_lock = threading.Lock()
+
+
+def bus_frames(rol: str):
+    """Bus de este proceso para `rol` ("rostro", "placa"), creado la primera vez."""
+    with _buses_lock:
+        if rol not in _buses:
+            _buses[rol] = BusFrames.crear(rol)
+        return _buses[rol]
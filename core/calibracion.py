@@ -0,0 +1,248 @@
+"""
+Calibración del equipo: cadencias y tamaños elegidos según lo que rinde
+esta máquina y no la laptop donde se fijaron los números.
+
+Al arrancar (ver daemon_parqueadero.py) se mide brevemente:
+    - la latencia del detector de placas con varios tamaños de entrada
+    - la latencia del embedding facial de cada modelo candidato
+      (en el trabajador DeepFace persistente)
+y se elige el perfil más preciso cuya latencia estimada, desde que el
+carro queda quieto hasta la decisión, cabe en LATENCIA_OBJETIVO_MS:
+
+    CADA_FRAMES_YOLO, TAMANO_ENTRADA_DETECTOR, FRAMES_ESTABLES_PLACA,
+    CADA_FRAMES_ROSTRO, MODELO_FACIAL
+
+El perfil queda en RUTA_PERFIL_HOST y core/config.py lo carga en cada
+arranque. Para fijar un valor a mano (gana sobre lo medido, y una
+variable de entorno gana sobre ambos):
+
+    python -m core.calibracion                                # perfil vigente
+    python -m core.calibracion --calibrar                     # medir y elegir de nuevo
+    python -m core.calibracion --fijar CADA_FRAMES_YOLO=3 MODELO_FACIAL=ArcFace
+    python -m core.calibracion --quitar CADA_FRAMES_YOLO
+"""
+
+import json
+import math
+import os
+import sys
+import time
+from datetime import datetime
+
+from core import config
+from core.config import LATENCIA_OBJETIVO_MS, RUTA_PERFIL_HOST, CALIBRAR_AL_ARRANCAR
+from core.utils import percentil
+
+# Lo que se puede calibrar o fijar a mano
+CLAVES_PERFIL = (
+    "CADA_FRAMES_YOLO",
+    "TAMANO_ENTRADA_DETECTOR",
+    "TAMANO_ENTRADA_CARACTERES",
+    "FRAMES_ESTABLES_PLACA",
+    "CONFIANZA_DETECCION_PLACA",
+    "MOVIMIENTO_MAXIMO_PX",
+    "CADA_FRAMES_ROSTRO",
+    "MODELO_FACIAL",
+)
+
+# Candidatos, del más preciso al más liviano
+TAMANOS_ENTRADA = (640, 480, 320)
+MODELOS_FACIALES = ("ArcFace", "SFace")
+FRAMES_ESTABLES = (8, 7, 6, 5)
+
+FPS_SUPUESTO = 30.0  # si la cámara aún no reporta FPS
+
+
+# ==========================================
+# 1. MEDICIONES
+# ==========================================
+
+def medir_detector(modelo, tamanos=TAMANOS_ENTRADA, repeticiones: int = 5):
+    """p50 en ms de una inferencia del detector por tamaño de entrada."""
+    import numpy as np
+
+    frame = np.random.randint(0, 255, (480, 640, 3), dtype=np.uint8)
+    resultado = {}
+    for tamano in tamanos:
+        modelo(frame, verbose=False, imgsz=tamano)  # la primera con cada tamaño no cuenta
+        tiempos = []
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            modelo(frame, verbose=False, imgsz=tamano)
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+        resultado[tamano] = round(percentil(tiempos, 50), 1)
+    return resultado
+
+
+def medir_rostro(trabajador, modelos=MODELOS_FACIALES, repeticiones: int = 3):
+    """p50 en ms del embedding de un frame por modelo (carga cada modelo una vez)."""
+    try:
+        return trabajador.medir(list(modelos), repeticiones)
+    except Exception as e:
+        print(f"⚠️  No se pudo medir DeepFace: {e}")
+        return {}
+
+
+# ==========================================
+# 2. ELECCIÓN DEL PERFIL
+# ==========================================
+
+def estimar_latencia(perfil: dict, ms_detector: float, ms_rostro, fps: float):
+    """
+    ms desde que el carro queda quieto hasta la decisión:
+    FRAMES_ESTABLES_PLACA ciclos de detección + OCR + dos comparaciones
+    faciales seguidas (las que confirman la coincidencia).
+    """
+    ms_frame = 1000.0 / fps
+    ciclo_placa = (perfil["CADA_FRAMES_YOLO"] - 1) * ms_frame + max(ms_frame, ms_detector)
+    placa = perfil["FRAMES_ESTABLES_PLACA"] * ciclo_placa
+    ocr = ms_detector  # el modelo de caracteres es otro YOLO de tamaño parecido
+    rostro = 0.0
+    if ms_rostro:
+        rostro = 2 * ((perfil["CADA_FRAMES_ROSTRO"] - 1) * ms_frame + max(ms_frame, ms_rostro))
+    return placa + ocr + rostro
+
+
+def _cadencia(ms_inferencia: float, fps: float, factor: float, minimo: int, maximo: int):
+    """Cada cuántos frames inferir para no ocupar más de 1/factor del tiempo del bucle."""
+    return max(minimo, min(maximo, math.ceil(factor * ms_inferencia * fps / 1000.0)))
+
+
+def elegir_perfil(ms_detector: dict, ms_rostro: dict, fps: float, objetivo: float = LATENCIA_OBJETIVO_MS):
+    """
+    Recorre los candidatos del más preciso al más liviano (modelo facial,
+    luego tamaño de entrada, luego frames de estabilidad) y retorna el
+    primero que cumple el objetivo: (perfil, latencia_estimada, cumple).
+    """
+    modelos = [m for m in MODELOS_FACIALES if m in ms_rostro] or [config.MODELO_FACIAL]
+    tamanos = [t for t in TAMANOS_ENTRADA if t in ms_detector] or list(ms_detector)
+
+    perfil = estimado = None
+    for modelo in modelos:
+        t_rostro = ms_rostro.get(modelo)
+        for tamano in tamanos:
+            t_detector = ms_detector[tamano]
+            for frames_estables in FRAMES_ESTABLES:
+                perfil = {
+                    "CADA_FRAMES_YOLO": _cadencia(t_detector, fps, 1.5, 2, 10),
+                    "TAMANO_ENTRADA_DETECTOR": tamano,
+                    "FRAMES_ESTABLES_PLACA": frames_estables,
+                    "CADA_FRAMES_ROSTRO": _cadencia(t_rostro, fps, 2.0, 10, 60)
+                    if t_rostro else config.CADA_FRAMES_ROSTRO,
+                    "MODELO_FACIAL": modelo,
+                }
+                estimado = estimar_latencia(perfil, t_detector, t_rostro, fps)
+                if estimado <= objetivo:
+                    return perfil, round(estimado), True
+
+    # Ninguno cumple: el más liviano de todos
+    return perfil, round(estimado), False
+
+
+# ==========================================
+# 3. PERFIL EN DISCO Y EN core.config
+# ==========================================
+
+def leer_archivo_perfil():
+    try:
+        with open(RUTA_PERFIL_HOST, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _escribir_archivo_perfil(datos: dict):
+    RUTA_PERFIL_HOST.parent.mkdir(parents=True, exist_ok=True)
+    temporal = f"{RUTA_PERFIL_HOST}.tmp"
+    with open(temporal, "w", encoding="utf-8") as f:
+        json.dump(datos, f, ensure_ascii=False, indent=2)
+    os.replace(temporal, RUTA_PERFIL_HOST)
+
+
+def aplicar_perfil(perfil: dict):
+    """Actualiza core.config en caliente; lo manual y las variables de entorno se respetan."""
+    efectivo = {**perfil, **leer_archivo_perfil().get("manual", {})}
+    for clave, valor in efectivo.items():
+        if clave in CLAVES_PERFIL and clave not in os.environ:
+            setattr(config, clave, valor)
+    config.PERFIL_HOST.update(efectivo)
+
+
+def perfil_vigente():
+    return {clave: getattr(config, clave) for clave in CLAVES_PERFIL}
+
+
+def necesita_calibrar():
+    return CALIBRAR_AL_ARRANCAR or not RUTA_PERFIL_HOST.exists()
+
+
+def calibrar(detector, trabajador=None, fps: float = None, tamanos=TAMANOS_ENTRADA,
+             objetivo: float = LATENCIA_OBJETIVO_MS):
+    """Mide, elige, guarda y aplica el perfil. Retorna el perfil vigente."""
+    fps = fps or FPS_SUPUESTO
+    print(f"⏱️  Calibrando el equipo (objetivo {objetivo:.0f} ms, cámara a {fps:g} fps)...")
+    ms_detector = medir_detector(detector, tamanos)
+    ms_rostro = medir_rostro(trabajador) if trabajador is not None else {}
+
+    perfil, estimado, cumple = elegir_perfil(ms_detector, ms_rostro, fps, objetivo)
+    datos = leer_archivo_perfil()
+    datos.update({
+        "perfil": perfil,
+        "medido": {"fps": fps, "detector_ms": ms_detector, "rostro_ms": ms_rostro},
+        "latencia_estimada_ms": estimado,
+        "objetivo_ms": objetivo,
+        "creado": datetime.now().isoformat(timespec="seconds"),
+    })
+    datos.setdefault("manual", {})
+    _escribir_archivo_perfil(datos)
+    aplicar_perfil(perfil)
+
+    print(f"   Detector (ms por tamaño): {ms_detector}")
+    if ms_rostro:
+        print(f"   Embedding facial (ms por modelo): {ms_rostro}")
+    marca = "✅" if cumple else "⚠️  no alcanza el objetivo, se usa el perfil más liviano:"
+    print(f"   {marca} latencia estimada {estimado} ms -> {perfil_vigente()}")
+    return perfil_vigente()
+
+
+def fijar_manual(valores: dict):
+    """Fija valores a mano (convertidos al tipo del valor actual en core.config)."""
+    datos = leer_archivo_perfil()
+    manual = datos.setdefault("manual", {})
+    for clave, valor in valores.items():
+        if clave not in CLAVES_PERFIL:
+            raise KeyError(f"{clave} no es parte del perfil ({', '.join(CLAVES_PERFIL)})")
+        manual[clave] = type(getattr(config, clave))(valor)
+    _escribir_archivo_perfil(datos)
+    aplicar_perfil(datos.get("perfil", {}))
+
+
+def quitar_manual(claves):
+    datos = leer_archivo_perfil()
+    for clave in claves:
+        datos.get("manual", {}).pop(clave, None)
+    _escribir_archivo_perfil(datos)
+    print("ℹ️  Los valores quitados vuelven a lo calibrado en el próximo arranque")
+
+
+if __name__ == "__main__":
+    argumentos = sys.argv[1:]
+    if "--calibrar" in argumentos:
+        from core.modelos import cargar_yolo
+
+        # TorchScript solo acepta su tamaño de entrada: entonces se mide el .pt
+        formato = "pt" if config.FORMATO_MODELOS == "torchscript" else config.FORMATO_MODELOS
+        calibrar(cargar_yolo(config.MODELO_DETECTOR_PLACAS, "detector_placas", formato=formato))
+    elif "--fijar" in argumentos:
+        fijar_manual(dict(par.split("=", 1) for par in argumentos[argumentos.index("--fijar") + 1:]))
+    elif "--quitar" in argumentos:
+        quitar_manual(argumentos[argumentos.index("--quitar") + 1:])
+
+    datos = leer_archivo_perfil()
+    print(json.dumps({
+        "vigente": perfil_vigente(),
+        "manual": datos.get("manual", {}),
+        "medido": datos.get("medido"),
+        "latencia_estimada_ms": datos.get("latencia_estimada_ms"),
+        "creado": datos.get("creado"),
+    }, indent=2, ensure_ascii=False))
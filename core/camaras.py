@@ -0,0 +1,248 @@
+"""
+Cámaras compartidas durante toda la vida del proceso.
+
+Antes cada captura (placa, manual, rostro) abría y cerraba su propio
+cv2.VideoCapture(0), pagando cada vez la apertura del dispositivo y el
+ajuste de exposición automática (un segundo o más). Aquí cada dispositivo
+se abre una sola vez, un hilo lector lo mantiene leyendo y las etapas se
+suscriben para recibir frames:
+
+    cap = suscribir_camara("placa")     # misma interfaz que cv2.VideoCapture
+    ret, frame = cap.read()             # siempre el frame más reciente
+    cap.release()                       # suelta la suscripción, no la cámara
+
+Los roles "placa" y "rostro" se asignan a dispositivos con CAMARA_PLACA y
+CAMARA_ROSTRO; si apuntan al mismo índice comparten un solo dispositivo.
+"""
+
+import atexit
+import threading
+import time
+from collections import deque
+
+from core.config import CAMARA_PLACA, CAMARA_ROSTRO
+
+FRAMES_CALENTAMIENTO = 10   # se descartan al abrir (exposición y balance de blancos)
+TIMEOUT_FRAME = 2.0         # segundos esperando un frame nuevo antes de dar error
+FALLOS_PARA_REABRIR = 50    # lecturas fallidas seguidas antes de reabrir el dispositivo
+
+
+class Camara:
+    """Un dispositivo abierto con un hilo que lee frames sin parar."""
+
+    def __init__(self, indice, frames_calentamiento: int = FRAMES_CALENTAMIENTO):
+        self.indice = indice
+        self.frames_calentamiento = frames_calentamiento
+        self._cap = None
+        self._hilo = None
+        self._activa = False
+        self._lock = threading.Lock()
+        self._nuevo_frame = threading.Condition()
+
+        self._frame = None
+        self._secuencia = 0         # número del último frame leído
+        self.suscriptores = 0
+        self.tiempo_apertura = None  # segundos que tardó abrir + calentar
+        self._marcas = deque(maxlen=60)  # instantes de los últimos frames (fps)
+
+    def abrir(self):
+        """Abre el dispositivo (una sola vez) y arranca el hilo lector. Retorna True si quedó abierta."""
+        import cv2
+
+        with self._lock:
+            if self._activa:
+                return True
+
+            inicio = time.perf_counter()
+            cap = cv2.VideoCapture(self.indice)
+            if not cap.isOpened():
+                cap.release()
+                return False
+
+            for _ in range(self.frames_calentamiento):
+                cap.read()
+
+            self._cap = cap
+            self._activa = True
+            self.tiempo_apertura = time.perf_counter() - inicio
+            self._hilo = threading.Thread(target=self._leer, name=f"camara-{self.indice}", daemon=True)
+            self._hilo.start()
+            print(f"📷 Cámara {self.indice} abierta en {self.tiempo_apertura:.2f}s")
+            return True
+
+    def abierta(self):
+        return self._activa
+
+    def _reabrir(self):
+        import cv2
+
+        print(f"🔄 Cámara {self.indice}: demasiadas lecturas fallidas, reabriendo...")
+        self._cap.release()
+        time.sleep(0.5)
+        self._cap = cv2.VideoCapture(self.indice)
+
+    def _leer(self):
+        fallos = 0
+        while self._activa:
+            ret, frame = self._cap.read()
+            if not ret:
+                fallos += 1
+                if fallos >= FALLOS_PARA_REABRIR:
+                    self._reabrir()
+                    fallos = 0
+                time.sleep(0.01)
+                continue
+
+            fallos = 0
+            with self._nuevo_frame:
+                self._frame = frame
+                self._secuencia += 1
+                self._marcas.append(time.perf_counter())
+                self._nuevo_frame.notify_all()
+
+    def siguiente_frame(self, despues_de: int, timeout: float = TIMEOUT_FRAME):
+        """
+        Espera un frame más nuevo que `despues_de`.
+        Retorna (secuencia, frame) o (despues_de, None) si no llegó a tiempo.
+        """
+        with self._nuevo_frame:
+            llego = self._nuevo_frame.wait_for(
+                lambda: self._secuencia > despues_de or not self._activa, timeout=timeout
+            )
+            if not llego or not self._activa:
+                return despues_de, None
+            return self._secuencia, self._frame
+
+    def fps(self):
+        with self._nuevo_frame:
+            marcas = list(self._marcas)
+        if len(marcas) < 2:
+            return 0.0
+        return round((len(marcas) - 1) / (marcas[-1] - marcas[0]), 1)
+
+    def cerrar(self):
+        with self._lock:
+            if not self._activa:
+                return
+            self._activa = False
+            with self._nuevo_frame:
+                self._nuevo_frame.notify_all()
+            self._hilo.join(timeout=2)
+            self._cap.release()
+            self._cap = None
+
+
+class Suscripcion:
+    """
+    Vista de una Camara con la interfaz de cv2.VideoCapture que usan las
+    capturas (isOpened / read / release). Cada read() entrega un frame que
+    esta suscripción aún no había visto; el frame se comparte entre
+    suscriptores, así que no debe modificarse en el lugar.
+    """
+
+    def __init__(self, camara: Camara, rol: str):
+        self.camara = camara
+        self.rol = rol
+        self._vista = camara._secuencia  # los frames anteriores a suscribirse no interesan
+        self._activa = True
+        with camara._lock:
+            camara.suscriptores += 1
+
+    def isOpened(self):
+        return self._activa and self.camara.abierta()
+
+    def read(self):
+        if not self.isOpened():
+            return False, None
+        self._vista, frame = self.camara.siguiente_frame(self._vista)
+        return frame is not None, frame
+
+    def release(self):
+        if self._activa:
+            self._activa = False
+            with self.camara._lock:
+                self.camara.suscriptores -= 1
+
+
+class GestorCamaras:
+    """Asigna roles a dispositivos y mantiene cada dispositivo abierto una sola vez."""
+
+    def __init__(self, roles: dict = None):
+        self.roles = dict(roles or {"placa": CAMARA_PLACA, "rostro": CAMARA_ROSTRO})
+        self._camaras = {}  # índice -> Camara
+        self._lock = threading.Lock()
+
+    def dispositivo(self, indice):
+        """Camara del índice (abriéndola si hace falta) o None si no se pudo abrir."""
+        with self._lock:
+            camara = self._camaras.get(indice)
+            if camara is None:
+                camara = self._camaras[indice] = Camara(indice)
+        return camara if camara.abrir() else None
+
+    def camara(self, rol: str):
+        """Camara asignada al rol ("placa" / "rostro")."""
+        return self.dispositivo(self.roles[rol])
+
+    def comparten_dispositivo(self, rol_a: str, rol_b: str):
+        return self.roles[rol_a] == self.roles[rol_b]
+
+    def suscribir(self, rol: str, indice=None):
+        """
+        Suscripción al rol (o directamente a `indice`); si la cámara no abre,
+        una suscripción cerrada (isOpened() = False).
+        """
+        indice = self.roles[rol] if indice is None else indice
+        camara = self.dispositivo(indice)
+        if camara is None:
+            suscripcion = Suscripcion(Camara(indice), rol)
+            suscripcion.release()
+            return suscripcion
+        return Suscripcion(camara, rol)
+
+    def estado(self):
+        with self._lock:
+            camaras = dict(self._camaras)
+        return {
+            indice: {
+                "roles": [rol for rol, i in self.roles.items() if i == indice],
+                "abierta": camara.abierta(),
+                "suscriptores": camara.suscriptores,
+                "fps": camara.fps(),
+                "apertura_s": round(camara.tiempo_apertura, 2) if camara.tiempo_apertura else None,
+            }
+            for indice, camara in camaras.items()
+        }
+
+    def cerrar(self):
+        with self._lock:
+            camaras, self._camaras = list(self._camaras.values()), {}
+        for camara in camaras:
+            camara.cerrar()
+
+
+# ==========================================
+# GESTOR DEL PROCESO
+# ==========================================
+
+_gestor = None
+_gestor_lock = threading.Lock()
+
+
+def gestor_camaras():
+    """Gestor único del proceso; las cámaras se cierran al salir."""
+    global _gestor
+    with _gestor_lock:
+        if _gestor is None:
+            _gestor = GestorCamaras()
+            atexit.register(_gestor.cerrar)
+        return _gestor
+
+
+def suscribir_camara(rol: str):
+    return gestor_camaras().suscribir(rol)
+
+
+def cerrar_camaras():
+    if _gestor is not None:
+        _gestor.cerrar()
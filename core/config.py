@@ -0,0 +1,342 @@
+"""
+Configuración central del sistema de acceso al parqueadero.
+
+Todos los valores tienen un default razonable y pueden sobrescribirse
+con variables de entorno (o en el archivo .env).
+"""
+
+import json
+import os
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+# Variables del archivo .env, si existe (las del entorno real ganan). Con la
+# ruta explícita load_dotenv no inspecciona la pila ni recorre carpetas, y
+# dotenv ni se importa si no hay archivo
+if (BASE_DIR / ".env").exists():
+    try:
+        from dotenv import load_dotenv
+        load_dotenv(BASE_DIR / ".env")
+    except ImportError:
+        pass  # p. ej. el venv de DeepFace, que solo usa lo que viene en el entorno
+
+# Carpeta para datos locales persistentes (réplica, colas, caches)
+DATOS_DIR = Path(os.getenv("DATOS_DIR", BASE_DIR / "datos"))
+
+# ==========================================
+# RÉPLICA LOCAL (SQLite) DE SUPABASE
+# ==========================================
+
+RUTA_REPLICA = Path(os.getenv("RUTA_REPLICA", DATOS_DIR / "replica.db"))
+
+# Cada cuántos segundos se sincroniza la réplica en segundo plano
+INTERVALO_SINCRONIZACION = float(os.getenv("INTERVALO_SINCRONIZACION", "60"))
+
+# Filas por página en las descargas masivas
+TAMANO_PAGINA_SINCRONIZACION = int(os.getenv("TAMANO_PAGINA_SINCRONIZACION", "500"))
+
+# La sincronización por updated_at no ve los DELETE: cada tanto se compara la
+# lista completa de ids con Supabase y se borra lo que ya no existe allá
+# (un vehículo borrado deja de estar autorizado en a lo sumo este tiempo)
+INTERVALO_RECONCILIACION = float(os.getenv("INTERVALO_RECONCILIACION", "300"))
+
+# ==========================================
+# COLA DURABLE DE ESCRITURAS (registro_acceso, notificaciones)
+# ==========================================
+
+RUTA_COLA_ESCRITURA = Path(os.getenv("RUTA_COLA_ESCRITURA", DATOS_DIR / "cola_escritura.db"))
+
+# Espera máxima entre reintentos cuando Supabase no responde (segundos)
+ESPERA_MAXIMA_REINTENTO = float(os.getenv("ESPERA_MAXIMA_REINTENTO", "60"))
+
+# Tiempo que se espera a que la cola se vacíe al terminar el programa
+TIEMPO_DRENADO_SALIDA = float(os.getenv("TIEMPO_DRENADO_SALIDA", "10"))
+
+# Agrupación en inserciones masivas: se envía al juntar TAMANO_LOTE filas
+# o cuando la fila más antigua lleva VENTANA_LOTE segundos esperando
+TAMANO_LOTE = int(os.getenv("TAMANO_LOTE", "50"))
+VENTANA_LOTE = float(os.getenv("VENTANA_LOTE", "0.5"))
+
+# Notificaciones repetidas (mismo usuario, tipo y título) dentro de esta
+# ventana se fusionan en una sola
+VENTANA_DEBOUNCE_NOTIFICACIONES = float(os.getenv("VENTANA_DEBOUNCE_NOTIFICACIONES", "30"))
+
+# ==========================================
+# CACHE DE FOTOS BIOMÉTRICAS (direccionada por contenido)
+# ==========================================
+
+RUTA_CACHE_BIOMETRIA = Path(os.getenv("RUTA_CACHE_BIOMETRIA", BASE_DIR / "face" / "cache_biometria"))
+
+# Tamaño máximo en disco; al superarlo se borran las menos usadas (LRU)
+CUOTA_CACHE_BIOMETRIA_MB = float(os.getenv("CUOTA_CACHE_BIOMETRIA_MB", "200"))
+
+# Segundos durante los que una foto validada se usa sin volver a preguntar a Supabase
+FRESCURA_CACHE_BIOMETRIA = float(os.getenv("FRESCURA_CACHE_BIOMETRIA", "300"))
+
+# ==========================================
+# CLIENTE ASÍNCRONO DE SUPABASE
+# ==========================================
+
+# Peticiones simultáneas máximas (y conexiones en el pool)
+CONCURRENCIA_SUPABASE = int(os.getenv("CONCURRENCIA_SUPABASE", "8"))
+TIMEOUT_SUPABASE = float(os.getenv("TIMEOUT_SUPABASE", "10"))
+
+# ==========================================
+# RESILIENCIA DE LLAMADAS A SUPABASE
+# ==========================================
+
+# Presupuesto de tiempo por operación (segundos)
+TIMEOUT_CONSULTA = float(os.getenv("TIMEOUT_CONSULTA", "3"))
+TIMEOUT_DESCARGA = float(os.getenv("TIMEOUT_DESCARGA", "8"))
+TIMEOUT_ESCRITURA = float(os.getenv("TIMEOUT_ESCRITURA", "5"))
+
+# Fallos seguidos que abren el circuito y segundos que permanece abierto
+UMBRAL_FALLOS_CIRCUITO = int(os.getenv("UMBRAL_FALLOS_CIRCUITO", "5"))
+ENFRIAMIENTO_CIRCUITO = float(os.getenv("ENFRIAMIENTO_CIRCUITO", "30"))
+
+# Espera antes de lanzar el GET de cobertura mientras no haya un p95 medido
+RETRASO_COBERTURA = float(os.getenv("RETRASO_COBERTURA", "0.5"))
+
+# ==========================================
+# EVIDENCIAS (foto_captura) EN SUPABASE STORAGE
+# ==========================================
+
+RUTA_COLA_EVIDENCIAS = Path(os.getenv("RUTA_COLA_EVIDENCIAS", DATOS_DIR / "cola_evidencias.db"))
+
+# Copias locales de las capturas mientras esperan subir
+CARPETA_EVIDENCIAS = Path(os.getenv("CARPETA_EVIDENCIAS", DATOS_DIR / "evidencias"))
+
+BUCKET_EVIDENCIAS = os.getenv("BUCKET_EVIDENCIAS", "evidencias")
+
+# Subidas simultáneas máximas
+HILOS_SUBIDA_EVIDENCIAS = int(os.getenv("HILOS_SUBIDA_EVIDENCIAS", "2"))
+
+# Compresión antes de subir: lado mayor en píxeles y calidad JPEG (0-100)
+LADO_MAXIMO_EVIDENCIA = int(os.getenv("LADO_MAXIMO_EVIDENCIA", "1280"))
+CALIDAD_JPEG_EVIDENCIA = int(os.getenv("CALIDAD_JPEG_EVIDENCIA", "80"))
+
+# Intentos de enlazar una evidencia cuyo registro_acceso no está en Supabase ni
+# en la cola de escritura (nunca llegará); si la cola lo descartó se abandona enseguida
+INTENTOS_MAXIMOS_ENLACE_EVIDENCIA = int(os.getenv("INTENTOS_MAXIMOS_ENLACE_EVIDENCIA", "20"))
+
+# ==========================================
+# ARTEFACTOS (capturas de placa y rostro de cada evento)
+# ==========================================
+
+# Capturas por día (AAAA-MM-DD/<evento>_<nombre>.jpg) e índice SQLite por placa y fecha
+CARPETA_ARTEFACTOS = Path(os.getenv("CARPETA_ARTEFACTOS", DATOS_DIR / "artefactos"))
+RUTA_INDICE_ARTEFACTOS = Path(os.getenv("RUTA_INDICE_ARTEFACTOS", DATOS_DIR / "artefactos.db"))
+
+# Almacén e índice propios de replay_parqueadero.py, para que las corridas de
+# medición no llenen la cuota ni el índice de la portería
+CARPETA_ARTEFACTOS_REPLAY = Path(os.getenv("CARPETA_ARTEFACTOS_REPLAY", DATOS_DIR / "replay" / "artefactos"))
+RUTA_INDICE_ARTEFACTOS_REPLAY = Path(os.getenv("RUTA_INDICE_ARTEFACTOS_REPLAY",
+                                               DATOS_DIR / "replay" / "artefactos.db"))
+
+# Retención: se borra lo más viejo que RETENCION_ARTEFACTOS_DIAS y, si aún se
+# supera CUOTA_ARTEFACTOS_MB, lo más antiguo hasta quedar bajo la cuota
+RETENCION_ARTEFACTOS_DIAS = float(os.getenv("RETENCION_ARTEFACTOS_DIAS", "30"))
+CUOTA_ARTEFACTOS_MB = float(os.getenv("CUOTA_ARTEFACTOS_MB", "2048"))
+
+# Cada cuántos segundos se aplica la retención en segundo plano
+INTERVALO_LIMPIEZA_ARTEFACTOS = float(os.getenv("INTERVALO_LIMPIEZA_ARTEFACTOS", "3600"))
+
+# ==========================================
+# CÁMARAS Y MODO CONTINUO (pipeline de varios vehículos)
+# ==========================================
+
+# Índices de OpenCV de la cámara de placas y la del rostro (pueden ser la misma)
+CAMARA_PLACA = int(os.getenv("CAMARA_PLACA", "0"))
+CAMARA_ROSTRO = int(os.getenv("CAMARA_ROSTRO", "0"))
+
+# Segundos máximos buscando un rostro que coincida; al vencer el intento se registra
+# como denegado (sin teclado, p. ej. VISOR=mjpeg o ninguno, no hay ESC que lo corte)
+TIMEOUT_VERIFICACION_FACIAL = float(os.getenv("TIMEOUT_VERIFICACION_FACIAL", "30"))
+
+# Vehículos que pueden esperar entre una etapa y la siguiente
+CAPACIDAD_COLA_PIPELINE = int(os.getenv("CAPACIDAD_COLA_PIPELINE", "4"))
+
+# Consultas de conductor + descargas de biometría simultáneas
+HILOS_REFERENCIA_PIPELINE = int(os.getenv("HILOS_REFERENCIA_PIPELINE", "4"))
+
+# Segundos que el modo continuo espera, al detenerse, a los vehículos que ya estaban en el pipeline
+TIEMPO_CIERRE_PIPELINE = float(os.getenv("TIEMPO_CIERRE_PIPELINE", "60"))
+
+# ==========================================
+# VISUALIZACIÓN (vista previa de las cámaras)
+# ==========================================
+
+# "ventana" (cv2.imshow en su propio hilo), "mjpeg" (vista previa por HTTP) o "ninguno"
+VISOR = os.getenv("VISOR", "ventana")
+
+# Vista previa MJPEG: http://<equipo>:PUERTO_MJPEG/ a lo sumo FPS_MJPEG cuadros por segundo.
+# Solo en este equipo por defecto (las cámaras muestran placas y rostros, sin autenticación);
+# HOST_MJPEG=0.0.0.0 la publica en la red
+HOST_MJPEG = os.getenv("HOST_MJPEG", "127.0.0.1")
+PUERTO_MJPEG = int(os.getenv("PUERTO_MJPEG", "8081"))
+FPS_MJPEG = float(os.getenv("FPS_MJPEG", "5"))
+
+# ==========================================
+# TRAZAS POR ETAPA (latencias de cada evento)
+# ==========================================
+
+# Archivo JSON lines donde se agregan los spans de cada evento ("" = no exportar)
+RUTA_TRAZAS = os.getenv("RUTA_TRAZAS", str(DATOS_DIR / "trazas.jsonl"))
+
+# "jsonl" (un registro simple por span) u "otel" (OTLP JSON: una solicitud
+# resourceSpans/scopeSpans por evento, como el exportador a archivo del Collector)
+FORMATO_TRAZAS = os.getenv("FORMATO_TRAZAS", "jsonl")
+
+# Rotación: el archivo pasa a RUTA_TRAZAS.1 (y los anteriores a .2, .3...) al superar
+# TAMANO_MAXIMO_TRAZAS_MB o ANTIGUEDAD_MAXIMA_TRAZAS_H horas; se conservan ARCHIVOS_TRAZAS_CONSERVADOS
+TAMANO_MAXIMO_TRAZAS_MB = float(os.getenv("TAMANO_MAXIMO_TRAZAS_MB", "50"))
+ANTIGUEDAD_MAXIMA_TRAZAS_H = float(os.getenv("ANTIGUEDAD_MAXIMA_TRAZAS_H", "24"))
+ARCHIVOS_TRAZAS_CONSERVADOS = int(os.getenv("ARCHIVOS_TRAZAS_CONSERVADOS", "7"))
+
+# ==========================================
+# SERVIDOR LOCAL DE INFERENCIA (modelos YOLO compartidos entre carriles)
+# ==========================================
+
+# Modelo que detecta la placa en el frame completo
+MODELO_DETECTOR_PLACAS = os.getenv("MODELO_DETECTOR_PLACAS", "modelos/detectar-Placa/best.pt")
+
+# "unix:/ruta.sock" o "tcp:host:puerto" (Windows no tiene sockets Unix en Python)
+DIRECCION_INFERENCIA = os.getenv(
+    "DIRECCION_INFERENCIA",
+    "tcp:127.0.0.1:8765" if os.name == "nt" else "unix:/tmp/parqueadero_inferencia.sock"
+)
+
+# 1 = este carril no carga YOLO: detección y OCR los hace el servidor compartido
+USAR_SERVIDOR_INFERENCIA = os.getenv("USAR_SERVIDOR_INFERENCIA", "0") == "1"
+
+# Nombre del carril ante el servidor (métricas y reparto justo)
+ID_CARRIL = os.getenv("ID_CARRIL", "carril-1")
+
+# Lotes dinámicos: se espera a lo sumo VENTANA_LOTE_MS para juntar hasta LOTE_MAXIMO_INFERENCIA imágenes
+VENTANA_LOTE_MS = float(os.getenv("VENTANA_LOTE_MS", "8"))
+LOTE_MAXIMO_INFERENCIA = int(os.getenv("LOTE_MAXIMO_INFERENCIA", "8"))
+
+# ==========================================
+# BUS DE FRAMES EN MEMORIA COMPARTIDA (entre procesos)
+# ==========================================
+
+# 1 = los frames van al trabajador DeepFace y al servidor de inferencia por
+# memoria compartida; 0 = como antes (JPEG en disco / bytes por el socket)
+USAR_BUS_FRAMES = os.getenv("USAR_BUS_FRAMES", "1") == "1"
+
+# Casillas del anillo: un lector tiene ese margen de frames publicados antes de que se pise el suyo
+SLOTS_BUS_FRAMES = int(os.getenv("SLOTS_BUS_FRAMES", "4"))
+
+# Bytes por casilla (por defecto un frame 1920x1080 BGR)
+TAMANO_MAXIMO_FRAME_BUS = int(os.getenv("TAMANO_MAXIMO_FRAME_BUS", str(1920 * 1080 * 3)))
+
+# ==========================================
+# DEDUPLICACIÓN DE DISPAROS REPETIDOS (misma placa, mismo carril)
+# ==========================================
+
+RUTA_DEDUPLICACION = Path(os.getenv("RUTA_DEDUPLICACION", DATOS_DIR / "deduplicacion.db"))
+
+# Segundos durante los que una placa ya decidida en un carril reutiliza esa
+# decisión en lugar de volver a consultar, verificar el rostro y registrar
+COOLDOWN_PLACA = float(os.getenv("COOLDOWN_PLACA", "60"))
+
+# Un evento "en curso" que nunca se resolvió (proceso caído) deja de bloquear la placa después de esto
+LIMITE_EVENTO_EN_CURSO = float(os.getenv("LIMITE_EVENTO_EN_CURSO", "180"))
+
+# ==========================================
+# PERFIL DEL EQUIPO (cadencias calibradas, ver core/calibracion.py)
+# ==========================================
+
+# Perfil elegido por la calibración al arrancar; lo "manual" de ese archivo
+# gana sobre lo medido y una variable de entorno gana sobre ambos
+RUTA_PERFIL_HOST = Path(os.getenv("RUTA_PERFIL_HOST", DATOS_DIR / "perfil_host.json"))
+
+
+def _leer_perfil_host():
+    try:
+        with open(RUTA_PERFIL_HOST, encoding="utf-8") as f:
+            datos = json.load(f)
+        return {**datos.get("perfil", {}), **datos.get("manual", {})}
+    except (OSError, ValueError):
+        return {}
+
+
+PERFIL_HOST = _leer_perfil_host()
+
+
+def _ajuste(nombre: str, defecto, tipo):
+    return tipo(os.getenv(nombre, PERFIL_HOST.get(nombre, defecto)))
+
+
+# Latencia objetivo desde que el carro se detiene hasta la decisión
+LATENCIA_OBJETIVO_MS = float(os.getenv("LATENCIA_OBJETIVO_MS", "4000"))
+
+# 1 = calibrar en cada arranque del daemon (si no, solo cuando no hay perfil guardado)
+CALIBRAR_AL_ARRANCAR = os.getenv("CALIBRAR_AL_ARRANCAR", "0") == "1"
+
+# YOLO corre cada CADA_FRAMES_YOLO frames leídos, con entradas de TAMANO_ENTRADA_DETECTOR px
+CADA_FRAMES_YOLO = _ajuste("CADA_FRAMES_YOLO", 5, int)
+TAMANO_ENTRADA_DETECTOR = _ajuste("TAMANO_ENTRADA_DETECTOR", 640, int)
+
+# El modelo de caracteres corre sobre recortes de placa de pocos píxeles: a
+# 640 los agranda de más (barrido_resoluciones.py mide qué tamaño conviene)
+TAMANO_ENTRADA_CARACTERES = _ajuste("TAMANO_ENTRADA_CARACTERES", 640, int)
+
+# Cómo se lleva cada imagen a imgsz: "rect" = se escala y se rellena solo
+# hasta múltiplo de 32 (menos píxeles); "cuadrado" = hasta imgsz x imgsz
+LETTERBOX_DETECTOR = os.getenv("LETTERBOX_DETECTOR", "rect")
+LETTERBOX_CARACTERES = os.getenv("LETTERBOX_CARACTERES", "rect")
+
+# 1 = inferencia en media precisión (FP16); solo se aplica si hay GPU
+MEDIA_PRECISION_DETECTOR = os.getenv("MEDIA_PRECISION_DETECTOR", "0") == "1"
+MEDIA_PRECISION_CARACTERES = os.getenv("MEDIA_PRECISION_CARACTERES", "0") == "1"
+
+# La placa se captura tras FRAMES_ESTABLES_PLACA detecciones seguidas con
+# confianza >= CONFIANZA_DETECCION_PLACA que no se movieron MOVIMIENTO_MAXIMO_PX o más
+FRAMES_ESTABLES_PLACA = _ajuste("FRAMES_ESTABLES_PLACA", 8, int)
+CONFIANZA_DETECCION_PLACA = _ajuste("CONFIANZA_DETECCION_PLACA", 0.70, float)
+MOVIMIENTO_MAXIMO_PX = _ajuste("MOVIMIENTO_MAXIMO_PX", 15, int)
+
+# Comparación facial cada CADA_FRAMES_ROSTRO frames; el modelo solo cambia
+# en el trabajador DeepFace persistente (el modo por comparación usa ArcFace)
+CADA_FRAMES_ROSTRO = _ajuste("CADA_FRAMES_ROSTRO", 40, int)
+MODELO_FACIAL = _ajuste("MODELO_FACIAL", "ArcFace", str)
+
+# ==========================================
+# CACHE DE MODELOS (artefactos convertidos, ver core/modelos.py)
+# ==========================================
+
+# Una carpeta por best.pt, con el nombre del sha256 del archivo: cambiar los
+# pesos invalida solos sus artefactos
+RUTA_CACHE_MODELOS = Path(os.getenv("RUTA_CACHE_MODELOS", DATOS_DIR / "cache_modelos"))
+
+# "pt" = checkpoint con las capas ya fusionadas (acepta cualquier tamaño de
+# entrada y lotes); "torchscript" = exportado una vez por tamaño de entrada;
+# "onnx" / "openvino" = para CPU, exportados con ejes dinámicos (lotes y cualquier tamaño)
+FORMATO_MODELOS = os.getenv("FORMATO_MODELOS", "pt")
+
+# INT8_MODELOS=1 cuantiza onnx y openvino a INT8 calibrando con las imágenes de
+# CARPETA_CALIBRACION_INT8; si el modelo INT8 coincide con el .pt original
+# en menos de CONCORDANCIA_MINIMA_INT8 de esas imágenes, se descarta y se usa el FP32
+INT8_MODELOS = os.getenv("INT8_MODELOS", "0") == "1"
+CARPETA_CALIBRACION_INT8 = Path(os.getenv("CARPETA_CALIBRACION_INT8", BASE_DIR / "placas" / "detecciones"))
+CONCORDANCIA_MINIMA_INT8 = float(os.getenv("CONCORDANCIA_MINIMA_INT8", "0.98"))
+
+# ==========================================
+# PRESUPUESTO DE HILOS DE CPU (torch y TensorFlow en el mismo equipo, ver core/recursos.py)
+# ==========================================
+
+# 1 = repartir los hilos entre YOLO (torch) y DeepFace (TensorFlow) en lugar de
+# que cada uno use todos los núcleos; OMP_NUM_THREADS y compañía, si vienen en
+# el entorno, ganan sobre el reparto
+USAR_PRESUPUESTO_HILOS = os.getenv("USAR_PRESUPUESTO_HILOS", "1") == "1"
+
+# Hilos en total para los modelos (0 = todos los núcleos que puede usar el proceso)
+HILOS_CPU = int(os.getenv("HILOS_CPU", "0"))
+
+# Proporción del total para cada rol
+REPARTO_HILOS = os.getenv("REPARTO_HILOS", "yolo=1,deepface=1")
+
+# 1 = además atar cada rol a su propio grupo de núcleos (afinidad)
+FIJAR_NUCLEOS = os.getenv("FIJAR_NUCLEOS", "0") == "1"
@@ -0,0 +1,204 @@
+"""
+Deduplicación de disparos repetidos por placa y carril.
+
+Un carro esperando frente a la barrera se detecta, se lee y se consulta
+una y otra vez, y cada intento podía crear otra fila en registro_acceso y
+otra notificación. Aquí cada (placa normalizada, carril) tiene a lo sumo
+un evento vivo:
+
+    nuevo, previa = reclamar_evento("abc-123", evento.id)
+    if not nuevo:
+        ...  # otro evento de esa placa está en curso, o ya se decidió hace
+             # menos de COOLDOWN_PLACA: `previa` trae esa decisión
+    ...
+    resolver_evento("abc-123", evento.id, "permitido")   # arranca el cooldown
+    liberar_evento("abc-123", evento.id)                 # terminó sin decisión: se puede reintentar
+
+El estado vive en SQLite (RUTA_DEDUPLICACION), así también sirve entre
+corridas de main_integrated.py (un proceso por vehículo) y entre carriles
+del mismo equipo.
+
+Uso:
+    python -m core.deduplicacion     # decisiones vigentes y contadores de supresión
+"""
+
+import re
+import sqlite3
+import threading
+import time
+
+from core.config import (
+    RUTA_DEDUPLICACION,
+    COOLDOWN_PLACA,
+    LIMITE_EVENTO_EN_CURSO,
+    ID_CARRIL,
+)
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS eventos (
+    placa TEXT NOT NULL,
+    carril TEXT NOT NULL,
+    evento TEXT NOT NULL,
+    estado TEXT NOT NULL,          -- en_curso | decidido
+    decision TEXT,
+    inicio REAL NOT NULL,
+    expira REAL NOT NULL,
+    PRIMARY KEY (placa, carril)
+);
+
+CREATE TABLE IF NOT EXISTS supresiones (
+    carril TEXT NOT NULL,
+    motivo TEXT NOT NULL,          -- en_curso | reutilizada
+    n INTEGER NOT NULL DEFAULT 0,
+    ultima REAL,
+    PRIMARY KEY (carril, motivo)
+);
+"""
+
+_local = threading.local()
+
+# Métricas en memoria (desde que arrancó el proceso)
+_metricas = {
+    "nuevos": 0,
+    "suprimidos_en_curso": 0,
+    "suprimidos_reutilizada": 0,
+    "resueltos": 0,
+    "liberados": 0,
+}
+_metricas_lock = threading.Lock()
+
+
+def _conexion():
+    con = getattr(_local, "conexion", None)
+    if con is None:
+        RUTA_DEDUPLICACION.parent.mkdir(parents=True, exist_ok=True)
+        con = sqlite3.connect(str(RUTA_DEDUPLICACION), timeout=5, isolation_level=None)
+        con.row_factory = sqlite3.Row
+        con.execute("PRAGMA journal_mode=WAL")
+        con.executescript(_ESQUEMA)
+        _local.conexion = con
+    return con
+
+
+def _contar(clave: str):
+    with _metricas_lock:
+        _metricas[clave] += 1
+
+
+def normalizar_placa(placa: str):
+    """"abc-123 " -> "ABC123": el OCR a veces mete guiones o espacios."""
+    return re.sub(r"[^A-Z0-9]", "", (placa or "").upper())
+
+
+# ==========================================
+# 1. CICLO DE VIDA DE UN EVENTO
+# ==========================================
+
+def reclamar_evento(placa: str, evento: str, carril: str = ID_CARRIL):
+    """
+    Intenta quedarse con la placa en el carril.
+
+    Returns:
+        (True, None) si el evento es nuevo y debe seguir el flujo completo;
+        (False, None) si otro evento de la misma placa sigue en curso;
+        (False, decision) si ya se decidió dentro del cooldown.
+    """
+    placa = normalizar_placa(placa)
+    ahora = time.time()
+    con = _conexion()
+    con.execute("BEGIN IMMEDIATE")  # leer y escribir sin que otro proceso se meta en medio
+    try:
+        fila = con.execute(
+            "SELECT estado, decision, evento FROM eventos WHERE placa = ? AND carril = ? AND expira > ?",
+            (placa, carril, ahora)
+        ).fetchone()
+
+        if fila is not None and fila["evento"] != evento:
+            motivo = "en_curso" if fila["estado"] == "en_curso" else "reutilizada"
+            con.execute(
+                "INSERT INTO supresiones (carril, motivo, n, ultima) VALUES (?, ?, 1, ?) "
+                "ON CONFLICT (carril, motivo) DO UPDATE SET n = n + 1, ultima = excluded.ultima",
+                (carril, motivo, ahora)
+            )
+            con.execute("COMMIT")
+            _contar(f"suprimidos_{motivo}")
+            return False, fila["decision"]
+
+        con.execute(
+            "INSERT OR REPLACE INTO eventos (placa, carril, evento, estado, decision, inicio, expira) "
+            "VALUES (?, ?, ?, 'en_curso', NULL, ?, ?)",
+            (placa, carril, evento, ahora, ahora + LIMITE_EVENTO_EN_CURSO)
+        )
+        con.execute("COMMIT")
+    except Exception:
+        con.execute("ROLLBACK")
+        raise
+
+    _contar("nuevos")
+    return True, None
+
+
+def resolver_evento(placa: str, evento: str, decision: str, carril: str = ID_CARRIL,
+                    cooldown: float = COOLDOWN_PLACA):
+    """Guarda la decisión ("permitido" / "denegado"); los disparos siguientes la reutilizan durante `cooldown`."""
+    ahora = time.time()
+    _conexion().execute(
+        "UPDATE eventos SET estado = 'decidido', decision = ?, expira = ? "
+        "WHERE placa = ? AND carril = ? AND evento = ?",
+        (decision, ahora + cooldown, normalizar_placa(placa), carril, evento)
+    )
+    _contar("resueltos")
+
+
+def liberar_evento(placa: str, evento: str, carril: str = ID_CARRIL):
+    """El evento terminó sin decisión (no hubo rostro, error...): el próximo disparo va completo."""
+    cursor = _conexion().execute(
+        "DELETE FROM eventos WHERE placa = ? AND carril = ? AND evento = ? AND estado = 'en_curso'",
+        (normalizar_placa(placa), carril, evento)
+    )
+    if cursor.rowcount:
+        _contar("liberados")
+
+
+# ==========================================
+# 2. MÉTRICAS
+# ==========================================
+
+def estadisticas_deduplicacion():
+    con = _conexion()
+    ahora = time.time()
+    vigentes = con.execute(
+        "SELECT estado, COUNT(*) AS n FROM eventos WHERE expira > ? GROUP BY estado", (ahora,)
+    ).fetchall()
+    supresiones = con.execute("SELECT carril, motivo, n FROM supresiones").fetchall()
+    with _metricas_lock:
+        proceso = dict(_metricas)
+    return {
+        "cooldown_s": COOLDOWN_PLACA,
+        "vigentes": {f["estado"]: f["n"] for f in vigentes},
+        "supresiones": {f"{f['carril']}/{f['motivo']}": f["n"] for f in supresiones},
+        "proceso": proceso,
+    }
+
+
+def imprimir_deduplicacion():
+    e = estadisticas_deduplicacion()["proceso"]
+    suprimidos = e["suprimidos_en_curso"] + e["suprimidos_reutilizada"]
+    if e["nuevos"] or suprimidos:
+        print(f"🔁 Deduplicación: {e['nuevos']} eventos nuevos | {suprimidos} disparos suprimidos "
+              f"({e['suprimidos_reutilizada']} con decisión reutilizada, "
+              f"{e['suprimidos_en_curso']} con evento en curso)")
+
+
+def purgar_vencidos():
+    """Borra los eventos cuyo cooldown ya pasó (la tabla no crece con el tiempo)."""
+    return _conexion().execute("DELETE FROM eventos WHERE expira <= ?", (time.time(),)).rowcount
+
+
+if __name__ == "__main__":
+    purgar_vencidos()
+    for fila in _conexion().execute("SELECT * FROM eventos ORDER BY inicio DESC"):
+        restante = fila["expira"] - time.time()
+        print(f"{fila['placa']:<10} {fila['carril']:<12} {fila['estado']:<10} "
+              f"{fila['decision'] or '-':<10} [{fila['evento']}] vence en {restante:.0f}s")
+    print(estadisticas_deduplicacion())
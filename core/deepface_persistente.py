@@ -0,0 +1,150 @@
+"""
+Cliente del proceso persistente de DeepFace (face/trabajador_deepface.py).
+
+En lugar de lanzar un Python nuevo del venv deepface por cada comparación
+(y cargar TensorFlow + ArcFace cada vez), el trabajador se arranca una
+sola vez y se le envían pedidos JSON por stdin. Cada pedido lleva un `id`
+que el trabajador devuelve en la respuesta: una respuesta tardía de un
+pedido que ya venció se descarta en lugar de tomarse por la del siguiente.
+
+    trabajador = TrabajadorDeepFace(PYTHON_DEEPFACE).iniciar()
+    coincide, distancia = trabajador.comparar("frame.jpg", "referencia.jpg")
+    trabajador.cerrar()
+
+Lo que imprima TensorFlow queda en DATOS_DIR/trabajador_deepface.log.
+"""
+
+import itertools
+import json
+import os
+import queue
+import subprocess
+import threading
+import time
+
+from core import config
+from core.config import BASE_DIR, DATOS_DIR
+from core.recursos import entorno_para, medir_inferencia
+
+SCRIPT_TRABAJADOR = BASE_DIR / "face" / "trabajador_deepface.py"
+
+
+class TrabajadorDeepFace:
+    """Proceso DeepFace de larga vida; un pedido a la vez (thread-safe)."""
+
+    def __init__(self, python, script=SCRIPT_TRABAJADOR, timeout_arranque: float = 180):
+        self.python = python
+        self.script = script
+        self.timeout_arranque = timeout_arranque
+        self._proceso = None
+        self._respuestas = queue.Queue()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._log = None
+        self.modelo = None  # modelo facial con que arrancó el proceso
+
+    @staticmethod
+    def _leer_salida(proceso, respuestas):
+        # Solo escribe en la cola de su proceso: tras un reinicio, lo que el
+        # proceso anterior responda tarde (o su fin) no llega a la cola nueva
+        for linea in proceso.stdout:
+            respuestas.put(linea)
+        respuestas.put(None)  # el proceso terminó
+
+    def iniciar(self):
+        """Lanza el proceso y espera a que tenga el modelo cargado."""
+        DATOS_DIR.mkdir(parents=True, exist_ok=True)
+        self._log = open(DATOS_DIR / "trabajador_deepface.log", "a", encoding="utf-8")
+        self._respuestas = queue.Queue()
+        self._proceso = subprocess.Popen(
+            [str(self.python), "-u", str(self.script)],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=self._log,
+            text=True,
+            encoding="utf-8",
+            bufsize=1,
+            cwd=str(BASE_DIR),
+            # Se lee en cada arranque: la calibración puede haber cambiado el modelo.
+            # Los hilos y núcleos de DeepFace salen del presupuesto de CPU (core/recursos.py)
+            env={**os.environ, "MODELO_FACIAL": config.MODELO_FACIAL, **entorno_para("deepface")},
+        )
+        threading.Thread(target=self._leer_salida, args=(self._proceso, self._respuestas),
+                         name="deepface-salida", daemon=True).start()
+
+        listo = self._esperar_respuesta(self.timeout_arranque)
+        if not listo.get("listo"):
+            self.cerrar()
+            raise RuntimeError(f"El trabajador DeepFace no arrancó: {listo}")
+        self.modelo = listo.get("modelo")
+        return self
+
+    def vivo(self):
+        return self._proceso is not None and self._proceso.poll() is None
+
+    def _esperar_respuesta(self, timeout: float, id_pedido: int = None):
+        """Siguiente respuesta (con `id_pedido`, la de ese pedido; las de otros se descartan)."""
+        limite = time.monotonic() + timeout
+        while True:
+            try:
+                linea = self._respuestas.get(timeout=max(0.0, limite - time.monotonic()))
+            except queue.Empty:
+                # Un pedido colgado deja el protocolo desfasado: reiniciar en el próximo
+                self.cerrar()
+                raise TimeoutError(f"El trabajador DeepFace no respondió en {timeout:g}s")
+            if linea is None:
+                raise RuntimeError("El trabajador DeepFace terminó inesperadamente")
+            respuesta = json.loads(linea)
+            if id_pedido is None or respuesta.get("id") == id_pedido:
+                return respuesta
+            print(f"⚠️  Respuesta de DeepFace descartada (pedido {respuesta.get('id')}, "
+                  f"se esperaba {id_pedido})")
+
+    def _pedir(self, pedido: dict, timeout: float = 30):
+        with self._lock:
+            if not self.vivo():
+                print("🔄 Reiniciando trabajador DeepFace...")
+                self.iniciar()
+            pedido = {**pedido, "id": next(self._ids)}
+            self._proceso.stdin.write(json.dumps(pedido) + "\n")
+            self._proceso.stdin.flush()
+            respuesta = self._esperar_respuesta(timeout, pedido["id"])
+
+        if not respuesta.get("ok"):
+            raise RuntimeError(respuesta.get("error", "error desconocido en DeepFace"))
+        return respuesta
+
+    def comparar(self, ruta_frame, ruta_referencia, ruta_embedding=None, timeout: float = 30):
+        """
+        Retorna (coincide, distancia) del frame contra la foto de referencia.
+        `ruta_frame` puede ser una ruta o una referencia de core/bus_frames.py.
+        """
+        with medir_inferencia("deepface"):
+            respuesta = self._pedir({
+                "op": "comparar",
+                "frame": ruta_frame if isinstance(ruta_frame, dict) else str(ruta_frame),
+                "referencia": str(ruta_referencia),
+                "embedding": str(ruta_embedding) if ruta_embedding else None,
+            }, timeout)
+        return respuesta["coincide"], respuesta["distancia"]
+
+    def calcular_embedding(self, ruta_foto, ruta_salida, timeout: float = 120):
+        """Calcula y guarda el embedding ArcFace de la foto (mismo JSON que calcular_embedding.py)."""
+        self._pedir({"op": "embedding", "foto": str(ruta_foto), "salida": str(ruta_salida)}, timeout)
+        return str(ruta_salida)
+
+    def medir(self, modelos, repeticiones: int = 3, timeout: float = 600):
+        """p50 en ms del embedding con cada modelo (ver core/calibracion.py)."""
+        return self._pedir({"op": "medir", "modelos": modelos, "repeticiones": repeticiones}, timeout)["ms"]
+
+    def cerrar(self):
+        proceso, self._proceso = self._proceso, None
+        if proceso is not None:
+            try:
+                proceso.stdin.close()
+                proceso.wait(timeout=5)
+            except Exception:
+                proceso.kill()
+        if self._log is not None:
+            self._log.close()
+            self._log = None
@@ -0,0 +1,163 @@
+"""
+Fuentes de frames intercambiables: cámara, archivo de video o secuencia
+de imágenes, todas con la interfaz de cv2.VideoCapture que usan las
+capturas (isOpened / read / release).
+
+    fuente = abrir_fuente("grabaciones/porteria_01.mp4")
+    fuente = abrir_fuente("grabaciones/porteria_01/")     # carpeta de .jpg/.png
+    fuente = abrir_fuente(None, rol="placa")             # cámara del rol (core/camaras.py)
+    fuente = abrir_fuente("1")                            # cámara por índice
+
+Los archivos se leen frame por frame sin saltarse ninguno y tan rápido
+como los consuma quien lee (salvo `tiempo_real=True`), para que dos
+corridas sobre la misma grabación den el mismo resultado.
+"""
+
+import glob
+import os
+import time
+from abc import ABC, abstractmethod
+
+EXTENSIONES_IMAGEN = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+class FuenteFrames(ABC):
+    """Base: cuenta los frames entregados para calcular FPS de procesamiento."""
+
+    descripcion = "fuente"
+
+    def __init__(self):
+        self.frames_leidos = 0
+        self._inicio = None
+
+    def _contar(self, ret):
+        if self._inicio is None:
+            self._inicio = time.perf_counter()
+        if ret:
+            self.frames_leidos += 1
+
+    def fps(self):
+        if not self._inicio or not self.frames_leidos:
+            return 0.0
+        return round(self.frames_leidos / (time.perf_counter() - self._inicio), 1)
+
+    @abstractmethod
+    def isOpened(self):
+        """True mientras la fuente pueda entregar frames."""
+
+    @abstractmethod
+    def read(self):
+        """(ret, frame) como cv2.VideoCapture.read."""
+
+    def release(self):
+        pass
+
+
+class FuenteCamara(FuenteFrames):
+    """Suscripción a una cámara del gestor (siempre el frame más reciente)."""
+
+    def __init__(self, rol: str = "placa", indice=None):
+        super().__init__()
+        from core.camaras import gestor_camaras
+
+        self._suscripcion = gestor_camaras().suscribir(rol, indice)
+        self.descripcion = f"cámara {self._suscripcion.camara.indice} ({rol})"
+
+    def isOpened(self):
+        return self._suscripcion.isOpened()
+
+    def read(self):
+        ret, frame = self._suscripcion.read()
+        self._contar(ret)
+        return ret, frame
+
+    def release(self):
+        self._suscripcion.release()
+
+
+class FuenteVideo(FuenteFrames):
+    """Archivo de video leído en orden; con tiempo_real=True respeta los FPS del archivo."""
+
+    def __init__(self, ruta, tiempo_real: bool = False):
+        super().__init__()
+        import cv2
+
+        self.ruta = str(ruta)
+        self.descripcion = os.path.basename(self.ruta)
+        self._cap = cv2.VideoCapture(self.ruta)
+        self.fps_archivo = self._cap.get(cv2.CAP_PROP_FPS) or 30.0
+        self.total_frames = int(self._cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+        self.tiempo_real = tiempo_real
+
+    def isOpened(self):
+        return self._cap is not None and self._cap.isOpened()
+
+    def read(self):
+        if not self.isOpened():
+            return False, None
+        if self.tiempo_real and self._inicio is not None:
+            # Esperar hasta el instante que le toca al frame siguiente
+            objetivo = self._inicio + self.frames_leidos / self.fps_archivo
+            espera = objetivo - time.perf_counter()
+            if espera > 0:
+                time.sleep(espera)
+        ret, frame = self._cap.read()
+        self._contar(ret)
+        return ret, frame
+
+    def release(self):
+        if self._cap is not None:
+            self._cap.release()
+            self._cap = None
+
+
+class FuenteImagenes(FuenteFrames):
+    """Secuencia de imágenes (carpeta o patrón glob) en orden alfabético."""
+
+    def __init__(self, ruta_o_patron):
+        super().__init__()
+        ruta_o_patron = str(ruta_o_patron)
+        if os.path.isdir(ruta_o_patron):
+            rutas = [os.path.join(ruta_o_patron, n) for n in os.listdir(ruta_o_patron)]
+        else:
+            rutas = glob.glob(ruta_o_patron)
+        self.rutas = sorted(r for r in rutas if r.lower().endswith(EXTENSIONES_IMAGEN))
+        self.descripcion = os.path.basename(ruta_o_patron.rstrip("/\\")) or ruta_o_patron
+        self.total_frames = len(self.rutas)
+        self._posicion = 0
+        self._abierta = True
+
+    def isOpened(self):
+        return self._abierta and bool(self.rutas)
+
+    def read(self):
+        import cv2
+
+        while self.isOpened() and self._posicion < len(self.rutas):
+            frame = cv2.imread(self.rutas[self._posicion])
+            self._posicion += 1
+            if frame is not None:
+                self._contar(True)
+                return True, frame
+        self._contar(False)
+        return False, None
+
+    def release(self):
+        self._abierta = False
+
+
+def abrir_fuente(origen=None, rol: str = "placa", tiempo_real: bool = False):
+    """
+    Crea la fuente adecuada para `origen`:
+    None -> cámara del rol; entero o "2" -> cámara por índice;
+    carpeta, patrón glob o imagen -> FuenteImagenes; otro archivo -> FuenteVideo.
+    """
+    if origen is None:
+        return FuenteCamara(rol)
+    if isinstance(origen, int) or str(origen).isdigit():
+        return FuenteCamara(rol, int(origen))
+
+    origen = str(origen)
+    if os.path.isdir(origen) or any(c in origen for c in "*?[") or origen.lower().endswith(EXTENSIONES_IMAGEN):
+        return FuenteImagenes(origen)
+    return FuenteVideo(origen, tiempo_real=tiempo_real)
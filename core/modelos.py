@@ -0,0 +1,491 @@
+"""
+Carga de los modelos YOLO con cache de artefactos convertidos.
+
+Cada best.pt tiene su carpeta en RUTA_CACHE_MODELOS, con el nombre del
+sha256 del archivo (cambiar los pesos invalida solos sus artefactos):
+
+    datos/cache_modelos/best-3f9a1c.../
+        pt_fusionado.pt          # capas Conv+BN ya fusionadas
+        torchscript_640.torchscript
+        onnx_640_int8.onnx       # ONNX Runtime, cuantizado con placas/detecciones
+        openvino_640_openvino_model/
+        artefactos.json          # de qué salieron, con qué ultralytics, tiempos en frío
+
+La primera vez que se carga un modelo en un formato se convierte (en
+frío); los arranques siguientes cargan el artefacto directo (en tibio).
+Al terminar se imprime cuánto tardó cada modelo y cuánto tardó en frío.
+
+Con INT8_MODELOS=1 (solo onnx y openvino) el modelo se cuantiza calibrando
+con las imágenes de CARPETA_CALIBRACION_INT8 y se compara con el .pt
+original en esas mismas imágenes: si las cajas (clase e IoU >= 0.5)
+coinciden en menos de CONCORDANCIA_MINIMA_INT8 de ellas, el INT8 queda
+marcado como rechazado y se usa el mismo formato en FP32. Todos los
+formatos se cargan con YOLO(), así que aceptan las mismas entradas
+(rutas, frames BGR, listas) que el .pt.
+
+
+    modelo = cargar_yolo(MODELO_DETECTOR_PLACAS, "detector_placas", imgsz=640)
+    futuros = arrancar_modelos()          # detector y OCR en paralelo
+    imprimir_arranque_modelos()
+
+Uso:
+    python -m core.modelos             # artefactos en cache
+    python -m core.modelos --limpiar   # borra los de pesos que ya no existen
+
+Latencia y concordancia de cada formato: benchmark_modelos.py
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+from core import config
+from core.config import (
+    BASE_DIR,
+    RUTA_CACHE_MODELOS,
+    FORMATO_MODELOS,
+    MODELO_DETECTOR_PLACAS,
+    INT8_MODELOS,
+    CARPETA_CALIBRACION_INT8,
+    CONCORDANCIA_MINIMA_INT8,
+)
+
+_RUTA_HUELLAS = RUTA_CACHE_MODELOS / "huellas.json"
+
+# Formatos que se pueden cuantizar a INT8
+FORMATOS_INT8 = ("onnx", "openvino")
+EXTENSIONES_IMAGEN = (".jpg", ".jpeg", ".png", ".bmp")
+
+_tiempos = {}  # nombre -> desglose del último arranque de ese modelo
+_lock = threading.Lock()
+_conversion_lock = threading.Lock()  # una conversión a la vez (torch ya usa todos los núcleos)
+
+
+# ==========================================
+# 1. HUELLA DE LOS PESOS
+# ==========================================
+
+def _leer_json(ruta: Path):
+    try:
+        with open(ruta, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _escribir_json(ruta: Path, datos: dict):
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    temporal = f"{ruta}.{os.getpid()}.tmp"
+    with open(temporal, "w", encoding="utf-8") as f:
+        json.dump(datos, f, ensure_ascii=False, indent=2)
+    os.replace(temporal, ruta)
+
+
+def huella(ruta):
+    """
+    sha256 del archivo de pesos. Se recuerda por (tamaño, fecha) en
+    huellas.json para no releer el archivo entero en cada arranque.
+    """
+    ruta = Path(BASE_DIR, ruta).resolve()
+    estado = ruta.stat()
+    clave = str(ruta)
+    with _lock:
+        conocidas = _leer_json(_RUTA_HUELLAS)
+        previa = conocidas.get(clave)
+        if previa and previa["tamano"] == estado.st_size and previa["mtime_ns"] == estado.st_mtime_ns:
+            return previa["sha256"]
+
+    sha = hashlib.sha256()
+    with open(ruta, "rb") as f:
+        for bloque in iter(lambda: f.read(1 << 20), b""):
+            sha.update(bloque)
+
+    with _lock:
+        conocidas = _leer_json(_RUTA_HUELLAS)
+        conocidas[clave] = {"tamano": estado.st_size, "mtime_ns": estado.st_mtime_ns, "sha256": sha.hexdigest()}
+        _escribir_json(_RUTA_HUELLAS, conocidas)
+    return sha.hexdigest()
+
+
+def carpeta_cache(ruta, sha: str = None):
+    sha = sha or huella(ruta)
+    return RUTA_CACHE_MODELOS / f"{Path(ruta).stem}-{sha[:16]}"
+
+
+# ==========================================
+# 2. CONCORDANCIA CON EL MODELO ORIGINAL
+# ==========================================
+
+def _iou(a, b):
+    ancho = max(0.0, min(a[2], b[2]) - max(a[0], b[0]))
+    alto = max(0.0, min(a[3], b[3]) - max(a[1], b[1]))
+    interseccion = ancho * alto
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - interseccion
+    return interseccion / union if union > 0 else 0.0
+
+
+def mismas_cajas(referencia, candidato, iou_minimo: float = 0.5):
+    """True si los dos resultados tienen las mismas cajas (misma clase e IoU >= iou_minimo, una a una)."""
+    cajas_ref = list(zip(referencia.boxes.cls.tolist(), referencia.boxes.xyxy.tolist()))
+    cajas_cand = list(zip(candidato.boxes.cls.tolist(), candidato.boxes.xyxy.tolist()))
+    if len(cajas_ref) != len(cajas_cand):
+        return False
+    for clase, caja in cajas_ref:
+        pareja = next((c for c in cajas_cand if c[0] == clase and _iou(caja, c[1]) >= iou_minimo), None)
+        if pareja is None:
+            return False
+        cajas_cand.remove(pareja)
+    return True
+
+
+def concordancia(referencia, candidato, imagenes, imgsz: int = 640, conf: float = 0.5):
+    """Fracción de imágenes en que `candidato` da las mismas cajas que `referencia` (1.0 sin imágenes)."""
+    if not imagenes:
+        return 1.0
+    coinciden = 0
+    for ruta in imagenes:
+        a = referencia.predict(str(ruta), imgsz=imgsz, conf=conf, verbose=False)[0]
+        b = candidato.predict(str(ruta), imgsz=imgsz, conf=conf, verbose=False)[0]
+        coinciden += mismas_cajas(a, b)
+    return coinciden / len(imagenes)
+
+
+def _verificar_int8(ruta: Path, destino: Path, imgsz: int):
+    from ultralytics import YOLO
+
+    return round(concordancia(YOLO(str(ruta)), YOLO(str(destino), task="detect"), imagenes_calibracion(), imgsz), 4)
+
+
+# ==========================================
+# 3. CONVERSIÓN Y CARGA
+# ==========================================
+
+def _version_ultralytics():
+    try:
+        import ultralytics
+        return ultralytics.__version__
+    except Exception:
+        return "?"
+
+
+def _fusionar(ruta: Path, destino: Path):
+    """Guarda el checkpoint con Conv+BN fusionadas: AutoBackend ya no tiene que hacerlo al cargar."""
+    import torch
+    from ultralytics import YOLO
+
+    modelo = YOLO(str(ruta))
+    modelo.model.fuse(verbose=False)
+    torch.save({"model": modelo.model, "train_args": modelo.ckpt.get("train_args", {})}, destino)
+    return destino
+
+
+def imagenes_calibracion(carpeta=CARPETA_CALIBRACION_INT8, limite: int = 300):
+    """Imágenes para calibrar el INT8 y para el chequeo de concordancia."""
+    carpeta = Path(carpeta)
+    if not carpeta.is_dir():
+        return []
+    return sorted(p for p in carpeta.iterdir() if p.suffix.lower() in EXTENSIONES_IMAGEN)[:limite]
+
+
+def _tensor_letterbox(ruta: Path, imgsz: int):
+    """Imagen como la prepara ultralytics: letterbox a imgsz, RGB, NCHW float32 en [0, 1]."""
+    import cv2
+    import numpy as np
+
+    imagen = cv2.imread(str(ruta))
+    alto, ancho = imagen.shape[:2]
+    escala = imgsz / max(alto, ancho)
+    imagen = cv2.resize(imagen, (round(ancho * escala), round(alto * escala)))
+    lienzo = np.full((imgsz, imgsz, 3), 114, dtype=np.uint8)
+    arriba, izquierda = (imgsz - imagen.shape[0]) // 2, (imgsz - imagen.shape[1]) // 2
+    lienzo[arriba:arriba + imagen.shape[0], izquierda:izquierda + imagen.shape[1]] = imagen
+    return np.ascontiguousarray(lienzo[:, :, ::-1].transpose(2, 0, 1))[None].astype(np.float32) / 255.0
+
+
+def _cuantizar_onnx(origen: Path, destino: Path, imagenes, imgsz: int):
+    """INT8 estático (QDQ) con ONNX Runtime; conserva los metadatos de ultralytics (clases, stride)."""
+    import onnx
+    import onnxruntime
+    from onnxruntime.quantization import CalibrationDataReader, QuantFormat, QuantType, quantize_static
+
+    entrada = onnxruntime.InferenceSession(str(origen), providers=["CPUExecutionProvider"]).get_inputs()[0].name
+
+    class _Lector(CalibrationDataReader):
+        def __init__(self):
+            self._tensores = ({entrada: _tensor_letterbox(ruta, imgsz)} for ruta in imagenes)
+
+        def get_next(self):
+            return next(self._tensores, None)
+
+    quantize_static(
+        str(origen), str(destino), _Lector(),
+        quant_format=QuantFormat.QDQ, activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8, per_channel=True
+    )
+    original, cuantizado = onnx.load(str(origen)), onnx.load(str(destino))
+    del cuantizado.metadata_props[:]
+    cuantizado.metadata_props.extend(original.metadata_props)
+    onnx.save(cuantizado, str(destino))
+    return destino
+
+
+def _exportar(ruta: Path, carpeta: Path, formato: str, imgsz: int, int8: bool = False):
+    """
+    Exporta una copia de los pesos dentro de una carpeta temporal (ultralytics
+    escribe junto al .pt) y mueve el resultado a la cache. Retorna su ruta.
+    """
+    from ultralytics import YOLO
+
+    temporal = carpeta / f"tmp_{os.getpid()}_{threading.get_ident()}"
+    temporal.mkdir(parents=True, exist_ok=True)
+    try:
+        copia = temporal / ruta.name
+        shutil.copy2(ruta, copia)
+        modelo = YOLO(str(copia))
+        # ONNX/OpenVINO con ejes dinámicos: aceptan lotes (servidor de inferencia) y cualquier imgsz
+        opciones = {"dynamic": True} if formato in FORMATOS_INT8 else {}
+        if int8 and formato == "openvino":
+            # ultralytics calibra con NNCF a partir de un dataset; basta con las imágenes (JSON es YAML válido)
+            datos = temporal / "calibracion.yaml"
+            datos.write_text(json.dumps({
+                "path": str(CARPETA_CALIBRACION_INT8), "train": ".", "val": ".", "names": modelo.names
+            }), encoding="utf-8")
+            opciones.update(int8=True, data=str(datos))
+        exportado = Path(modelo.export(format=formato, imgsz=imgsz, verbose=False, **opciones))
+        if int8 and formato == "onnx":
+            exportado = _cuantizar_onnx(
+                exportado, exportado.with_name(f"{copia.stem}_int8.onnx"), imagenes_calibracion(), imgsz
+            )
+
+        # best.torchscript -> torchscript_640.torchscript, best_int8_openvino_model -> openvino_640_int8_openvino_model
+        sufijo = exportado.name[len(copia.stem):].replace("_int8", "")
+        destino = carpeta / f"{_clave(formato, imgsz, int8)}{sufijo}"
+        if destino.exists():
+            shutil.rmtree(destino) if destino.is_dir() else destino.unlink()
+        os.replace(exportado, destino)
+        return destino
+    finally:
+        shutil.rmtree(temporal, ignore_errors=True)
+
+
+def _clave(formato: str, imgsz: int, int8: bool = False):
+    if formato == "pt":
+        return "pt_fusionado"
+    return f"{formato}_{imgsz}" + ("_int8" if int8 else "")
+
+
+def _artefacto(ruta: Path, carpeta: Path, formato: str, imgsz: int, int8: bool = False):
+    """(ruta del artefacto, ms de conversión o None si ya estaba en cache)."""
+    if int8 and formato not in FORMATOS_INT8:
+        int8 = False
+    if int8 and not imagenes_calibracion():
+        print(f"⚠️  Sin imágenes en {CARPETA_CALIBRACION_INT8} para calibrar INT8: se usa {formato} FP32")
+        int8 = False
+
+    clave = _clave(formato, imgsz, int8)
+    meta = _leer_json(carpeta / "artefactos.json")
+    previo = meta.get("artefactos", {}).get(clave)
+    version = _version_ultralytics()
+    if previo and previo.get("ultralytics") == version:
+        if previo.get("rechazado"):
+            return _artefacto(ruta, carpeta, formato, imgsz, int8=False)
+        if (carpeta / previo["archivo"]).exists():
+            return carpeta / previo["archivo"], None
+
+    with _conversion_lock:
+        inicio = time.perf_counter()
+        carpeta.mkdir(parents=True, exist_ok=True)
+        if formato == "pt":
+            destino = _fusionar(ruta, carpeta / "pt_fusionado.pt")
+        else:
+            destino = _exportar(ruta, carpeta, formato, imgsz, int8)
+        registro = {
+            "archivo": destino.name,
+            "ultralytics": version,
+            "conversion_ms": round((time.perf_counter() - inicio) * 1000),
+            "creado": datetime.now().isoformat(timespec="seconds"),
+        }
+        if int8:
+            registro["concordancia"] = _verificar_int8(ruta, destino, imgsz)
+            if registro["concordancia"] < CONCORDANCIA_MINIMA_INT8:
+                print(f"⚠️  {ruta} en INT8 coincide con el original en {registro['concordancia']:.1%} "
+                      f"(< {CONCORDANCIA_MINIMA_INT8:.0%}): se descarta y se usa {formato} FP32")
+                registro["rechazado"] = True
+                shutil.rmtree(destino) if destino.is_dir() else destino.unlink()
+        conversion_ms = (time.perf_counter() - inicio) * 1000
+
+        sha = huella(ruta)
+        with _lock:
+            meta = _leer_json(carpeta / "artefactos.json")
+            meta.update({"origen": str(ruta), "sha256": sha})
+            meta.setdefault("artefactos", {})[clave] = registro
+            _escribir_json(carpeta / "artefactos.json", meta)
+
+    if registro.get("rechazado"):
+        destino, ms_fp32 = _artefacto(ruta, carpeta, formato, imgsz, int8=False)
+        conversion_ms += ms_fp32 or 0.0
+    return destino, conversion_ms
+
+
+def _registrar(nombre: str, carpeta: Path, formato: str, desglose: dict):
+    """Guarda el desglose del proceso; el de un arranque en frío queda también en disco."""
+    with _lock:
+        meta = _leer_json(carpeta / "artefactos.json") if carpeta else {}
+        en_frio = meta.get("en_frio", {}).get(formato)
+        if desglose["estado"] == "frio" and carpeta:
+            meta.setdefault("en_frio", {})[formato] = desglose
+            _escribir_json(carpeta / "artefactos.json", meta)
+        _tiempos[nombre] = {**desglose, "formato": formato, "en_frio_ms": (en_frio or desglose)["total_ms"]}
+
+
+def cargar_yolo(ruta, nombre: str = None, formato: str = FORMATO_MODELOS, imgsz: int = 640,
+                calentar: bool = True, int8: bool = INT8_MODELOS):
+    """
+    Carga un YOLO desde la cache (convirtiéndolo la primera vez) y, si
+    `calentar`, le hace una inferencia en vacío de `imgsz`. Si la
+    conversión falla se usa el .pt original.
+    """
+    nombre = nombre or Path(ruta).parent.name
+    inicio = time.perf_counter()
+    import numpy as np
+    from ultralytics import YOLO
+    from core.recursos import aplicar_torch
+    aplicar_torch("yolo")  # hilos del presupuesto de CPU, no todos los núcleos
+    desglose = {"importacion_ms": (time.perf_counter() - inicio) * 1000}
+
+    t = time.perf_counter()
+    ruta = Path(BASE_DIR, ruta)
+    carpeta = carpeta_cache(ruta)
+    desglose["huella_ms"] = (time.perf_counter() - t) * 1000
+
+    t = time.perf_counter()
+    try:
+        artefacto, conversion_ms = _artefacto(ruta, carpeta, formato, imgsz, int8)
+        if "_int8" in artefacto.name:
+            formato = f"{formato}+int8"
+    except Exception as e:
+        print(f"⚠️  No se pudo convertir {ruta} a {formato}, se usa el original: {e}")
+        artefacto, conversion_ms, formato = ruta, None, "original"
+    desglose["conversion_ms"] = (time.perf_counter() - t) * 1000 if conversion_ms is not None else 0.0
+    desglose["estado"] = "frio" if conversion_ms is not None else "tibio"
+
+    t = time.perf_counter()
+    modelo = YOLO(str(artefacto), task="detect")
+    desglose["carga_ms"] = (time.perf_counter() - t) * 1000
+
+    t = time.perf_counter()
+    if calentar:
+        # La primera inferencia es la más lenta (memoria, kernels): mejor aquí que con el primer carro
+        modelo(np.zeros((imgsz, imgsz, 3), dtype=np.uint8), verbose=False, imgsz=imgsz)
+    desglose["calentamiento_ms"] = (time.perf_counter() - t) * 1000
+
+    desglose = {k: round(v, 1) if isinstance(v, float) else v for k, v in desglose.items()}
+    desglose["total_ms"] = round((time.perf_counter() - inicio) * 1000, 1)
+    _registrar(nombre, carpeta if formato != "original" else None, formato, desglose)
+    return modelo
+
+
+# ==========================================
+# 4. ARRANQUE EN PARALELO Y REPORTE
+# ==========================================
+
+def _gpu_disponible():
+    torch = sys.modules.get("torch")  # si no se importó aún, tampoco hay modelo que lo use
+    return bool(torch is not None and torch.cuda.is_available())
+
+
+def opciones_inferencia(modelo: str):
+    """
+    imgsz, letterbox y FP16 de "detector" o "caracteres" para pasar a
+    predict(). Se leen de core.config en cada llamada: la calibración
+    puede cambiarlos en caliente.
+    """
+    sufijo = {"detector": "DETECTOR", "caracteres": "CARACTERES"}[modelo]
+    return {
+        "imgsz": getattr(config, f"TAMANO_ENTRADA_{sufijo}"),
+        "rect": getattr(config, f"LETTERBOX_{sufijo}") != "cuadrado",
+        "half": getattr(config, f"MEDIA_PRECISION_{sufijo}") and _gpu_disponible(),
+    }
+
+
+def cargar_detector_placas():
+    """Detector de placas (frame completo) al tamaño de entrada del perfil del equipo."""
+    return cargar_yolo(MODELO_DETECTOR_PLACAS, "detector_placas", imgsz=config.TAMANO_ENTRADA_DETECTOR)
+
+
+def arrancar_modelos(detector: bool = True, ocr: bool = True):
+    """
+    Lanza en paralelo (hilos de core.arranque) la carga del detector y del
+    OCR de placas. Retorna {nombre: Future}; el trabajador DeepFace se
+    arranca aparte (es otro proceso).
+    """
+    from core.arranque import cargar_en_segundo_plano
+
+    futuros = {}
+    if detector:
+        futuros["detector_placas"] = cargar_en_segundo_plano("detector_placas", cargar_detector_placas)
+    if ocr:
+        from placas.prueba_numero_letra import cargar_modelo
+        futuros["ocr_placas"] = cargar_en_segundo_plano("ocr_placas", cargar_modelo)
+    return futuros
+
+
+def tiempos_modelos():
+    with _lock:
+        return {nombre: dict(d) for nombre, d in _tiempos.items()}
+
+
+def imprimir_arranque_modelos():
+    tiempos = tiempos_modelos()
+    if not tiempos:
+        return
+    print("🧠 Modelos:")
+    for nombre, d in tiempos.items():
+        estado = "en frío" if d["estado"] == "frio" else f"en tibio (en frío: {d['en_frio_ms']:.0f} ms)"
+        print(f"   {nombre:<18} {d['total_ms']:>7.0f} ms {estado} [{d['formato']}] "
+              f"import {d['importacion_ms']:.0f} | huella {d['huella_ms']:.0f} | "
+              f"conversión {d['conversion_ms']:.0f} | carga {d['carga_ms']:.0f} | "
+              f"calentamiento {d['calentamiento_ms']:.0f}")
+
+
+# ==========================================
+# 5. MANTENIMIENTO DE LA CACHE
+# ==========================================
+
+def listar_cache():
+    """[(carpeta, metadatos)] de cada best.pt con artefactos."""
+    if not RUTA_CACHE_MODELOS.exists():
+        return []
+    return [(c, _leer_json(c / "artefactos.json")) for c in sorted(RUTA_CACHE_MODELOS.iterdir()) if c.is_dir()]
+
+
+def limpiar_cache():
+    """Borra las carpetas cuyo best.pt ya no existe o cambió. Retorna cuántas."""
+    borradas = 0
+    for carpeta, meta in listar_cache():
+        origen = meta.get("origen")
+        vigente = origen and Path(origen).exists() and carpeta_cache(origen) == carpeta
+        if not vigente:
+            shutil.rmtree(carpeta, ignore_errors=True)
+            borradas += 1
+    return borradas
+
+
+if __name__ == "__main__":
+    if "--limpiar" in sys.argv[1:]:
+        print(f"🧹 {limpiar_cache()} carpetas de pesos viejos borradas")
+    for carpeta, meta in listar_cache():
+        print(f"📁 {carpeta.name}  <- {meta.get('origen', '?')}")
+        for clave, artefacto in meta.get("artefactos", {}).items():
+            extra = ""
+            if "concordancia" in artefacto:
+                extra = f" | concordancia {artefacto['concordancia']:.1%}" + (
+                    " RECHAZADO" if artefacto.get("rechazado") else "")
+            print(f"   {clave:<20} {artefacto['archivo']:<32} convertido en {artefacto['conversion_ms']} ms "
+                  f"(ultralytics {artefacto['ultralytics']}, {artefacto['creado']}){extra}")
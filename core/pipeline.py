@@ -0,0 +1,277 @@
+"""
+Pipeline por etapas para atender varios vehículos a la vez.
+
+Cada etapa tiene su cola acotada y sus propios hilos: mientras el carro N
+está en verificación facial, la placa del carro N+1 ya se está leyendo y
+consultando. Si una etapa se atrasa su cola se llena y la anterior se
+bloquea al entregarle trabajo (contrapresión), así nunca se acumulan
+vehículos sin límite en memoria.
+
+    pipeline = Pipeline([
+        Etapa("ocr", leer, concurrencia=1),
+        Etapa("consulta", consultar, concurrencia=4),
+    ])
+    pipeline.iniciar()
+    pipeline.enviar({"ruta_placa": "temp/placa.jpg"})
+    pipeline.cerrar()
+    pipeline.imprimir_metricas()
+
+La función de cada etapa recibe el Evento, completa `evento.datos` y
+retorna True para pasarlo a la siguiente etapa (cualquier otro valor lo
+termina ahí como descartado).
+
+Una etapa anterior con varios hilos puede terminar los vehículos en otro
+orden. Etapa(..., ordenada=True) los recibe en el orden en que entraron al
+pipeline: el que se adelanta espera a los anteriores, y los que se
+descartan antes de llegar ya no la hacen esperar. No aplica a la primera
+etapa, que recibe los vehículos en el orden de enviar().
+"""
+
+import queue
+import threading
+import time
+from collections import deque
+
+from core.trazas import LineaTiempo
+from core.utils import resumen_latencias
+
+_FIN = object()
+
+
+def _ms(valores):
+    return {k: (round(v * 1000, 1) if isinstance(v, float) else v)
+            for k, v in resumen_latencias(list(valores)).items()}
+
+
+class Evento:
+    """Un vehículo recorriendo el pipeline, con su id de correlación."""
+
+    def __init__(self, datos: dict = None, linea: LineaTiempo = None):
+        # Si la línea de tiempo ya existía (p. ej. desde la captura) se usa su id
+        self.linea = linea or LineaTiempo("vehículo")
+        self.id = self.linea.id
+        self.seq = 0  # orden de llegada al pipeline (lo asigna Pipeline.enviar)
+        self.datos = dict(datos or {})
+        self.creado = time.perf_counter()
+        self.estado = "en_curso"  # en_curso | completado | descartado | error
+        self.ultima_etapa = None
+        self.terminado = threading.Event()
+
+
+class Etapa:
+    """Una etapa del pipeline: función, hilos que la ejecutan y su cola de entrada."""
+
+    def __init__(self, nombre: str, funcion, concurrencia: int = 1, capacidad: int = 4,
+                 ordenada: bool = False):
+        self.nombre = nombre
+        self.funcion = funcion
+        self.concurrencia = concurrencia
+        self.ordenada = ordenada
+        self.cola = queue.Queue(maxsize=capacidad)
+        self.hilos = []
+
+        # Resecuenciador (solo si es ordenada): seq -> Evento que llegó, o None si se descartó antes
+        self._lock_orden = threading.Lock()
+        self._siguiente_seq = 1
+        self._adelantados = {}
+
+        self._lock = threading.Lock()
+        self.ocupados = 0
+        self.procesados = 0
+        self.descartados = 0
+        self.errores = 0
+        self._servicio = deque(maxlen=500)  # segundos ejecutando la función
+        self._espera = deque(maxlen=500)    # segundos esperando en la cola
+
+    def metricas(self):
+        with self._lock:
+            return {
+                "concurrencia": self.concurrencia,
+                "en_cola": self.cola.qsize(),
+                "esperando_turno": len(self._adelantados),
+                "ocupados": self.ocupados,
+                "procesados": self.procesados,
+                "descartados": self.descartados,
+                "errores": self.errores,
+                "servicio_ms": _ms(self._servicio),
+                "espera_ms": _ms(self._espera),
+            }
+
+
+class Pipeline:
+    """Etapas encadenadas por colas acotadas; ver el docstring del módulo."""
+
+    def __init__(self, etapas: list, al_terminar=None):
+        self.etapas = etapas
+        self.al_terminar = al_terminar  # callback(evento) al salir del pipeline
+
+        self._lock = threading.Lock()
+        self.inicio = None
+        self.enviados = 0
+        self._secuencia = 0
+        self.terminados = {"completado": 0, "descartado": 0, "error": 0}
+        self._latencias_total = deque(maxlen=500)
+
+    def iniciar(self):
+        self.inicio = time.perf_counter()
+        for i, etapa in enumerate(self.etapas):
+            siguiente = self.etapas[i + 1] if i + 1 < len(self.etapas) else None
+            for n in range(etapa.concurrencia):
+                hilo = threading.Thread(
+                    target=self._trabajar, args=(etapa, siguiente),
+                    name=f"{etapa.nombre}-{n}", daemon=True
+                )
+                hilo.start()
+                etapa.hilos.append(hilo)
+        return self
+
+    def enviar(self, datos: dict, timeout: float = None, linea: LineaTiempo = None):
+        """
+        Mete un vehículo al pipeline. Bloquea si la primera etapa está llena
+        (queue.Full si pasa `timeout`). Retorna el Evento.
+        """
+        evento = Evento(datos, linea)
+        with self._lock:
+            self._secuencia += 1
+            evento.seq = self._secuencia
+        self.etapas[0].cola.put((evento, time.perf_counter()), timeout=timeout)
+        with self._lock:
+            self.enviados += 1
+        return evento
+
+    def _entregar(self, etapa: Etapa, evento: Evento, seq: int = None):
+        """
+        Pone `evento` en la cola de `etapa`. Si es ordenada, solo cuando ya
+        pasaron (o se descartaron) todos los anteriores; evento=None marca
+        que `seq` se descartó antes de llegar.
+        """
+        if not etapa.ordenada:
+            if evento is not None:
+                # Bloquea si la etapa está llena: contrapresión
+                etapa.cola.put((evento, time.perf_counter()))
+            return
+        with etapa._lock_orden:
+            etapa._adelantados[evento.seq if evento is not None else seq] = evento
+            while etapa._siguiente_seq in etapa._adelantados:
+                listo = etapa._adelantados.pop(etapa._siguiente_seq)
+                etapa._siguiente_seq += 1
+                if listo is not None:
+                    etapa.cola.put((listo, time.perf_counter()))
+
+    def _terminar(self, evento: Evento, estado: str, etapa: str):
+        # Las etapas ordenadas que ya no va a alcanzar no deben esperarlo
+        posicion = next(i for i, e in enumerate(self.etapas) if e.nombre == etapa)
+        for posterior in self.etapas[posicion + 1:]:
+            if posterior.ordenada:
+                self._entregar(posterior, None, evento.seq)
+
+        evento.estado = estado
+        evento.ultima_etapa = etapa
+        with self._lock:
+            self.terminados[estado] += 1
+            self._latencias_total.append(time.perf_counter() - evento.creado)
+        evento.linea.anotar(estado=estado, ultima_etapa=etapa)
+        evento.linea.exportar()
+        evento.terminado.set()
+        if self.al_terminar:
+            try:
+                self.al_terminar(evento)
+            except Exception as e:
+                print(f"⚠️  [{evento.id}] Error en al_terminar: {e}")
+
+    def _trabajar(self, etapa: Etapa, siguiente: Etapa):
+        while True:
+            item = etapa.cola.get()
+            if item is _FIN:
+                break
+
+            evento, encolado_en = item
+            inicio = time.perf_counter()
+            with etapa._lock:
+                etapa._espera.append(inicio - encolado_en)
+                etapa.ocupados += 1
+
+            estado = None
+            try:
+                with evento.linea.etapa(etapa.nombre):
+                    continuar = etapa.funcion(evento) is True
+            except Exception as e:
+                print(f"❌ [{evento.id}] Error en etapa '{etapa.nombre}': {e}")
+                continuar, estado = False, "error"
+
+            with etapa._lock:
+                etapa.ocupados -= 1
+                etapa._servicio.append(time.perf_counter() - inicio)
+                etapa.procesados += 1
+                if estado == "error":
+                    etapa.errores += 1
+                elif not continuar:
+                    etapa.descartados += 1
+
+            if continuar and siguiente is not None:
+                self._entregar(siguiente, evento)
+            else:
+                self._terminar(evento, estado or ("completado" if continuar else "descartado"),
+                               etapa.nombre)
+
+    def cerrar(self, timeout: float = None):
+        """
+        Deja de recibir vehículos y espera a que terminen los que ya entraron.
+        Las etapas se cierran en orden para que ninguna pierda trabajo.
+        Con `timeout` (segundos) deja de esperar a las etapas que no
+        terminaron (sus hilos son daemon). Retorna True si todas terminaron.
+        """
+        limite = None if timeout is None else time.perf_counter() + timeout
+
+        def _restante():
+            return None if limite is None else max(0.0, limite - time.perf_counter())
+
+        for etapa in self.etapas:
+            try:
+                for _ in etapa.hilos:
+                    etapa.cola.put(_FIN, timeout=_restante())
+            except queue.Full:
+                break
+            for hilo in etapa.hilos:
+                hilo.join(_restante())
+            if any(hilo.is_alive() for hilo in etapa.hilos):
+                break
+
+        pendientes = [e.nombre for e in self.etapas if any(h.is_alive() for h in e.hilos)]
+        if pendientes:
+            print(f"⚠️  Pipeline cerrado sin esperar a: {', '.join(pendientes)}")
+        return not pendientes
+
+    def metricas(self):
+        """Rendimiento global, latencia de punta a punta y métricas por etapa."""
+        with self._lock:
+            terminados = dict(self.terminados)
+            enviados = self.enviados
+            latencias = list(self._latencias_total)
+
+        transcurrido = time.perf_counter() - self.inicio if self.inicio else 0.0
+        total_terminados = sum(terminados.values())
+        return {
+            "enviados": enviados,
+            **terminados,
+            "en_vuelo": enviados - total_terminados,
+            "vehiculos_por_minuto": round(total_terminados / transcurrido * 60, 2)
+            if transcurrido else 0.0,
+            "latencia_total_ms": _ms(latencias),
+            "etapas": {etapa.nombre: etapa.metricas() for etapa in self.etapas},
+        }
+
+    def imprimir_metricas(self):
+        m = self.metricas()
+        print(f"\n📊 Pipeline: {m['enviados']} vehículos | completados {m['completado']} | "
+              f"descartados {m['descartado']} | errores {m['error']} | "
+              f"{m['vehiculos_por_minuto']} veh/min")
+        total = m["latencia_total_ms"]
+        if total["n"]:
+            print(f"   Latencia total: p50 {total['p50']} ms | p95 {total['p95']} ms | "
+                  f"p99 {total['p99']} ms")
+        for nombre, e in m["etapas"].items():
+            servicio, espera = e["servicio_ms"], e["espera_ms"]
+            print(f"   {nombre:<22} x{e['concurrencia']} | procesados {e['procesados']:>4} | "
+                  f"servicio p50 {servicio['p50'] or 0:>8.1f} ms p95 {servicio['p95'] or 0:>8.1f} ms | "
+                  f"espera p95 {espera['p95'] or 0:>8.1f} ms | cola {e['en_cola']}")
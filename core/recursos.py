@@ -0,0 +1,281 @@
+"""
+Presupuesto de hilos de CPU para los modelos que conviven en el equipo.
+
+YOLO (torch) y el modelo facial (TensorFlow, en el trabajador DeepFace)
+arrancan cada uno con tantos hilos intra-op como núcleos hay; cuando
+corren a la vez (el pipeline detecta la placa de un carro mientras
+verifica el rostro del anterior) se pisan y la cola de latencias se
+dispara. Aquí se reparte un presupuesto global (HILOS_CPU, por defecto
+todos los núcleos del proceso) según REPARTO_HILOS y, con FIJAR_NUCLEOS=1,
+cada rol queda atado a su propio grupo de núcleos:
+
+    configurar_proceso("yolo")        # al arrancar, antes de importar torch
+    aplicar_torch("yolo")             # ya importado torch (core/modelos.py)
+    entorno_para("deepface")          # variables para lanzar el trabajador
+    configurar_proceso("deepface")    # en el trabajador, antes de TensorFlow
+    aplicar_tensorflow("deepface")
+
+    with medir_inferencia("yolo"):
+        modelo(frame)
+    imprimir_contencion()             # latencias por rol, solapes, presión de CPU
+
+Uso:
+    python -m core.recursos           # reparto del equipo y contención actual
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from core.config import USAR_PRESUPUESTO_HILOS, HILOS_CPU, REPARTO_HILOS, FIJAR_NUCLEOS
+from core.utils import resumen_latencias
+
+try:
+    import resource
+except ImportError:  # Windows: sin conteo de cambios de contexto
+    resource = None
+
+# Variables que leen OpenMP/MKL/OpenBLAS (torch, numpy, cv2) y TensorFlow al arrancar
+VARIABLES_HILOS = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS",
+                   "TF_NUM_INTRAOP_THREADS", "TF_NUM_INTEROP_THREADS")
+
+
+def nucleos_disponibles():
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+# Antes de que configurar_proceso() ate este proceso a un grupo
+_NUCLEOS = nucleos_disponibles()
+
+
+def _definidas_por_usuario():
+    """
+    Las que ya venían en el entorno las fijó el usuario: no se tocan. En el
+    trabajador DeepFace, las que el proceso padre puso junto con
+    ASIGNACION_CPU (entorno_para) son del presupuesto, no del usuario.
+    """
+    presentes = {v for v in VARIABLES_HILOS if v in os.environ}
+    if os.getenv("ASIGNACION_CPU"):
+        presentes -= set(json.loads(os.environ["ASIGNACION_CPU"]).get("variables", ()))
+    return presentes
+
+
+_DEFINIDAS_POR_USUARIO = _definidas_por_usuario()
+
+_latencias = {}  # rol -> deque de ms
+_activas = {}    # rol -> inferencias en curso
+_metricas = {"inferencias": 0, "solapadas": 0}
+_lock = threading.Lock()
+
+
+def _cambios_involuntarios():
+    """Veces que el SO le quitó la CPU a un hilo de este proceso (otro la necesitaba)."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_nivcsw if resource is not None else 0
+
+
+_inicio = (time.monotonic(), _cambios_involuntarios())
+
+
+# ==========================================
+# 1. REPARTO
+# ==========================================
+
+def _reparto():
+    pesos = {}
+    for parte in REPARTO_HILOS.split(","):
+        rol, _, peso = parte.partition("=")
+        if rol.strip():
+            pesos[rol.strip()] = float(peso or 1)
+    return pesos
+
+
+def asignaciones():
+    """
+    {rol: {"hilos": n, "nucleos": [...] o None}}. Cada rol recibe al menos
+    un hilo; con FIJAR_NUCLEOS, grupos de núcleos consecutivos sin cruzarse.
+    """
+    pesos = _reparto()
+    total = max(len(pesos), HILOS_CPU or len(_NUCLEOS))
+    suma = sum(pesos.values())
+
+    hilos = {rol: max(1, int(total * peso / suma)) for rol, peso in pesos.items()}
+    # Lo que sobra del redondeo, a los roles de más peso
+    for rol in sorted(pesos, key=lambda r: -pesos[r]):
+        if sum(hilos.values()) >= total:
+            break
+        hilos[rol] += 1
+
+    resultado, siguiente = {}, 0
+    fijar = FIJAR_NUCLEOS and sum(hilos.values()) <= len(_NUCLEOS)
+    for rol, n in hilos.items():
+        nucleos = _NUCLEOS[siguiente:siguiente + n] if fijar else None
+        siguiente += n
+        resultado[rol] = {"hilos": n, "nucleos": nucleos}
+    return resultado
+
+
+def asignacion(rol: str):
+    """Lo que le toca a `rol`; el trabajador DeepFace lo recibe ya calculado del proceso padre."""
+    if os.getenv("ASIGNACION_CPU"):
+        return json.loads(os.environ["ASIGNACION_CPU"])
+    return asignaciones().get(rol, {"hilos": len(_NUCLEOS), "nucleos": None})
+
+
+def variables_hilos(rol: str, a: dict = None):
+    a = a or asignacion(rol)
+    variables = {
+        "OMP_NUM_THREADS": a["hilos"],
+        "MKL_NUM_THREADS": a["hilos"],
+        "OPENBLAS_NUM_THREADS": a["hilos"],
+        "TF_NUM_INTRAOP_THREADS": a["hilos"],
+        "TF_NUM_INTEROP_THREADS": 2 if a["hilos"] >= 4 else 1,
+    }
+    return {k: str(v) for k, v in variables.items() if k not in _DEFINIDAS_POR_USUARIO}
+
+
+# ==========================================
+# 2. APLICAR (variables, afinidad, torch, TensorFlow)
+# ==========================================
+
+def _fijar_afinidad(nucleos):
+    try:
+        if hasattr(os, "sched_setaffinity"):
+            os.sched_setaffinity(0, nucleos)  # este hilo y los que cree después
+        else:
+            import psutil  # Windows
+            psutil.Process().cpu_affinity(nucleos)
+        return True
+    except Exception as e:
+        print(f"⚠️  No se pudo fijar la afinidad a {nucleos}: {e}", file=sys.stderr)
+        return False
+
+
+def configurar_proceso(rol: str):
+    """
+    Variables de hilos y afinidad de `rol` para este proceso. Llamarla antes
+    de importar torch / TensorFlow (leen las variables al cargar).
+    """
+    if not USAR_PRESUPUESTO_HILOS:
+        return None
+    os.environ.update(variables_hilos(rol))
+    a = asignacion(rol)
+    if a["nucleos"]:
+        _fijar_afinidad(a["nucleos"])
+    return a
+
+
+def entorno_para(rol: str):
+    """Variables para lanzar el proceso de `rol` (p. ej. el trabajador DeepFace)."""
+    if not USAR_PRESUPUESTO_HILOS:
+        return {}
+    a = asignaciones().get(rol)
+    if a is None:
+        return {}
+    variables = variables_hilos(rol, a)
+    # Con la lista de las que puso el presupuesto, el trabajador no las confunde con las del usuario
+    return {"ASIGNACION_CPU": json.dumps({**a, "variables": sorted(variables)}), **variables}
+
+
+def aplicar_torch(rol: str = "yolo"):
+    """set_num_threads de torch (ya importado); se puede llamar más de una vez."""
+    if not USAR_PRESUPUESTO_HILOS or "OMP_NUM_THREADS" in _DEFINIDAS_POR_USUARIO:
+        return
+    import torch
+
+    a = asignacion(rol)
+    torch.set_num_threads(a["hilos"])
+    try:
+        torch.set_num_interop_threads(2 if a["hilos"] >= 4 else 1)
+    except RuntimeError:
+        pass  # solo se puede antes del primer trabajo en paralelo; ya quedó como estaba
+
+
+def aplicar_tensorflow(rol: str = "deepface"):
+    """Hilos intra/inter-op de TensorFlow; antes de la primera operación."""
+    if not USAR_PRESUPUESTO_HILOS or "TF_NUM_INTRAOP_THREADS" in _DEFINIDAS_POR_USUARIO:
+        return
+    import tensorflow as tf
+
+    a = asignacion(rol)
+    try:
+        tf.config.threading.set_intra_op_parallelism_threads(a["hilos"])
+        tf.config.threading.set_inter_op_parallelism_threads(2 if a["hilos"] >= 4 else 1)
+    except RuntimeError:
+        pass  # TensorFlow ya inicializado: quedan las variables TF_NUM_*
+
+
+# ==========================================
+# 3. MÉTRICAS DE CONTENCIÓN
+# ==========================================
+
+@contextmanager
+def medir_inferencia(rol: str):
+    """Registra la latencia de una inferencia de `rol` y si coincidió con la de otro rol."""
+    with _lock:
+        solapada = any(n for otro, n in _activas.items() if otro != rol)
+        _activas[rol] = _activas.get(rol, 0) + 1
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        ms = (time.perf_counter() - inicio) * 1000
+        with _lock:
+            _activas[rol] -= 1
+            _latencias.setdefault(rol, deque(maxlen=1000)).append(ms)
+            _metricas["inferencias"] += 1
+            _metricas["solapadas"] += solapada
+
+
+def _presion_cpu():
+    """% del tiempo (promedio 10 s) con tareas esperando CPU (Linux PSI), o None."""
+    try:
+        with open("/proc/pressure/cpu", encoding="utf-8") as f:
+            for linea in f:
+                if linea.startswith("some"):
+                    return float(linea.split()[1].split("=")[1])
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def metricas_contencion():
+    segundos = max(1e-6, time.monotonic() - _inicio[0])
+    involuntarios = _cambios_involuntarios() - _inicio[1]
+    carga = os.getloadavg()[0] if hasattr(os, "getloadavg") else None
+    with _lock:
+        latencias = {rol: resumen_latencias(list(v)) for rol, v in _latencias.items()}
+        metricas = dict(_metricas)
+    return {
+        "nucleos": len(_NUCLEOS),
+        "presupuesto": asignaciones() if USAR_PRESUPUESTO_HILOS else None,
+        "carga_por_nucleo": round(carga / len(_NUCLEOS), 2) if carga is not None else None,
+        "presion_cpu_pct": _presion_cpu(),
+        "cambios_involuntarios_s": round(involuntarios / segundos, 1),
+        "inferencias": metricas["inferencias"],
+        "solapadas": metricas["solapadas"],
+        "latencias": latencias,
+    }
+
+
+def imprimir_contencion():
+    m = metricas_contencion()
+    if not m["inferencias"]:
+        return
+    reparto = " | ".join(f"{rol} {a['hilos']} hilos" + (f" en {a['nucleos']}" if a["nucleos"] else "")
+                         for rol, a in (m["presupuesto"] or {}).items()) or "sin presupuesto"
+    print(f"🧮 CPU ({m['nucleos']} núcleos; {reparto}): {m['solapadas']}/{m['inferencias']} inferencias "
+          f"solapadas | cambios de contexto involuntarios {m['cambios_involuntarios_s']}/s"
+          + (f" | presión {m['presion_cpu_pct']}%" if m["presion_cpu_pct"] is not None else "")
+          + (f" | carga/núcleo {m['carga_por_nucleo']}" if m["carga_por_nucleo"] is not None else ""))
+    for rol, r in m["latencias"].items():
+        print(f"   {rol:<10} p50 {r['p50']:7.1f} ms | p95 {r['p95']:7.1f} ms | p99 {r['p99']:7.1f} ms (n={r['n']})")
+
+
+if __name__ == "__main__":
+    print(json.dumps(metricas_contencion(), indent=2, ensure_ascii=False))
@@ -0,0 +1,336 @@
+"""
+Línea de tiempo por etapas de un evento del parqueadero.
+
+Registra inicio y fin de cada etapa (aunque corran en hilos distintos)
+y las dibuja como barras para ver qué se solapa y qué bloquea:
+
+    consulta         |███                                     |   120 ms
+    camara_rostro    |█████████                               |   610 ms
+
+Cada etapa es un span con el id de correlación del evento. Al terminar el
+evento, `exportar()` agrega sus spans a RUTA_TRAZAS según FORMATO_TRAZAS:
+"jsonl" (un registro simple por span) u "otel" (una línea por evento con el
+sobre OTLP JSON resourceSpans/scopeSpans, el mismo del exportador a archivo
+del OpenTelemetry Collector). El archivo rota al pasar de
+TAMANO_MAXIMO_TRAZAS_MB o de ANTIGUEDAD_MAXIMA_TRAZAS_H horas
+(trazas.jsonl.1, .2, ... hasta ARCHIVOS_TRAZAS_CONSERVADOS). El reporte
+de percentiles por etapa sale del archivo vigente:
+
+    python -m core.trazas                 # usa RUTA_TRAZAS
+    python -m core.trazas datos/trazas.jsonl
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timezone
+
+from core.config import (
+    ANTIGUEDAD_MAXIMA_TRAZAS_H,
+    ARCHIVOS_TRAZAS_CONSERVADOS,
+    FORMATO_TRAZAS,
+    ID_CARRIL,
+    RUTA_TRAZAS,
+    TAMANO_MAXIMO_TRAZAS_MB,
+)
+from core.utils import resumen_latencias
+
+_lock_archivo = threading.Lock()
+_inicio_archivo = {}  # ruta -> timestamp del primer registro del archivo vigente
+
+
+class LineaTiempo:
+    """Etapas medidas de un evento, relativas a su creación."""
+
+    def __init__(self, nombre: str, id_evento: str = None):
+        self.nombre = nombre
+        self.id_traza = uuid.uuid4().hex  # 32 hex, como un trace id de OpenTelemetry
+        self.id = id_evento or self.id_traza[:8]
+        self.inicio = time.perf_counter()
+        self.inicio_unix = time.time()
+        self.atributos = {}  # datos del evento (placa, resultado...) que viajan con los spans
+        self.etapas = []  # (nombre, hilo, inicio_s, fin_s, estado, atributos)
+        self._lock = threading.Lock()
+
+    def anotar(self, **atributos):
+        """Agrega atributos al evento completo (p. ej. placa=...)."""
+        with self._lock:
+            self.atributos.update(atributos)
+
+    def registrar(self, nombre: str, inicio: float, fin: float, estado: str = "ok", **atributos):
+        with self._lock:
+            self.etapas.append((
+                nombre,
+                threading.current_thread().name,
+                inicio - self.inicio,
+                fin - self.inicio,
+                estado,
+                atributos,
+            ))
+
+    @contextmanager
+    def etapa(self, nombre: str, **atributos):
+        """Mide el bloque `with` como una etapa (estado "error" si lanza excepción)."""
+        inicio = time.perf_counter()
+        estado = "ok"
+        try:
+            yield
+        except BaseException:
+            estado = "error"
+            raise
+        finally:
+            self.registrar(nombre, inicio, time.perf_counter(), estado, **atributos)
+
+    def medir(self, nombre: str, funcion):
+        """Envuelve `funcion` para que cada llamada quede registrada como etapa."""
+        def _envuelta(*args, **kwargs):
+            with self.etapa(nombre):
+                return funcion(*args, **kwargs)
+        return _envuelta
+
+    def duraciones(self):
+        """Dict {etapa: segundos} (si una etapa se repite se suman)."""
+        resultado = {}
+        for nombre, _, inicio, fin, _, _ in self.etapas:
+            resultado[nombre] = resultado.get(nombre, 0.0) + (fin - inicio)
+        return resultado
+
+    def imprimir(self, ancho: int = 40):
+        with self._lock:
+            etapas = sorted(self.etapas, key=lambda e: e[2])
+        if not etapas:
+            return
+
+        # Las etapas que se repiten (una por inferencia) se muestran juntas
+        repetidas = {}
+        for nombre, _, _, _, _, _ in etapas:
+            repetidas[nombre] = repetidas.get(nombre, 0) + 1
+
+        total = max(fin for _, _, _, fin, _, _ in etapas) or 1e-9
+        print(f"\n⏱️  Línea de tiempo: {self.nombre} [{self.id}] (total {total * 1000:.0f} ms)")
+        mostradas = set()
+        for nombre, hilo, inicio, fin, _, _ in etapas:
+            if repetidas[nombre] > 1:
+                if nombre in mostradas:
+                    continue
+                mostradas.add(nombre)
+                print(f"   {nombre:<20} | {repetidas[nombre]} veces, "
+                      f"{self.duraciones()[nombre] * 1000:.0f} ms en total")
+                continue
+            desde = int(inicio / total * ancho)
+            hasta = max(desde + 1, int(fin / total * ancho))
+            barra = " " * desde + "█" * (hasta - desde)
+            print(f"   {nombre:<20} |{barra:<{ancho}}| {(fin - inicio) * 1000:7.0f} ms  [{hilo}]")
+
+    # ==========================================
+    # EXPORTACIÓN
+    # ==========================================
+
+    def _registros_jsonl(self):
+        with self._lock:
+            etapas = list(self.etapas)
+            atributos_evento = dict(self.atributos)
+        for nombre, hilo, inicio, fin, estado, atributos in etapas:
+            yield {
+                "evento": self.id,
+                "traza": self.nombre,
+                "etapa": nombre,
+                "inicio": datetime.fromtimestamp(self.inicio_unix + inicio, timezone.utc).isoformat(),
+                "desplazamiento_ms": round(inicio * 1000, 2),
+                "duracion_ms": round((fin - inicio) * 1000, 2),
+                "estado": estado,
+                "hilo": hilo,
+                **({"atributos": atributos} if atributos else {}),
+                **({"evento_atributos": atributos_evento} if atributos_evento else {}),
+            }
+
+    def _registros_otel(self):
+        """
+        Una solicitud OTLP JSON (resourceSpans > scopeSpans > spans) con un
+        span raíz por evento y un hijo por etapa.
+        """
+        with self._lock:
+            etapas = list(self.etapas)
+            atributos_evento = dict(self.atributos)
+
+        def _nanos(segundos):
+            return str(int((self.inicio_unix + segundos) * 1e9))
+
+        def _atributos(dic):
+            return [{"key": k, "value": {"stringValue": str(v)}} for k, v in dic.items()]
+
+        raiz = uuid.uuid4().hex[:16]
+        fin_total = max((fin for _, _, _, fin, _, _ in etapas), default=0.0)
+        spans = [{
+            "traceId": self.id_traza,
+            "spanId": raiz,
+            "name": self.nombre,
+            "kind": 1,
+            "startTimeUnixNano": _nanos(0.0),
+            "endTimeUnixNano": _nanos(fin_total),
+            "attributes": _atributos({"evento.id": self.id, **atributos_evento}),
+            "status": {"code": 2 if any(e[4] == "error" for e in etapas) else 1},
+        }]
+        for nombre, hilo, inicio, fin, estado, atributos in etapas:
+            spans.append({
+                "traceId": self.id_traza,
+                "spanId": uuid.uuid4().hex[:16],
+                "parentSpanId": raiz,
+                "name": nombre,
+                "kind": 1,
+                "startTimeUnixNano": _nanos(inicio),
+                "endTimeUnixNano": _nanos(fin),
+                "attributes": _atributos({"evento.id": self.id, "thread.name": hilo, **atributos}),
+                "status": {"code": 2 if estado == "error" else 1},
+            })
+        yield {"resourceSpans": [{
+            "resource": {"attributes": _atributos({"service.name": "parqueadero",
+                                                    "service.instance.id": ID_CARRIL})},
+            "scopeSpans": [{"scope": {"name": "core.trazas"}, "spans": spans}],
+        }]}
+
+    def exportar(self, ruta: str = None, formato: str = None):
+        """Agrega los spans del evento al archivo de trazas (JSON lines), rotándolo si hace falta."""
+        ruta = RUTA_TRAZAS if ruta is None else ruta
+        formato = formato or FORMATO_TRAZAS
+        if not ruta or not self.etapas:
+            return
+
+        registros = self._registros_otel() if formato == "otel" else self._registros_jsonl()
+        lineas = "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in registros)
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(ruta)), exist_ok=True)
+            with _lock_archivo:
+                _rotar_si_hace_falta(ruta)
+                with open(ruta, "a", encoding="utf-8") as f:
+                    f.write(lineas)
+                _inicio_archivo.setdefault(ruta, self.inicio_unix)
+        except OSError as e:
+            print(f"⚠️  No se pudieron guardar las trazas: {e}")
+
+
+# ==========================================
+# ROTACIÓN DEL ARCHIVO DE TRAZAS
+# ==========================================
+
+def _inicio_registros(ruta):
+    """Timestamp del primer registro del archivo (o None si no se puede leer)."""
+    try:
+        with open(ruta, encoding="utf-8") as f:
+            r = json.loads(f.readline())
+    except (OSError, ValueError):
+        return None
+    for span in _spans_otlp(r):
+        return int(span["startTimeUnixNano"]) / 1e9
+    if "inicio" in r:
+        return datetime.fromisoformat(r["inicio"]).timestamp()
+    return None
+
+
+def _rotar_si_hace_falta(ruta):
+    """Con _lock_archivo tomado: ruta -> ruta.1 -> ruta.2 ... si el vigente es muy grande o viejo."""
+    try:
+        tamano = os.path.getsize(ruta)
+    except OSError:
+        _inicio_archivo.pop(ruta, None)
+        return
+    if ruta not in _inicio_archivo:
+        _inicio_archivo[ruta] = _inicio_registros(ruta) or time.time()
+
+    muy_grande = tamano >= TAMANO_MAXIMO_TRAZAS_MB * 1024 * 1024
+    muy_viejo = time.time() - _inicio_archivo[ruta] >= ANTIGUEDAD_MAXIMA_TRAZAS_H * 3600
+    if not (muy_grande or muy_viejo):
+        return
+
+    for n in range(ARCHIVOS_TRAZAS_CONSERVADOS - 1, 0, -1):
+        if os.path.exists(f"{ruta}.{n}"):
+            os.replace(f"{ruta}.{n}", f"{ruta}.{n + 1}")
+    if ARCHIVOS_TRAZAS_CONSERVADOS > 0:
+        os.replace(ruta, f"{ruta}.1")
+    else:
+        os.remove(ruta)
+    _inicio_archivo.pop(ruta, None)
+
+
+def etapa(linea, nombre: str, **atributos):
+    """Como `linea.etapa(nombre)`, pero no mide nada si no hay línea de tiempo."""
+    return linea.etapa(nombre, **atributos) if linea is not None else nullcontext()
+
+
+# ==========================================
+# REPORTE DE PERCENTILES
+# ==========================================
+
+def _spans_otlp(registro):
+    """Spans de una línea con el sobre OTLP (resourceSpans/scopeSpans)."""
+    for recurso in registro.get("resourceSpans", ()):
+        for alcance in recurso.get("scopeSpans", ()):
+            yield from alcance.get("spans", ())
+
+
+def _leer_spans(ruta):
+    """(evento, etapa, duracion_ms) de cada span del archivo, en cualquiera de los dos formatos."""
+    with open(ruta, encoding="utf-8") as f:
+        for linea in f:
+            if not linea.strip():
+                continue
+            try:
+                r = json.loads(linea)
+            except ValueError:
+                continue
+            if "resourceSpans" in r:
+                for span in _spans_otlp(r):
+                    if "parentSpanId" in span:  # el raíz es el total del evento
+                        duracion = (int(span["endTimeUnixNano"]) - int(span["startTimeUnixNano"])) / 1e6
+                        yield span["traceId"], span["name"], duracion
+            else:
+                yield r["evento"], r["etapa"], r["duracion_ms"]
+
+
+def reporte_trazas(ruta: str = None):
+    """
+    Percentiles por etapa sobre todos los eventos del archivo. Las etapas
+    que se repiten dentro de un evento (una por inferencia) se suman.
+
+    Retorna {etapa: {"n", "p50", "p95", "p99", "media_ms"}} en ms.
+    """
+    ruta = ruta or RUTA_TRAZAS
+    por_evento = {}
+    for evento, nombre, duracion in _leer_spans(ruta):
+        etapas = por_evento.setdefault(evento, {})
+        etapas[nombre] = etapas.get(nombre, 0.0) + duracion
+
+    valores = {}
+    for etapas in por_evento.values():
+        for nombre, duracion in etapas.items():
+            valores.setdefault(nombre, []).append(duracion)
+
+    reporte = {}
+    for nombre, duraciones in valores.items():
+        reporte[nombre] = {
+            **{k: (round(v, 1) if isinstance(v, float) else v)
+               for k, v in resumen_latencias(duraciones).items()},
+            "media_ms": round(sum(duraciones) / len(duraciones), 1),
+        }
+    return reporte
+
+
+def imprimir_reporte(ruta: str = None):
+    reporte = reporte_trazas(ruta)
+    if not reporte:
+        print("Sin trazas registradas")
+        return
+
+    print(f"\n📊 Latencia por etapa ({ruta or RUTA_TRAZAS})")
+    print(f"   {'etapa':<22} {'n':>5} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'media ms':>10}")
+    for nombre, r in sorted(reporte.items(), key=lambda item: -item[1]["media_ms"]):
+        print(f"   {nombre:<22} {r['n']:>5} {r['p50']:>10.1f} {r['p95']:>10.1f} {r['p99']:>10.1f} "
+              f"{r['media_ms']:>10.1f}")
+
+
+if __name__ == "__main__":
+    imprimir_reporte(sys.argv[1] if len(sys.argv) > 1 else None)
@@ -0,0 +1,32 @@
+"""
+Utilidades compartidas por los distintos módulos del sistema.
+"""
+
+
+def percentil(valores, p: float):
+    """
+    Percentil `p` (0-100) por interpolación lineal.
+    Retorna None si no hay valores.
+    """
+    if not valores:
+        return None
+
+    ordenados = sorted(valores)
+    if len(ordenados) == 1:
+        return ordenados[0]
+
+    posicion = (len(ordenados) - 1) * p / 100.0
+    inferior = int(posicion)
+    superior = min(inferior + 1, len(ordenados) - 1)
+    fraccion = posicion - inferior
+    return ordenados[inferior] + (ordenados[superior] - ordenados[inferior]) * fraccion
+
+
+def resumen_latencias(valores):
+    """Dict con n, p50, p95 y p99 (mismas unidades que `valores`)."""
+    return {
+        "n": len(valores),
+        "p50": percentil(valores, 50),
+        "p95": percentil(valores, 95),
+        "p99": percentil(valores, 99),
+    }
@@ -0,0 +1,261 @@
+"""
+Vista previa de las cámaras sin frenar el procesamiento.
+
+Los bucles de captura ya no copian el frame, ni dibujan texto, ni llaman a
+cv2.imshow / cv2.waitKey: solo entregan el frame y lo que hay que dibujar
+encima al visor, que lo guarda (sin copiar) y retorna enseguida. Dibujar y
+mostrar ocurre en el hilo del visor, siempre con el último frame recibido;
+si el visor se atrasa, los frames intermedios simplemente no se muestran.
+
+    visor = obtener_visor()             # según VISOR en core/config.py
+    visor.mostrar("Placa", frame, textos=[("Detectando...", (10, 30), 1, (0, 255, 0), 2)])
+    if visor.tecla() == 27:             # ESC (solo el visor de ventana tiene teclado)
+        ...
+    visor.cerrar("Placa")
+
+Visores:
+    "ninguno"  no hace nada (equipos sin pantalla, replay)
+    "ventana"  cv2.imshow en un hilo propio
+    "mjpeg"    http://<equipo>:PUERTO_MJPEG/ con a lo sumo FPS_MJPEG cuadros/s
+               (solo desde el mismo equipo salvo HOST_MJPEG=0.0.0.0)
+"""
+
+import threading
+import time
+from abc import ABC, abstractmethod
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote
+
+from core.config import FPS_MJPEG, HOST_MJPEG, PUERTO_MJPEG, VISOR
+
+
+def dibujar(frame, textos=(), rectangulos=()):
+    """Copia del frame con los textos (texto, (x, y), escala, color, grosor) y rectángulos encima."""
+    import cv2
+
+    lienzo = frame.copy()
+    for p1, p2, color, grosor in rectangulos:
+        cv2.rectangle(lienzo, p1, p2, color, grosor)
+    for texto, posicion, escala, color, grosor in textos:
+        cv2.putText(lienzo, texto, posicion, cv2.FONT_HERSHEY_SIMPLEX, escala, color, grosor)
+    return lienzo
+
+
+class VisorNinguno:
+    """No muestra nada; las capturas funcionan igual sin pantalla."""
+
+    interactivo = False  # sin teclado: no hay ESC ni captura manual
+
+    def mostrar(self, ventana, frame, textos=(), rectangulos=()):
+        pass
+
+    def tecla(self):
+        return None
+
+    def cerrar(self, ventana=None):
+        pass
+
+
+class _VisorConHilo(VisorNinguno, ABC):
+    """Guarda el último frame de cada ventana y lo procesa en un hilo propio."""
+
+    def __init__(self):
+        self._ultimos = {}  # ventana -> (frame, textos, rectangulos)
+        self._hay_nuevo = threading.Condition()
+        self._hilo = None
+        self._activo = False
+
+    def _asegurar_hilo(self):
+        if self._hilo is None:
+            self._activo = True
+            self._hilo = threading.Thread(target=self._bucle, name=type(self).__name__, daemon=True)
+            self._hilo.start()
+
+    def mostrar(self, ventana, frame, textos=(), rectangulos=()):
+        # Sin copiar ni dibujar: eso lo hace el hilo del visor
+        with self._hay_nuevo:
+            self._ultimos[ventana] = (frame, list(textos), list(rectangulos))
+            self._hay_nuevo.notify()
+        self._asegurar_hilo()
+
+    def _tomar_pendientes(self, timeout):
+        with self._hay_nuevo:
+            if not self._ultimos:
+                self._hay_nuevo.wait(timeout)
+            pendientes, self._ultimos = self._ultimos, {}
+        return pendientes
+
+    @abstractmethod
+    def _bucle(self):
+        """Atiende los frames pendientes mientras el visor esté activo (en el hilo del visor)."""
+
+
+class VisorVentana(_VisorConHilo):
+    """
+    Ventanas de OpenCV atendidas por su propio hilo (imshow + waitKey).
+    En Windows y Linux HighGUI funciona fuera del hilo principal.
+    """
+
+    interactivo = True
+
+    def __init__(self):
+        super().__init__()
+        self._tecla = None
+        self._cerrar = set()
+        self._abiertas = set()
+
+    def tecla(self):
+        """Última tecla presionada desde la llamada anterior (o None)."""
+        tecla, self._tecla = self._tecla, None
+        return tecla
+
+    def cerrar(self, ventana=None):
+        with self._hay_nuevo:
+            if ventana is None:
+                self._cerrar.update(self._abiertas | set(self._ultimos))
+                self._ultimos.clear()
+            else:
+                self._cerrar.add(ventana)
+                self._ultimos.pop(ventana, None)
+            self._hay_nuevo.notify()
+
+    def _bucle(self):
+        import cv2
+
+        while self._activo:
+            pendientes = self._tomar_pendientes(timeout=0.05)
+            with self._hay_nuevo:
+                cerrar, self._cerrar = self._cerrar, set()
+            for ventana in cerrar & self._abiertas:
+                cv2.destroyWindow(ventana)
+                self._abiertas.discard(ventana)
+
+            for ventana, (frame, textos, rectangulos) in pendientes.items():
+                cv2.imshow(ventana, dibujar(frame, textos, rectangulos))
+                self._abiertas.add(ventana)
+
+            # waitKey atiende los eventos de las ventanas; solo en este hilo
+            if self._abiertas:
+                tecla = cv2.waitKey(1) & 0xFF
+                if tecla != 255:
+                    self._tecla = tecla
+
+
+class VisorMJPEG(_VisorConHilo):
+    """
+    Vista previa por HTTP (multipart/x-mixed-replace): se abre en cualquier
+    navegador. Se codifica a lo sumo `fps` veces por segundo y solo si hay
+    alguien mirando.
+
+        http://<equipo>:8081/           último frame de cualquier ventana
+        http://<equipo>:8081/<ventana>  una ventana en particular
+    """
+
+    def __init__(self, host: str = HOST_MJPEG, puerto: int = PUERTO_MJPEG, fps: float = FPS_MJPEG,
+                 calidad: int = 70):
+        super().__init__()
+        self.intervalo = 1.0 / fps if fps > 0 else 0.0
+        self.calidad = calidad
+        self._jpeg = {}          # ventana -> bytes del último JPEG
+        self._ultima_ventana = None
+        self._jpeg_listo = threading.Condition()
+        self.clientes = 0
+
+        visor = self
+
+        class ManejadorMJPEG(BaseHTTPRequestHandler):
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                ventana = unquote(self.path.strip("/")) or None
+                self.send_response(200)
+                self.send_header("Content-Type", "multipart/x-mixed-replace; boundary=frame")
+                self.send_header("Cache-Control", "no-cache")
+                self.end_headers()
+                with visor._jpeg_listo:
+                    visor.clientes += 1
+                try:
+                    enviado = None
+                    while True:
+                        jpeg = visor._esperar_jpeg(ventana, enviado)
+                        if jpeg is None:
+                            continue
+                        self.wfile.write(b"--frame\r\nContent-Type: image/jpeg\r\n"
+                                         + f"Content-Length: {len(jpeg)}\r\n\r\n".encode() + jpeg + b"\r\n")
+                        enviado = jpeg
+                except (BrokenPipeError, ConnectionResetError, ConnectionAbortedError):
+                    pass
+                finally:
+                    with visor._jpeg_listo:
+                        visor.clientes -= 1
+
+        self.servidor = ThreadingHTTPServer((host, puerto), ManejadorMJPEG)
+        self.servidor.daemon_threads = True
+        threading.Thread(target=self.servidor.serve_forever, name="visor-mjpeg", daemon=True).start()
+        print(f"📺 Vista previa MJPEG en http://{host}:{self.servidor.server_address[1]}/")
+        if host not in ("127.0.0.1", "localhost", "::1"):
+            print("⚠️  La vista previa MJPEG es accesible desde la red y no pide autenticación")
+
+    def _esperar_jpeg(self, ventana, enviado, timeout: float = 1.0):
+        with self._jpeg_listo:
+            self._jpeg_listo.wait_for(
+                lambda: self._jpeg.get(ventana or self._ultima_ventana) is not enviado, timeout=timeout
+            )
+            jpeg = self._jpeg.get(ventana or self._ultima_ventana)
+        return jpeg if jpeg is not enviado else None
+
+    def _bucle(self):
+        import cv2
+
+        while self._activo:
+            pendientes = self._tomar_pendientes(timeout=0.5)
+            if not pendientes or not self.clientes:
+                continue  # nadie mirando: no se gasta CPU codificando
+
+            inicio = time.perf_counter()
+            for ventana, (frame, textos, rectangulos) in pendientes.items():
+                ok, jpeg = cv2.imencode(".jpg", dibujar(frame, textos, rectangulos),
+                                        [cv2.IMWRITE_JPEG_QUALITY, self.calidad])
+                if ok:
+                    with self._jpeg_listo:
+                        self._jpeg[ventana] = jpeg.tobytes()
+                        self._ultima_ventana = ventana
+                        self._jpeg_listo.notify_all()
+
+            # Limitar la tasa de cuadros de la vista previa
+            restante = self.intervalo - (time.perf_counter() - inicio)
+            if restante > 0:
+                time.sleep(restante)
+
+    def cerrar(self, ventana=None):
+        with self._hay_nuevo:
+            if ventana is None:
+                self._ultimos.clear()
+            else:
+                self._ultimos.pop(ventana, None)
+
+
+# ==========================================
+# VISOR DEL PROCESO
+# ==========================================
+
+VISORES = {
+    "ninguno": VisorNinguno,
+    "ventana": VisorVentana,
+    "mjpeg": VisorMJPEG,
+}
+
+_visor = None
+_visor_lock = threading.Lock()
+
+
+def obtener_visor():
+    """Visor único del proceso, según VISOR ("ventana" si el valor no se reconoce)."""
+    global _visor
+    with _visor_lock:
+        if _visor is None:
+            _visor = VISORES.get(VISOR, VisorVentana)()
+        return _visor
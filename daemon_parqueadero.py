@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Modo daemon de la portería: arranca una sola vez y atiende vehículos
+indefinidamente con todo caliente.
+
+main_integrated.py se ejecuta una vez por vehículo y en cada corrida
+vuelve a cargar YOLO, abre la cámara dos veces y lanza DeepFace en frío.
+Aquí, al arrancar (en paralelo):
+    - se cargan el detector de placas y el OCR, con una inferencia en vacío
+      (o, con USAR_SERVIDOR_INFERENCIA, se conecta al servidor local de
+      inferencia que comparten los carriles)
+    - se lanza el trabajador DeepFace persistente (ArcFace ya cargado)
+    - se abren las cámaras de placa y rostro en el gestor de cámaras
+      (una sola si son la misma) y quedan leyendo frames
+luego, si el equipo no tiene perfil (o CALIBRAR_AL_ARRANCAR=1), se mide
+y se eligen cadencias y modelos (core/calibracion.py)
+y después se atienden vehículos con el pipeline del modo continuo.
+
+La vista previa de la cámara de placas aparece apenas abre la cámara
+(con el aviso "Calentando modelos..."), sin esperar a YOLO ni DeepFace;
+al final se imprimen los hitos del arranque (core/arranque.py).
+
+Ctrl+C / SIGTERM: deja de capturar, corta la verificación facial en curso,
+espera a lo sumo TIEMPO_CIERRE_PIPELINE a los vehículos ya en el pipeline,
+vacía las colas y libera cámaras y procesos (si llega durante el arranque,
+sale apenas termina de arrancar). Una segunda señal corta sin esperar.
+
+Uso:
+    python daemon_parqueadero.py
+"""
+
+import signal
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from core.arranque import hito, imprimir_hitos
+import main_integrated as flujo
+from core import config
+from core.calibracion import TAMANOS_ENTRADA, calibrar, necesita_calibrar, perfil_vigente
+from core.camaras import cerrar_camaras, gestor_camaras
+from core.config import DIRECCION_INFERENCIA, FORMATO_MODELOS, ID_CARRIL, USAR_SERVIDOR_INFERENCIA
+from core.deepface_persistente import TrabajadorDeepFace
+from core.modelos import imprimir_arranque_modelos
+from core.recursos import configurar_proceso
+from core.trazas import LineaTiempo
+
+
+# ==========================================
+# 1. PRECARGA DE MODELOS Y CÁMARAS
+# ==========================================
+
+def cargar_detector():
+    # Desde la cache de core/modelos.py y ya con una inferencia en vacío
+    return flujo.cargar_detector_placas()
+
+
+def precalentar_ocr():
+    from placas.prueba_numero_letra import cargar_modelo
+    return cargar_modelo()
+
+
+def conectar_servidor_inferencia():
+    """Detector y OCR del servidor compartido (placas/servidor_inferencia.py)."""
+    from placas.cliente_inferencia import ClienteInferencia, DetectorRemoto
+
+    cliente = ClienteInferencia(DIRECCION_INFERENCIA, ID_CARRIL)
+    cliente.metricas()  # falla aquí, y no con el primer vehículo, si el servidor no está
+    print(f"🔌 Usando el servidor de inferencia en {DIRECCION_INFERENCIA} como {ID_CARRIL}")
+    return {"detector": DetectorRemoto(cliente), "ocr": cliente.leer_placa, "cliente_inferencia": cliente}
+
+
+def iniciar_trabajador():
+    if not flujo.PYTHON_DEEPFACE.exists():
+        print(f"⚠️  No encontrado {flujo.PYTHON_DEEPFACE}: DeepFace se lanzará por comparación")
+        return None
+    return TrabajadorDeepFace(flujo.PYTHON_DEEPFACE).iniciar()
+
+
+def abrir_camaras():
+    """Abre (y calienta) los dispositivos de placa y rostro; quedan abiertos en el gestor."""
+    gestor = gestor_camaras()
+    for rol in ("placa", "rostro"):
+        if gestor.camara(rol) is None:
+            print(f"⚠️  No se pudo abrir la cámara de {rol} ({gestor.roles[rol]}): se reintentará por vehículo")
+
+
+def _vista_previa_mientras_carga(listo: threading.Event):
+    """Muestra la cámara de placas mientras los modelos terminan de cargar."""
+    visor = flujo.obtener_visor()
+    cap = flujo.suscribir_camara("placa")
+    try:
+        while cap.isOpened() and not listo.is_set():
+            ret, frame = cap.read()
+            if not ret:
+                listo.wait(0.1)
+                continue
+            visor.mostrar(flujo.VENTANA_PLACA, frame,
+                          textos=[("Calentando modelos...", (10, 30), 1, (0, 255, 255), 2)])
+            hito("vista_previa")
+    finally:
+        cap.release()
+
+
+def precargar(listo: threading.Event = None):
+    """
+    Carga todo en paralelo. Retorna el dict de recursos del pipeline.
+    Con `listo`, la vista previa arranca apenas abren las cámaras y se
+    mantiene hasta que se marque el evento.
+    """
+    linea = LineaTiempo("arranque del daemon")
+    with ThreadPoolExecutor(max_workers=4, thread_name_prefix="precarga") as ejecutor:
+        if USAR_SERVIDOR_INFERENCIA:
+            futuro_modelos = ejecutor.submit(linea.medir("servidor_inferencia", conectar_servidor_inferencia))
+        else:
+            futuro_detector = ejecutor.submit(linea.medir("detector_placas", cargar_detector))
+            futuro_ocr = ejecutor.submit(linea.medir("ocr_placas", precalentar_ocr))
+        futuro_trabajador = ejecutor.submit(linea.medir("deepface", iniciar_trabajador))
+        futuro_camaras = ejecutor.submit(linea.medir("camaras", abrir_camaras))
+        if listo is not None:
+            futuro_camaras.add_done_callback(lambda _: threading.Thread(
+                target=_vista_previa_mientras_carga, args=(listo,), name="vista-previa-arranque", daemon=True
+            ).start())
+
+        if USAR_SERVIDOR_INFERENCIA:
+            recursos = futuro_modelos.result()
+        else:
+            recursos = {"detector": futuro_detector.result()}
+            futuro_ocr.result()
+
+        try:
+            recursos["trabajador"] = futuro_trabajador.result()
+        except Exception as e:
+            print(f"⚠️  Trabajador DeepFace no disponible, se usará un proceso por comparación: {e}")
+            recursos["trabajador"] = None
+
+        futuro_camaras.result()
+
+    linea.imprimir()
+    imprimir_arranque_modelos()
+    return recursos
+
+
+def calibrar_equipo(recursos):
+    """Mide el equipo con los modelos ya cargados y aplica el perfil elegido."""
+    if not necesita_calibrar():
+        print(f"⚙️  Perfil del equipo: {perfil_vigente()}")
+        return
+
+    camara = gestor_camaras().camara("placa")
+    # Con el servidor de inferencia el tamaño de entrada lo decide el servidor,
+    # y TorchScript solo acepta el tamaño con que se exportó
+    tamano_fijo = USAR_SERVIDOR_INFERENCIA or FORMATO_MODELOS == "torchscript"
+    tamanos = (config.TAMANO_ENTRADA_DETECTOR,) if tamano_fijo else TAMANOS_ENTRADA
+    calibrar(recursos["detector"], recursos.get("trabajador"), camara.fps() if camara else None, tamanos)
+
+    trabajador = recursos.get("trabajador")
+    if trabajador is not None and trabajador.modelo != config.MODELO_FACIAL:
+        print(f"🔄 Reiniciando el trabajador DeepFace con {config.MODELO_FACIAL}...")
+        trabajador.cerrar()
+        trabajador.iniciar()
+
+
+def liberar(recursos):
+    cerrar_camaras()
+    if recursos.get("cliente_inferencia") is not None:
+        recursos["cliente_inferencia"].cerrar()
+    if recursos.get("trabajador") is not None:
+        recursos["trabajador"].cerrar()
+
+
+# ==========================================
+# 2. CICLO DE VIDA
+# ==========================================
+
+_detener_evento = threading.Event()
+
+
+def _detener(signum, frame):
+    # Solo una marca: una excepción aquí podría caer dentro del cierre del
+    # pipeline y saltarse el drenado. El ciclo principal la ve y sale limpio
+    if _detener_evento.is_set():
+        raise KeyboardInterrupt  # segunda señal: salir ya
+    print(f"\n⏹️  Señal {signal.Signals(signum).name}: terminando (otra señal corta sin esperar)")
+    _detener_evento.set()
+
+
+def main():
+    for nombre in ("SIGINT", "SIGTERM", "SIGBREAK"):  # SIGBREAK: Ctrl+Break en Windows
+        if hasattr(signal, nombre):
+            signal.signal(getattr(signal, nombre), _detener)
+
+    # Hilos y núcleos de YOLO antes de precargar torch (core/recursos.py)
+    configurar_proceso("yolo")
+
+    print("\n" + "=" * 50)
+    print("🛡️  DAEMON DE PORTERÍA - precargando modelos y cámaras")
+    print("=" * 50)
+
+    inicio = time.perf_counter()
+    flujo.iniciar_sincronizacion_periodica()
+    flujo.iniciar_vaciado()
+    flujo.iniciar_subida_evidencias()
+    flujo.iniciar_limpieza_artefactos()
+    listo = threading.Event()
+    recursos = precargar(listo)
+    calibrar_equipo(recursos)
+    listo.set()
+    hito("listo")
+    arranque = time.perf_counter() - inicio
+    imprimir_hitos()
+    print(f"\n✅ Listo en {arranque:.1f}s - esperando vehículos (Ctrl+C para detener)")
+
+    try:
+        metricas = flujo.procesar_flujo_continuo(recursos=recursos, detener=_detener_evento)
+    finally:
+        liberar(recursos)
+
+    print(f"\n⏱️  Arranque en frío: {arranque:.1f}s | por vehículo en régimen: "
+          f"p50 {metricas['latencia_total_ms']['p50'] or 0:.0f} ms, "
+          f"p95 {metricas['latencia_total_ms']['p95'] or 0:.0f} ms")
+
+    flujo.drenar_artefactos()
+    if not flujo.drenar():
+        print(f"⚠️  Escrituras pendientes en cola: {flujo.estadisticas_cola()['profundidad']}")
+    if not flujo.drenar_evidencias():
+        print("⚠️  Quedaron evidencias por subir (se retoman al volver a arrancar)")
+    print("👋 Daemon detenido")
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        print("\n⚠️  Detenido durante el arranque o el cierre")
+        sys.exit(0)
@@ -0,0 +1,44 @@
+"""
+Calcula el embedding ArcFace de una foto de referencia y lo guarda en JSON.
+
+Se ejecuta en el venv deepface (Python 3.10.11):
+    python face/calcular_embedding.py <ruta_foto> <ruta_salida.json>
+
+main_integrated.py lo lanza apenas descarga la biometría, en paralelo con
+la apertura de la cámara, para que la verificación facial solo tenga que
+calcular el embedding del frame capturado.
+"""
+
+import json
+import os
+import sys
+
+
+def calcular_embedding(ruta_foto, ruta_salida, modelo="ArcFace"):
+    from deepface import DeepFace
+
+    resultado = DeepFace.represent(
+        img_path=ruta_foto,
+        model_name=modelo,
+        enforce_detection=False,
+        align=True
+    )
+
+    # Escribir y renombrar: quien lo lea nunca ve un JSON a medias
+    temporal = f"{ruta_salida}.tmp"
+    with open(temporal, "w", encoding="utf-8") as f:
+        json.dump({"modelo": modelo, "embedding": resultado[0]["embedding"]}, f)
+    os.replace(temporal, ruta_salida)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("Uso: python calcular_embedding.py <ruta_foto> <ruta_salida.json>")
+        sys.exit(1)
+
+    try:
+        calcular_embedding(sys.argv[1], sys.argv[2])
+        print("EMBEDDING:OK")
+    except Exception as e:
+        print(f"EMBEDDING:ERROR:{str(e)[:100]}")
+        sys.exit(1)
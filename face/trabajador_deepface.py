@@ -0,0 +1,181 @@
+"""
+Proceso persistente de DeepFace para el modo daemon.
+
+Carga el modelo facial (MODELO_FACIAL, por defecto ArcFace) una sola vez y atiende pedidos por stdin/stdout, una línea
+JSON por pedido y una por respuesta. El `id` del pedido (si viene) se devuelve en la respuesta:
+
+    {"op": "comparar", "frame": "temp/f.jpg", "referencia": "ref.jpg", "embedding": "ref.jpg.arcface.json"}
+        -> {"ok": true, "distancia": 0.3124, "coincide": true}
+    {"op": "comparar", "frame": {"bus": "parq_1234_rostro", "casilla": 1, "secuencia": 9}, ...}
+        (frame en el bus de memoria compartida, core/bus_frames.py)
+    {"op": "embedding", "foto": "ref.jpg", "salida": "ref.jpg.arcface.json"}
+        -> {"ok": true}
+    {"op": "medir", "modelos": ["ArcFace", "SFace"], "repeticiones": 3}
+        -> {"ok": true, "ms": {"ArcFace": 212.4, "SFace": 48.9}}   (core/calibracion.py)
+    {"op": "ping"}
+        -> {"ok": true}
+
+Los embeddings de referencia quedan en memoria: la misma persona en
+varios vehículos o varios frames solo se calcula una vez.
+
+Se ejecuta en el venv deepface (Python 3.10.11); lo lanza
+core/deepface_persistente.py, no hace falta abrirlo a mano.
+"""
+
+import json
+import os
+import sys
+
+# Todo lo que impriman DeepFace/TensorFlow va a stderr: stdout es el canal
+# de respuestas y una línea ajena rompería el protocolo
+_respuestas = sys.stdout
+sys.stdout = sys.stderr
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(1, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # core/
+
+# Hilos y núcleos que le tocan a DeepFace en el presupuesto de CPU del equipo
+# (core/recursos.py, calculado por el proceso padre); antes de importar TensorFlow
+try:
+    from core.recursos import configurar_proceso, aplicar_tensorflow
+    configurar_proceso("deepface")
+except Exception as e:
+    aplicar_tensorflow = None
+    print(f"⚠️  Presupuesto de hilos no aplicado: {e}", file=sys.stderr)
+
+# Distancia coseno máxima para considerar que es la misma persona, por modelo
+UMBRALES = {
+    "ArcFace": 0.60,  # Umbral estricto para ArcFace (igual que reconocimientoFacial.py)
+    "SFace": 0.55,    # un poco más estricto que el 0.593 por defecto de DeepFace
+}
+
+# Lo elige la calibración del equipo (core/calibracion.py); lo pasa core/deepface_persistente.py
+MODELO = os.getenv("MODELO_FACIAL", "ArcFace")
+UMBRAL_DISTANCIA = UMBRALES.get(MODELO, UMBRALES["ArcFace"])
+
+_embeddings_referencia = {}  # ruta de la foto -> embedding
+
+
+def _representar(imagen, modelo=None):
+    from deepface import DeepFace
+
+    return DeepFace.represent(
+        img_path=imagen,
+        model_name=modelo or MODELO,
+        enforce_detection=False,
+        align=True
+    )[0]["embedding"]
+
+
+def _embedding_referencia(ruta_foto, ruta_embedding=None):
+    if ruta_foto in _embeddings_referencia:
+        return _embeddings_referencia[ruta_foto]
+
+    embedding = None
+    if ruta_embedding and os.path.exists(ruta_embedding):
+        try:
+            with open(ruta_embedding, encoding="utf-8") as f:
+                datos = json.load(f)
+            # Un embedding de otro modelo no es comparable: se recalcula
+            if datos.get("modelo", "ArcFace") == MODELO:
+                embedding = datos["embedding"]
+        except Exception:
+            embedding = None
+
+    if embedding is None:
+        embedding = _representar(ruta_foto)
+
+    _embeddings_referencia[ruta_foto] = embedding
+    return embedding
+
+
+def comparar(pedido):
+    import numpy as np
+
+    a = np.array(_embedding_referencia(pedido["referencia"], pedido.get("embedding")))
+    frame = pedido["frame"]
+    if isinstance(frame, dict):
+        # Referencia al bus de frames: se lee la casilla sin copiar ni decodificar
+        from core.bus_frames import frame_desde_referencia, vigente
+
+        frame = frame_desde_referencia(pedido["frame"])
+        if frame is None:
+            raise RuntimeError("el frame ya fue reemplazado en el bus")
+        b = np.array(_representar(frame))
+        if not vigente(pedido["frame"]):
+            raise RuntimeError("el frame cambió en el bus durante la comparación")
+    else:
+        b = np.array(_representar(frame))
+    distancia = 1 - float(np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b)))
+    return {"ok": True, "distancia": round(distancia, 4), "coincide": distancia < UMBRAL_DISTANCIA}
+
+
+def embedding(pedido):
+    from calcular_embedding import calcular_embedding
+
+    calcular_embedding(pedido["foto"], pedido["salida"], modelo=MODELO)
+    return {"ok": True}
+
+
+def medir(pedido):
+    """Latencia (p50, ms) del embedding de un frame con cada modelo pedido."""
+    import time
+    import numpy as np
+
+    frame = np.random.randint(0, 255, (480, 640, 3), dtype=np.uint8)
+    resultado = {}
+    for modelo in pedido.get("modelos", [MODELO]):
+        try:
+            _representar(frame, modelo)  # carga del modelo: no cuenta
+            tiempos = []
+            for _ in range(pedido.get("repeticiones", 3)):
+                inicio = time.perf_counter()
+                _representar(frame, modelo)
+                tiempos.append((time.perf_counter() - inicio) * 1000)
+            resultado[modelo] = round(sorted(tiempos)[len(tiempos) // 2], 1)
+        except Exception as e:
+            print(f"⚠️  No se pudo medir {modelo}: {e}", file=sys.stderr)
+    return {"ok": True, "ms": resultado}
+
+
+def precalentar():
+    """Carga el modelo y el detector con una imagen vacía."""
+    import numpy as np
+
+    try:
+        if aplicar_tensorflow is not None:
+            aplicar_tensorflow("deepface")
+        _representar(np.zeros((160, 160, 3), dtype=np.uint8))
+    except Exception as e:
+        print(f"⚠️  Precalentamiento de DeepFace: {e}", file=sys.stderr)
+
+
+OPERACIONES = {
+    "comparar": comparar,
+    "embedding": embedding,
+    "medir": medir,
+    "ping": lambda pedido: {"ok": True},
+}
+
+
+def responder(respuesta):
+    _respuestas.write(json.dumps(respuesta) + "\n")
+    _respuestas.flush()
+
+
+if __name__ == "__main__":
+    precalentar()
+    responder({"ok": True, "listo": True, "modelo": MODELO})
+
+    for linea in sys.stdin:
+        if not linea.strip():
+            continue
+        pedido = None
+        try:
+            pedido = json.loads(linea)
+            respuesta = OPERACIONES[pedido["op"]](pedido)
+        except Exception as e:
+            respuesta = {"ok": False, "error": str(e)[:200]}
+        if isinstance(pedido, dict) and "id" in pedido:
+            respuesta = {**respuesta, "id": pedido["id"]}
+        responder(respuesta)
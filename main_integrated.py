@@ -9,11 +9,19 @@ Main integrado para todo el flujo:
 6. Autoriza o deniega acceso
 """
 
+# Primero que todo: los hitos de arranque cuentan desde aquí (core/arranque.py)
+from core.arranque import hito, cargar_en_segundo_plano, imprimir_hitos
+# Los hilos que le tocan a YOLO (core/recursos.py) se fijan al arrancar, no al importar
+from core.recursos import configurar_proceso, medir_inferencia, imprimir_contencion
+
 import cv2
 import os
 import subprocess
 import json
 import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 import sys
@@ -22,11 +30,54 @@ import sys
 try:
     from servicios.peticiones_supaBase import (
         obtener_conductor_por_placa, 
-        descargar_foto_biometria,
-        registrar_acceso,
-        crear_notificacion
+        descargar_foto_biometria
+    )
+    from servicios.cola_escritura import (
+        encolar_registro_acceso,
+        encolar_notificacion,
+        iniciar_vaciado,
+        drenar,
+        estadisticas_cola
+    )
+    from servicios.subida_evidencias import (
+        encolar_evidencia,
+        iniciar_subida_evidencias,
+        drenar_evidencias,
+        estadisticas_evidencias
+    )
+    from servicios.replica_local import (
+        consultar_conductor,
+        obtener_biometria,
+        iniciar_sincronizacion_periodica
     )
     from placas.prueba_numero_letra import leer_placa
+    from core.modelos import arrancar_modelos, imprimir_arranque_modelos, opciones_inferencia
+    from core.trazas import LineaTiempo, etapa
+    from core.pipeline import Pipeline, Etapa
+    from core.camaras import gestor_camaras, suscribir_camara
+    from core.visualizacion import obtener_visor
+    from core.bus_frames import bus_frames
+    from core.deduplicacion import (
+        reclamar_evento,
+        resolver_evento,
+        liberar_evento,
+        imprimir_deduplicacion
+    )
+    from core.artefactos import (
+        guardar_artefacto,
+        esperar_artefacto,
+        asociar_placa,
+        iniciar_limpieza_artefactos,
+        drenar_artefactos
+    )
+    from core import config
+    from core.config import (
+        CAPACIDAD_COLA_PIPELINE,
+        HILOS_REFERENCIA_PIPELINE,
+        TIEMPO_CIERRE_PIPELINE,
+        TIMEOUT_VERIFICACION_FACIAL,
+        USAR_BUS_FRAMES
+    )
 except ImportError as e:
     print(f"❌ Error importando módulos del venv 3.11.8: {e}")
     print("⚠️  Asegúrate de tener activado el venv 3.11.8 correcto")
@@ -44,32 +95,35 @@ PYTHON_3_11 = VENV_3_11 / "Scripts" / "python.exe"
 PYTHON_DEEPFACE = VENV_DEEPFACE / "Scripts" / "python.exe"
 
 SCRIPT_DEEPFACE = BASE_DIR / "face" / "reconocimientoFacial.py"
+SCRIPT_EMBEDDING = BASE_DIR / "face" / "calcular_embedding.py"
 
 # Carpetas temporales
 TEMP_DIR = BASE_DIR / "temp"
 TEMP_DIR.mkdir(exist_ok=True)
 
-# Variable global para guardar la placa actual
-PLACA_ACTUAL = None
-CARPETA_PLACA_ACTUAL = None
 
-def crear_carpeta_placa(placa: str):
-    """
-    Crea una carpeta separada para cada placa en temp/[placa]/
-    y la guarda en variables globales.
-    """
-    global PLACA_ACTUAL, CARPETA_PLACA_ACTUAL
-    PLACA_ACTUAL = placa
-    CARPETA_PLACA_ACTUAL = TEMP_DIR / placa
-    CARPETA_PLACA_ACTUAL.mkdir(exist_ok=True)
-    print(f"📁 Carpeta creada/utilizada: {CARPETA_PLACA_ACTUAL}")
-    return CARPETA_PLACA_ACTUAL
+def _id_evento(linea):
+    """Id de las capturas: el de la línea de tiempo del evento (None: el almacén crea uno)."""
+    return linea.id if linea is not None else None
 
 # ==========================================
 # UTILIDADES PARA CAPTURA DE CÁMARA
 # ==========================================
 
-def capturar_placa_automatica(nombre_archivo="placa_captura.jpg", timeout_segundos=30, placa=None):
+# Nombres de las ventanas (o rutas del visor MJPEG)
+VENTANA_PLACA = "Camara - Deteccion Automatica de Placa"
+VENTANA_MANUAL = "Modo Manual - ESPACIO para capturar, ESC para salir"
+VENTANA_ROSTRO = "Verificación Facial - TIEMPO REAL"
+
+
+def cargar_detector_placas():
+    """Carga (desde la cache de core/modelos.py) el YOLO que detecta y recorta la placa en el frame."""
+    from core.modelos import cargar_detector_placas as cargar
+    return cargar()
+
+
+def capturar_placa_automatica(nombre_archivo="placa_captura.jpg", timeout_segundos=30, placa=None,
+                              modelo=None, linea=None, fuente=None, visor=None, detener=None):
     """
     Abre la cámara y detecta automáticamente la placa usando YOLO.
     Captura automáticamente cuando detecta una placa QUIETA con confianza suficiente.
@@ -79,7 +133,15 @@ def capturar_placa_automatica(nombre_archivo="placa_captura.jpg", timeout_segund
     Args:
         nombre_archivo: nombre del archivo a guardar
         timeout_segundos: máximo tiempo esperando detección
-        placa: si se proporciona, crea carpeta separada para esta placa
+        placa: si se conoce, queda en el índice de artefactos
+        modelo: detector YOLO ya cargado (modo daemon); si no, se carga en
+            segundo plano mientras la cámara ya muestra imagen
+        linea: LineaTiempo del evento; cada inferencia queda como etapa "deteccion"
+        fuente: fuente de frames (core/fuentes.py, p. ej. un video grabado);
+            por defecto la cámara de placas. No se libera al terminar
+        visor: dónde se muestra la vista previa (core/visualizacion.py);
+            por defecto el del proceso según VISOR
+        detener: threading.Event; si se marca deja de buscar (el daemon al recibir SIGTERM)
     
     Returns:
         ruta_imagen: ruta del archivo guardado o None si no detectó
@@ -87,20 +149,19 @@ def capturar_placa_automatica(nombre_archivo="placa_captura.jpg", timeout_segund
     print("\n📷 Abriendo cámara... (detectando placa QUIETA automáticamente)")
     print("   ⏳ Esperando a que YOLO detecte una placa estable...")
     
-    try:
-        from ultralytics import YOLO
-        import numpy as np
-        
-        # Cargar modelo YOLO
-        print("   🤖 Cargando modelo YOLO...")
-        model = YOLO("modelos/detectar-Placa/best.pt")
-        
-    except Exception as e:
-        print(f"   ❌ Error cargando YOLO: {e}")
-        print("   💡 Alternativa: usando captura manual")
-        return capturar_foto_camara_manual(nombre_archivo, placa=placa)
+    model = modelo
+    modelo_pendiente = None
+    if model is None:
+        # Arranque rápido: la vista previa no espera a YOLO (y torch); el
+        # detector se carga en otro hilo y se empieza a usar apenas esté
+        print("   🤖 Cargando modelo YOLO en segundo plano...")
+        modelo_pendiente = cargar_en_segundo_plano("detector_placas", cargar_detector_placas)
     
-    cap = cv2.VideoCapture(0)
+    visor = visor or obtener_visor()
+    
+    # La cámara queda abierta en el gestor; aquí solo se toma una suscripción
+    fuente_propia = fuente is None
+    cap = suscribir_camara("placa") if fuente_propia else fuente
     
     if not cap.isOpened():
         print("❌ No se pudo abrir la cámara")
@@ -112,45 +173,76 @@ def capturar_placa_automatica(nombre_archivo="placa_captura.jpg", timeout_segund
     marco_capturado = None
     frame_original = None
     
+    # Cadencias del perfil del equipo (core/calibracion.py); se leen en cada
+    # llamada porque la calibración al arrancar puede cambiarlas
+    cada_frames_yolo = config.CADA_FRAMES_YOLO
+    opciones_detector = opciones_inferencia("detector")  # imgsz, letterbox, FP16
+    confianza_minima = config.CONFIANZA_DETECCION_PLACA
+    movimiento_maximo = config.MOVIMIENTO_MAXIMO_PX
+    
     # Variables para detectar estabilidad
     placa_anterior = None
     frames_estables = 0
-    frames_estables_requeridos = 8  # Requiere 8 frames consecutivos sin movimiento
+    frames_estables_requeridos = config.FRAMES_ESTABLES_PLACA  # detecciones seguidas sin movimiento
+    numero_frame = 0
     
     print("   ⏳ Buscando placa QUIETA en video en tiempo real...")
     
     while not placa_detectada:
+        if detener is not None and detener.is_set():
+            break
         ret, frame = cap.read()
         
         if not ret:
             print("❌ Error al leer frame de cámara")
             break
+        numero_frame += 1
         
-        # Mostrar frame actual
-        frame_display = frame.copy()
-        cv2.putText(frame_display, "Detectando placa quieta...", (10, 30),
-                   cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+        # Mostrar frame actual (se copia y dibuja en el hilo del visor)
+        if model is None:
+            textos = [("Cargando detector de placas...", (10, 30), 1, (0, 255, 255), 2)]
+        else:
+            textos = [("Detectando placa quieta...", (10, 30), 1, (0, 255, 0), 2)]
         if frames_estables > 0:
-            cv2.putText(frame_display, f"Estabilidad: {frames_estables}/{frames_estables_requeridos}", (10, 70),
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
-        cv2.imshow("Camara - Deteccion Automatica de Placa", frame_display)
+            textos.append((f"Estabilidad: {frames_estables}/{frames_estables_requeridos}", (10, 70),
+                           0.7, (0, 255, 0), 2))
+        visor.mostrar(VENTANA_PLACA, frame, textos)
+        if numero_frame == 1:
+            hito("vista_previa")
         
         # Presionar ESC para cancelar
-        key = cv2.waitKey(1) & 0xFF
-        if key == 27:  # ESC
+        if visor.tecla() == 27:  # ESC
             print("❌ Detección cancelada por el usuario")
             break
         
-        # Verificar timeout
-        if time.time() - tiempo_inicio > timeout_segundos:
+        # Verificar timeout (mientras carga el detector no corre)
+        if (model is not None and timeout_segundos is not None
+                and time.time() - tiempo_inicio > timeout_segundos):
             print(f"⏱️  Timeout: No se detectó placa quieta en {timeout_segundos} segundos")
             break
         
-        # Ejecutar YOLO cada 5 frames (para mejor performance)
-        frame_count = int((time.time() - tiempo_inicio) * 30) % 5
-        if frame_count == 0:
+        if model is None:
+            if not modelo_pendiente.done():
+                continue
+            try:
+                model = modelo_pendiente.result()
+            except Exception as e:
+                print(f"   ❌ Error cargando YOLO: {e}")
+                print("   💡 Alternativa: usando captura manual")
+                if fuente_propia:
+                    cap.release()
+                visor.cerrar(VENTANA_PLACA)
+                return capturar_foto_camara_manual(nombre_archivo, placa=placa, evento=_id_evento(linea))
+            # El timeout corre desde que hay detector, como cuando se cargaba antes de abrir la cámara
+            tiempo_inicio = time.time()
+            print("   🤖 Modelo YOLO listo")
+        
+        # Ejecutar YOLO cada CADA_FRAMES_YOLO frames (para mejor performance); se
+        # cuenta por frame leído y no por reloj, así una grabación da siempre lo mismo
+        if numero_frame % cada_frames_yolo == 0:
             try:
-                results = model(frame, verbose=False)
+                with etapa(linea, "deteccion"), medir_inferencia("yolo"):
+                    results = model(frame, verbose=False, **opciones_detector)
                 placa_encontrada_ahora = None
                 
                 for result in results:
@@ -159,8 +251,8 @@ def capturar_placa_automatica(nombre_archivo="placa_captura.jpg", timeout_segund
                     for box in boxes:
                         conf = float(box.conf[0])
                         
-                        # Si confianza > 70%, considerar
-                        if conf >= 0.70:
+                        # Si la confianza alcanza CONFIANZA_DETECCION_PLACA, considerar
+                        if conf >= confianza_minima:
                             x1, y1, x2, y2 = map(int, box.xyxy[0])
                             
                             # Agregar margen para que no quede muy ajustado
@@ -206,8 +298,8 @@ def capturar_placa_automatica(nombre_archivo="placa_captura.jpg", timeout_segund
                     
                     movimiento_max = max(diff_x1, diff_y1, diff_x2, diff_y2)
                     
-                    # Si movimiento < 15 píxeles, considerar estable
-                    if movimiento_max < 15:
+                    # Si se movió menos de MOVIMIENTO_MAXIMO_PX, considerar estable
+                    if movimiento_max < movimiento_maximo:
                         frames_estables += 1
                         print(f"   ✓ Placa estable ({frames_estables}/{frames_estables_requeridos}) - movimiento: {movimiento_max}px")
                         
@@ -233,40 +325,42 @@ def capturar_placa_automatica(nombre_archivo="placa_captura.jpg", timeout_segund
                 placa_anterior = None
                 continue
     
-    cap.release()
-    cv2.destroyAllWindows()
+    if fuente_propia:
+        cap.release()
+    visor.cerrar(VENTANA_PLACA)
     
     if marco_capturado is None:
         print("❌ No se detectó placa quieta en el tiempo límite")
         return None
     
-    # Guardar foto recortada en carpeta de placa
-    if placa:
-        carpeta = crear_carpeta_placa(placa)
-        ruta_foto = carpeta / nombre_archivo
-    else:
-        ruta_foto = TEMP_DIR / nombre_archivo
-    
-    cv2.imwrite(str(ruta_foto), marco_capturado)
+    # Guardar foto recortada en el almacén de artefactos (se escribe en segundo plano)
+    ruta_foto = guardar_artefacto(marco_capturado, nombre_archivo, evento=_id_evento(linea), placa=placa)
     print(f"✔ Placa capturada y guardada: {ruta_foto}")
     
-    return str(ruta_foto)
+    return ruta_foto
 
 
-def capturar_foto_camara_manual(nombre_archivo="captura.jpg", placa=None):
+def capturar_foto_camara_manual(nombre_archivo="captura.jpg", placa=None, visor=None, evento=None):
     """
     Alternativa: Abre la cámara y permite capturar manualmente (si YOLO falla).
     
     Args:
         nombre_archivo: nombre del archivo a guardar
-        placa: si se proporciona, crea carpeta separada para esta placa
+        placa: si se conoce, queda en el índice de artefactos
+        visor: visor con teclado (ventana); sin pantalla no hay captura manual
+        evento: id del evento para el almacén de artefactos
     
     Returns:
         ruta_imagen: ruta del archivo guardado o None si no se capturó
     """
+    visor = visor or obtener_visor()
+    if not visor.interactivo:
+        print("❌ La captura manual necesita ventana (VISOR=ventana)")
+        return None
+    
     print("\n📷 Modo MANUAL - Presiona ESPACIO para capturar, ESC para cancelar")
     
-    cap = cv2.VideoCapture(0)
+    cap = suscribir_camara("placa")
     
     if not cap.isOpened():
         print("❌ No se pudo abrir la cámara")
@@ -282,9 +376,9 @@ def capturar_foto_camara_manual(nombre_archivo="captura.jpg", placa=None):
             print("❌ Error al leer el frame")
             break
         
-        cv2.imshow("Modo Manual - ESPACIO para capturar, ESC para salir", frame)
+        visor.mostrar(VENTANA_MANUAL, frame)
         
-        key = cv2.waitKey(1) & 0xFF
+        key = visor.tecla()
         
         if key == ord(' '):  # ESPACIO
             marco = frame.copy()
@@ -295,41 +389,223 @@ def capturar_foto_camara_manual(nombre_archivo="captura.jpg", placa=None):
             break
     
     cap.release()
-    cv2.destroyAllWindows()
+    visor.cerrar(VENTANA_MANUAL)
     
     if marco is None:
         return None
     
-    if placa:
-        carpeta = crear_carpeta_placa(placa)
-        ruta_foto = carpeta / nombre_archivo
+    ruta_foto = guardar_artefacto(marco, nombre_archivo, evento=evento, placa=placa)
+    print(f"✔ Foto guardada: {ruta_foto}")
+    
+    return ruta_foto
+
+
+def ruta_embedding_referencia(ruta_foto_biometria):
+    """Ruta del JSON con el embedding ArcFace precalculado de una foto."""
+    return f"{ruta_foto_biometria}.arcface.json"
+
+
+def calcular_embedding_referencia(ruta_foto_biometria, trabajador=None):
+    """
+    Calcula (una sola vez por foto) el embedding ArcFace de la referencia
+    en el venv deepface y lo guarda junto a la foto.
+    
+    Returns:
+        ruta del JSON del embedding o None si no se pudo calcular
+    """
+    ruta_embedding = ruta_embedding_referencia(ruta_foto_biometria)
+    
+    if os.path.exists(ruta_embedding):
+        return ruta_embedding
+    
+    if trabajador is not None:
+        try:
+            return trabajador.calcular_embedding(ruta_foto_biometria, ruta_embedding)
+        except Exception as e:
+            print(f"⚠️  Error calculando embedding de referencia: {e}")
+            return None
+    
+    if not PYTHON_DEEPFACE.exists() or not SCRIPT_EMBEDDING.exists():
+        return None
+    
+    try:
+        subprocess.run(
+            [str(PYTHON_DEEPFACE), str(SCRIPT_EMBEDDING), str(ruta_foto_biometria), ruta_embedding],
+            capture_output=True,
+            text=True,
+            timeout=120,
+            cwd=str(BASE_DIR)
+        )
+    except subprocess.TimeoutExpired:
+        print("⏱️  Timeout calculando embedding de referencia")
+    
+    return ruta_embedding if os.path.exists(ruta_embedding) else None
+
+
+def preparar_referencia(placa, linea, ejecutor, trabajador=None):
+    """
+    Consulta el conductor y descarga su biometría; apenas la tiene, deja
+    calculando el embedding de referencia en `ejecutor` sin esperarlo.
+    
+    Returns:
+        tuple: (conductor, ruta_foto_biometria)
+    """
+    with linea.etapa("consulta"):
+        # Réplica local primero (funciona sin red), Supabase como respaldo
+        conductor = consultar_conductor(placa)
+    
+    if not conductor or not conductor.get("foto_biometria"):
+        return conductor, None
+    
+    with linea.etapa("descarga_biometria"):
+        ruta_foto_biometria = obtener_biometria(conductor["foto_biometria"])
+    
+    if ruta_foto_biometria and os.path.exists(ruta_foto_biometria):
+        ejecutor.submit(linea.medir("embedding_referencia", calcular_embedding_referencia),
+                        ruta_foto_biometria, trabajador)
+    
+    return conductor, ruta_foto_biometria
+
+
+def _comparar_frame_subprocess(temp_frame_path, ruta_foto_biometria, ruta_embedding=None):
+    """
+    Compara un frame contra la biometría lanzando un Python del venv deepface
+    (carga TensorFlow y ArcFace en cada llamada).
+    
+    Returns:
+        tuple: (es_coincidencia, distancia)
+    """
+    es_coincidencia = False
+    distancia = 0.9999
+    
+    # Comparar usando subprocess en deepface_env
+    script_temporal = TEMP_DIR / "compare_face_realtime.py"
+    
+    script_content = f'''
+import json
+import os
+import sys
+sys.path.insert(0, r"{BASE_DIR / 'face'}")
+
+try:
+    from deepface import DeepFace
+    
+    # Embedding de referencia precalculado (si ya está listo)
+    embedding_ref = None
+    ruta_embedding = r"{ruta_embedding or ''}"
+    if ruta_embedding and os.path.exists(ruta_embedding):
+        try:
+            with open(ruta_embedding, encoding="utf-8") as f:
+                embedding_ref = json.load(f)["embedding"]
+        except Exception:
+            embedding_ref = None
+    
+    if embedding_ref is not None:
+        import numpy as np
+        actual = DeepFace.represent(
+            img_path=r"{temp_frame_path}",
+            model_name='ArcFace',
+            enforce_detection=False,
+            align=True
+        )[0]["embedding"]
+        a = np.array(embedding_ref)
+        b = np.array(actual)
+        distancia = 1 - float(np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b)))
     else:
-        ruta_foto = TEMP_DIR / nombre_archivo
+        result = DeepFace.verify(
+            img1_path=r"{ruta_foto_biometria}",
+            img2_path=r"{temp_frame_path}",
+            model_name='ArcFace',  # Modelo más preciso
+            enforce_detection=False,
+            distance_metric='cosine',
+            align=True  # Alinear rostros para mejor precisión
+        )
+        distancia = result['distance']
     
-    cv2.imwrite(str(ruta_foto), marco)
-    print(f"✔ Foto guardada: {ruta_foto}")
+    # Aplicar umbral más estricto para mayor precisión
+    es_coincidencia = distancia < 0.60  # Umbral estricto para ArcFace
+    
+    print(f"RESULTADO:{{es_coincidencia}}")
+    print(f"DISTANCIA:{{distancia:.4f}}")
+except Exception as e:
+    print(f"RESULTADO:False")
+    print(f"DISTANCIA:0.9999")
+    print(f"ERROR:{{str(e)[:50]}}")
+'''
+    
+    with open(script_temporal, 'w', encoding='utf-8') as f:
+        f.write(script_content)
     
-    return str(ruta_foto)
+    # Ejecutar comparación
+    resultado = subprocess.run(
+        [str(PYTHON_DEEPFACE), str(script_temporal)],
+        capture_output=True,
+        text=True,
+        timeout=30,
+        cwd=str(BASE_DIR)
+    )
+    
+    # Parsear resultado
+    if "RESULTADO:True" in resultado.stdout:
+        es_coincidencia = True
+        # Extraer distancia
+        for linea in resultado.stdout.split('\n'):
+            if "DISTANCIA:" in linea:
+                try:
+                    distancia = float(linea.split("DISTANCIA:")[1].strip())
+                except:
+                    pass
+    elif "RESULTADO:False" in resultado.stdout:
+        es_coincidencia = False
+        for linea in resultado.stdout.split('\n'):
+            if "DISTANCIA:" in linea:
+                try:
+                    distancia = float(linea.split("DISTANCIA:")[1].strip())
+                except:
+                    pass
+    
+    return es_coincidencia, distancia
 
 
-def capturar_rostro_camara(nombre_archivo="rostro_captura.jpg", placa=None, ruta_foto_biometria=None):
+def capturar_rostro_camara(nombre_archivo="rostro_captura.jpg", placa=None, ruta_foto_biometria=None,
+                           cap=None, ruta_embedding=None, trabajador=None, linea=None,
+                           visor=None, timeout_segundos=TIMEOUT_VERIFICACION_FACIAL, detener=None):
     """
     Captura rostro desde cámara y compara en TIEMPO REAL con DeepFace (via subprocess).
-    Se cierra automáticamente cuando COINCIDA con la biometría.
+    Se cierra automáticamente cuando COINCIDA con la biometría o al vencer
+    `timeout_segundos`: en ese caso guarda el último frame como intento sin
+    coincidencia, para que el acceso denegado quede registrado.
     
     Args:
         nombre_archivo: nombre del archivo a guardar
-        placa: si se proporciona, crea carpeta separada para esta placa
+        placa: si se conoce, queda en el índice de artefactos
         ruta_foto_biometria: ruta de la foto biométrica de referencia
+        cap: suscripción a la cámara ya tomada o fuente de frames
+            (core/fuentes.py); si no, se suscribe aquí. Se libera al terminar
+        ruta_embedding: JSON con el embedding de la referencia; si ya
+            existe al comparar, solo se calcula el embedding del frame
+        trabajador: TrabajadorDeepFace ya arrancado (modo daemon); si no,
+            cada comparación lanza un Python nuevo del venv deepface
+        linea: LineaTiempo del evento; cada comparación queda como etapa
+            "comparacion_facial"
+        visor: dónde se muestra la vista previa (core/visualizacion.py);
+            por defecto el del proceso según VISOR
+        timeout_segundos: máximo tiempo buscando la coincidencia
+        detener: threading.Event; si se marca deja de comparar sin decidir
+            (el daemon al recibir SIGTERM)
     
     Returns:
-        tuple: (ruta_imagen, es_coincidencia) donde es_coincidencia=True si hay match
+        tuple: (ruta_imagen, es_coincidencia) donde es_coincidencia=True si hay match;
+        (ruta_ultimo_frame, False) si venció el tiempo; (None, False) si se
+        canceló, se detuvo o no hubo frames
     """
     print("\n📷 Abriendo cámara para verificación facial en tiempo real...")
     print("   🔍 Escaneando constantemente su rostro...")
     print("   ⏳ La cámara se cerrará automáticamente cuando COINCIDA")
     
-    cap = cv2.VideoCapture(0)
+    visor = visor or obtener_visor()
+    if cap is None:
+        cap = suscribir_camara("rostro")
     
     if not cap.isOpened():
         print("❌ No se pudo abrir la cámara")
@@ -340,42 +616,48 @@ def capturar_rostro_camara(nombre_archivo="rostro_captura.jpg", placa=None, ruta
         cap.release()
         return None, False
     
-    if not PYTHON_DEEPFACE.exists():
+    if trabajador is None and not PYTHON_DEEPFACE.exists():
         print(f"❌ No encontrado: {PYTHON_DEEPFACE}")
         print(f"⚠️  Debes crear venv deepface con: py -3.10 -m venv face/deepface_env")
         cap.release()
         return None, False
     
     import time
+    tiempo_inicio = time.time()
     marco_capturado = None
     coincidencia_encontrada = False
+    tiempo_agotado = False
+    ultimo_frame = None
     frame_counter = 0
     ultimos_resultados = []  # Historial de últimas 2 comparaciones
+    cada_frames_rostro = config.CADA_FRAMES_ROSTRO  # perfil del equipo (core/calibracion.py)
     temp_frame_path = TEMP_DIR / "temp_frame_compare.jpg"
+    textos_resultado = []  # resultado de la última comparación, queda en pantalla
     
     print("\n   📊 Iniciando análisis facial en tiempo real...")
     print("   " + "="*50)
     
     while not coincidencia_encontrada:
+        if detener is not None and detener.is_set():
+            print("⏹️  Verificación interrumpida: el proceso se está deteniendo")
+            break
+        if time.time() - tiempo_inicio > timeout_segundos:
+            print(f"\n   ⏱️  Sin coincidencia en {timeout_segundos:.0f}s: se registra como denegado")
+            tiempo_agotado = True
+            break
+        
         ret, frame = cap.read()
         
         if not ret:
             print("❌ Error al leer el frame")
             break
         
-        frame_display = frame.copy()
         frame_counter += 1
+        ultimo_frame = frame
         
-        # Mostrar información en pantalla
-        h, w = frame_display.shape[:2]
-        cv2.rectangle(frame_display, (20, 20), (w-20, h-20), (0, 255, 0), 3)
-        cv2.putText(frame_display, "ESCANEANDO ROSTRO...", (10, 40),
-                   cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
-        cv2.putText(frame_display, f"Frame: {frame_counter}", (10, 80),
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
         
-        # Comparar cada 40 frames (OPTIMIZADO para reducir lag)
-        if frame_counter % 40 == 0:
+        # Comparar cada CADA_FRAMES_ROSTRO frames (OPTIMIZADO para reducir lag)
+        if frame_counter % cada_frames_rostro == 0:
             # Inicializar variables ANTES del try para evitar errores
             es_coincidencia = False
             distancia = 0.9999
@@ -383,69 +665,24 @@ def capturar_rostro_camara(nombre_archivo="rostro_captura.jpg", placa=None, ruta
             try:
                 print(f"   🔄 Comparando frame {frame_counter}...", end=" ")
                 
-                # Guardar frame temporal
-                cv2.imwrite(str(temp_frame_path), frame)
-                
-                # Comparar usando subprocess en deepface_env
-                script_temporal = TEMP_DIR / "compare_face_realtime.py"
-                
-                script_content = f'''
-import sys
-sys.path.insert(0, r"{BASE_DIR / 'face'}")
-
-try:
-    from deepface import DeepFace
-    result = DeepFace.verify(
-        img1_path=r"{ruta_foto_biometria}",
-        img2_path=r"{temp_frame_path}",
-        model_name='ArcFace',  # Modelo más preciso
-        enforce_detection=False,
-        distance_metric='cosine',
-        align=True  # Alinear rostros para mejor precisión
-    )
-    
-    # Aplicar umbral más estricto para mayor precisión
-    distancia = result['distance']
-    es_coincidencia = distancia < 0.60  # Umbral estricto para ArcFace
-    
-    print(f"RESULTADO:{{es_coincidencia}}")
-    print(f"DISTANCIA:{{distancia:.4f}}")
-except Exception as e:
-    print(f"RESULTADO:False")
-    print(f"DISTANCIA:0.9999")
-    print(f"ERROR:{{str(e)[:50]}}")
-'''
-                
-                with open(script_temporal, 'w', encoding='utf-8') as f:
-                    f.write(script_content)
-                
-                # Ejecutar comparación
-                resultado = subprocess.run(
-                    [str(PYTHON_DEEPFACE), str(script_temporal)],
-                    capture_output=True,
-                    text=True,
-                    timeout=30,
-                    cwd=str(BASE_DIR)
-                )
-                
-                # Parsear resultado
-                if "RESULTADO:True" in resultado.stdout:
-                    es_coincidencia = True
-                    # Extraer distancia
-                    for linea in resultado.stdout.split('\n'):
-                        if "DISTANCIA:" in linea:
-                            try:
-                                distancia = float(linea.split("DISTANCIA:")[1].strip())
-                            except:
-                                pass
-                elif "RESULTADO:False" in resultado.stdout:
-                    es_coincidencia = False
-                    for linea in resultado.stdout.split('\n'):
-                        if "DISTANCIA:" in linea:
-                            try:
-                                distancia = float(linea.split("DISTANCIA:")[1].strip())
-                            except:
-                                pass
+                with etapa(linea, "comparacion_facial", frame=frame_counter):
+                    if trabajador is not None:
+                        # Proceso DeepFace ya caliente: sin arrancar Python ni cargar el modelo.
+                        # El frame le llega por memoria compartida (sin JPEG ni disco)
+                        if USAR_BUS_FRAMES:
+                            frame_para_comparar = bus_frames("rostro").publicar(frame)
+                        else:
+                            cv2.imwrite(str(temp_frame_path), frame)
+                            frame_para_comparar = temp_frame_path
+                        es_coincidencia, distancia = trabajador.comparar(
+                            frame_para_comparar, ruta_foto_biometria, ruta_embedding
+                        )
+                    else:
+                        # Un Python nuevo por comparación: el frame va por archivo
+                        cv2.imwrite(str(temp_frame_path), frame)
+                        es_coincidencia, distancia = _comparar_frame_subprocess(
+                            temp_frame_path, ruta_foto_biometria, ruta_embedding
+                        )
                 
                 ultimos_resultados.append(es_coincidencia)
                 if len(ultimos_resultados) > 2:
@@ -454,16 +691,16 @@ except Exception as e:
                 # Mostrar en terminal
                 if es_coincidencia:
                     print(f"✅ COINCIDENCIA (distancia: {distancia:.4f})")
-                    cv2.putText(frame_display, "COINCIDENCIA DETECTADA", (10, 120),
-                               cv2.FONT_HERSHEY_SIMPLEX, 1.2, (0, 255, 0), 3)
-                    cv2.putText(frame_display, f"Confianza: {(1-distancia)*100:.1f}%", (10, 160),
-                               cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2)
+                    textos_resultado = [
+                        ("COINCIDENCIA DETECTADA", (10, 120), 1.2, (0, 255, 0), 3),
+                        (f"Confianza: {(1-distancia)*100:.1f}%", (10, 160), 0.8, (0, 255, 0), 2),
+                    ]
                 else:
                     print(f"❌ Sin coincidencia (distancia: {distancia:.4f})")
-                    cv2.putText(frame_display, "SIN COINCIDENCIA", (10, 120),
-                               cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
-                    cv2.putText(frame_display, f"Distancia: {distancia:.4f}", (10, 160),
-                               cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 255), 2)
+                    textos_resultado = [
+                        ("SIN COINCIDENCIA", (10, 120), 1, (0, 0, 255), 2),
+                        (f"Distancia: {distancia:.4f}", (10, 160), 0.8, (0, 0, 255), 2),
+                    ]
                 
                 # Si 2 comparaciones consecutivas coinciden, confirmar
                 if len(ultimos_resultados) >= 2 and all(ultimos_resultados[-2:]):
@@ -477,17 +714,21 @@ except Exception as e:
             except Exception as e:
                 print(f"⚠️  Error: {str(e)[:40]}")
         
-        # Mostrar frame
-        cv2.imshow("Verificación Facial - TIEMPO REAL", frame_display)
+        # Mostrar frame: el visor lo dibuja en su hilo, aquí no se espera nada
+        h, w = frame.shape[:2]
+        visor.mostrar(
+            VENTANA_ROSTRO, frame,
+            textos=[("ESCANEANDO ROSTRO...", (10, 40), 1, (0, 255, 0), 2),
+                    (f"Frame: {frame_counter}", (10, 80), 0.7, (0, 255, 0), 2)] + textos_resultado,
+            rectangulos=[((20, 20), (w-20, h-20), (0, 255, 0), 3)]
+        )
         
-        # waitKey más largo para reducir lag (10ms en lugar de 1ms)
-        key = cv2.waitKey(10) & 0xFF
-        if key == 27:  # ESC
+        if visor.tecla() == 27:  # ESC
             print("❌ Verificación cancelada por el usuario")
             break
     
     cap.release()
-    cv2.destroyAllWindows()
+    visor.cerrar(VENTANA_ROSTRO)
     
     # Limpiar archivo temporal
     if temp_frame_path.exists():
@@ -496,21 +737,22 @@ except Exception as e:
         except:
             pass
     
+    if tiempo_agotado and ultimo_frame is not None:
+        # Evidencia del intento fallido: el último frame visto
+        ruta_foto = guardar_artefacto(ultimo_frame.copy(), nombre_archivo, evento=_id_evento(linea), placa=placa)
+        print(f"✔ Último frame guardado como intento sin coincidencia: {ruta_foto}")
+        print("   " + "="*50)
+        return ruta_foto, False
+    
     if marco_capturado is None or not coincidencia_encontrada:
         print("❌ No se encontró coincidencia facial")
         return None, False
     
-    if placa:
-        carpeta = crear_carpeta_placa(placa)
-        ruta_foto = carpeta / nombre_archivo
-    else:
-        ruta_foto = TEMP_DIR / nombre_archivo
-    
-    cv2.imwrite(str(ruta_foto), marco_capturado)
+    ruta_foto = guardar_artefacto(marco_capturado, nombre_archivo, evento=_id_evento(linea), placa=placa)
     print(f"✔ Rostro guardado: {ruta_foto}")
     print("   " + "="*50)
     
-    return str(ruta_foto), True
+    return ruta_foto, True
 
 # ==========================================
 # LLAMAR RECONOCIMIENTO FACIAL CON DEEPFACE-ENV
@@ -532,8 +774,8 @@ def comparar_rostros_con_deepface(ruta_captura_rostro, ruta_foto_biometria):
     print(f"   📸 Captura actual: {ruta_captura_rostro}")
     print(f"   📸 Referencia: {ruta_foto_biometria}")
     
-    # Verificar archivos
-    if not os.path.exists(ruta_captura_rostro):
+    # Verificar archivos (la captura puede seguir escribiéndose)
+    if not os.path.exists(esperar_artefacto(ruta_captura_rostro)):
         print(f"❌ Archivo no existe: {ruta_captura_rostro}")
         return False
     
@@ -618,6 +860,21 @@ except Exception as e:
 # ==========================================
 
 def procesar_evento_parqueadero():
+    """
+    Atiende un vehículo (ver _procesar_evento) y, pase lo que pase, deja
+    las etapas medidas en el archivo de trazas (core/trazas.py).
+    """
+    linea = LineaTiempo("evento parqueadero")
+    try:
+        return _procesar_evento(linea)
+    finally:
+        if linea.atributos.get("placa"):
+            # Si el evento terminó sin decisión, el próximo disparo de la placa va completo
+            liberar_evento(linea.atributos["placa"], linea.id)
+        linea.exportar()
+
+
+def _procesar_evento(linea):
     """
     Flujo completo:
     1. Capturar foto de placa desde cámara
@@ -636,9 +893,12 @@ def procesar_evento_parqueadero():
     print("📸 PASO 1: Capturar foto de la placa")
     print("-" * 50)
     
-    ruta_imagen_placa = capturar_placa_automatica("placa_captura.jpg", timeout_segundos=30)
+    with linea.etapa("espera_captura"):
+        ruta_imagen_placa = capturar_placa_automatica("placa_captura.jpg", timeout_segundos=30,
+                                                      linea=linea)
     
-    if not ruta_imagen_placa or not os.path.exists(ruta_imagen_placa):
+    # La captura se escribe en segundo plano: esperarla antes de mirar el disco
+    if not ruta_imagen_placa or not os.path.exists(esperar_artefacto(ruta_imagen_placa)):
         print("❌ No se capturó la placa. Abortando...")
         return
     
@@ -654,26 +914,54 @@ def procesar_evento_parqueadero():
     print("\n📖 PASO 3: Leer placa (OCR)")
     print("-" * 50)
     
-    placa = leer_placa(placa_recortada)
+    with linea.etapa("ocr"):
+        placa = leer_placa(placa_recortada)
     
     if not placa:
         print("❌ No se pudo leer la placa")
         return
     
     print(f"✔ Placa detectada: {placa}\n")
+    linea.anotar(placa=placa)
+    
+    # Las capturas del evento quedan indexadas con la placa
+    asociar_placa(linea.id, placa)
+    
+    # El mismo carro frente a la barrera: no repetir consulta, rostro ni registro
+    nuevo, decision_previa = reclamar_evento(placa, linea.id)
+    if not nuevo:
+        linea.anotar(deduplicado=decision_previa or "en_curso")
+        if decision_previa is None:
+            print(f"🔁 La placa {placa} ya tiene un evento en curso: se ignora este disparo")
+            return
+        print(f"🔁 La placa {placa} ya fue atendida hace poco: se reutiliza la decisión "
+              f"({decision_previa}) sin registrar de nuevo")
+        return decision_previa == "permitido"
+    
+    # ====== PASOS 4 y 5 EN PARALELO CON LA CÁMARA DEL ROSTRO ======
+    # Apenas se lee la placa: consulta + descarga + embedding de referencia
+    # por un lado, y apertura/calentamiento de la cámara por otro.
+    print("🔍 PASO 4: Consultando conductor (mientras se prepara la cámara del rostro)")
+    print("-" * 50)
     
-    # Crear carpeta separada para esta placa
-    print(f"📁 Creando carpeta para placa: {placa}")
-    crear_carpeta_placa(placa)
+    ejecutor = ThreadPoolExecutor(max_workers=3, thread_name_prefix="prefetch")
+    futuro_referencia = ejecutor.submit(preparar_referencia, placa, linea, ejecutor)
+    # Si el rostro usa la misma cámara que la placa ya está abierta y la suscripción es inmediata
+    futuro_camara = ejecutor.submit(linea.medir("camara_rostro", suscribir_camara), "rostro")
     
-    # ====== PASO 4: CONSULTAR SUPABASE ======
-    print("🔍 PASO 4: Consultando conductor en Supabase")
-    print("-" * 50)
+    try:
+        conductor, ruta_foto_biometria = futuro_referencia.result()
+    except Exception as e:
+        print(f"❌ Error consultando conductor: {e}")
+        conductor, ruta_foto_biometria = None, None
     
-    conductor = obtener_conductor_por_placa(placa)
+    def _cerrar_camara_rostro():
+        futuro_camara.result().release()
     
     if not conductor:
         print("❌ La placa no está registrada en Supabase")
+        _cerrar_camara_rostro()
+        ejecutor.shutdown(wait=False)
         return
     
     nombre_conductor = conductor.get('nombre', 'Desconocido')
@@ -690,13 +978,14 @@ def procesar_evento_parqueadero():
     
     if not conductor.get("foto_biometria"):
         print("❌ El usuario no tiene foto biométrica registrada en Supabase.")
+        _cerrar_camara_rostro()
+        ejecutor.shutdown(wait=False)
         return
     
-    ruta_foto_biometria = descargar_foto_biometria(conductor["foto_biometria"])
-
-    
     if not ruta_foto_biometria or not os.path.exists(ruta_foto_biometria):
         print("❌ No se pudo descargar la biometría")
+        _cerrar_camara_rostro()
+        ejecutor.shutdown(wait=False)
         return
     
     print(f"✔ Biometría descargada: {ruta_foto_biometria}\n")
@@ -707,11 +996,19 @@ def procesar_evento_parqueadero():
     print(f"   Iniciando verificación para: {nombre_completo}")
     print(f"   Biometría de referencia: {ruta_foto_biometria}")
     
-    ruta_captura_rostro, es_coincidencia = capturar_rostro_camara(
-        "rostro_captura.jpg", 
-        placa=placa, 
-        ruta_foto_biometria=ruta_foto_biometria
-    )
+    with linea.etapa("verificacion_facial"):
+        ruta_captura_rostro, es_coincidencia = capturar_rostro_camara(
+            "rostro_captura.jpg", 
+            placa=placa, 
+            ruta_foto_biometria=ruta_foto_biometria,
+            cap=futuro_camara.result(),
+            ruta_embedding=ruta_embedding_referencia(ruta_foto_biometria),
+            linea=linea
+        )
+    
+    # El embedding puede seguir calculándose: queda en cache para la próxima vez
+    ejecutor.shutdown(wait=False)
+    linea.imprimir()
     
     if not ruta_captura_rostro:
         print("❌ No se capturó el rostro. Abortando...")
@@ -720,6 +1017,23 @@ def procesar_evento_parqueadero():
     # Si capturar_rostro_camara ya hizo la comparación, usar ese resultado
     es_mismo = es_coincidencia
     
+    with linea.etapa("registro"):
+        acceso_permitido = registrar_resultado(conductor, placa, ruta_captura_rostro, es_mismo)
+    resolver_evento(placa, linea.id, "permitido" if acceso_permitido else "denegado")
+    linea.anotar(acceso_permitido=acceso_permitido)
+    return acceso_permitido
+
+
+def registrar_resultado(conductor, placa, ruta_captura_rostro, es_mismo):
+    """
+    Muestra el resultado final y encola el registro de acceso, la evidencia
+    y la notificación al usuario.
+    
+    Returns:
+        bool: True si el acceso fue permitido
+    """
+    nombre_completo = f"{conductor.get('nombre', 'Desconocido')} {conductor.get('apellido', '')}".strip()
+    
     # ====== RESULTADO FINAL ======
     print("\n" + "="*70)
     
@@ -750,29 +1064,29 @@ def procesar_evento_parqueadero():
         # Calcular confianza (por defecto alta si es coincidencia)
         confianza = 0.95  # 95% de confianza
         
-        # Registrar en registro_acceso
-        registro = registrar_acceso(
+        # Registrar en registro_acceso (cola durable, no frena la barrera)
+        registro_id = encolar_registro_acceso(
             usuario_id=usuario_id,
             vehiculo_id=vehiculo_id,
             placa=placa,
             tipo_evento="entrada",
             metodo_acceso="facial",
             ubicacion="Parqueadero Principal",
-            foto_captura=ruta_captura_rostro,  # Ruta local de la foto
+            foto_captura=ruta_captura_rostro,  # Ruta local hasta que suba la evidencia
             confianza=confianza,
             estado="exitoso"
         )
         
-        if registro:
-            print(f"✅ Acceso registrado correctamente")
-            print(f"   ID: {registro.get('id')}")
-            print(f"   Fecha: {registro.get('created_at')}")
+        print(f"✅ Acceso encolado para registro (ID: {registro_id})")
+        
+        # La foto se sube a Storage en segundo plano y luego se enlaza al registro
+        encolar_evidencia(registro_id, esperar_artefacto(ruta_captura_rostro), placa)
         
         # Crear notificación para el usuario
         print("\n🔔 Creando notificación para el usuario...")
         
         fecha_hora = datetime.now().strftime("%d/%m/%Y %H:%M:%S")
-        notificacion = crear_notificacion(
+        encolar_notificacion(
             usuario_id=usuario_id,
             titulo="✅ Acceso Autorizado",
             mensaje=f"Ingreso exitoso al parqueadero. Placa: {placa}. Fecha: {fecha_hora}",
@@ -780,8 +1094,7 @@ def procesar_evento_parqueadero():
             icono="🚗"
         )
         
-        if notificacion:
-            print(f"✅ Notificación creada para {nombre_completo}")
+        print(f"✅ Notificación encolada para {nombre_completo}")
         
         print("="*70 + "\n")
         return True
@@ -803,7 +1116,7 @@ def procesar_evento_parqueadero():
         vehiculo_id = conductor.get('vehiculo_id')
         
         # Registrar intento denegado
-        registro = registrar_acceso(
+        registro_id = encolar_registro_acceso(
             usuario_id=usuario_id,
             vehiculo_id=vehiculo_id,
             placa=placa,
@@ -815,14 +1128,14 @@ def procesar_evento_parqueadero():
             estado="denegado"
         )
         
-        if registro:
-            print(f"✅ Intento registrado (ID: {registro.get('id')})")
+        print(f"✅ Intento encolado para registro (ID: {registro_id})")
+        encolar_evidencia(registro_id, esperar_artefacto(ruta_captura_rostro), placa)
         
         # Crear notificación de advertencia
         print("\n🔔 Creando notificación de advertencia...")
         
         fecha_hora = datetime.now().strftime("%d/%m/%Y %H:%M:%S")
-        notificacion = crear_notificacion(
+        encolar_notificacion(
             usuario_id=usuario_id,
             titulo="⚠️ Intento de Acceso Denegado",
             mensaje=f"Intento de ingreso con placa {placa} fue rechazado. Verificación facial fallida. Fecha: {fecha_hora}",
@@ -830,24 +1143,252 @@ def procesar_evento_parqueadero():
             icono="🚨"
         )
         
-        if notificacion:
-            print(f"✅ Notificación de advertencia creada")
+        print(f"✅ Notificación de advertencia encolada")
         
         print("="*70 + "\n")
         return False
 
+# ==========================================
+# MODO CONTINUO: VARIOS VEHÍCULOS EN PIPELINE
+# ==========================================
+
+def crear_pipeline_parqueadero(ejecutor_embeddings, recursos=None, detener=None,
+                               timeout_rostro=TIMEOUT_VERIFICACION_FACIAL):
+    """
+    Etapas del flujo para varios vehículos a la vez:
+    ocr -> referencia (consulta + biometría) -> verificacion_facial -> registro
+    
+    La captura de placas no es una etapa: la hace el hilo principal
+    (procesar_flujo_continuo) y mete cada placa al pipeline.
+    
+    `recursos` (modo daemon) puede traer ya arrancado el "trabajador"
+    (TrabajadorDeepFace) y un "ocr" remoto (placas/servidor_inferencia.py);
+    las cámaras las mantiene abiertas core/camaras.py.
+    
+    `detener` (threading.Event) corta la verificación facial en curso y
+    `timeout_rostro` la acota, así la etapa siempre termina.
+    """
+    recursos = recursos or {}
+    trabajador = recursos.get("trabajador")
+    leer = recursos.get("ocr", leer_placa)
+    def etapa_ocr(evento):
+        placa = leer(esperar_artefacto(evento.datos["ruta_placa"]))
+        if not placa:
+            print(f"❌ [{evento.id}] No se pudo leer la placa")
+            return False
+        
+        evento.datos["placa"] = placa
+        evento.linea.anotar(placa=placa)
+        asociar_placa(evento.id, placa)
+        print(f"✔ [{evento.id}] Placa detectada: {placa}")
+        
+        # Re-disparo del mismo carro: reutilizar la decisión en lugar de repetir el flujo
+        nuevo, decision_previa = reclamar_evento(placa, evento.id)
+        if not nuevo:
+            evento.linea.anotar(deduplicado=decision_previa or "en_curso")
+            if decision_previa is None:
+                print(f"🔁 [{evento.id}] {placa} ya tiene un evento en curso: se ignora este disparo")
+            else:
+                evento.datos["acceso_permitido"] = decision_previa == "permitido"
+                print(f"🔁 [{evento.id}] {placa} ya fue atendida hace poco: se reutiliza "
+                      f"la decisión ({decision_previa}) sin registrar de nuevo")
+            return False
+        evento.datos["reclamado"] = True
+        return True
+    
+    def etapa_referencia(evento):
+        conductor, ruta_foto_biometria = preparar_referencia(
+            evento.datos["placa"], evento.linea, ejecutor_embeddings, trabajador
+        )
+        if not conductor:
+            print(f"❌ [{evento.id}] La placa {evento.datos['placa']} no está registrada")
+            return False
+        if not ruta_foto_biometria or not os.path.exists(ruta_foto_biometria):
+            print(f"❌ [{evento.id}] No se pudo obtener la biometría")
+            return False
+        
+        evento.datos["conductor"] = conductor
+        evento.datos["ruta_foto_biometria"] = ruta_foto_biometria
+        return True
+    
+    def etapa_verificacion_facial(evento):
+        try:
+            ruta_captura_rostro, es_coincidencia = capturar_rostro_camara(
+                f"rostro_captura_{evento.id}.jpg",
+                placa=evento.datos["placa"],
+                ruta_foto_biometria=evento.datos["ruta_foto_biometria"],
+                ruta_embedding=ruta_embedding_referencia(evento.datos["ruta_foto_biometria"]),
+                trabajador=trabajador,
+                linea=evento.linea,
+                timeout_segundos=timeout_rostro,
+                detener=detener
+            )
+        finally:
+            # La cámara del rostro quedó libre (ver procesar_flujo_continuo)
+            evento.datos["camara_rostro_liberada"] = True
+        
+        if not ruta_captura_rostro:
+            print(f"❌ [{evento.id}] No se capturó el rostro")
+            return False
+        
+        evento.datos["ruta_captura_rostro"] = ruta_captura_rostro
+        evento.datos["es_coincidencia"] = es_coincidencia
+        return True
+    
+    def etapa_registro(evento):
+        evento.datos["acceso_permitido"] = registrar_resultado(
+            evento.datos["conductor"],
+            evento.datos["placa"],
+            evento.datos["ruta_captura_rostro"],
+            evento.datos["es_coincidencia"]
+        )
+        resolver_evento(evento.datos["placa"], evento.id,
+                        "permitido" if evento.datos["acceso_permitido"] else "denegado")
+        return True
+    
+    def al_terminar(evento):
+        evento.datos["camara_rostro_liberada"] = True
+        if evento.datos.get("reclamado"):
+            # Sin decisión (no registrada, sin rostro, error): el próximo disparo va completo
+            liberar_evento(evento.datos["placa"], evento.id)
+        print(f"🏁 [{evento.id}] {evento.datos.get('placa', '???')}: {evento.estado} "
+              f"(última etapa: {evento.ultima_etapa})")
+    
+    return Pipeline([
+        Etapa("ocr", etapa_ocr, concurrencia=1, capacidad=CAPACIDAD_COLA_PIPELINE),
+        Etapa("referencia", etapa_referencia, concurrencia=HILOS_REFERENCIA_PIPELINE,
+              capacidad=CAPACIDAD_COLA_PIPELINE),
+        # Una sola cámara de rostro: un vehículo a la vez y en el orden de llegada
+        # (varios hilos de referencia pueden terminar el carro N+1 antes que el N;
+        # si pasara primero, su biometría se compararía con el rostro del carro N).
+        # Con un solo hilo, timeout_rostro es lo que impide que un conductor que no
+        # coincide detenga a todos los que vienen detrás
+        Etapa("verificacion_facial", etapa_verificacion_facial, concurrencia=1,
+              capacidad=CAPACIDAD_COLA_PIPELINE, ordenada=True),
+        Etapa("registro", etapa_registro, concurrencia=1, capacidad=CAPACIDAD_COLA_PIPELINE),
+    ], al_terminar=al_terminar)
+
+
+def procesar_flujo_continuo(max_vehiculos=None, recursos=None, detener=None,
+                            timeout_rostro=TIMEOUT_VERIFICACION_FACIAL):
+    """
+    Atiende vehículos uno tras otro sin reiniciar el programa: el hilo
+    principal captura placas y el pipeline hace el resto en paralelo
+    (mientras el carro N está en verificación facial, la placa del
+    carro N+1 ya se está leyendo y consultando).
+    
+    Si CAMARA_PLACA y CAMARA_ROSTRO son la misma cámara, la siguiente
+    placa se captura solo cuando los vehículos anteriores ya la liberaron.
+    
+    Ctrl+C (o marcar `detener`, un threading.Event) deja de capturar,
+    corta la verificación facial en curso y espera a lo sumo
+    TIEMPO_CIERRE_PIPELINE a que terminen los que ya entraron. Cada
+    verificación facial dura a lo sumo `timeout_rostro` segundos.
+    
+    `recursos`: modelos ya cargados (ver daemon_parqueadero.py):
+    "detector" y "trabajador".
+    """
+    detener = detener or threading.Event()
+    recursos = recursos or {}
+    print("\n" + "="*50)
+    print("🚗 MODO CONTINUO - varios vehículos en pipeline")
+    print("="*50 + "\n")
+    
+    camara_compartida = gestor_camaras().comparten_dispositivo("placa", "rostro")
+    if camara_compartida:
+        print("⚠️  Placa y rostro usan la misma cámara: la captura espera a que se libere")
+    
+    ejecutor_embeddings = ThreadPoolExecutor(max_workers=2, thread_name_prefix="embedding")
+    pipeline = crear_pipeline_parqueadero(ejecutor_embeddings, recursos, detener, timeout_rostro).iniciar()
+    enviados = 0
+    # Solo los que aún pueden usar la cámara del rostro: el daemon corre meses
+    sin_liberar = []
+    
+    try:
+        while not detener.is_set() and (max_vehiculos is None or enviados < max_vehiculos):
+            if camara_compartida:
+                sin_liberar = [e for e in sin_liberar if not e.datos.get("camara_rostro_liberada")]
+                while sin_liberar and not detener.is_set():
+                    time.sleep(0.1)
+                    sin_liberar = [e for e in sin_liberar if not e.datos.get("camara_rostro_liberada")]
+            
+            # La línea de tiempo empieza con la espera de la placa y pasa al evento
+            linea = LineaTiempo("vehículo")
+            nombre = f"placa_captura_{datetime.now().strftime('%H%M%S%f')}.jpg"
+            with linea.etapa("espera_captura"):
+                ruta_imagen_placa = capturar_placa_automatica(
+                    nombre, timeout_segundos=30,
+                    modelo=recursos.get("detector"), linea=linea, detener=detener
+                )
+            if not ruta_imagen_placa:
+                continue
+            
+            evento = pipeline.enviar({"ruta_placa": ruta_imagen_placa}, linea=linea)
+            enviados += 1
+            if camara_compartida:
+                sin_liberar.append(evento)
+            print(f"🚗 [{evento.id}] Vehículo {enviados} en el pipeline")
+        
+        if detener.is_set():
+            print("\n⏹️  Captura detenida, terminando vehículos en curso...")
+    
+    except KeyboardInterrupt:
+        print("\n⏹️  Captura detenida, terminando vehículos en curso...")
+        detener.set()  # también corta la verificación facial en curso
+    
+    pipeline.cerrar(timeout=TIEMPO_CIERRE_PIPELINE)
+    ejecutor_embeddings.shutdown(wait=False)
+    pipeline.imprimir_metricas()
+    imprimir_deduplicacion()
+    imprimir_contencion()
+    return pipeline.metricas()
+
 # ==========================================
 # PUNTO DE ENTRADA
 # ==========================================
 
 if __name__ == "__main__":
+    # Antes de que torch/OpenMP lean sus variables (YOLO carga en segundo plano)
+    configurar_proceso("yolo")
     try:
-        resultado = procesar_evento_parqueadero()
+        # Mantener la réplica local al día mientras corre el flujo
+        iniciar_sincronizacion_periodica()
+        iniciar_vaciado()
+        iniciar_subida_evidencias()
+        iniciar_limpieza_artefactos()
+        
+        # Detector y OCR cargan en paralelo mientras se abre la cámara
+        # (el OCR se necesita recién después de capturar la placa)
+        arrancar_modelos()
         
-        if resultado:
-            print("\n✅ Flujo completado exitosamente - ACCESO PERMITIDO")
+        if "--continuo" in sys.argv:
+            # python main_integrated.py --continuo [--vehiculos N]
+            max_vehiculos = None
+            if "--vehiculos" in sys.argv:
+                max_vehiculos = int(sys.argv[sys.argv.index("--vehiculos") + 1])
+            procesar_flujo_continuo(max_vehiculos)
         else:
-            print("\n❌ Flujo completado - ACCESO DENEGADO")
+            resultado = procesar_evento_parqueadero()
+            
+            if resultado:
+                print("\n✅ Flujo completado exitosamente - ACCESO PERMITIDO")
+            else:
+                print("\n❌ Flujo completado - ACCESO DENEGADO")
+        
+        imprimir_hitos()
+        imprimir_arranque_modelos()
+        if "--continuo" not in sys.argv:
+            imprimir_contencion()
+        
+        # Dar tiempo a que los registros encolados lleguen a Supabase;
+        # lo que quede pendiente se envía en la próxima ejecución
+        drenar_artefactos()
+        if not drenar():
+            print(f"⚠️  Escrituras pendientes en cola: {estadisticas_cola()['profundidad']}")
+        if not drenar_evidencias():
+            estado_evidencias = estadisticas_evidencias()
+            print(f"⚠️  Evidencias por subir: "
+                  f"{estado_evidencias['pendientes'] + estado_evidencias['por_enlazar']}")
     
     except KeyboardInterrupt:
         print("\n\n⚠️  Programa interrumpido por el usuario")
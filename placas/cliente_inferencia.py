@@ -0,0 +1,148 @@
+"""
+Cliente de placas/servidor_inferencia.py para cada carril.
+
+    cliente = ClienteInferencia()                  # DIRECCION_INFERENCIA, ID_CARRIL
+    detector = DetectorRemoto(cliente)             # se usa igual que el YOLO local:
+    capturar_placa_automatica(..., modelo=detector)
+    placa = cliente.leer_placa("placa_captura.jpg")
+
+Una conexión por cliente, un pedido a la vez (thread-safe). Si el
+servidor se reinicia, el siguiente pedido reconecta solo. Con
+USAR_BUS_FRAMES cada cliente publica los frames en su propio bus de
+memoria compartida y solo envía la referencia; como espera la respuesta
+antes del siguiente pedido, el servidor nunca ve una casilla pisada.
+"""
+
+import itertools
+import socket
+import threading
+
+from core.bus_frames import BusFrames
+from core.config import DIRECCION_INFERENCIA, ID_CARRIL, USAR_BUS_FRAMES
+from placas.servidor_inferencia import (
+    enviar_mensaje,
+    imagen_a_bytes,
+    recibir_mensaje,
+    separar_direccion,
+)
+
+
+class ClienteInferencia:
+    def __init__(self, direccion: str = DIRECCION_INFERENCIA, cliente: str = ID_CARRIL,
+                 timeout: float = 10, usar_bus: bool = USAR_BUS_FRAMES):
+        self.direccion = direccion
+        self.cliente = cliente
+        self.timeout = timeout
+        self.usar_bus = usar_bus
+        self._bus = None
+        self._sock = None
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+    def _conectar(self):
+        familia, destino = separar_direccion(self.direccion)
+        sock = socket.socket(familia, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(destino)
+        if familia == socket.AF_INET:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._sock = sock
+
+    def _pedir(self, op: str, imagen=None):
+        cabecera, datos = {"op": op, "cliente": self.cliente}, b""
+
+        with self._lock:
+            if imagen is not None:
+                if self._cabe_en_bus(imagen):
+                    cabecera.update(self._bus.publicar(imagen))
+                else:
+                    forma, datos = imagen_a_bytes(imagen)
+                    cabecera.update(forma)
+
+            for intento in range(2):
+                try:
+                    if self._sock is None:
+                        self._conectar()
+                    cabecera["id"] = next(self._ids)
+                    enviar_mensaje(self._sock, cabecera, datos)
+                    respuesta, _ = recibir_mensaje(self._sock)
+                    break
+                except (ConnectionError, OSError):
+                    self.cerrar()
+                    if intento:
+                        raise
+
+        if not respuesta.get("ok"):
+            raise RuntimeError(respuesta.get("error", "error en el servidor de inferencia"))
+        return respuesta
+
+    def _cabe_en_bus(self, imagen):
+        if not self.usar_bus or imagen.dtype.name != "uint8":
+            return False
+        if self._bus is None:
+            self._bus = BusFrames.crear(f"inferencia_{self.cliente}")
+        return imagen.nbytes <= self._bus.bytes_casilla
+
+    def detectar(self, frame):
+        """Cajas del detector de placas: [{"xyxy": [x1, y1, x2, y2], "conf": 0.9, "cls": 0}]."""
+        return self._pedir("detectar", frame)["cajas"]
+
+    def leer_placa(self, imagen_o_ruta):
+        """Mismo resultado que placas.prueba_numero_letra.leer_placa, inferido en el servidor."""
+        imagen = imagen_o_ruta
+        if isinstance(imagen_o_ruta, str) or hasattr(imagen_o_ruta, "__fspath__"):
+            import cv2
+
+            imagen = cv2.imread(str(imagen_o_ruta))
+            if imagen is None:
+                print(f"⚠ No se pudo leer la imagen: {imagen_o_ruta}")
+                return None
+        return self._pedir("leer", imagen)["placa"]
+
+    def metricas(self):
+        return self._pedir("metricas")["metricas"]
+
+    def cerrar(self):
+        """Cierra la conexión (el bus se conserva: el próximo pedido reconecta y lo reutiliza)."""
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            finally:
+                self._sock = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+
+# ==========================================
+# ADAPTADOR CON LA FORMA DE LOS RESULTADOS DE YOLO
+# ==========================================
+
+class _Caja:
+    def __init__(self, caja: dict):
+        import numpy as np
+
+        self.xyxy = [np.array(caja["xyxy"])]
+        self.conf = [caja["conf"]]
+        self.cls = [caja["cls"]]
+
+
+class _Resultado:
+    def __init__(self, cajas: list):
+        self.boxes = [_Caja(c) for c in cajas]
+
+
+class DetectorRemoto:
+    """
+    Se llama como el modelo YOLO local: detector(frame, verbose=False) -> [resultado].
+    Otras opciones de YOLO (imgsz...) se ignoran: las decide el servidor.
+    """
+
+    def __init__(self, cliente: ClienteInferencia):
+        self.cliente = cliente
+
+    def __call__(self, frame, verbose=False, **opciones):
+        return [_Resultado(self.cliente.detectar(frame))]
@@ -1,10 +1,30 @@
-from ultralytics import YOLO
-import cv2, os
-import numpy as np
+import threading
 
 MODELO_PATH = "modelos/leer_numero_placas/best.pt"
+CONFIANZA_CARACTERES = 0.5
 
-model = YOLO(MODELO_PATH)
+# El modelo (y ultralytics/torch) se cargan la primera vez que se usan, no
+# al importar: así main_integrated arranca y muestra la cámara enseguida
+_model = None
+_model_lock = threading.Lock()
+
+
+def cargar_modelo():
+    """Modelo de caracteres, cargado una sola vez (thread-safe)."""
+    global _model
+    with _model_lock:
+        if _model is None:
+            from core import config
+            from core.modelos import cargar_yolo
+            _model = cargar_yolo(MODELO_PATH, "ocr_placas", imgsz=config.TAMANO_ENTRADA_CARACTERES)
+        return _model
+
+
+def __getattr__(nombre):
+    # Compatibilidad: `from placas.prueba_numero_letra import model` sigue funcionando
+    if nombre == "model":
+        return cargar_modelo()
+    raise AttributeError(nombre)
 
 # ============================================================
 # === Mapa de clases (corrección Roboflow) ===
@@ -58,8 +78,22 @@ def leer_placa(ruta_img):
     Procesa una imagen recortada de placa y devuelve el texto detectado.
     """
 
-    results = model.predict(source=ruta_img, conf=0.5, verbose=False)
-    r = results[0]
+    from core.modelos import opciones_inferencia
+    from core.recursos import medir_inferencia
+
+    modelo = cargar_modelo()
+    with medir_inferencia("yolo"):
+        results = modelo.predict(
+            source=ruta_img, conf=CONFIANZA_CARACTERES, verbose=False, **opciones_inferencia("caracteres")
+        )
+    return placa_desde_resultado(results[0])
+
+
+def placa_desde_resultado(r):
+    """
+    Arma la placa a partir del resultado YOLO de una imagen (también lo usa
+    el servidor de inferencia con los resultados de un lote).
+    """
     boxes = r.boxes
 
     if len(boxes) == 0:
@@ -0,0 +1,409 @@
+"""
+Servidor local de inferencia compartido por varios carriles.
+
+Un solo proceso carga el detector de placas y el modelo de caracteres;
+las porterías (placas/cliente_inferencia.py) le envían frames por un
+socket Unix (o TCP local en Windows) en lugar de cargar cada una su copia
+de YOLO.
+
+Lotes dinámicos: la primera imagen que llega abre una ventana de
+VENTANA_LOTE_MS; lo que llegue mientras tanto (hasta LOTE_MAXIMO_INFERENCIA)
+se infiere en una sola llamada a YOLO. Para que un carril con mucho
+tráfico no acapare el lote, las imágenes se toman por turnos entre
+carriles (una de cada uno, rotando quién va primero).
+
+Protocolo (por conexión, en orden): 8 bytes con el largo de la cabecera
+JSON y de los datos, la cabecera y los bytes crudos de la imagen. Con
+USAR_BUS_FRAMES la imagen no viaja: la cabecera trae la referencia al bus
+de memoria compartida del carril (core/bus_frames.py) en lugar de
+forma/dtype. El servidor suelta su mapeo del bus cuando se cierra la
+última conexión que lo usaba, y descarta la respuesta si la casilla se
+pisó mientras se infería.
+
+    {"id": 1, "op": "detectar", "cliente": "carril-1", "forma": [480, 640, 3], "dtype": "uint8"}
+        -> {"id": 1, "ok": true, "cajas": [{"xyxy": [...], "conf": 0.91, "cls": 0}]}
+    {"id": 2, "op": "leer", ...}      -> {"id": 2, "ok": true, "placa": "ABC123"}
+    {"id": 3, "op": "metricas"}       -> {"id": 3, "ok": true, "metricas": {...}}
+
+Uso:
+    python -m placas.servidor_inferencia
+    python -m placas.servidor_inferencia --metricas   # consulta un servidor en marcha
+"""
+
+import json
+import os
+import socket
+import socketserver
+import struct
+import sys
+import threading
+import time
+from collections import deque
+
+from core.bus_frames import frame_desde_referencia, olvidar_bus, vigente
+from core.config import (
+    DIRECCION_INFERENCIA,
+    LOTE_MAXIMO_INFERENCIA,
+    VENTANA_LOTE_MS,
+)
+from core.utils import resumen_latencias
+
+_CABECERA = struct.Struct("!II")
+
+
+# ==========================================
+# 1. PROTOCOLO
+# ==========================================
+
+def _recibir_exacto(sock, n: int):
+    partes, faltan = [], n
+    while faltan:
+        parte = sock.recv(min(faltan, 1 << 20))
+        if not parte:
+            raise ConnectionError("Conexión cerrada")
+        partes.append(parte)
+        faltan -= len(parte)
+    return b"".join(partes)
+
+
+def enviar_mensaje(sock, cabecera: dict, datos: bytes = b""):
+    cuerpo = json.dumps(cabecera).encode()
+    sock.sendall(_CABECERA.pack(len(cuerpo), len(datos)) + cuerpo + datos)
+
+
+def recibir_mensaje(sock):
+    """Retorna (cabecera, datos)."""
+    largo_cabecera, largo_datos = _CABECERA.unpack(_recibir_exacto(sock, _CABECERA.size))
+    cabecera = json.loads(_recibir_exacto(sock, largo_cabecera))
+    datos = _recibir_exacto(sock, largo_datos) if largo_datos else b""
+    return cabecera, datos
+
+
+def imagen_a_bytes(imagen):
+    import numpy as np
+
+    imagen = np.ascontiguousarray(imagen)
+    return {"forma": list(imagen.shape), "dtype": str(imagen.dtype)}, imagen.tobytes()
+
+
+def bytes_a_imagen(cabecera: dict, datos: bytes):
+    import numpy as np
+
+    return np.frombuffer(datos, dtype=cabecera["dtype"]).reshape(cabecera["forma"])
+
+
+def separar_direccion(direccion: str):
+    """"unix:/ruta" -> (AF_UNIX, "/ruta"); "tcp:host:puerto" -> (AF_INET, (host, puerto))."""
+    tipo, _, resto = direccion.partition(":")
+    if tipo == "unix":
+        return socket.AF_UNIX, resto
+    host, _, puerto = resto.rpartition(":")
+    return socket.AF_INET, (host or "127.0.0.1", int(puerto))
+
+
+# ==========================================
+# 2. LOTES DINÁMICOS CON TURNOS POR CARRIL
+# ==========================================
+
+class Solicitud:
+    __slots__ = ("id", "cliente", "imagen", "responder", "llegada", "ref")
+
+    def __init__(self, id_, cliente, imagen, responder, ref=None):
+        self.id = id_
+        self.cliente = cliente
+        self.imagen = imagen
+        self.responder = responder  # callback(dict) que escribe en la conexión del cliente
+        self.llegada = time.perf_counter()
+        self.ref = ref              # referencia al bus si la imagen es una vista sin copia
+
+
+class Loteador:
+    """Junta solicitudes de una operación en lotes y las infiere en su propio hilo."""
+
+    def __init__(self, nombre: str, inferir, metricas, ventana_ms: float = VENTANA_LOTE_MS,
+                 maximo: int = LOTE_MAXIMO_INFERENCIA):
+        self.nombre = nombre
+        self.inferir = inferir      # list[imagen] -> list[dict] (misma longitud)
+        self.metricas = metricas
+        self.ventana = ventana_ms / 1000
+        self.maximo = maximo
+        self._colas = {}            # cliente -> deque de Solicitud
+        self._turno = 0
+        self._hay_trabajo = threading.Condition()
+        threading.Thread(target=self._bucle, name=f"lotes-{nombre}", daemon=True).start()
+
+    def encolar(self, solicitud: Solicitud):
+        with self._hay_trabajo:
+            self._colas.setdefault(solicitud.cliente, deque()).append(solicitud)
+            self._hay_trabajo.notify()
+
+    def en_cola(self):
+        with self._hay_trabajo:
+            return {cliente: len(cola) for cliente, cola in self._colas.items()}
+
+    def _pendientes(self):
+        return sum(len(c) for c in self._colas.values())
+
+    def _armar_lote(self):
+        with self._hay_trabajo:
+            self._hay_trabajo.wait_for(lambda: self._pendientes() > 0)
+            # La ventana corre desde la solicitud más antigua
+            primera = min(c[0].llegada for c in self._colas.values() if c)
+            limite = primera + self.ventana
+            while self._pendientes() < self.maximo:
+                restante = limite - time.perf_counter()
+                if restante <= 0:
+                    break
+                self._hay_trabajo.wait(restante)
+
+            # Turnos: una de cada carril por vuelta, rotando quién empieza
+            clientes = [c for c, cola in self._colas.items() if cola]
+            self._turno = (self._turno + 1) % len(clientes)
+            clientes = clientes[self._turno:] + clientes[:self._turno]
+            lote = []
+            while len(lote) < self.maximo and any(self._colas[c] for c in clientes):
+                for cliente in clientes:
+                    if self._colas[cliente] and len(lote) < self.maximo:
+                        lote.append(self._colas[cliente].popleft())
+            return lote
+
+    def _bucle(self):
+        while True:
+            lote = self._armar_lote()
+            inicio = time.perf_counter()
+            try:
+                respuestas = self.inferir([s.imagen for s in lote])
+            except Exception as e:
+                respuestas = [{"ok": False, "error": str(e)[:200]}] * len(lote)
+            fin = time.perf_counter()
+            self.metricas.lote(self.nombre, len(lote), fin - inicio)
+
+            for solicitud, respuesta in zip(lote, respuestas):
+                if solicitud.ref is not None and not vigente(solicitud.ref):
+                    # La casilla se pisó mientras se infería: el resultado es de otro frame
+                    respuesta = {"ok": False, "error": "el frame fue reemplazado en el bus durante la inferencia"}
+                self.metricas.atendida(solicitud.cliente, inicio - solicitud.llegada,
+                                       fin - solicitud.llegada, respuesta.get("ok", True))
+                try:
+                    solicitud.responder({"id": solicitud.id, "ok": True, **respuesta})
+                except OSError:
+                    pass  # el carril se desconectó mientras esperaba
+
+
+class Metricas:
+    """Por carril: solicitudes, espera en cola y latencia total; por operación: tamaño de lote."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.carriles = {}
+        self.operaciones = {}
+        self.inicio = time.time()
+
+    def recibida(self, cliente):
+        with self._lock:
+            c = self.carriles.setdefault(cliente, {
+                "solicitudes": 0, "atendidas": 0, "errores": 0,
+                "espera": deque(maxlen=1000), "total": deque(maxlen=1000),
+            })
+            c["solicitudes"] += 1
+
+    def atendida(self, cliente, espera, total, ok):
+        with self._lock:
+            c = self.carriles[cliente]
+            c["atendidas"] += 1
+            c["errores"] += 0 if ok else 1
+            c["espera"].append(espera)
+            c["total"].append(total)
+
+    def lote(self, operacion, tamano, duracion):
+        with self._lock:
+            o = self.operaciones.setdefault(operacion, {
+                "lotes": 0, "imagenes": 0, "tamanos": deque(maxlen=1000), "inferencia": deque(maxlen=1000),
+            })
+            o["lotes"] += 1
+            o["imagenes"] += tamano
+            o["tamanos"].append(tamano)
+            o["inferencia"].append(duracion)
+
+    def resumen(self, en_cola: dict):
+        def _ms(valores):
+            return {k: (round(v * 1000, 2) if isinstance(v, float) else v)
+                    for k, v in resumen_latencias(list(valores)).items()}
+
+        with self._lock:
+            return {
+                "activo_s": round(time.time() - self.inicio),
+                "carriles": {
+                    cliente: {
+                        "solicitudes": c["solicitudes"],
+                        "atendidas": c["atendidas"],
+                        "errores": c["errores"],
+                        "en_cola": sum(cola.get(cliente, 0) for cola in en_cola.values()),
+                        "espera_ms": _ms(c["espera"]),
+                        "total_ms": _ms(c["total"]),
+                    }
+                    for cliente, c in self.carriles.items()
+                },
+                "operaciones": {
+                    nombre: {
+                        "lotes": o["lotes"],
+                        "imagenes": o["imagenes"],
+                        "lote_medio": round(sum(o["tamanos"]) / len(o["tamanos"]), 2) if o["tamanos"] else 0,
+                        "en_cola": sum(en_cola.get(nombre, {}).values()),
+                        "inferencia_ms": _ms(o["inferencia"]),
+                    }
+                    for nombre, o in self.operaciones.items()
+                },
+            }
+
+
+# ==========================================
+# 3. MODELOS
+# ==========================================
+
+def crear_inferencias():
+    """Carga los dos modelos (en paralelo, desde la cache) una sola vez. Retorna {operación: inferir(lote)}."""
+    from core.modelos import arrancar_modelos, imprimir_arranque_modelos, opciones_inferencia
+    from placas.prueba_numero_letra import CONFIANZA_CARACTERES, placa_desde_resultado
+
+    futuros = arrancar_modelos()
+    detector = futuros["detector_placas"].result()
+    modelo_ocr = futuros["ocr_placas"].result()
+    imprimir_arranque_modelos()
+
+    def detectar(imagenes):
+        respuestas = []
+        for r in detector.predict(imagenes, verbose=False, **opciones_inferencia("detector")):
+            respuestas.append({"cajas": [
+                {"xyxy": [float(v) for v in caja.xyxy[0]], "conf": float(caja.conf[0]), "cls": int(caja.cls[0])}
+                for caja in r.boxes
+            ]})
+        return respuestas
+
+    def leer(imagenes):
+        resultados = modelo_ocr.predict(imagenes, conf=CONFIANZA_CARACTERES, verbose=False,
+                                        **opciones_inferencia("caracteres"))
+        return [{"placa": placa_desde_resultado(r)} for r in resultados]
+
+    return {"detectar": detectar, "leer": leer}
+
+
+# ==========================================
+# 4. SERVIDOR
+# ==========================================
+
+def crear_servidor(direccion: str = DIRECCION_INFERENCIA, inferencias: dict = None,
+                   ventana_ms: float = VENTANA_LOTE_MS, maximo: int = LOTE_MAXIMO_INFERENCIA):
+    """
+    Crea (sin arrancar) el servidor. `inferencias` permite pasar funciones
+    propias en lugar de cargar YOLO (pruebas / benchmarks).
+    """
+    inferencias = inferencias or crear_inferencias()
+    metricas = Metricas()
+    loteadores = {op: Loteador(op, f, metricas, ventana_ms, maximo) for op, f in inferencias.items()}
+    # Conexiones que usan cada bus: el mapeo del lector se cierra con la última,
+    # si no el segmento del carril (ya terminado) sigue ocupando memoria
+    conexiones_bus = {}
+    lock_buses = threading.Lock()
+
+    def soltar_buses(buses):
+        for nombre in buses:
+            with lock_buses:
+                conexiones_bus[nombre] -= 1
+                ultimo = conexiones_bus[nombre] == 0
+                if ultimo:
+                    del conexiones_bus[nombre]
+            if ultimo:
+                olvidar_bus(nombre)
+
+    class ManejadorCarril(socketserver.BaseRequestHandler):
+        def handle(self):
+            buses = set()
+            try:
+                self._atender(buses)
+            finally:
+                soltar_buses(buses)
+
+        def _atender(self, buses):
+            lock_escritura = threading.Lock()
+
+            def responder(respuesta):
+                with lock_escritura:
+                    enviar_mensaje(self.request, respuesta)
+
+            while True:
+                try:
+                    cabecera, datos = recibir_mensaje(self.request)
+                except (ConnectionError, OSError):
+                    return
+
+                op = cabecera.get("op")
+                if op in loteadores:
+                    ref = None
+                    if "bus" in cabecera:
+                        if cabecera["bus"] not in buses:
+                            buses.add(cabecera["bus"])
+                            with lock_buses:
+                                conexiones_bus[cabecera["bus"]] = conexiones_bus.get(cabecera["bus"], 0) + 1
+                        # Frame en el bus de memoria compartida del carril: sin copia
+                        ref = {"bus": cabecera["bus"], "casilla": cabecera["casilla"],
+                               "secuencia": cabecera["secuencia"]}
+                        imagen = frame_desde_referencia(ref)
+                        if imagen is None:
+                            responder({"id": cabecera.get("id"), "ok": False,
+                                       "error": "el frame ya fue reemplazado en el bus"})
+                            continue
+                    else:
+                        imagen = bytes_a_imagen(cabecera, datos)
+                    cliente = cabecera.get("cliente", "anonimo")
+                    metricas.recibida(cliente)
+                    loteadores[op].encolar(Solicitud(cabecera.get("id"), cliente, imagen, responder, ref))
+                elif op == "metricas":
+                    en_cola = {nombre: l.en_cola() for nombre, l in loteadores.items()}
+                    responder({"id": cabecera.get("id"), "ok": True, "metricas": metricas.resumen(en_cola)})
+                elif op == "ping":
+                    responder({"id": cabecera.get("id"), "ok": True})
+                else:
+                    responder({"id": cabecera.get("id"), "ok": False, "error": f"operación desconocida: {op}"})
+
+    familia, destino = separar_direccion(direccion)
+    if familia == socket.AF_UNIX:
+        if os.path.exists(destino):
+            os.remove(destino)  # socket de una corrida anterior
+        clase = socketserver.ThreadingUnixStreamServer
+    else:
+        clase = socketserver.ThreadingTCPServer
+        clase.allow_reuse_address = True
+
+    servidor = clase(destino, ManejadorCarril)
+    servidor.daemon_threads = True
+    servidor.metricas = metricas
+    return servidor
+
+
+def main():
+    if "--metricas" in sys.argv:
+        from placas.cliente_inferencia import ClienteInferencia
+
+        with ClienteInferencia(cliente="consola") as cliente:
+            print(json.dumps(cliente.metricas(), indent=2, ensure_ascii=False))
+        return
+
+    from core.recursos import configurar_proceso
+
+    # Este proceso es el que corre YOLO de todos los carriles: le toca la parte "yolo" del presupuesto
+    configurar_proceso("yolo")
+    print("⏳ Cargando modelos de placas...")
+    servidor = crear_servidor()
+    print(f"✅ Servidor de inferencia en {DIRECCION_INFERENCIA} "
+          f"(lotes de hasta {LOTE_MAXIMO_INFERENCIA}, ventana {VENTANA_LOTE_MS:g} ms)")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Servidor de inferencia detenido")
+    finally:
+        servidor.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+Replay sin pantalla: pasa grabaciones de la portería por detección de
+placa, OCR y verificación facial tan rápido como se pueda, para medir
+rendimiento de forma reproducible (mismos frames, mismo resultado).
+
+Cada clip puede ser:
+    - un archivo de video o una carpeta de imágenes: se usa para la placa
+      y, donde terminó la placa, sigue para el rostro (una sola cámara)
+    - una carpeta de clip con:
+        placa.mp4 | placa/        frames de la cámara de placas (obligatorio)
+        rostro.mp4 | rostro/      frames de la cámara del rostro (opcional)
+        referencia.jpg            foto biométrica; si no está se consulta
+                                  el conductor como en la portería
+        esperado.json             {"placa": "ABC123", "decision": "permitido"} (opcional)
+
+No se registra nada en Supabase: solo se mide y se reporta la decisión.
+Las capturas van a CARPETA_ARTEFACTOS_REPLAY / RUTA_INDICE_ARTEFACTOS_REPLAY
+y no al almacén de la portería (salvo --artefactos-produccion).
+
+Uso:
+    python replay_parqueadero.py grabaciones/                # cada entrada es un clip
+    python replay_parqueadero.py clip1.mp4 clip2/ --json replay.json --trazas replay_trazas.jsonl
+"""
+
+import argparse
+import io
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import redirect_stdout
+from pathlib import Path
+
+BASE_DIR = Path(__file__).parent
+sys.path.insert(0, str(BASE_DIR))
+
+import main_integrated as flujo
+from core.artefactos import usar_almacen
+from core.config import CARPETA_ARTEFACTOS_REPLAY, RUTA_INDICE_ARTEFACTOS_REPLAY
+from core.fuentes import EXTENSIONES_IMAGEN, abrir_fuente
+from core.trazas import LineaTiempo
+from core.utils import resumen_latencias
+from core.visualizacion import VisorNinguno
+
+EXTENSIONES_VIDEO = (".mp4", ".avi", ".mkv", ".mov", ".webm")
+SIN_VISOR = VisorNinguno()  # replay siempre sin pantalla, sin importar VISOR
+
+
+# ==========================================
+# 1. CLIPS
+# ==========================================
+
+def _buscar(carpeta: Path, nombre: str):
+    """`nombre` como carpeta de imágenes o como video dentro de la carpeta del clip."""
+    if (carpeta / nombre).is_dir():
+        return carpeta / nombre
+    for ext in EXTENSIONES_VIDEO:
+        if (carpeta / f"{nombre}{ext}").exists():
+            return carpeta / f"{nombre}{ext}"
+    return None
+
+
+def describir_clip(ruta):
+    """Dict con las fuentes del clip o None si la ruta no es un clip."""
+    ruta = Path(ruta)
+    if ruta.is_file():
+        if ruta.suffix.lower() not in EXTENSIONES_VIDEO:
+            return None
+        return {"nombre": ruta.stem, "placa": ruta, "rostro": None, "referencia": None, "esperado": None}
+
+    if not ruta.is_dir():
+        return None
+
+    placa = _buscar(ruta, "placa")
+    if placa is None:
+        # Carpeta de imágenes sueltas: una sola cámara
+        if any(n.lower().endswith(EXTENSIONES_IMAGEN) for n in os.listdir(ruta)):
+            return {"nombre": ruta.name, "placa": ruta, "rostro": None, "referencia": None, "esperado": None}
+        return None
+
+    esperado = None
+    if (ruta / "esperado.json").exists():
+        with open(ruta / "esperado.json", encoding="utf-8") as f:
+            esperado = json.load(f)
+
+    referencia = next((ruta / f"referencia{ext}" for ext in EXTENSIONES_IMAGEN
+                       if (ruta / f"referencia{ext}").exists()), None)
+    return {
+        "nombre": ruta.name,
+        "placa": placa,
+        "rostro": _buscar(ruta, "rostro"),
+        "referencia": referencia,
+        "esperado": esperado,
+    }
+
+
+def encontrar_clips(rutas):
+    """Expande las rutas: un clip directo o una carpeta cuyas entradas son clips."""
+    clips = []
+    for ruta in rutas:
+        clip = describir_clip(ruta)
+        if clip is not None:
+            clips.append(clip)
+            continue
+        if Path(ruta).is_dir():
+            for hija in sorted(Path(ruta).iterdir()):
+                clip = describir_clip(hija)
+                if clip is not None:
+                    clips.append(clip)
+    return clips
+
+
+# ==========================================
+# 2. REPRODUCCIÓN
+# ==========================================
+
+def reproducir_clip(clip, recursos, ejecutor, tiempo_real=False):
+    """Pasa un clip por todo el flujo. Retorna (resultado, linea)."""
+    linea = LineaTiempo(f"replay {clip['nombre']}")
+    resultado = {"clip": clip["nombre"], "placa": None, "decision": None}
+
+    fuente_placa = abrir_fuente(clip["placa"], tiempo_real=tiempo_real)
+    fuente_rostro = fuente_placa
+    if clip["rostro"] is not None:
+        fuente_rostro = abrir_fuente(clip["rostro"], tiempo_real=tiempo_real)
+    inicio = time.perf_counter()
+
+    try:
+        with linea.etapa("espera_captura"):
+            ruta_placa = flujo.capturar_placa_automatica(
+                f"replay_{clip['nombre']}.jpg", timeout_segundos=None,
+                modelo=recursos["detector"], linea=linea, fuente=fuente_placa, visor=SIN_VISOR
+            )
+        if not ruta_placa:
+            resultado["decision"] = "sin_placa"
+            return resultado, linea
+
+        with linea.etapa("ocr"):
+            placa = flujo.leer_placa(flujo.esperar_artefacto(ruta_placa))
+        resultado["placa"] = placa
+        if not placa:
+            resultado["decision"] = "placa_ilegible"
+            return resultado, linea
+        linea.anotar(placa=placa)
+
+        if clip["referencia"] is not None:
+            ruta_foto_biometria = str(clip["referencia"])
+        else:
+            conductor, ruta_foto_biometria = flujo.preparar_referencia(
+                placa, linea, ejecutor, recursos.get("trabajador")
+            )
+            if not conductor:
+                resultado["decision"] = "no_registrada"
+                return resultado, linea
+            if not ruta_foto_biometria:
+                resultado["decision"] = "sin_biometria"
+                return resultado, linea
+
+        with linea.etapa("verificacion_facial"):
+            _, es_coincidencia = flujo.capturar_rostro_camara(
+                f"replay_rostro_{clip['nombre']}.jpg",
+                ruta_foto_biometria=ruta_foto_biometria,
+                cap=fuente_rostro,
+                ruta_embedding=flujo.ruta_embedding_referencia(ruta_foto_biometria),
+                trabajador=recursos.get("trabajador"),
+                linea=linea,
+                visor=SIN_VISOR
+            )
+        resultado["decision"] = "permitido" if es_coincidencia else "denegado"
+        return resultado, linea
+
+    finally:
+        transcurrido = time.perf_counter() - inicio
+        frames = fuente_placa.frames_leidos
+        if fuente_rostro is not fuente_placa:
+            frames += fuente_rostro.frames_leidos
+            fuente_rostro.release()
+        fuente_placa.release()
+
+        resultado["frames"] = frames
+        resultado["segundos"] = round(transcurrido, 2)
+        resultado["fps"] = round(frames / transcurrido, 1) if transcurrido else 0.0
+        resultado["etapas_ms"] = {k: round(v * 1000, 1) for k, v in linea.duraciones().items()}
+        esperado = clip["esperado"] or {}
+        if esperado:
+            resultado["correcto"] = all(resultado.get(k) == v for k, v in esperado.items())
+        linea.anotar(decision=resultado["decision"])
+
+
+def imprimir_reporte(resultados):
+    print("\n" + "=" * 90)
+    print("📼 REPLAY - resultados por clip")
+    print("=" * 90)
+    print(f"   {'clip':<24} {'frames':>7} {'fps':>8} {'seg':>7}  {'placa':<10} {'decisión':<15}")
+    for r in resultados:
+        marca = {True: " ✅", False: " ❌"}.get(r.get("correcto"), "")
+        print(f"   {r['clip']:<24} {r['frames']:>7} {r['fps']:>8.1f} {r['segundos']:>7.2f}  "
+              f"{r['placa'] or '-':<10} {r['decision']:<15}{marca}")
+
+    frames = sum(r["frames"] for r in resultados)
+    segundos = sum(r["segundos"] for r in resultados)
+    print(f"\n   Total: {len(resultados)} clips | {frames} frames en {segundos:.1f}s | "
+          f"{frames / segundos if segundos else 0:.1f} fps")
+    verificados = [r for r in resultados if "correcto" in r]
+    if verificados:
+        print(f"   Decisiones correctas: {sum(r['correcto'] for r in verificados)}/{len(verificados)}")
+
+    por_etapa = {}
+    for r in resultados:
+        for nombre, ms in r["etapas_ms"].items():
+            por_etapa.setdefault(nombre, []).append(ms)
+    if por_etapa:
+        print(f"\n   {'etapa':<22} {'n':>4} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10}")
+        for nombre, valores in sorted(por_etapa.items(), key=lambda item: -sum(item[1])):
+            e = resumen_latencias(valores)
+            print(f"   {nombre:<22} {e['n']:>4} {e['p50']:>10.1f} {e['p95']:>10.1f} {e['p99']:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay sin pantalla de grabaciones de la portería")
+    parser.add_argument("rutas", nargs="+", help="clips (video, carpeta de imágenes o carpeta de clip)")
+    parser.add_argument("--tiempo-real", action="store_true",
+                        help="respetar los FPS de los videos en lugar de ir lo más rápido posible")
+    parser.add_argument("--sin-trabajador", action="store_true",
+                        help="lanzar DeepFace por comparación en lugar del trabajador persistente")
+    parser.add_argument("--json", help="guardar los resultados por clip en este archivo")
+    parser.add_argument("--trazas", help="exportar los spans de cada clip a este archivo JSON lines")
+    parser.add_argument("--detalle", action="store_true", help="mostrar los mensajes del flujo")
+    parser.add_argument("--artefactos-produccion", action="store_true",
+                        help="guardar las capturas en el almacén de la portería en lugar del de replay")
+    args = parser.parse_args()
+
+    if not args.artefactos_produccion:
+        usar_almacen(CARPETA_ARTEFACTOS_REPLAY, RUTA_INDICE_ARTEFACTOS_REPLAY)
+
+    clips = encontrar_clips(args.rutas)
+    if not clips:
+        print("❌ No se encontraron clips en las rutas indicadas")
+        return 1
+
+    from daemon_parqueadero import cargar_detector, iniciar_trabajador
+
+    print(f"⏳ Cargando modelos para {len(clips)} clips...")
+    recursos = {"detector": cargar_detector()}
+    recursos["trabajador"] = None if args.sin_trabajador else iniciar_trabajador()
+
+    ejecutor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="embedding")
+    resultados = []
+    try:
+        for clip in clips:
+            salida = sys.stdout if args.detalle else io.StringIO()
+            with redirect_stdout(salida):
+                resultado, linea = reproducir_clip(clip, recursos, ejecutor, args.tiempo_real)
+            resultados.append(resultado)
+            print(f"   ▶ {resultado['clip']}: {resultado['decision']} "
+                  f"({resultado['frames']} frames, {resultado['fps']} fps)")
+            if args.trazas:
+                linea.exportar(ruta=args.trazas)
+    finally:
+        ejecutor.shutdown(wait=False)
+        if recursos.get("trabajador") is not None:
+            recursos["trabajador"].cerrar()
+
+    imprimir_reporte(resultados)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, ensure_ascii=False, indent=2)
+        print(f"\n💾 Resultados guardados en {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
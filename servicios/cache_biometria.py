@@ -0,0 +1,326 @@
+"""
+Cache local de fotos biométricas, direccionada por contenido.
+
+- Cada foto se guarda una sola vez como objetos/<sha256[:2]>/<sha256><ext>,
+  sin importar cuántas rutas de Supabase apunten al mismo contenido.
+- Antes de descargar se revalida con If-None-Match (ETag) o
+  If-Modified-Since (Last-Modified): si Supabase responde 304 no se baja nada.
+- Si la foto se validó hace menos de FRESCURA_CACHE_BIOMETRIA segundos
+  ni siquiera se pregunta.
+- Al superar CUOTA_CACHE_BIOMETRIA_MB se borran los objetos menos usados (LRU),
+  nunca el que se está entregando ni los entregados hace menos de
+  _PROTECCION_EN_USO segundos (alguien puede estar leyéndolos); una foto
+  sola más grande que la cuota se conserva igual.
+- Si Supabase no responde (error de red o 5xx) se sirve la copia local
+  aunque esté vencida; si responde 404/410 la foto se dio de baja y se
+  olvida la referencia.
+
+Uso:
+    python -m servicios.cache_biometria   # estado de la cache
+"""
+
+import glob
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import requests
+
+from core.config import (
+    RUTA_CACHE_BIOMETRIA,
+    CUOTA_CACHE_BIOMETRIA_MB,
+    FRESCURA_CACHE_BIOMETRIA,
+)
+from servicios.peticiones_supaBase import SUPABASE_URL, SUPABASE_KEY
+from servicios.resiliencia import peticion
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS referencias (
+    ruta_supabase TEXT PRIMARY KEY,
+    sha256 TEXT NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    validado_en REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS objetos (
+    sha256 TEXT PRIMARY KEY,
+    ruta_local TEXT NOT NULL,
+    tamano INTEGER NOT NULL,
+    ultimo_acceso REAL NOT NULL
+);
+"""
+
+_local = threading.local()
+_lock = threading.Lock()
+
+# Pocas fotos en RAM para decodificar sin tocar disco
+_MAX_EN_MEMORIA = 32
+_en_memoria = OrderedDict()  # sha256 -> bytes
+
+# Respuestas que significan que la foto ya no existe: se olvida la referencia
+_CODIGOS_BORRADA = (404, 410)
+
+# Segundos durante los que una foto recién entregada no se desaloja
+# (la comparación facial la abre después de recibir la ruta)
+_PROTECCION_EN_USO = 60
+
+
+def _conexion():
+    con = getattr(_local, "conexion", None)
+    if con is None:
+        RUTA_CACHE_BIOMETRIA.mkdir(parents=True, exist_ok=True)
+        con = sqlite3.connect(str(RUTA_CACHE_BIOMETRIA / "indice.db"), timeout=5,
+                              isolation_level=None)
+        con.row_factory = sqlite3.Row
+        con.execute("PRAGMA journal_mode=WAL")
+        con.executescript(_ESQUEMA)
+        _local.conexion = con
+    return con
+
+
+def _recordar_en_memoria(sha: str, contenido: bytes):
+    with _lock:
+        _en_memoria[sha] = contenido
+        _en_memoria.move_to_end(sha)
+        while len(_en_memoria) > _MAX_EN_MEMORIA:
+            _en_memoria.popitem(last=False)
+
+
+def _buscar(ruta_supabase: str):
+    """Fila referencia+objeto de una ruta, solo si el archivo sigue en disco."""
+    fila = _conexion().execute(
+        "SELECT r.sha256, r.etag, r.last_modified, r.validado_en, o.ruta_local "
+        "FROM referencias r JOIN objetos o ON o.sha256 = r.sha256 "
+        "WHERE r.ruta_supabase = ?",
+        (ruta_supabase,)
+    ).fetchone()
+    if fila and os.path.exists(fila["ruta_local"]):
+        return fila
+    return None
+
+
+def _tocar(sha: str):
+    _conexion().execute(
+        "UPDATE objetos SET ultimo_acceso = ? WHERE sha256 = ?", (time.time(), sha)
+    )
+
+
+def _guardar_objeto(ruta_supabase: str, contenido: bytes):
+    """Escribe el contenido (si no existía ya) y retorna (sha256, ruta_local)."""
+    sha = hashlib.sha256(contenido).hexdigest()
+    extension = os.path.splitext(ruta_supabase)[1].lower() or ".jpg"
+    carpeta = RUTA_CACHE_BIOMETRIA / "objetos" / sha[:2]
+    ruta_local = carpeta / f"{sha}{extension}"
+
+    if not ruta_local.exists():
+        carpeta.mkdir(parents=True, exist_ok=True)
+        temporal = ruta_local.with_suffix(ruta_local.suffix + ".tmp")
+        with open(temporal, "wb") as f:
+            f.write(contenido)
+        os.replace(temporal, ruta_local)
+
+    _conexion().execute(
+        "INSERT OR REPLACE INTO objetos (sha256, ruta_local, tamano, ultimo_acceso) "
+        "VALUES (?, ?, ?, ?)",
+        (sha, str(ruta_local), len(contenido), time.time())
+    )
+    _recordar_en_memoria(sha, contenido)
+    return sha, str(ruta_local)
+
+
+def _desalojar(conservar: str = None):
+    """
+    Borra objetos por LRU hasta quedar bajo la cuota, salvo `conservar`
+    (el sha256 que se está entregando) y los usados hace menos de
+    _PROTECCION_EN_USO segundos: esos pueden dejar la cache sobre la cuota.
+    """
+    con = _conexion()
+    cuota = CUOTA_CACHE_BIOMETRIA_MB * 1024 * 1024
+    total = con.execute("SELECT COALESCE(SUM(tamano), 0) FROM objetos").fetchone()[0]
+
+    if total <= cuota:
+        return 0
+
+    borrados = 0
+    for fila in con.execute(
+        "SELECT sha256, ruta_local, tamano FROM objetos WHERE sha256 != ? AND ultimo_acceso < ? "
+        "ORDER BY ultimo_acceso",
+        (conservar or "", time.time() - _PROTECCION_EN_USO)
+    ).fetchall():
+        if total <= cuota:
+            break
+        # La foto y sus derivados (p. ej. <foto>.arcface.json con el embedding)
+        for ruta in [fila["ruta_local"], *glob.glob(f"{glob.escape(fila['ruta_local'])}.*.json")]:
+            try:
+                os.remove(ruta)
+            except FileNotFoundError:
+                pass
+        con.execute("DELETE FROM objetos WHERE sha256 = ?", (fila["sha256"],))
+        con.execute("DELETE FROM referencias WHERE sha256 = ?", (fila["sha256"],))
+        with _lock:
+            _en_memoria.pop(fila["sha256"], None)
+        total -= fila["tamano"]
+        borrados += 1
+
+    return borrados
+
+
+# ==========================================
+# API PÚBLICA
+# ==========================================
+
+def preparar_revalidacion(ruta_en_supabase: str, forzar_revalidacion: bool = False):
+    """
+    Decide si hace falta preguntar a Supabase por una foto.
+
+    Returns:
+        tuple: (previa, headers). `headers` es None si la copia local está
+        fresca y se puede usar sin red; si no, trae los encabezados
+        condicionales (If-None-Match / If-Modified-Since) para el GET.
+    """
+    previa = _buscar(ruta_en_supabase)
+
+    if previa and not forzar_revalidacion and \
+            time.time() - previa["validado_en"] < FRESCURA_CACHE_BIOMETRIA:
+        _tocar(previa["sha256"])
+        return previa, None
+
+    headers = {
+        "apikey": SUPABASE_KEY,
+        "Authorization": f"Bearer {SUPABASE_KEY}"
+    }
+    if previa and previa["etag"]:
+        headers["If-None-Match"] = previa["etag"]
+    elif previa and previa["last_modified"]:
+        headers["If-Modified-Since"] = previa["last_modified"]
+
+    return previa, headers
+
+
+def url_biometria(ruta_en_supabase: str):
+    return f"{SUPABASE_URL}/storage/v1/object/biometria/{ruta_en_supabase}"
+
+
+def registrar_respuesta(ruta_en_supabase: str, previa, codigo: int, contenido: bytes,
+                        headers_respuesta):
+    """
+    Aplica la respuesta del GET condicional a la cache (sirve igual para
+    requests y para el cliente asíncrono). Retorna la ruta local o None.
+    """
+    con = _conexion()
+
+    if codigo == 304 and previa:
+        con.execute(
+            "UPDATE referencias SET validado_en = ? WHERE ruta_supabase = ?",
+            (time.time(), ruta_en_supabase)
+        )
+        _tocar(previa["sha256"])
+        return previa["ruta_local"]
+
+    if codigo in _CODIGOS_BORRADA:
+        # La foto ya no existe en Supabase (conductor dado de baja o foto
+        # reemplazada): no se sigue comparando contra la copia vieja.
+        # El objeto queda sin esta referencia y el LRU lo borra cuando toque.
+        con.execute("DELETE FROM referencias WHERE ruta_supabase = ?", (ruta_en_supabase,))
+        print(f"🗑️  Biometría eliminada en Supabase ({codigo}): {ruta_en_supabase}")
+        return None
+
+    if codigo >= 500:
+        return usar_copia_vencida(previa, f"HTTP {codigo}")
+
+    if codigo != 200:
+        print(f"❌ Error descargando biometría: {codigo}")
+        return None
+
+    sha, ruta_local = _guardar_objeto(ruta_en_supabase, contenido)
+    con.execute(
+        "INSERT OR REPLACE INTO referencias "
+        "(ruta_supabase, sha256, etag, last_modified, validado_en) VALUES (?, ?, ?, ?, ?)",
+        (ruta_en_supabase, sha, headers_respuesta.get("ETag"),
+         headers_respuesta.get("Last-Modified"), time.time())
+    )
+    _desalojar(conservar=sha)
+    return ruta_local
+
+
+def usar_copia_vencida(previa, error):
+    """Si Supabase no responde (red o 5xx), sirve la copia local aunque esté vencida."""
+    if previa:
+        print(f"⚠️  Supabase no responde, usando biometría en cache: {error}")
+        _tocar(previa["sha256"])
+        return previa["ruta_local"]
+    return None
+
+
+def obtener_foto(ruta_en_supabase: str, forzar_revalidacion: bool = False):
+    """
+    Ruta local de la foto `ruta_en_supabase` del bucket 'biometria'.
+    Descarga solo si no está en cache o si cambió en Supabase.
+    Retorna None si no hay copia local y no se pudo descargar.
+    """
+    previa, headers = preparar_revalidacion(ruta_en_supabase, forzar_revalidacion)
+    if headers is None:
+        return previa["ruta_local"]
+
+    try:
+        res = peticion("GET", url_biometria(ruta_en_supabase), "descarga_biometria", headers=headers)
+    except requests.RequestException as e:
+        if previa:
+            return usar_copia_vencida(previa, e)
+        raise
+
+    return registrar_respuesta(ruta_en_supabase, previa, res.status_code, res.content, res.headers)
+
+
+def obtener_bytes(ruta_en_supabase: str):
+    """Contenido de la foto (desde RAM si está, si no desde la cache en disco)."""
+    ruta_local = obtener_foto(ruta_en_supabase)
+    if ruta_local is None:
+        return None
+
+    sha = os.path.splitext(os.path.basename(ruta_local))[0]
+    with _lock:
+        contenido = _en_memoria.get(sha)
+        if contenido is not None:
+            _en_memoria.move_to_end(sha)
+            return contenido
+
+    with open(ruta_local, "rb") as f:
+        contenido = f.read()
+    _recordar_en_memoria(sha, contenido)
+    return contenido
+
+
+def decodificar_foto(ruta_en_supabase: str):
+    """Imagen BGR (numpy) decodificada directo desde memoria, o None."""
+    import cv2
+    import numpy as np
+
+    contenido = obtener_bytes(ruta_en_supabase)
+    if contenido is None:
+        return None
+    return cv2.imdecode(np.frombuffer(contenido, dtype=np.uint8), cv2.IMREAD_COLOR)
+
+
+def estadisticas_cache():
+    con = _conexion()
+    objetos, total = con.execute(
+        "SELECT COUNT(*), COALESCE(SUM(tamano), 0) FROM objetos"
+    ).fetchone()
+    referencias = con.execute("SELECT COUNT(*) FROM referencias").fetchone()[0]
+    return {
+        "objetos": objetos,
+        "referencias": referencias,
+        "uso_mb": round(total / (1024 * 1024), 2),
+        "cuota_mb": CUOTA_CACHE_BIOMETRIA_MB,
+        "en_memoria": len(_en_memoria),
+    }
+
+
+if __name__ == "__main__":
+    print(f"🗂️  Cache biométrica: {RUTA_CACHE_BIOMETRIA}")
+    print(f"   {estadisticas_cache()}")
@@ -0,0 +1,263 @@
+"""
+Cliente asyncio de Supabase (httpx) para solapar consultas, descargas
+y escrituras en lugar de hacerlas una tras otra.
+
+Cubre las mismas cuatro operaciones que peticiones_supaBase.py:
+    obtener_conductor_por_placa, descargar_foto_biometria,
+    registrar_acceso, crear_notificacion
+
+- Un solo pool de conexiones keep-alive compartido por todas las peticiones.
+- Un semáforo limita cuántas peticiones hay en vuelo a la vez.
+- Cancelación: cancelar la tarea (o el Future de la fachada) aborta la
+  petición en curso y libera su lugar en el semáforo.
+- Comparte con las funciones síncronas el circuit breaker, los
+  presupuestos de tiempo y las latencias de servicios/resiliencia.py.
+
+Para código síncrono existente está ClienteSupabaseSync, que corre el
+event loop en un hilo propio y expone los mismos métodos bloqueantes.
+
+Ejemplo:
+    async with ClienteSupabaseAsync() as cliente:
+        conductor, _ = await asyncio.gather(
+            cliente.obtener_conductor_por_placa("TRF088"),
+            cliente.crear_notificacion(usuario_id, "Hola", "Mensaje"),
+        )
+"""
+
+import asyncio
+import threading
+import time
+
+import httpx
+
+from core.config import CONCURRENCIA_SUPABASE, TIMEOUT_SUPABASE
+from servicios.peticiones_supaBase import (
+    SUPABASE_URL,
+    SUPABASE_KEY,
+    construir_datos_registro,
+    construir_datos_notificacion,
+)
+from servicios import cache_biometria
+from servicios.resiliencia import (
+    PRESUPUESTOS,
+    CircuitoAbierto,
+    interruptor,
+    registrar_latencia,
+)
+
+
+class ClienteSupabaseAsync:
+    """Cliente asíncrono con pool de conexiones y límite de concurrencia."""
+
+    def __init__(self, url: str = None, key: str = None,
+                 max_concurrencia: int = CONCURRENCIA_SUPABASE,
+                 timeout: float = TIMEOUT_SUPABASE):
+        self.url = url or SUPABASE_URL
+        self.key = key or SUPABASE_KEY
+        self.max_concurrencia = max_concurrencia
+        self.timeout = timeout
+        self._cliente = None
+        self._semaforo = None
+
+    async def abrir(self):
+        if self._cliente is None:
+            self._cliente = httpx.AsyncClient(
+                base_url=self.url,
+                headers={
+                    "apikey": self.key,
+                    "Authorization": f"Bearer {self.key}",
+                },
+                limits=httpx.Limits(
+                    max_connections=self.max_concurrencia,
+                    max_keepalive_connections=self.max_concurrencia,
+                ),
+                timeout=self.timeout,
+            )
+            self._semaforo = asyncio.Semaphore(self.max_concurrencia)
+        return self
+
+    async def cerrar(self):
+        if self._cliente is not None:
+            await self._cliente.aclose()
+            self._cliente = None
+
+    async def __aenter__(self):
+        return await self.abrir()
+
+    async def __aexit__(self, *exc):
+        await self.cerrar()
+
+    async def _peticion(self, metodo: str, ruta: str, operacion: str, **kwargs):
+        if not interruptor.permitir():
+            raise CircuitoAbierto(f"Circuito abierto: se omite '{operacion}'")
+
+        await self.abrir()
+        kwargs.setdefault("timeout", PRESUPUESTOS.get(operacion, self.timeout))
+        res = None
+        try:
+            async with self._semaforo:
+                inicio = time.perf_counter()
+                try:
+                    res = await self._cliente.request(metodo, ruta, **kwargs)
+                except httpx.HTTPError:
+                    interruptor.fallo()
+                    raise
+                finally:
+                    registrar_latencia(operacion, time.perf_counter() - inicio)
+        finally:
+            if res is None:
+                # Cancelada (también esperando el semáforo) u otro error: liberar la prueba
+                interruptor.abandonar()
+
+        if res.status_code >= 500:
+            interruptor.fallo()
+        else:
+            interruptor.exito()
+        return res
+
+    # ==========================================
+    # 1. CONSULTAR CONDUCTOR POR PLACA
+    # ==========================================
+
+    async def obtener_conductor_por_placa(self, placa: str):
+        """Igual que la versión síncrona: dict del conductor o None."""
+        placa_normalizada = placa.strip().upper()
+
+        try:
+            res = await self._peticion("GET", "/rest/v1/vehiculo_usuario", "consulta_placa", params={
+                "placa": f"ilike.%{placa_normalizada}%",
+                "select": "*",
+            })
+        except (httpx.HTTPError, CircuitoAbierto):
+            from servicios.replica_local import buscar_conductor_local
+
+            return await asyncio.to_thread(buscar_conductor_local, placa_normalizada)
+        if res.status_code != 200 or not res.json():
+            return None
+
+        vehiculo = res.json()[0]
+        propietario_id = vehiculo.get("vehiculo_propietario")
+        if not propietario_id:
+            return None
+
+        try:
+            res = await self._peticion("GET", "/rest/v1/perfil_usuario", "consulta_perfil", params={
+                "id": f"eq.{propietario_id}",
+                "select": "*",
+            })
+        except (httpx.HTTPError, CircuitoAbierto):
+            from servicios.replica_local import buscar_conductor_local
+
+            return await asyncio.to_thread(buscar_conductor_local, placa_normalizada)
+        if res.status_code != 200 or not res.json():
+            return None
+
+        conductor = res.json()[0].copy()
+        conductor["placa"] = vehiculo.get("placa")
+        conductor["foto_placa"] = vehiculo.get("foto_placa")
+        conductor["vehiculo_id"] = vehiculo.get("id")
+        conductor["foto_biometria"] = conductor.get("foto_rostro")
+        return conductor
+
+    # ==========================================
+    # 2. DESCARGAR FOTO BIOMÉTRICA
+    # ==========================================
+
+    async def descargar_foto_biometria(self, ruta_en_supabase: str):
+        """Ruta local de la foto (pasa por la cache con GET condicional) o None."""
+        previa, headers = await asyncio.to_thread(
+            cache_biometria.preparar_revalidacion, ruta_en_supabase
+        )
+        if headers is None:
+            return previa["ruta_local"]
+
+        try:
+            res = await self._peticion(
+                "GET", f"/storage/v1/object/biometria/{ruta_en_supabase}",
+                "descarga_biometria", headers=headers
+            )
+        except (httpx.HTTPError, CircuitoAbierto) as e:
+            if previa:
+                return cache_biometria.usar_copia_vencida(previa, e)
+            raise
+
+        return await asyncio.to_thread(
+            cache_biometria.registrar_respuesta,
+            ruta_en_supabase, previa, res.status_code, res.content, res.headers
+        )
+
+    # ==========================================
+    # 3 y 4. REGISTRO DE ACCESO Y NOTIFICACIONES
+    # ==========================================
+
+    async def _insertar(self, tabla: str, operacion: str, datos: dict):
+        res = await self._peticion(
+            "POST", f"/rest/v1/{tabla}", operacion, json=datos,
+            headers={"Prefer": "return=representation"},
+        )
+        if res.status_code in (200, 201):
+            resultado = res.json()
+            return resultado[0] if resultado else None
+        print(f"❌ Error insertando en {tabla}: {res.status_code} {res.text[:200]}")
+        return None
+
+    async def registrar_acceso(self, **kwargs):
+        """Mismos argumentos que registrar_acceso; retorna la fila creada o None."""
+        return await self._insertar("registro_acceso", "registro_acceso", construir_datos_registro(**kwargs))
+
+    async def crear_notificacion(self, **kwargs):
+        """Mismos argumentos que crear_notificacion; retorna la fila creada o None."""
+        return await self._insertar("notificaciones", "notificacion", construir_datos_notificacion(**kwargs))
+
+
+class ClienteSupabaseSync:
+    """
+    Fachada bloqueante sobre ClienteSupabaseAsync para el código existente.
+
+    Cada método espera el resultado; `enviar()` en cambio retorna un
+    concurrent.futures.Future (cancelable) para lanzar varias peticiones
+    a la vez desde código síncrono.
+    """
+
+    def __init__(self, **kwargs):
+        self._loop = asyncio.new_event_loop()
+        self._hilo = threading.Thread(
+            target=self._loop.run_forever, name="supabase-async", daemon=True
+        )
+        self._hilo.start()
+        self._async = ClienteSupabaseAsync(**kwargs)
+
+    def enviar(self, nombre: str, *args, **kwargs):
+        """Lanza la operación `nombre` sin esperarla. Retorna un Future."""
+        corrutina = getattr(self._async, nombre)(*args, **kwargs)
+        return asyncio.run_coroutine_threadsafe(corrutina, self._loop)
+
+    def obtener_conductor_por_placa(self, placa: str):
+        return self.enviar("obtener_conductor_por_placa", placa).result()
+
+    def descargar_foto_biometria(self, ruta_en_supabase: str):
+        return self.enviar("descargar_foto_biometria", ruta_en_supabase).result()
+
+    def registrar_acceso(self, **kwargs):
+        return self.enviar("registrar_acceso", **kwargs).result()
+
+    def crear_notificacion(self, **kwargs):
+        return self.enviar("crear_notificacion", **kwargs).result()
+
+    def cerrar(self):
+        asyncio.run_coroutine_threadsafe(self._async.cerrar(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._hilo.join(timeout=5)
+
+
+_cliente_sync = None
+_lock_cliente = threading.Lock()
+
+
+def obtener_cliente_sync():
+    """Instancia compartida de ClienteSupabaseSync (se crea la primera vez)."""
+    global _cliente_sync
+    with _lock_cliente:
+        if _cliente_sync is None:
+            _cliente_sync = ClienteSupabaseSync()
+        return _cliente_sync
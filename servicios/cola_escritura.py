@@ -0,0 +1,359 @@
+"""
+Cola durable (outbox) para las escrituras que no deben frenar la barrera:
+registro_acceso y notificaciones.
+
+Encolar es un INSERT en SQLite local (microsegundos); un hilo en segundo
+plano envía las filas a Supabase en el mismo orden en que se encolaron,
+agrupando filas consecutivas de la misma tabla en inserciones masivas
+(ver servicios/lotes.py), con reintentos y backoff exponencial.
+
+Idempotencia: cada fila lleva un `id` UUID generado aquí y se inserta con
+`on_conflict=id` + `resolution=ignore-duplicates`, así un reintento después
+de un timeout (en el que Supabase sí alcanzó a guardar) no duplica la fila.
+
+Uso:
+    python -m servicios.cola_escritura   # muestra el estado de la cola
+"""
+
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from collections import deque
+
+from core.config import (
+    RUTA_COLA_ESCRITURA,
+    ESPERA_MAXIMA_REINTENTO,
+    TIEMPO_DRENADO_SALIDA,
+    TAMANO_LOTE,
+    VENTANA_LOTE,
+    VENTANA_DEBOUNCE_NOTIFICACIONES,
+)
+from core.utils import resumen_latencias
+from servicios.peticiones_supaBase import (
+    construir_datos_registro,
+    construir_datos_notificacion,
+)
+from servicios.lotes import armar_lote, insertar_en_bloque, ErrorPermanente
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS pendientes (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    tabla TEXT NOT NULL,
+    clave TEXT NOT NULL UNIQUE,
+    datos TEXT NOT NULL,
+    creado REAL NOT NULL,
+    intentos INTEGER NOT NULL DEFAULT 0,
+    proximo_intento REAL NOT NULL DEFAULT 0,
+    ultimo_error TEXT
+);
+
+CREATE TABLE IF NOT EXISTS notificaciones_enviadas (
+    usuario_id TEXT,
+    tipo TEXT,
+    titulo TEXT,
+    clave TEXT NOT NULL,
+    enviado REAL NOT NULL,
+    PRIMARY KEY (usuario_id, tipo, titulo)
+);
+
+CREATE TABLE IF NOT EXISTS fallidos (
+    seq INTEGER PRIMARY KEY,
+    tabla TEXT NOT NULL,
+    clave TEXT NOT NULL,
+    datos TEXT NOT NULL,
+    creado REAL NOT NULL,
+    intentos INTEGER NOT NULL,
+    ultimo_error TEXT
+);
+"""
+
+_local = threading.local()
+_hay_trabajo = threading.Event()
+_hilo_vaciado = None
+_en_envio = set()  # seqs que el hilo de vaciado ya leyó para enviar: no se modifican
+_lock_envio = threading.Lock()
+
+# Métricas en memoria (desde que arrancó el proceso)
+_metricas = {
+    "enviados": 0,
+    "lotes": 0,
+    "notificaciones_fusionadas": 0,
+    "reintentos": 0,
+    "descartados": 0,
+}
+_latencias_envio = deque(maxlen=500)    # duración de cada POST de lote (s)
+_latencias_vaciado = deque(maxlen=500)  # desde encolar hasta confirmado (s)
+
+
+def _conexion():
+    con = getattr(_local, "conexion", None)
+    if con is None:
+        RUTA_COLA_ESCRITURA.parent.mkdir(parents=True, exist_ok=True)
+        con = sqlite3.connect(str(RUTA_COLA_ESCRITURA), timeout=5, isolation_level=None)
+        con.row_factory = sqlite3.Row
+        con.execute("PRAGMA journal_mode=WAL")
+        con.execute("PRAGMA synchronous=NORMAL")
+        con.executescript(_ESQUEMA)
+        _local.conexion = con
+    return con
+
+
+# ==========================================
+# 1. ENCOLAR
+# ==========================================
+
+def encolar(tabla: str, datos: dict):
+    """
+    Guarda una fila pendiente de insertar en `tabla`.
+    Retorna la clave de idempotencia (que también es el `id` de la fila).
+    """
+    clave = datos.get("id") or str(uuid.uuid4())
+    datos = dict(datos, id=clave)
+
+    _conexion().execute(
+        "INSERT INTO pendientes (tabla, clave, datos, creado) VALUES (?, ?, ?, ?)",
+        (tabla, clave, json.dumps(datos, ensure_ascii=False), time.time())
+    )
+    _hay_trabajo.set()
+    return clave
+
+
+def encolar_registro_acceso(**kwargs):
+    """Mismos argumentos que registrar_acceso; retorna el id del registro."""
+    return encolar("registro_acceso", construir_datos_registro(**kwargs))
+
+
+def _clave_debounce(datos: dict):
+    return datos.get("usuario_id"), datos.get("tipo"), datos.get("titulo")
+
+
+def encolar_notificacion(**kwargs):
+    """
+    Mismos argumentos que crear_notificacion; retorna el id de la notificación.
+
+    Debounce por (usuario, tipo, título) durante VENTANA_DEBOUNCE_NOTIFICACIONES:
+    si hay una igual pendiente se actualiza su mensaje; si ya se envió (o se
+    está enviando) una igual dentro de la ventana, esta no se encola.
+    """
+    datos = construir_datos_notificacion(**kwargs)
+    clave_debounce = _clave_debounce(datos)
+    con = _conexion()
+    desde = time.time() - VENTANA_DEBOUNCE_NOTIFICACIONES
+
+    with _lock_envio:
+        for fila in con.execute(
+            "SELECT seq, clave, datos FROM pendientes "
+            "WHERE tabla = 'notificaciones' AND creado >= ? ORDER BY seq DESC",
+            (desde,)
+        ):
+            if _clave_debounce(json.loads(fila["datos"])) != clave_debounce:
+                continue
+            if fila["seq"] not in _en_envio:
+                datos["id"] = fila["clave"]
+                con.execute(
+                    "UPDATE pendientes SET datos = ? WHERE seq = ?",
+                    (json.dumps(datos, ensure_ascii=False), fila["seq"])
+                )
+            _metricas["notificaciones_fusionadas"] += 1
+            return fila["clave"]
+
+        con.execute("DELETE FROM notificaciones_enviadas WHERE enviado < ?", (desde,))
+        enviada = con.execute(
+            "SELECT clave FROM notificaciones_enviadas "
+            "WHERE usuario_id IS ? AND tipo IS ? AND titulo IS ?",
+            clave_debounce
+        ).fetchone()
+        if enviada is not None:
+            _metricas["notificaciones_fusionadas"] += 1
+            return enviada["clave"]
+
+        return encolar("notificaciones", datos)
+
+
+# ==========================================
+# 2. ENVÍO EN SEGUNDO PLANO
+# ==========================================
+
+_lote_unitario_hasta = 0  # tras un lote rechazado, enviar fila por fila hasta este seq
+
+
+def _pendientes(limite: int):
+    return _conexion().execute(
+        "SELECT * FROM pendientes ORDER BY seq LIMIT ?", (limite,)
+    ).fetchall()
+
+
+def _procesar_lote():
+    """
+    Envía el siguiente lote de filas consecutivas de la misma tabla.
+    Retorna los segundos a esperar antes de volver a intentar
+    (0 = seguir, None = cola vacía).
+    """
+    filas = _pendientes(TAMANO_LOTE)
+    if not filas:
+        return None
+
+    cabeza = filas[0]
+    ahora = time.time()
+    if cabeza["proximo_intento"] > ahora:
+        return cabeza["proximo_intento"] - ahora
+
+    tamano = 1 if cabeza["seq"] <= _lote_unitario_hasta else TAMANO_LOTE
+    lote = armar_lote(filas, tamano)
+
+    # Esperar a que el lote se llene o venza la ventana de la fila más antigua
+    lote_lleno = len(lote) >= tamano or len(lote) < len(filas)
+    espera_ventana = cabeza["creado"] + VENTANA_LOTE - ahora
+    if not lote_lleno and cabeza["intentos"] == 0 and espera_ventana > 0:
+        return espera_ventana
+
+    con = _conexion()
+    seqs = [f["seq"] for f in lote]
+    marcadores = ",".join("?" * len(seqs))
+    with _lock_envio:
+        # Desde aquí el debounce ya no fusiona en estas filas: se envía lo que se lee ahora
+        _en_envio.update(seqs)
+        datos = [json.loads(f["datos"]) for f in con.execute(
+            f"SELECT datos FROM pendientes WHERE seq IN ({marcadores}) ORDER BY seq", seqs
+        )]
+    try:
+        return _enviar_lote(con, cabeza, lote, datos, seqs, marcadores)
+    finally:
+        with _lock_envio:
+            _en_envio.difference_update(seqs)
+
+
+def _enviar_lote(con, cabeza, lote, datos, seqs, marcadores):
+    global _lote_unitario_hasta
+
+    inicio = time.perf_counter()
+    try:
+        insertar_en_bloque(cabeza["tabla"], datos)
+
+    except ErrorPermanente as e:
+        if len(lote) > 1:
+            # Una fila mala no debe tumbar a las demás: reintentar una por una
+            _lote_unitario_hasta = lote[-1]["seq"]
+            return 0
+
+        # No bloquear la cola para siempre: mover a fallidos
+        con.execute(
+            "INSERT OR REPLACE INTO fallidos "
+            "(seq, tabla, clave, datos, creado, intentos, ultimo_error) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (cabeza["seq"], cabeza["tabla"], cabeza["clave"], json.dumps(datos[0], ensure_ascii=False),
+             cabeza["creado"], cabeza["intentos"] + 1, str(e))
+        )
+        con.execute("DELETE FROM pendientes WHERE seq = ?", (cabeza["seq"],))
+        _metricas["descartados"] += 1
+        print(f"❌ Escritura descartada en {cabeza['tabla']} ({cabeza['clave']}): {e}")
+        return 0
+
+    except Exception as e:
+        intentos = cabeza["intentos"] + 1
+        espera = min(ESPERA_MAXIMA_REINTENTO, 2 ** min(intentos, 10) * 0.5)
+        con.execute(
+            f"UPDATE pendientes SET intentos = intentos + 1, proximo_intento = ?, "
+            f"ultimo_error = ? WHERE seq IN ({marcadores})",
+            (time.time() + espera, str(e)[:200], *seqs)
+        )
+        _metricas["reintentos"] += 1
+        return espera
+
+    _latencias_envio.append(time.perf_counter() - inicio)
+    fin = time.time()
+    _latencias_vaciado.extend(fin - f["creado"] for f in lote)
+    if cabeza["tabla"] == "notificaciones":
+        con.executemany(
+            "INSERT OR REPLACE INTO notificaciones_enviadas "
+            "(usuario_id, tipo, titulo, clave, enviado) VALUES (?, ?, ?, ?, ?)",
+            [(*_clave_debounce(d), d["id"], fin) for d in datos]
+        )
+    con.execute(f"DELETE FROM pendientes WHERE seq IN ({marcadores})", seqs)
+    _metricas["enviados"] += len(lote)
+    _metricas["lotes"] += 1
+    return 0
+
+
+def _ciclo_vaciado():
+    while True:
+        try:
+            espera = _procesar_lote()
+        except Exception as e:
+            print(f"⚠️  Error en la cola de escritura: {e}")
+            espera = 1.0
+
+        if espera is None:
+            _hay_trabajo.wait()
+            _hay_trabajo.clear()
+        elif espera > 0:
+            _hay_trabajo.wait(espera)
+            _hay_trabajo.clear()
+
+
+def iniciar_vaciado():
+    """Arranca (una sola vez) el hilo que envía la cola a Supabase."""
+    global _hilo_vaciado
+    if _hilo_vaciado is None or not _hilo_vaciado.is_alive():
+        _hilo_vaciado = threading.Thread(target=_ciclo_vaciado, name="cola-escritura", daemon=True)
+        _hilo_vaciado.start()
+    _hay_trabajo.set()
+    return _hilo_vaciado
+
+
+def drenar(timeout: float = TIEMPO_DRENADO_SALIDA):
+    """
+    Espera hasta `timeout` segundos a que la cola quede vacía.
+    Retorna True si se vació; lo pendiente se envía en la próxima ejecución.
+    """
+    iniciar_vaciado()
+    limite = time.time() + timeout
+    while time.time() < limite:
+        if profundidad() == 0:
+            return True
+        time.sleep(0.05)
+    return profundidad() == 0
+
+
+# ==========================================
+# 3. MÉTRICAS
+# ==========================================
+
+def estado_escritura(clave: str):
+    """"pendiente" si la fila sigue en la cola, "fallida" si se descartó, None si no está (enviada o ajena)."""
+    con = _conexion()
+    if con.execute("SELECT 1 FROM pendientes WHERE clave = ?", (clave,)).fetchone():
+        return "pendiente"
+    if con.execute("SELECT 1 FROM fallidos WHERE clave = ?", (clave,)).fetchone():
+        return "fallida"
+    return None
+
+
+def profundidad():
+    return _conexion().execute("SELECT COUNT(*) FROM pendientes").fetchone()[0]
+
+
+def estadisticas_cola():
+    """Profundidad, antigüedad, contadores y latencias (ms) de la cola."""
+    con = _conexion()
+    mas_antigua = con.execute("SELECT MIN(creado) FROM pendientes").fetchone()[0]
+
+    def _ms(resumen):
+        return {k: (round(v * 1000, 1) if isinstance(v, float) else v)
+                for k, v in resumen.items()}
+
+    return {
+        "profundidad": profundidad(),
+        "antiguedad_s": round(time.time() - mas_antigua, 1) if mas_antigua else 0.0,
+        "fallidos": con.execute("SELECT COUNT(*) FROM fallidos").fetchone()[0],
+        **_metricas,
+        "latencia_envio_ms": _ms(resumen_latencias(list(_latencias_envio))),
+        "latencia_vaciado_ms": _ms(resumen_latencias(list(_latencias_vaciado))),
+    }
+
+
+if __name__ == "__main__":
+    print(f"📬 Cola de escritura: {RUTA_COLA_ESCRITURA}")
+    print(f"   {estadisticas_cola()}")
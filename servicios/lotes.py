@@ -0,0 +1,86 @@
+"""
+Inserciones masivas (bulk insert) en PostgREST.
+
+Un solo POST con un arreglo JSON inserta muchas filas de la misma tabla;
+en hora pico reemplaza cientos de peticiones pequeñas por unas pocas.
+"""
+
+import requests
+
+from servicios.peticiones_supaBase import SUPABASE_URL, SUPABASE_KEY
+from servicios.resiliencia import peticion
+
+
+class ErrorPermanente(Exception):
+    """Supabase rechazó los datos (400, 409, 422): reintentar igual no sirve."""
+
+
+class ErrorAcceso(requests.HTTPError):
+    """401/403/404: clave vencida o rotada, o tabla/URL mal configurada. Los datos están bien: se reintenta."""
+
+
+# Errores de los datos: la misma fila va a fallar siempre
+ESTADOS_PERMANENTES = (400, 409, 422)
+# Errores de configuración: se arreglan sin tocar los datos (nueva clave, URL corregida)
+ESTADOS_ACCESO = (401, 403, 404)
+
+
+def verificar_respuesta(res, operacion: str):
+    """
+    Nada si la respuesta es 2xx. ErrorPermanente si Supabase rechazó los
+    datos; cualquier otro código lanza una excepción reintentable.
+    """
+    if 200 <= res.status_code < 300:
+        return
+    # 409 no es "ya estaba": los duplicados por id los absorbe ignore-duplicates,
+    # así que un 409 es otra restricción (p. ej. una llave foránea, 23503) y la fila no entró
+    if res.status_code in ESTADOS_PERMANENTES:
+        raise ErrorPermanente(f"{operacion} {res.status_code}: {res.text[:200]}")
+    if res.status_code in ESTADOS_ACCESO:
+        print(f"🚨 Supabase respondió {res.status_code} en {operacion}: revisar SUPABASE_URL y "
+              f"SUPABASE_SERVICE_ROLE. Los datos quedan pendientes y se reintentan")
+        raise ErrorAcceso(f"{operacion} {res.status_code}: {res.text[:200]}")
+    raise requests.HTTPError(f"{operacion}: respuesta {res.status_code}")
+
+
+def armar_lote(filas: list, tamano_maximo: int):
+    """
+    Toma filas consecutivas de la misma tabla desde el inicio de `filas`
+    (ya ordenadas por llegada) sin pasar de `tamano_maximo`.
+    Conservar el orden entre tablas es lo que garantiza el outbox.
+    """
+    if not filas:
+        return []
+
+    tabla = filas[0]["tabla"]
+    lote = []
+    for fila in filas:
+        if fila["tabla"] != tabla or len(lote) >= tamano_maximo:
+            break
+        lote.append(fila)
+    return lote
+
+
+def insertar_en_bloque(tabla: str, filas: list, timeout: float = None):
+    """
+    Inserta `filas` (lista de dicts) en un solo POST.
+
+    PostgREST exige las mismas columnas en todo el arreglo; con el
+    parámetro `columns` las que falten en una fila toman su valor default.
+    Las filas traen `id` propio, así que repetir el lote no duplica nada.
+    """
+    columnas = sorted({clave for fila in filas for clave in fila})
+
+    res = peticion(
+        "POST", f"{SUPABASE_URL}/rest/v1/{tabla}", "insercion_bloque",
+        params={"on_conflict": "id", "columns": ",".join(columnas)},
+        json=filas,
+        headers={
+            "apikey": SUPABASE_KEY,
+            "Authorization": f"Bearer {SUPABASE_KEY}",
+            "Content-Type": "application/json",
+            "Prefer": "resolution=ignore-duplicates,return=minimal",
+        },
+        timeout=timeout,
+    )
+    verificar_respuesta(res, f"inserción en {tabla}")
@@ -1,8 +1,8 @@
 import os
 import requests
-from dotenv import load_dotenv
 
-load_dotenv()
+import core.config  # carga .env (una vez, sin buscarlo por carpetas)
+from servicios.resiliencia import peticion
 
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_SERVICE_ROLE")
@@ -10,6 +10,19 @@ SUPABASE_KEY = os.getenv("SUPABASE_SERVICE_ROLE")
 # ==========================================
 # 1. CONSULTAR CONDUCTOR POR PLACA
 # ==========================================
+def _conductor_desde_replica(placa_normalizada: str, error: Exception):
+    """
+    Supabase no respondió (circuito abierto, timeout, sin red...):
+    responder desde la réplica local en vez de negar la entrada.
+    """
+    from servicios.replica_local import buscar_conductor_local
+
+    conductor = buscar_conductor_local(placa_normalizada)
+    print(f"🔌 Supabase no disponible ({type(error).__name__}), "
+          f"réplica local: {'encontrado' if conductor else 'sin datos'}")
+    return conductor
+
+
 def obtener_conductor_por_placa(placa: str):
     """
     Busca la placa en vehiculo_usuario, obtiene el vehiculo_propietario (user_id),
@@ -24,15 +37,18 @@ def obtener_conductor_por_placa(placa: str):
     # PASO 1: Buscar la placa en vehiculo_usuario
     url_vehiculo = f"{SUPABASE_URL}/rest/v1/vehiculo_usuario"
 
-    res_vehiculo = requests.get(url_vehiculo, params={
-    "placa": f"ilike.%{placa_normalizada}%",
-    "select": "*"
-    }, headers={
-        "apikey": SUPABASE_KEY,
-        "Authorization": f"Bearer {SUPABASE_KEY}",
-        "Content-Type": "application/json",
-        "Prefer": "return=representation"
-    })
+    try:
+        res_vehiculo = peticion("GET", url_vehiculo, "consulta_placa", params={
+        "placa": f"ilike.%{placa_normalizada}%",
+        "select": "*"
+        }, headers={
+            "apikey": SUPABASE_KEY,
+            "Authorization": f"Bearer {SUPABASE_KEY}",
+            "Content-Type": "application/json",
+            "Prefer": "return=representation"
+        })
+    except requests.RequestException as e:  # CircuitoAbierto también lo es
+        return _conductor_desde_replica(placa_normalizada, e)
 
     if not res_vehiculo.ok:
         print("❌ Error buscando placa en vehiculo_usuario:", res_vehiculo.text)
@@ -45,15 +61,18 @@ def obtener_conductor_por_placa(placa: str):
         print(f"   💡 Intentando búsqueda flexible...")
         
         # Intento 2: búsqueda LIKE (sin case-sensitive)
-        res_vehiculo = requests.get(url_vehiculo, params={
-            "placa": f"ilike.%{placa_normalizada}%",
-            "select": "*"
-        }, headers={
-            "apikey": SUPABASE_KEY,
-            "Authorization": f"Bearer {SUPABASE_KEY}",
-            "Content-Type": "application/json",
-            "Prefer": "return=representation"
-        })
+        try:
+            res_vehiculo = peticion("GET", url_vehiculo, "consulta_placa", params={
+                "placa": f"ilike.%{placa_normalizada}%",
+                "select": "*"
+            }, headers={
+                "apikey": SUPABASE_KEY,
+                "Authorization": f"Bearer {SUPABASE_KEY}",
+                "Content-Type": "application/json",
+                "Prefer": "return=representation"
+            })
+        except requests.RequestException as e:
+            return _conductor_desde_replica(placa_normalizada, e)
         
         if res_vehiculo.ok:
             datos_vehiculo = res_vehiculo.json()
@@ -78,15 +97,19 @@ def obtener_conductor_por_placa(placa: str):
     # PASO 3: Buscar los datos del propietario en perfil_usuario
     url_perfil = f"{SUPABASE_URL}/rest/v1/perfil_usuario"
 
-    res_perfil = requests.get(url_perfil, params={
-        "id": f"eq.{propietario_id}",
-        "select": "*"
-    }, headers={
-        "apikey": SUPABASE_KEY,
-        "Authorization": f"Bearer {SUPABASE_KEY}",
-        "Content-Type": "application/json",
-        "Prefer": "return=representation"
-    })
+    try:
+        res_perfil = peticion("GET", url_perfil, "consulta_perfil", params={
+            "id": f"eq.{propietario_id}",
+            "select": "*"
+        }, headers={
+            "apikey": SUPABASE_KEY,
+            "Authorization": f"Bearer {SUPABASE_KEY}",
+            "Content-Type": "application/json",
+            "Prefer": "return=representation"
+        })
+    except requests.RequestException as e:
+        # Supabase cayó entre la consulta de la placa y la del perfil
+        return _conductor_desde_replica(placa_normalizada, e)
 
     if not res_perfil.ok:
         print("❌ Error buscando perfil del usuario:", res_perfil.text)
@@ -121,36 +144,56 @@ def descargar_foto_biometria(ruta_en_supabase: str):
     Descarga una foto desde el bucket 'biometria'
     ruta_en_supabase llega como:
     95c2c4f1-85a5-4650-b9a7-c2cdd41f78e5/front_1764989392442.jpg
-    """
-
-    url = f"{SUPABASE_URL}/storage/v1/object/biometria/{ruta_en_supabase}"
-
-    headers = {
-        "apikey": SUPABASE_KEY,
-        "Authorization": f"Bearer {SUPABASE_KEY}"
-    }
 
-    res = requests.get(url, headers=headers)
-
-    if res.status_code != 200:
-        print("❌ Error descargando biometría:", res.text)
-        return None
-
-    destino_dir = "face/imagenes_descargadas"
-    os.makedirs(destino_dir, exist_ok=True)
-
-    nombre_archivo = os.path.basename(ruta_en_supabase)
-    ruta_local = f"{destino_dir}/{nombre_archivo}"
-
-    with open(ruta_local, "wb") as f:
-        f.write(res.content)
+    Pasa por la cache local direccionada por contenido
+    (servicios/cache_biometria.py): solo baja la foto si no está
+    o si cambió en Supabase. Retorna la ruta local o None.
+    """
+    # Import local: cache_biometria importa este módulo
+    from servicios.cache_biometria import obtener_foto
 
-    return ruta_local
+    return obtener_foto(ruta_en_supabase)
 
 
 # ==========================================
 # 3. REGISTRAR ACCESO EN BASE DE DATOS
 # ==========================================
+def construir_datos_registro(
+    usuario_id: str,
+    vehiculo_id: str,
+    placa: str,
+    tipo_evento: str = "entrada",
+    metodo_acceso: str = "facial",
+    ubicacion: str = "Parqueadero Principal",
+    foto_captura: str = None,
+    confianza: float = None,
+    estado: str = "exitoso"
+):
+    """
+    Arma la fila de registro_acceso (mismos argumentos que registrar_acceso).
+    Se usa tanto para el POST directo como para la cola de escritura.
+    """
+    datos = {
+        "usuario_id": usuario_id,
+        "vehiculo_id": vehiculo_id,
+        "placa": placa.upper(),
+        "tipo_evento": tipo_evento,
+        "metodo_acceso": metodo_acceso,
+        "ubicacion": ubicacion,
+        "estado": estado
+    }
+    
+    # Agregar campos opcionales
+    if foto_captura:
+        datos["foto_captura"] = foto_captura
+    
+    if confianza is not None:
+        # Asegurar que esté entre 0 y 1
+        datos["confianza"] = max(0.0, min(1.0, float(confianza)))
+    
+    return datos
+
+
 def registrar_acceso(
     usuario_id: str,
     vehiculo_id: str,
@@ -182,24 +225,10 @@ def registrar_acceso(
     
     url = f"{SUPABASE_URL}/rest/v1/registro_acceso"
     
-    # Preparar datos
-    datos = {
-        "usuario_id": usuario_id,
-        "vehiculo_id": vehiculo_id,
-        "placa": placa.upper(),
-        "tipo_evento": tipo_evento,
-        "metodo_acceso": metodo_acceso,
-        "ubicacion": ubicacion,
-        "estado": estado
-    }
-    
-    # Agregar campos opcionales
-    if foto_captura:
-        datos["foto_captura"] = foto_captura
-    
-    if confianza is not None:
-        # Asegurar que esté entre 0 y 1
-        datos["confianza"] = max(0.0, min(1.0, float(confianza)))
+    datos = construir_datos_registro(
+        usuario_id, vehiculo_id, placa, tipo_evento, metodo_acceso,
+        ubicacion, foto_captura, confianza, estado
+    )
     
     headers = {
         "apikey": SUPABASE_KEY,
@@ -209,7 +238,7 @@ def registrar_acceso(
     }
     
     try:
-        res = requests.post(url, json=datos, headers=headers)
+        res = peticion("POST", url, "registro_acceso", json=datos, headers=headers)
         
         if res.status_code in [200, 201]:
             resultado = res.json()
@@ -228,6 +257,34 @@ def registrar_acceso(
 # ==========================================
 # 4. CREAR NOTIFICACIÓN
 # ==========================================
+def construir_datos_notificacion(
+    usuario_id: str,
+    titulo: str,
+    mensaje: str,
+    tipo: str = "info",
+    icono: str = None,
+    url: str = None
+):
+    """
+    Arma la fila de notificaciones (mismos argumentos que crear_notificacion).
+    """
+    datos = {
+        "usuario_id": usuario_id,
+        "titulo": titulo,
+        "mensaje": mensaje,
+        "tipo": tipo,
+        "leida": False
+    }
+    
+    if icono:
+        datos["icono"] = icono
+    
+    if url:
+        datos["url"] = url
+    
+    return datos
+
+
 def crear_notificacion(
     usuario_id: str,
     titulo: str,
@@ -253,19 +310,7 @@ def crear_notificacion(
     
     url_endpoint = f"{SUPABASE_URL}/rest/v1/notificaciones"
     
-    datos = {
-        "usuario_id": usuario_id,
-        "titulo": titulo,
-        "mensaje": mensaje,
-        "tipo": tipo,
-        "leida": False
-    }
-    
-    if icono:
-        datos["icono"] = icono
-    
-    if url:
-        datos["url"] = url
+    datos = construir_datos_notificacion(usuario_id, titulo, mensaje, tipo, icono, url)
     
     headers = {
         "apikey": SUPABASE_KEY,
@@ -275,7 +320,7 @@ def crear_notificacion(
     }
     
     try:
-        res = requests.post(url_endpoint, json=datos, headers=headers)
+        res = peticion("POST", url_endpoint, "notificacion", json=datos, headers=headers)
         
         if res.status_code in [200, 201]:
             resultado = res.json()
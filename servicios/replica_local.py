@@ -0,0 +1,517 @@
+"""
+Réplica local (SQLite en modo WAL) de las tablas vehiculo_usuario y
+perfil_usuario de Supabase, más las referencias biométricas ya descargadas.
+
+La portería consulta primero la réplica (sub-milisegundo, funciona sin red)
+y solo va a Supabase cuando la placa no está replicada todavía.
+
+La sincronización es incremental: por cada tabla se guarda una marca
+(updated_at, id) de la última fila recibida y se piden solo las filas
+posteriores, en páginas ordenadas (paginación por clave, no por offset).
+Como así no se ven los DELETE, cada INTERVALO_RECONCILIACION segundos se
+baja la lista de ids de cada tabla y se borra lo que ya no está en Supabase.
+Un conductor consultado directo a Supabase (placa aún no replicada) se
+guarda enseguida y queda anotado para pedirlo por id en la siguiente
+sincronización.
+
+Uso:
+    python -m servicios.replica_local            # sincroniza una vez
+    python -m servicios.replica_local --biometria  # y descarga biometrías
+"""
+
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+import requests
+
+from core.config import (
+    RUTA_REPLICA,
+    INTERVALO_SINCRONIZACION,
+    TAMANO_PAGINA_SINCRONIZACION,
+    INTERVALO_RECONCILIACION,
+)
+from servicios.peticiones_supaBase import (
+    SUPABASE_URL,
+    SUPABASE_KEY,
+    obtener_conductor_por_placa,
+    descargar_foto_biometria,
+)
+from servicios.resiliencia import peticion
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS vehiculo_usuario (
+    id TEXT PRIMARY KEY,
+    placa_normalizada TEXT NOT NULL,
+    vehiculo_propietario TEXT,
+    updated_at TEXT,
+    datos TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_vehiculo_placa ON vehiculo_usuario(placa_normalizada);
+
+CREATE TABLE IF NOT EXISTS perfil_usuario (
+    id TEXT PRIMARY KEY,
+    updated_at TEXT,
+    datos TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS biometria_local (
+    ruta_supabase TEXT PRIMARY KEY,
+    ruta_local TEXT NOT NULL,
+    descargada_en REAL NOT NULL
+);
+
+-- Filas guardadas fuera de la sincronización (consulta directa a Supabase):
+-- la marca incremental puede haberlas pasado ya, así que se piden por id
+CREATE TABLE IF NOT EXISTS por_refrescar (
+    tabla TEXT NOT NULL,
+    id TEXT NOT NULL,
+    PRIMARY KEY (tabla, id)
+);
+
+CREATE TABLE IF NOT EXISTS marcas_sincronizacion (
+    tabla TEXT PRIMARY KEY,
+    ultima_marca TEXT,
+    ultimo_id TEXT,
+    sincronizado_en REAL
+);
+"""
+
+# Una conexión por hilo: en WAL los lectores no bloquean al escritor
+_local = threading.local()
+_lock_escritura = threading.Lock()
+
+
+def _conexion():
+    """Devuelve la conexión SQLite del hilo actual (la crea si no existe)."""
+    con = getattr(_local, "conexion", None)
+    if con is None:
+        RUTA_REPLICA.parent.mkdir(parents=True, exist_ok=True)
+        con = sqlite3.connect(str(RUTA_REPLICA), timeout=5)
+        con.row_factory = sqlite3.Row
+        con.execute("PRAGMA journal_mode=WAL")
+        con.execute("PRAGMA synchronous=NORMAL")
+        con.executescript(_ESQUEMA)
+        _local.conexion = con
+    return con
+
+
+def _headers():
+    return {
+        "apikey": SUPABASE_KEY,
+        "Authorization": f"Bearer {SUPABASE_KEY}",
+        "Content-Type": "application/json",
+    }
+
+
+def _normalizar_placa(placa: str):
+    return placa.strip().upper()
+
+
+# ==========================================
+# 1. SINCRONIZACIÓN INCREMENTAL
+# ==========================================
+
+def _leer_marca(tabla: str):
+    fila = _conexion().execute(
+        "SELECT ultima_marca, ultimo_id FROM marcas_sincronizacion WHERE tabla = ?",
+        (tabla,)
+    ).fetchone()
+    if fila is None:
+        return None, None
+    return fila["ultima_marca"], fila["ultimo_id"]
+
+
+def _descargar_pagina(tabla: str, marca, ultimo_id, tamano: int):
+    """
+    Pide a PostgREST las filas posteriores a (marca, ultimo_id),
+    ordenadas por updated_at e id.
+    """
+    params = {
+        "select": "*",
+        "order": "updated_at.asc.nullsfirst,id.asc",
+        "limit": str(tamano),
+    }
+    if marca is not None:
+        params["or"] = (
+            f'(updated_at.gt."{marca}",'
+            f'and(updated_at.eq."{marca}",id.gt."{ultimo_id}"))'
+        )
+    elif ultimo_id is not None:
+        # La página terminó en una fila sin updated_at (van primero): seguir con
+        # las nulas de id mayor y luego todas las que sí tienen fecha
+        params["or"] = f'(and(updated_at.is.null,id.gt."{ultimo_id}"),updated_at.not.is.null)'
+
+    res = peticion(
+        "GET", f"{SUPABASE_URL}/rest/v1/{tabla}", "sincronizacion",
+        params=params,
+        headers=_headers(),
+    )
+    res.raise_for_status()
+    return res.json()
+
+
+def _guardar_filas(tabla: str, filas: list, mover_marca: bool = True):
+    con = _conexion()
+    with _lock_escritura, con:
+        for fila in filas:
+            datos = json.dumps(fila, ensure_ascii=False)
+            if tabla == "vehiculo_usuario":
+                con.execute(
+                    "INSERT OR REPLACE INTO vehiculo_usuario "
+                    "(id, placa_normalizada, vehiculo_propietario, updated_at, datos) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (
+                        str(fila.get("id")),
+                        _normalizar_placa(fila.get("placa") or ""),
+                        fila.get("vehiculo_propietario"),
+                        fila.get("updated_at"),
+                        datos,
+                    )
+                )
+            else:
+                con.execute(
+                    "INSERT OR REPLACE INTO perfil_usuario (id, updated_at, datos) "
+                    "VALUES (?, ?, ?)",
+                    (str(fila.get("id")), fila.get("updated_at"), datos)
+                )
+
+        if filas and mover_marca:
+            ultima = filas[-1]
+            con.execute(
+                "INSERT OR REPLACE INTO marcas_sincronizacion "
+                "(tabla, ultima_marca, ultimo_id, sincronizado_en) VALUES (?, ?, ?, ?)",
+                (tabla, ultima.get("updated_at"), str(ultima.get("id")), time.time())
+            )
+
+
+def sincronizar_tabla(tabla: str, tamano_pagina: int = TAMANO_PAGINA_SINCRONIZACION):
+    """
+    Trae de Supabase todas las filas de `tabla` modificadas desde la
+    última sincronización. Retorna el número de filas recibidas.
+    """
+    total = 0
+    marca, ultimo_id = _leer_marca(tabla)
+
+    while True:
+        filas = _descargar_pagina(tabla, marca, ultimo_id, tamano_pagina)
+        if not filas:
+            break
+
+        _guardar_filas(tabla, filas)
+        total += len(filas)
+        marca, ultimo_id = filas[-1].get("updated_at"), str(filas[-1].get("id"))
+
+        if len(filas) < tamano_pagina:
+            break
+
+    return total
+
+
+def refrescar_tabla(tabla: str, tamano_lote: int = 100):
+    """
+    Pide por id las filas de `tabla` anotadas en por_refrescar (guardadas
+    desde una consulta directa, sin updated_at) y las reemplaza por la fila
+    completa, sin mover la marca incremental. Retorna cuántas recibió.
+    """
+    con = _conexion()
+    ids = [r[0] for r in con.execute("SELECT id FROM por_refrescar WHERE tabla = ?", (tabla,))]
+    total = 0
+
+    for i in range(0, len(ids), tamano_lote):
+        lote = ids[i:i + tamano_lote]
+        res = peticion(
+            "GET", f"{SUPABASE_URL}/rest/v1/{tabla}", "sincronizacion",
+            params={"select": "*", "id": "in.(" + ",".join(f'"{id_}"' for id_ in lote) + ")"},
+            headers=_headers(),
+        )
+        res.raise_for_status()
+        filas = res.json()
+        _guardar_filas(tabla, filas, mover_marca=False)
+        # Las que no volvieron ya no existen allá: la reconciliación las borra
+        with _lock_escritura, con:
+            con.executemany("DELETE FROM por_refrescar WHERE tabla = ? AND id = ?",
+                            [(tabla, id_) for id_ in lote])
+        total += len(filas)
+
+    return total
+
+
+def sincronizar_replica():
+    """
+    Sincroniza vehiculo_usuario y perfil_usuario (incremental y, después,
+    las filas anotadas en por_refrescar).
+    Retorna dict {tabla: filas_recibidas}.
+    """
+    resumen = {}
+    for tabla in ("vehiculo_usuario", "perfil_usuario"):
+        resumen[tabla] = sincronizar_tabla(tabla) + refrescar_tabla(tabla)
+    return resumen
+
+
+def _ids_remotos(tabla: str, tamano: int):
+    """Todos los ids de `tabla` en Supabase (solo la columna id, por clave)."""
+    ids, ultimo_id = set(), None
+    while True:
+        params = {"select": "id", "order": "id.asc", "limit": str(tamano)}
+        if ultimo_id is not None:
+            params["id"] = f'gt."{ultimo_id}"'
+        res = peticion(
+            "GET", f"{SUPABASE_URL}/rest/v1/{tabla}", "sincronizacion",
+            params=params,
+            headers=_headers(),
+        )
+        res.raise_for_status()
+        filas = res.json()
+        ids.update(str(f["id"]) for f in filas)
+        if len(filas) < tamano:
+            return ids
+        ultimo_id = filas[-1]["id"]
+
+
+def reconciliar_tabla(tabla: str, tamano_pagina: int = 1000):
+    """
+    Borra de la réplica las filas de `tabla` que ya no existen en Supabase.
+    Retorna cuántas borró. Si la descarga de ids falla no se borra nada.
+    """
+    con = _conexion()
+    # Solo lo que ya estaba antes de pedir los ids: lo replicado mientras tanto existe allá
+    locales = {r[0] for r in con.execute(f"SELECT id FROM {tabla}")}
+    sobrantes = locales - _ids_remotos(tabla, tamano_pagina)
+    if sobrantes:
+        with _lock_escritura, con:
+            con.executemany(f"DELETE FROM {tabla} WHERE id = ?", [(i,) for i in sobrantes])
+        print(f"🗑️  Réplica: {len(sobrantes)} filas de {tabla} borradas en Supabase")
+    return len(sobrantes)
+
+
+def reconciliar_replica():
+    """Propaga los DELETE de vehiculo_usuario y perfil_usuario. Retorna {tabla: borradas}."""
+    return {tabla: reconciliar_tabla(tabla) for tabla in ("vehiculo_usuario", "perfil_usuario")}
+
+
+def sincronizar_biometria():
+    """
+    Descarga las fotos biométricas de los perfiles replicados que aún
+    no tienen copia local. Retorna cuántas se descargaron.
+    """
+    descargadas = 0
+    filas = _conexion().execute("SELECT datos FROM perfil_usuario").fetchall()
+
+    for fila in filas:
+        ruta = json.loads(fila["datos"]).get("foto_rostro")
+        if ruta and not ruta_biometria_local(ruta):
+            if obtener_biometria(ruta):
+                descargadas += 1
+
+    return descargadas
+
+
+def iniciar_sincronizacion_periodica(intervalo: float = INTERVALO_SINCRONIZACION,
+                                     con_biometria: bool = True):
+    """
+    Lanza un hilo daemon que sincroniza la réplica cada `intervalo` segundos.
+    Los errores de red se reportan y se reintenta en el siguiente ciclo;
+    las lecturas siguen funcionando con los datos ya replicados.
+    """
+    def _ciclo():
+        ultima_reconciliacion = 0.0
+        while True:
+            try:
+                resumen = sincronizar_replica()
+                if time.monotonic() - ultima_reconciliacion >= INTERVALO_RECONCILIACION:
+                    reconciliar_replica()
+                    ultima_reconciliacion = time.monotonic()
+                if con_biometria:
+                    sincronizar_biometria()
+                if any(resumen.values()):
+                    print(f"🔄 Réplica sincronizada: {resumen}")
+            except Exception as e:
+                print(f"⚠️  Sincronización de réplica fallida (se usa copia local): {e}")
+            time.sleep(intervalo)
+
+    hilo = threading.Thread(target=_ciclo, name="sincronizacion-replica", daemon=True)
+    hilo.start()
+    return hilo
+
+
+# ==========================================
+# 2. CONSULTAS LOCALES
+# ==========================================
+
+def buscar_conductor_local(placa: str):
+    """
+    Busca el conductor de una placa en la réplica.
+    Retorna el mismo dict que obtener_conductor_por_placa o None.
+    """
+    placa_normalizada = _normalizar_placa(placa)
+    con = _conexion()
+
+    fila = con.execute(
+        "SELECT datos, vehiculo_propietario FROM vehiculo_usuario "
+        "WHERE placa_normalizada = ? LIMIT 1",
+        (placa_normalizada,)
+    ).fetchone()
+
+    if fila is None:
+        # Igual que el ilike.%placa% de Supabase
+        fila = con.execute(
+            "SELECT datos, vehiculo_propietario FROM vehiculo_usuario "
+            "WHERE placa_normalizada LIKE ? LIMIT 1",
+            (f"%{placa_normalizada}%",)
+        ).fetchone()
+
+    if fila is None or not fila["vehiculo_propietario"]:
+        return None
+
+    perfil = con.execute(
+        "SELECT datos FROM perfil_usuario WHERE id = ?",
+        (str(fila["vehiculo_propietario"]),)
+    ).fetchone()
+
+    if perfil is None:
+        return None
+
+    vehiculo = json.loads(fila["datos"])
+    conductor = json.loads(perfil["datos"])
+    conductor["placa"] = vehiculo.get("placa")
+    conductor["foto_placa"] = vehiculo.get("foto_placa")
+    conductor["vehiculo_id"] = vehiculo.get("id")
+    conductor["foto_biometria"] = conductor.get("foto_rostro")
+    return conductor
+
+
+def ruta_biometria_local(ruta_en_supabase: str):
+    """Ruta local de una biometría ya descargada, o None."""
+    fila = _conexion().execute(
+        "SELECT ruta_local FROM biometria_local WHERE ruta_supabase = ?",
+        (ruta_en_supabase,)
+    ).fetchone()
+
+    if fila and os.path.exists(fila["ruta_local"]):
+        return fila["ruta_local"]
+    return None
+
+
+# ==========================================
+# 3. CONSULTAS CON RESPALDO EN SUPABASE
+# ==========================================
+
+def consultar_conductor(placa: str):
+    """
+    Réplica primero; si la placa no está replicada consulta Supabase
+    y guarda el resultado para la próxima vez.
+    """
+    conductor = buscar_conductor_local(placa)
+    if conductor:
+        print(f"⚡ Conductor encontrado en réplica local: {conductor.get('nombre')} {conductor.get('apellido')}")
+        return conductor
+
+    try:
+        conductor = obtener_conductor_por_placa(placa)
+    except requests.RequestException as e:
+        print(f"❌ Supabase no disponible y la placa no está en la réplica: {e}")
+        return None
+
+    if conductor:
+        _replicar_conductor(conductor)
+    return conductor
+
+
+def _replicar_conductor(conductor: dict):
+    """Guarda en la réplica un conductor obtenido directamente de Supabase."""
+    perfil = {k: v for k, v in conductor.items()
+              if k not in ("placa", "foto_placa", "vehiculo_id", "foto_biometria")}
+    vehiculo = {
+        "id": conductor.get("vehiculo_id"),
+        "placa": conductor.get("placa"),
+        "foto_placa": conductor.get("foto_placa"),
+        "vehiculo_propietario": conductor.get("id"),
+    }
+    # Sin updated_at y anotadas en por_refrescar: la marca incremental puede
+    # haber pasado ya por estas filas, así que la próxima sincronización las
+    # pide por id. Sin id no hay fila que guardar (ni que refrescar).
+    con = _conexion()
+    with _lock_escritura, con:
+        if vehiculo["id"] is not None:
+            con.execute(
+                "INSERT OR IGNORE INTO vehiculo_usuario "
+                "(id, placa_normalizada, vehiculo_propietario, updated_at, datos) "
+                "VALUES (?, ?, ?, NULL, ?)",
+                (str(vehiculo["id"]), _normalizar_placa(vehiculo["placa"] or ""),
+                 vehiculo["vehiculo_propietario"], json.dumps(vehiculo, ensure_ascii=False))
+            )
+            con.execute("INSERT OR IGNORE INTO por_refrescar (tabla, id) VALUES ('vehiculo_usuario', ?)",
+                        (str(vehiculo["id"]),))
+        if perfil.get("id") is not None:
+            con.execute(
+                "INSERT OR IGNORE INTO perfil_usuario (id, updated_at, datos) VALUES (?, NULL, ?)",
+                (str(perfil.get("id")), json.dumps(perfil, ensure_ascii=False))
+            )
+            con.execute("INSERT OR IGNORE INTO por_refrescar (tabla, id) VALUES ('perfil_usuario', ?)",
+                        (str(perfil["id"]),))
+
+
+def obtener_biometria(ruta_en_supabase: str):
+    """
+    Ruta local de la foto biométrica. Pasa por la cache biométrica, que
+    revalida con ETag cuando la copia dejó de estar fresca (una foto
+    actualizada en Supabase se vuelve a bajar); sin red y sin copia en la
+    cache usa la que haya registrado la réplica.
+    """
+    try:
+        ruta_local = descargar_foto_biometria(ruta_en_supabase)
+    except requests.RequestException as e:
+        ruta_local = ruta_biometria_local(ruta_en_supabase)
+        if ruta_local:
+            print(f"⚠️  Supabase no responde, usando biometría de la réplica: {e}")
+            return ruta_local
+        print(f"❌ No se pudo descargar la biometría (sin copia local): {e}")
+        return None
+
+    if ruta_local:
+        con = _conexion()
+        with _lock_escritura, con:
+            con.execute(
+                "INSERT OR REPLACE INTO biometria_local (ruta_supabase, ruta_local, descargada_en) "
+                "VALUES (?, ?, ?)",
+                (ruta_en_supabase, ruta_local, time.time())
+            )
+    return ruta_local
+
+
+def estadisticas_replica():
+    """Conteos y fecha de última sincronización por tabla."""
+    con = _conexion()
+    stats = {}
+    for tabla in ("vehiculo_usuario", "perfil_usuario", "biometria_local"):
+        stats[tabla] = con.execute(f"SELECT COUNT(*) FROM {tabla}").fetchone()[0]
+    for fila in con.execute("SELECT tabla, sincronizado_en FROM marcas_sincronizacion"):
+        stats[f"{fila['tabla']}_sincronizado_en"] = fila["sincronizado_en"]
+    return stats
+
+
+if __name__ == "__main__":
+    print("🔄 Sincronizando réplica local...")
+    try:
+        print(f"   Filas recibidas: {sincronizar_replica()}")
+        print(f"   Filas borradas en Supabase: {reconciliar_replica()}")
+        if "--biometria" in sys.argv:
+            print(f"   Biometrías descargadas: {sincronizar_biometria()}")
+    except requests.RequestException as e:
+        print(f"⚠️  Sin conexión con Supabase: {e}")
+
+    print(f"📊 Estado: {estadisticas_replica()}")
+
+    # Medir latencia de consulta local
+    placas = [r[0] for r in _conexion().execute(
+        "SELECT placa_normalizada FROM vehiculo_usuario LIMIT 100")]
+    if placas:
+        inicio = time.perf_counter()
+        for p in placas:
+            buscar_conductor_local(p)
+        promedio_ms = (time.perf_counter() - inicio) / len(placas) * 1000
+        print(f"⚡ Latencia promedio de consulta local: {promedio_ms:.3f} ms")
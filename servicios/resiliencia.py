@@ -0,0 +1,254 @@
+"""
+Presupuestos de tiempo, circuit breaker y GETs con cobertura (hedging)
+para todas las llamadas a Supabase.
+
+- Cada operación tiene su timeout (TIMEOUT_CONSULTA, TIMEOUT_DESCARGA,
+  TIMEOUT_ESCRITURA): una conexión colgada ya no retiene la barrera.
+- Tras UMBRAL_FALLOS_CIRCUITO fallos seguidos el circuito se abre y las
+  llamadas fallan al instante con CircuitoAbierto (subclase de
+  requests.RequestException, así que los respaldos locales existentes
+  -réplica, cache biométrica, cola- la manejan sin cambios). Pasado
+  ENFRIAMIENTO_CIRCUITO se deja pasar una sola llamada de prueba.
+- Los GET (idempotentes) lanzan una segunda petición si la primera no
+  respondió en el p95 de su operación o si falló; gana la primera que llega.
+- Se guardan las latencias por operación para reportar p50/p95/p99
+  (estado_resiliencia()).
+"""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import requests
+
+from core.config import (
+    TIMEOUT_SUPABASE,
+    TIMEOUT_CONSULTA,
+    TIMEOUT_DESCARGA,
+    TIMEOUT_ESCRITURA,
+    UMBRAL_FALLOS_CIRCUITO,
+    ENFRIAMIENTO_CIRCUITO,
+    RETRASO_COBERTURA,
+)
+from core.utils import resumen_latencias
+
+# Presupuesto de tiempo por operación (segundos)
+PRESUPUESTOS = {
+    "consulta_placa": TIMEOUT_CONSULTA,
+    "consulta_perfil": TIMEOUT_CONSULTA,
+    "sincronizacion": TIMEOUT_SUPABASE,
+    "descarga_biometria": TIMEOUT_DESCARGA,
+    "registro_acceso": TIMEOUT_ESCRITURA,
+    "notificacion": TIMEOUT_ESCRITURA,
+    "insercion_bloque": TIMEOUT_ESCRITURA,
+    "subida_evidencia": TIMEOUT_DESCARGA,
+    "enlace_evidencia": TIMEOUT_ESCRITURA,
+}
+
+# Muestras necesarias antes de usar el p95 como retraso de la cobertura
+_MUESTRAS_MINIMAS = 20
+
+
+class CircuitoAbierto(requests.RequestException):
+    """Supabase se dio por caído: la llamada ni siquiera se intenta."""
+
+
+class Interruptor:
+    """Circuit breaker: cerrado -> abierto -> semiabierto (una prueba) -> cerrado."""
+
+    def __init__(self, umbral_fallos: int = UMBRAL_FALLOS_CIRCUITO,
+                 enfriamiento: float = ENFRIAMIENTO_CIRCUITO):
+        self.umbral_fallos = umbral_fallos
+        self.enfriamiento = enfriamiento
+        self.estado = "cerrado"
+        self.fallos_seguidos = 0
+        self.abierto_en = 0.0
+        self.aperturas = 0
+        self.rechazadas = 0
+        self._prueba_en_curso = False
+        self._lock = threading.Lock()
+
+    def permitir(self):
+        """True si la llamada puede salir a la red."""
+        with self._lock:
+            if self.estado == "cerrado":
+                return True
+            if self.estado == "abierto" and time.time() - self.abierto_en >= self.enfriamiento:
+                self.estado = "semiabierto"
+                self._prueba_en_curso = False
+            if self.estado == "semiabierto" and not self._prueba_en_curso:
+                self._prueba_en_curso = True
+                return True
+            self.rechazadas += 1
+            return False
+
+    def exito(self):
+        with self._lock:
+            if self.estado != "cerrado":
+                print("🔌 Supabase respondió: circuito cerrado")
+            self.estado = "cerrado"
+            self.fallos_seguidos = 0
+            self._prueba_en_curso = False
+
+    def fallo(self):
+        with self._lock:
+            self.fallos_seguidos += 1
+            if self.estado == "semiabierto" or \
+                    (self.estado == "cerrado" and self.fallos_seguidos >= self.umbral_fallos):
+                print(f"🔌 Circuito abierto tras {self.fallos_seguidos} fallos: "
+                      f"se usan datos locales por {self.enfriamiento:.0f}s")
+                self.estado = "abierto"
+                self.abierto_en = time.time()
+                self.aperturas += 1
+            self._prueba_en_curso = False
+
+    def abandonar(self):
+        """
+        La llamada terminó sin resultado conocido (cancelada o con un error
+        que no es de red). Si era la prueba del semiabierto cuenta como
+        fallo, para no dejar el circuito esperando una respuesta que no llegará.
+        """
+        with self._lock:
+            era_prueba = self.estado == "semiabierto" and self._prueba_en_curso
+        if era_prueba:
+            self.fallo()
+
+    def resumen(self):
+        with self._lock:
+            return {
+                "estado": self.estado,
+                "fallos_seguidos": self.fallos_seguidos,
+                "aperturas": self.aperturas,
+                "rechazadas": self.rechazadas,
+                "abierto_hace_s": round(time.time() - self.abierto_en, 1)
+                if self.estado != "cerrado" else None,
+            }
+
+
+# Un solo circuito para Supabase: si se cae, se cae para todas las operaciones
+interruptor = Interruptor()
+
+_ejecutor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="supabase-get")
+_lock = threading.Lock()
+_latencias = {}  # operacion -> deque de segundos
+_contadores = {"coberturas": 0, "coberturas_ganadoras": 0, "timeouts": 0}
+
+
+def registrar_latencia(operacion: str, segundos: float):
+    with _lock:
+        _latencias.setdefault(operacion, deque(maxlen=500)).append(segundos)
+
+
+def _contar(clave: str):
+    with _lock:
+        _contadores[clave] += 1
+
+
+def _retraso_cobertura(operacion: str, timeout: float):
+    """p95 observado de la operación (o RETRASO_COBERTURA si aún no hay datos)."""
+    with _lock:
+        muestras = list(_latencias.get(operacion, ()))
+    if len(muestras) >= _MUESTRAS_MINIMAS:
+        retraso = resumen_latencias(muestras)["p95"]
+    else:
+        retraso = RETRASO_COBERTURA
+    return min(retraso, timeout / 2)
+
+
+def _get_con_cobertura(url: str, operacion: str, timeout: float, **kwargs):
+    """
+    GET con una segunda petición de respaldo. Retorna la primera respuesta
+    sin error de servidor; si ninguna lo logra, la última recibida.
+    """
+    limite = time.perf_counter() + timeout
+    retraso = _retraso_cobertura(operacion, timeout)
+    original = _ejecutor.submit(requests.get, url, timeout=timeout, **kwargs)
+    pendientes = {original}
+    cobertura = None
+    ultima_respuesta, ultimo_error = None, None
+
+    while pendientes:
+        restante = limite - time.perf_counter()
+        if restante <= 0:
+            break
+        espera = restante if cobertura else min(retraso, restante)
+        hechos, pendientes = wait(pendientes, timeout=espera, return_when=FIRST_COMPLETED)
+
+        for futuro in hechos:
+            try:
+                res = futuro.result()
+            except requests.RequestException as e:
+                ultimo_error = e
+                continue
+            if res.status_code < 500:
+                if futuro is cobertura:
+                    _contar("coberturas_ganadoras")
+                return res
+            ultima_respuesta = res
+
+        # Sin respuesta útil a tiempo (o la primera falló): lanzar la cobertura
+        if cobertura is None and limite - time.perf_counter() > 0:
+            cobertura = _ejecutor.submit(requests.get, url, timeout=timeout, **kwargs)
+            pendientes.add(cobertura)
+            _contar("coberturas")
+
+    if ultima_respuesta is not None:
+        return ultima_respuesta
+    if ultimo_error is not None and not pendientes:
+        raise ultimo_error
+    _contar("timeouts")
+    raise requests.Timeout(f"{operacion} superó su presupuesto de {timeout:.1f}s")
+
+
+def peticion(metodo: str, url: str, operacion: str, timeout: float = None,
+             sesion: requests.Session = None, **kwargs):
+    """
+    requests.request con presupuesto de tiempo, circuit breaker y, para GET,
+    petición de cobertura. Lanza CircuitoAbierto si el circuito está abierto.
+
+    `sesion` (opcional, solo para métodos que no son GET) reutiliza las
+    conexiones keep-alive de una requests.Session del hilo que llama.
+    """
+    if not interruptor.permitir():
+        raise CircuitoAbierto(f"Circuito abierto: se omite '{operacion}'")
+
+    timeout = timeout or PRESUPUESTOS.get(operacion, TIMEOUT_SUPABASE)
+    inicio = time.perf_counter()
+    res = None
+    try:
+        if metodo.upper() == "GET":
+            res = _get_con_cobertura(url, operacion, timeout, **kwargs)
+        else:
+            res = (sesion or requests).request(metodo, url, timeout=timeout, **kwargs)
+    except requests.RequestException:
+        interruptor.fallo()
+        raise
+    finally:
+        registrar_latencia(operacion, time.perf_counter() - inicio)
+        if res is None:
+            interruptor.abandonar()  # cualquier otra excepción: liberar la prueba
+
+    if res.status_code >= 500:
+        interruptor.fallo()
+    else:
+        interruptor.exito()
+    return res
+
+
+def estado_resiliencia():
+    """Estado del circuito, contadores y p50/p95/p99 (ms) por operación."""
+    with _lock:
+        latencias = {op: list(valores) for op, valores in _latencias.items()}
+        contadores = dict(_contadores)
+
+    return {
+        "circuito": interruptor.resumen(),
+        **contadores,
+        "latencias_ms": {
+            op: {k: round(v * 1000, 1) if k != "n" else v
+                 for k, v in resumen_latencias(valores).items()}
+            for op, valores in latencias.items()
+        },
+    }
+
@@ -0,0 +1,454 @@
+"""
+Servidor local que imita el subconjunto de Supabase que usa el sistema,
+para medir latencias y hacer pruebas de carga sin un proyecto real.
+
+PostgREST (/rest/v1/<tabla>):
+    GET   filtros eq, neq, gt, gte, lt, lte, like, ilike, is, in, or/and,
+          select, order, limit, offset
+    POST  inserción de un objeto o un arreglo, `columns`, `on_conflict`,
+          Prefer: return=representation|minimal, resolution=ignore-duplicates
+    PATCH actualización de las filas que cumplen los filtros
+Storage:
+    GET   /storage/v1/object/<bucket>/<ruta>  (ETag, Last-Modified, 304)
+    POST  /storage/v1/object/<bucket>/<ruta>  (x-upsert)
+
+Se puede inyectar latencia (con jitter) y una tasa de errores 503.
+
+Uso:
+    python -m servicios.servidor_falso --puerto 54321 --latencia-ms 40 --tasa-error 0.02
+
+    Luego, en otra terminal:
+    $env:SUPABASE_URL="http://127.0.0.1:54321"; python main_integrated.py
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import urlsplit, parse_qsl, unquote
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+FIXTURE_PLACAS = BASE_DIR / "placas" / "placas_registradas.json"
+FOTO_EJEMPLO = BASE_DIR / "face" / "imagenes_descargadas" / "front_1764989392442.jpg"
+
+
+def _ahora_iso():
+    return datetime.now(timezone.utc).isoformat()
+
+
+# ==========================================
+# 1. DATOS EN MEMORIA
+# ==========================================
+
+class BaseDatosFalsa:
+    """Tablas (listas de dicts) y objetos de Storage en memoria."""
+
+    def __init__(self):
+        self.tablas = {}
+        self.objetos = {}  # "bucket/ruta" -> (bytes, etag, last_modified)
+        self.lock = threading.Lock()
+
+    def insertar(self, tabla: str, fila: dict):
+        fila = dict(fila)
+        fila.setdefault("id", str(uuid.uuid4()))
+        fila.setdefault("created_at", _ahora_iso())
+        fila.setdefault("updated_at", _ahora_iso())
+        with self.lock:
+            self.tablas.setdefault(tabla, []).append(fila)
+        return fila
+
+    def guardar_objeto(self, bucket: str, ruta: str, contenido: bytes):
+        etag = f'"{hashlib.sha256(contenido).hexdigest()[:32]}"'
+        with self.lock:
+            self.objetos[f"{bucket}/{ruta}"] = (contenido, etag, formatdate(usegmt=True))
+
+
+def cargar_fixture_placas(db: BaseDatosFalsa, ruta_json=FIXTURE_PLACAS, ruta_foto=FOTO_EJEMPLO):
+    """
+    Crea vehiculo_usuario, perfil_usuario y una foto biométrica por cada
+    placa de un JSON como placas/placas_registradas.json:
+        {"TRF088": {"propietario": "Ana Gutierrez"}, ...}
+    Los ids son deterministas (uuid5 de la placa) para repetir pruebas.
+    """
+    with open(ruta_json, encoding="utf-8") as f:
+        placas = json.load(f)
+
+    foto = Path(ruta_foto).read_bytes() if ruta_foto and Path(ruta_foto).exists() else b""
+
+    for placa, info in placas.items():
+        usuario_id = str(uuid.uuid5(uuid.NAMESPACE_DNS, f"usuario-{placa}"))
+        nombre, _, apellido = info.get("propietario", "Sin Nombre").partition(" ")
+        ruta_foto_rostro = f"{usuario_id}/front_{placa.lower()}.jpg"
+
+        db.insertar("perfil_usuario", {
+            "id": usuario_id,
+            "nombre": nombre,
+            "apellido": apellido,
+            "email": f"{placa.lower()}@ejemplo.com",
+            "foto_rostro": ruta_foto_rostro,
+        })
+        db.insertar("vehiculo_usuario", {
+            "id": str(uuid.uuid5(uuid.NAMESPACE_DNS, f"vehiculo-{placa}")),
+            "placa": placa,
+            "vehiculo_propietario": usuario_id,
+        })
+        if foto:
+            db.guardar_objeto("biometria", ruta_foto_rostro, foto)
+
+    return len(placas)
+
+
+# ==========================================
+# 2. FILTROS ESTILO POSTGREST
+# ==========================================
+
+def _como_numero(valor):
+    try:
+        return float(valor)
+    except (TypeError, ValueError):
+        return None
+
+
+def _comparar(valor_fila, valor_filtro: str):
+    """-1, 0 o 1; numérico si ambos lo son, si no como texto."""
+    a, b = _como_numero(valor_fila), _como_numero(valor_filtro)
+    if a is None or b is None or isinstance(valor_fila, bool):
+        a, b = str(valor_fila), valor_filtro
+    return (a > b) - (a < b)
+
+
+def _patron_like(patron: str, ignorar_mayusculas: bool):
+    regex = "^" + re.escape(patron).replace("%", ".*").replace(r"\*", ".*") + "$"
+    return re.compile(regex, re.IGNORECASE if ignorar_mayusculas else 0)
+
+
+def _quitar_comillas(valor: str):
+    if len(valor) >= 2 and valor[0] == valor[-1] == '"':
+        return valor[1:-1]
+    return valor
+
+
+def _cumple(fila: dict, columna: str, expresion: str):
+    """Evalúa `columna=op.valor` (p. ej. placa=ilike.%ABC%) sobre una fila."""
+    negado = expresion.startswith("not.")
+    if negado:
+        expresion = expresion[4:]
+
+    operador, _, valor = expresion.partition(".")
+    valor = _quitar_comillas(valor)
+    actual = fila.get(columna)
+
+    if operador == "is":
+        resultado = (actual is None) if valor == "null" else (str(actual).lower() == valor)
+    elif actual is None:
+        resultado = False
+    elif operador == "eq":
+        resultado = _comparar(actual, valor) == 0
+    elif operador == "neq":
+        resultado = _comparar(actual, valor) != 0
+    elif operador == "gt":
+        resultado = _comparar(actual, valor) > 0
+    elif operador == "gte":
+        resultado = _comparar(actual, valor) >= 0
+    elif operador == "lt":
+        resultado = _comparar(actual, valor) < 0
+    elif operador == "lte":
+        resultado = _comparar(actual, valor) <= 0
+    elif operador in ("like", "ilike"):
+        resultado = bool(_patron_like(valor, operador == "ilike").match(str(actual)))
+    elif operador == "in":
+        opciones = [_quitar_comillas(v) for v in _dividir(valor.strip("()"))]
+        resultado = any(_comparar(actual, v) == 0 for v in opciones)
+    else:
+        raise ValueError(f"Operador no soportado: {operador}")
+
+    return resultado != negado
+
+
+def _dividir(texto: str):
+    """Divide por comas de primer nivel (respeta paréntesis y comillas)."""
+    partes, actual, nivel, en_comillas = [], "", 0, False
+    for c in texto:
+        if c == '"':
+            en_comillas = not en_comillas
+        elif not en_comillas and c == "(":
+            nivel += 1
+        elif not en_comillas and c == ")":
+            nivel -= 1
+        if c == "," and nivel == 0 and not en_comillas:
+            partes.append(actual)
+            actual = ""
+        else:
+            actual += c
+    if actual:
+        partes.append(actual)
+    return partes
+
+
+def _cumple_logico(fila: dict, operador: str, contenido: str):
+    """Evalúa or=(...) / and=(...) con condiciones `col.op.valor` anidadas."""
+    resultados = []
+    for condicion in _dividir(contenido.strip()[1:-1]):
+        if condicion.startswith(("and(", "or(")):
+            sub_operador, _, resto = condicion.partition("(")
+            resultados.append(_cumple_logico(fila, sub_operador, "(" + resto))
+        else:
+            columna, _, expresion = condicion.partition(".")
+            resultados.append(_cumple(fila, columna, expresion))
+    return any(resultados) if operador == "or" else all(resultados)
+
+
+_PARAMETROS_RESERVADOS = {"select", "order", "limit", "offset", "columns", "on_conflict"}
+
+
+def filtrar(filas: list, parametros: list):
+    """Filas que cumplen todos los filtros (ignora select, order, etc.)."""
+    resultado = list(filas)
+    for clave, valor in parametros:
+        if clave in _PARAMETROS_RESERVADOS:
+            continue
+        if clave in ("or", "and"):
+            resultado = [f for f in resultado if _cumple_logico(f, clave, valor)]
+        else:
+            resultado = [f for f in resultado if _cumple(f, clave, valor)]
+    return resultado
+
+
+def consultar(filas: list, parametros: list):
+    """Aplica filtros, orden, paginación y select de PostgREST a `filas`."""
+    resultado = filtrar(filas, parametros)
+
+    params = dict(parametros)
+
+    if "order" in params:
+        for criterio in reversed(params["order"].split(",")):
+            columna, *modificadores = criterio.split(".")
+            descendente = "desc" in modificadores
+            nulos_primero = "nullsfirst" in modificadores
+            con_valor = [f for f in resultado if f.get(columna) is not None]
+            sin_valor = [f for f in resultado if f.get(columna) is None]
+            con_valor.sort(key=lambda f: (_como_numero(f[columna]) is None,
+                                          _como_numero(f[columna]) or 0, str(f[columna])),
+                           reverse=descendente)
+            resultado = sin_valor + con_valor if nulos_primero else con_valor + sin_valor
+
+    offset = int(params.get("offset", 0))
+    if "limit" in params:
+        resultado = resultado[offset:offset + int(params["limit"])]
+    else:
+        resultado = resultado[offset:]
+
+    seleccion = params.get("select", "*")
+    if seleccion != "*":
+        columnas = [c.strip() for c in seleccion.split(",")]
+        resultado = [{c: f.get(c) for c in columnas} for f in resultado]
+
+    return resultado
+
+
+# ==========================================
+# 3. SERVIDOR HTTP
+# ==========================================
+
+def crear_manejador(db: BaseDatosFalsa, latencia_ms: float = 0, jitter_ms: float = 0,
+                    tasa_error: float = 0):
+
+    class ManejadorSupabase(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # Encabezados y cuerpo salen en dos write(): sin esto Nagle + ACK
+        # retardado suman ~40 ms por respuesta y falsean las mediciones
+        disable_nagle_algorithm = True
+
+        def log_message(self, *args):
+            pass
+
+        def _responder(self, codigo: int, cuerpo=b"", headers=None):
+            if isinstance(cuerpo, (list, dict)):
+                cuerpo = json.dumps(cuerpo, ensure_ascii=False).encode("utf-8")
+                headers = {"Content-Type": "application/json", **(headers or {})}
+            self.send_response(codigo)
+            for clave, valor in (headers or {}).items():
+                self.send_header(clave, valor)
+            self.send_header("Content-Length", str(len(cuerpo)))
+            self.end_headers()
+            self.wfile.write(cuerpo)
+
+        def _simular_red(self):
+            """Aplica la latencia inyectada; True si hay que responder con error."""
+            espera = latencia_ms + random.uniform(-jitter_ms, jitter_ms)
+            if espera > 0:
+                time.sleep(espera / 1000)
+            if tasa_error and random.random() < tasa_error:
+                self._responder(503, {"message": "Error inyectado por servidor_falso"})
+                return True
+            return False
+
+        def _ruta(self):
+            partes = urlsplit(self.path)
+            return unquote(partes.path), parse_qsl(partes.query, keep_blank_values=True)
+
+        def _leer_cuerpo(self):
+            largo = int(self.headers.get("Content-Length") or 0)
+            return json.loads(self.rfile.read(largo) or b"null")
+
+        def do_GET(self):
+            if self._simular_red():
+                return
+            ruta, parametros = self._ruta()
+
+            if ruta.startswith("/rest/v1/"):
+                tabla = ruta[len("/rest/v1/"):]
+                with db.lock:
+                    filas = list(db.tablas.get(tabla, []))
+                try:
+                    self._responder(200, consultar(filas, parametros))
+                except ValueError as e:
+                    self._responder(400, {"message": str(e)})
+                return
+
+            if ruta.startswith("/storage/v1/object/"):
+                clave = ruta[len("/storage/v1/object/"):]
+                with db.lock:
+                    objeto = db.objetos.get(clave)
+                if objeto is None:
+                    self._responder(404, {"message": "Object not found"})
+                    return
+                contenido, etag, modificado = objeto
+                headers = {"ETag": etag, "Last-Modified": modificado}
+                if self.headers.get("If-None-Match") == etag or \
+                        self.headers.get("If-Modified-Since") == modificado:
+                    self._responder(304, b"", headers)
+                else:
+                    self._responder(200, contenido, {"Content-Type": "image/jpeg", **headers})
+                return
+
+            self._responder(404, {"message": "Ruta no soportada"})
+
+        def do_POST(self):
+            if self._simular_red():
+                return
+            ruta, parametros = self._ruta()
+
+            if ruta.startswith("/storage/v1/object/"):
+                clave = ruta[len("/storage/v1/object/"):]
+                bucket, _, ruta_objeto = clave.partition("/")
+                contenido = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                with db.lock:
+                    existe = clave in db.objetos
+                if existe and self.headers.get("x-upsert", "").lower() != "true":
+                    self._responder(409, {"message": "The resource already exists"})
+                    return
+                db.guardar_objeto(bucket, ruta_objeto, contenido)
+                self._responder(200, {"Key": clave})
+                return
+
+            if not ruta.startswith("/rest/v1/"):
+                self._responder(404, {"message": "Ruta no soportada"})
+                return
+
+            tabla = ruta[len("/rest/v1/"):]
+            params = dict(parametros)
+            prefer = self.headers.get("Prefer", "")
+            cuerpo = self._leer_cuerpo()
+            filas = cuerpo if isinstance(cuerpo, list) else [cuerpo]
+
+            if "columns" in params:
+                columnas = params["columns"].split(",")
+                filas = [{c: f[c] for c in columnas if c in f} for f in filas]
+
+            conflicto = params.get("on_conflict")
+            insertadas = []
+            for fila in filas:
+                if conflicto and fila.get(conflicto) is not None:
+                    with db.lock:
+                        existe = any(str(f.get(conflicto)) == str(fila[conflicto])
+                                     for f in db.tablas.get(tabla, []))
+                    if existe:
+                        if "ignore-duplicates" in prefer:
+                            continue
+                        self._responder(409, {"message": "duplicate key value"})
+                        return
+                insertadas.append(db.insertar(tabla, fila))
+
+            if "return=representation" in prefer:
+                self._responder(201, insertadas)
+            else:
+                self._responder(201)
+
+        def do_PATCH(self):
+            if self._simular_red():
+                return
+            ruta, parametros = self._ruta()
+            if not ruta.startswith("/rest/v1/"):
+                self._responder(404, {"message": "Ruta no soportada"})
+                return
+
+            tabla = ruta[len("/rest/v1/"):]
+            cambios = self._leer_cuerpo() or {}
+            with db.lock:
+                actualizadas = filtrar(db.tablas.get(tabla, []), parametros)
+                for fila in actualizadas:
+                    fila.update(cambios, updated_at=_ahora_iso())
+                actualizadas = [dict(f) for f in actualizadas]
+
+            if "return=representation" in self.headers.get("Prefer", ""):
+                self._responder(200, actualizadas)
+            else:
+                self._responder(204)
+
+    return ManejadorSupabase
+
+
+def iniciar_servidor_falso(puerto: int = 0, latencia_ms: float = 0, jitter_ms: float = 0,
+                           tasa_error: float = 0, con_fixture: bool = True, db=None):
+    """
+    Arranca el servidor en un hilo daemon.
+    Retorna (servidor, url_base, db). `puerto=0` elige uno libre.
+    """
+    db = db or BaseDatosFalsa()
+    if con_fixture:
+        cargar_fixture_placas(db)
+
+    servidor = ThreadingHTTPServer(
+        ("127.0.0.1", puerto),
+        crear_manejador(db, latencia_ms, jitter_ms, tasa_error)
+    )
+    servidor.daemon_threads = True
+    threading.Thread(target=servidor.serve_forever, name="servidor-falso", daemon=True).start()
+
+    host, puerto_real = servidor.server_address
+    return servidor, f"http://{host}:{puerto_real}", db
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Supabase falso para pruebas locales")
+    parser.add_argument("--puerto", type=int, default=54321)
+    parser.add_argument("--latencia-ms", type=float, default=0)
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    parser.add_argument("--tasa-error", type=float, default=0)
+    parser.add_argument("--fixture", default=str(FIXTURE_PLACAS))
+    args = parser.parse_args()
+
+    db = BaseDatosFalsa()
+    total = cargar_fixture_placas(db, args.fixture)
+    servidor, url, _ = iniciar_servidor_falso(
+        args.puerto, args.latencia_ms, args.jitter_ms, args.tasa_error,
+        con_fixture=False, db=db
+    )
+    print(f"🧪 Supabase falso en {url} ({total} placas cargadas)")
+    print(f"   Latencia: {args.latencia_ms}±{args.jitter_ms} ms | Tasa de error: {args.tasa_error:.0%}")
+    print("   Ctrl+C para detener")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        servidor.shutdown()
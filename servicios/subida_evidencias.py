@@ -0,0 +1,384 @@
+"""
+Subida en segundo plano de las fotos de evidencia (foto_captura) a
+Supabase Storage.
+
+La barrera no espera: encolar_evidencia() solo copia la captura a
+CARPETA_EVIDENCIAS y anota una fila en SQLite. Un grupo de
+HILOS_SUBIDA_EVIDENCIAS hilos, cada uno con su requests.Session:
+
+    1. comprime la foto (lado mayor LADO_MAXIMO_EVIDENCIA, JPEG
+       CALIDAD_JPEG_EVIDENCIA) y la sube al bucket BUCKET_EVIDENCIAS,
+    2. hace PATCH de registro_acceso.foto_captura con la URL del objeto.
+
+El registro lo inserta la cola de escritura con el mismo id; si el PATCH
+no encuentra la fila (la cola aún no la envió) se reintenta más tarde. Si
+la cola descartó el registro, la evidencia se marca fallida; si el
+registro no está ni en Supabase ni en la cola, se abandona tras
+INTENTOS_MAXIMOS_ENLACE_EVIDENCIA intentos.
+Los fallos transitorios se reintentan con backoff exponencial y la cola
+sobrevive reinicios: lo pendiente se retoma al volver a arrancar.
+
+Uso:
+    python -m servicios.subida_evidencias   # muestra el estado de la cola
+"""
+
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from collections import deque
+
+import requests
+
+from core.config import (
+    RUTA_COLA_EVIDENCIAS,
+    CARPETA_EVIDENCIAS,
+    BUCKET_EVIDENCIAS,
+    HILOS_SUBIDA_EVIDENCIAS,
+    LADO_MAXIMO_EVIDENCIA,
+    CALIDAD_JPEG_EVIDENCIA,
+    ESPERA_MAXIMA_REINTENTO,
+    TIEMPO_DRENADO_SALIDA,
+    INTENTOS_MAXIMOS_ENLACE_EVIDENCIA,
+)
+from core.utils import resumen_latencias
+from servicios.peticiones_supaBase import SUPABASE_URL, SUPABASE_KEY
+from servicios.cola_escritura import estado_escritura
+from servicios.lotes import ErrorPermanente, verificar_respuesta
+from servicios.resiliencia import peticion
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS evidencias (
+    registro_id TEXT PRIMARY KEY,
+    ruta_local TEXT NOT NULL,
+    ruta_objeto TEXT NOT NULL,
+    estado TEXT NOT NULL DEFAULT 'pendiente',  -- pendiente | subida | fallida
+    url TEXT,
+    creado REAL NOT NULL,
+    intentos INTEGER NOT NULL DEFAULT 0,
+    proximo_intento REAL NOT NULL DEFAULT 0,
+    ultimo_error TEXT
+);
+"""
+
+_local = threading.local()
+_lock = threading.Lock()
+_hay_trabajo = threading.Event()
+_en_curso = set()   # registro_id que algún hilo está procesando
+_hilos = []
+
+_metricas = {
+    "subidas": 0,
+    "enlazadas": 0,
+    "reintentos": 0,
+    "fallidas": 0,
+    "bytes_originales": 0,
+    "bytes_subidos": 0,
+}
+_latencias_subida = deque(maxlen=500)  # duración de cada POST a Storage (s)
+_latencias_total = deque(maxlen=500)   # desde encolar hasta enlazada (s)
+
+
+class _RegistroNoDisponible(Exception):
+    """El registro_acceso todavía no llegó a Supabase."""
+
+
+def _conexion():
+    con = getattr(_local, "conexion", None)
+    if con is None:
+        RUTA_COLA_EVIDENCIAS.parent.mkdir(parents=True, exist_ok=True)
+        con = sqlite3.connect(str(RUTA_COLA_EVIDENCIAS), timeout=5, isolation_level=None)
+        con.row_factory = sqlite3.Row
+        con.execute("PRAGMA journal_mode=WAL")
+        con.executescript(_ESQUEMA)
+        _local.conexion = con
+    return con
+
+
+def _sesion():
+    sesion = getattr(_local, "sesion", None)
+    if sesion is None:
+        sesion = requests.Session()
+        sesion.headers.update({
+            "apikey": SUPABASE_KEY,
+            "Authorization": f"Bearer {SUPABASE_KEY}",
+        })
+        _local.sesion = sesion
+    return sesion
+
+
+def url_evidencia(ruta_objeto: str):
+    return f"{SUPABASE_URL}/storage/v1/object/{BUCKET_EVIDENCIAS}/{ruta_objeto}"
+
+
+# ==========================================
+# 1. ENCOLAR
+# ==========================================
+
+def encolar_evidencia(registro_id: str, ruta_captura: str, placa: str = None):
+    """
+    Programa la subida de `ruta_captura` como evidencia del registro
+    `registro_id`. Retorna la ruta de la copia local o None si la captura
+    no existe.
+    """
+    if not ruta_captura or not os.path.exists(ruta_captura):
+        print(f"⚠️  Evidencia no encontrada, no se sube: {ruta_captura}")
+        return None
+
+    # Copia propia: la captura en temp/ se sobrescribe en el próximo evento
+    CARPETA_EVIDENCIAS.mkdir(parents=True, exist_ok=True)
+    extension = os.path.splitext(ruta_captura)[1].lower() or ".jpg"
+    copia = CARPETA_EVIDENCIAS / f"{registro_id}{extension}"
+    shutil.copyfile(ruta_captura, copia)
+
+    ruta_objeto = f"{(placa or 'sin_placa').upper()}/{registro_id}.jpg"
+    _conexion().execute(
+        "INSERT OR REPLACE INTO evidencias (registro_id, ruta_local, ruta_objeto, creado) "
+        "VALUES (?, ?, ?, ?)",
+        (registro_id, str(copia), ruta_objeto, time.time())
+    )
+    _hay_trabajo.set()
+    return str(copia)
+
+
+# ==========================================
+# 2. COMPRESIÓN, SUBIDA Y ENLACE
+# ==========================================
+
+def comprimir_evidencia(ruta: str):
+    """JPEG reducido a LADO_MAXIMO_EVIDENCIA; el original si ya era más liviano."""
+    import cv2
+
+    with open(ruta, "rb") as f:
+        original = f.read()
+
+    imagen = cv2.imread(ruta)
+    if imagen is None:
+        raise ErrorPermanente(f"No se pudo leer la imagen {ruta}")
+
+    alto, ancho = imagen.shape[:2]
+    escala = LADO_MAXIMO_EVIDENCIA / max(alto, ancho)
+    if escala < 1:
+        imagen = cv2.resize(imagen, (int(ancho * escala), int(alto * escala)),
+                            interpolation=cv2.INTER_AREA)
+
+    ok, buffer = cv2.imencode(".jpg", imagen, [cv2.IMWRITE_JPEG_QUALITY, CALIDAD_JPEG_EVIDENCIA])
+    if not ok:
+        raise ErrorPermanente(f"No se pudo comprimir {ruta}")
+
+    comprimido = buffer.tobytes()
+    if len(comprimido) >= len(original) and ruta.lower().endswith((".jpg", ".jpeg")):
+        return original, len(original)
+    return comprimido, len(original)
+
+
+def _subir(fila):
+    contenido, tamano_original = comprimir_evidencia(fila["ruta_local"])
+    url = url_evidencia(fila["ruta_objeto"])
+
+    inicio = time.perf_counter()
+    res = peticion(
+        "POST", url, "subida_evidencia", sesion=_sesion(),
+        data=contenido,
+        # x-upsert: repetir la subida tras un timeout no falla con 409
+        headers={"Content-Type": "image/jpeg", "x-upsert": "true"},
+    )
+    verificar_respuesta(res, "subida de evidencia")
+    _latencias_subida.append(time.perf_counter() - inicio)
+
+    _conexion().execute(
+        "UPDATE evidencias SET estado = 'subida', url = ?, intentos = 0, ultimo_error = NULL "
+        "WHERE registro_id = ?",
+        (url, fila["registro_id"])
+    )
+    with _lock:
+        _metricas["subidas"] += 1
+        _metricas["bytes_originales"] += tamano_original
+        _metricas["bytes_subidos"] += len(contenido)
+    return url
+
+
+def _enlazar(registro_id: str, url: str):
+    res = peticion(
+        "PATCH", f"{SUPABASE_URL}/rest/v1/registro_acceso", "enlace_evidencia",
+        sesion=_sesion(),
+        params={"id": f"eq.{registro_id}"},
+        json={"foto_captura": url},
+        headers={"Content-Type": "application/json", "Prefer": "return=representation"},
+    )
+    verificar_respuesta(res, "enlace de evidencia")
+    if res.status_code != 204 and not res.json():
+        raise _RegistroNoDisponible(f"registro_acceso {registro_id} aún no está en Supabase")
+
+
+def _registro_perdido(fila):
+    """Motivo para dejar de esperar el registro_acceso de la evidencia, o None si aún puede llegar."""
+    estado = estado_escritura(fila["registro_id"])
+    if estado == "fallida":
+        return "la cola de escritura descartó el registro_acceso"
+    # Si la foto se subió en esta pasada, _subir() ya reinició los intentos: es el primer enlace
+    intentos = fila["intentos"] + 1 if fila["estado"] == "subida" else 1
+    if estado is None and intentos >= INTENTOS_MAXIMOS_ENLACE_EVIDENCIA:
+        return f"el registro_acceso no apareció tras {intentos} intentos"
+    return None
+
+
+def _procesar(fila):
+    con = _conexion()
+    registro_id = fila["registro_id"]
+    try:
+        url = fila["url"] if fila["estado"] == "subida" else _subir(fila)
+        try:
+            _enlazar(registro_id, url)
+        except _RegistroNoDisponible as e:
+            motivo = _registro_perdido(fila)
+            if motivo is not None:
+                raise ErrorPermanente(f"{e}: {motivo}") from e
+            raise
+
+    except ErrorPermanente as e:
+        con.execute(
+            "UPDATE evidencias SET estado = 'fallida', intentos = intentos + 1, ultimo_error = ? "
+            "WHERE registro_id = ?",
+            (str(e)[:200], registro_id)
+        )
+        with _lock:
+            _metricas["fallidas"] += 1
+        print(f"❌ Evidencia descartada ({registro_id}): {e}")
+        return
+
+    except Exception as e:
+        intentos = fila["intentos"] + 1
+        espera = min(ESPERA_MAXIMA_REINTENTO, 2 ** min(intentos, 10) * 0.5)
+        con.execute(
+            "UPDATE evidencias SET intentos = intentos + 1, proximo_intento = ?, ultimo_error = ? "
+            "WHERE registro_id = ?",
+            (time.time() + espera, str(e)[:200], registro_id)
+        )
+        with _lock:
+            _metricas["reintentos"] += 1
+        return
+
+    con.execute("DELETE FROM evidencias WHERE registro_id = ?", (registro_id,))
+    try:
+        os.remove(fila["ruta_local"])
+    except FileNotFoundError:
+        pass
+    with _lock:
+        _metricas["enlazadas"] += 1
+        _latencias_total.append(time.time() - fila["creado"])
+
+
+# ==========================================
+# 3. HILOS DE SUBIDA
+# ==========================================
+
+def _reclamar():
+    """Siguiente evidencia lista que ningún otro hilo esté procesando."""
+    with _lock:
+        for fila in _conexion().execute(
+            "SELECT * FROM evidencias WHERE estado != 'fallida' AND proximo_intento <= ? "
+            "ORDER BY creado LIMIT ?",
+            (time.time(), len(_en_curso) + 1)
+        ):
+            if fila["registro_id"] not in _en_curso:
+                _en_curso.add(fila["registro_id"])
+                return fila
+    return None
+
+
+def _espera_siguiente():
+    """Segundos hasta la próxima evidencia reintentable (None = no hay)."""
+    proximo = _conexion().execute(
+        "SELECT MIN(proximo_intento) FROM evidencias WHERE estado != 'fallida'"
+    ).fetchone()[0]
+    if proximo is None:
+        return None
+    return max(0.05, proximo - time.time())
+
+
+def _ciclo_subida():
+    while True:
+        try:
+            fila = _reclamar()
+            if fila is None:
+                _hay_trabajo.wait(_espera_siguiente())
+                _hay_trabajo.clear()
+                continue
+            try:
+                _procesar(fila)
+            finally:
+                with _lock:
+                    _en_curso.discard(fila["registro_id"])
+        except Exception as e:
+            print(f"⚠️  Error en la subida de evidencias: {e}")
+            time.sleep(1.0)
+
+
+def iniciar_subida_evidencias(hilos: int = HILOS_SUBIDA_EVIDENCIAS):
+    """Arranca (una sola vez) los hilos de subida; retoma lo pendiente."""
+    global _hilos
+    _hilos = [h for h in _hilos if h.is_alive()]
+    for i in range(len(_hilos), hilos):
+        hilo = threading.Thread(target=_ciclo_subida, name=f"subida-evidencias-{i}", daemon=True)
+        hilo.start()
+        _hilos.append(hilo)
+    _hay_trabajo.set()
+    return _hilos
+
+
+def drenar_evidencias(timeout: float = TIEMPO_DRENADO_SALIDA):
+    """
+    Espera hasta `timeout` segundos a que no queden evidencias pendientes.
+    Retorna True si se vació; lo pendiente se sube en la próxima ejecución.
+    """
+    iniciar_subida_evidencias()
+    limite = time.time() + timeout
+    while time.time() < limite:
+        if pendientes_evidencias() == 0:
+            return True
+        _hay_trabajo.set()
+        time.sleep(0.05)
+    return pendientes_evidencias() == 0
+
+
+# ==========================================
+# 4. MÉTRICAS
+# ==========================================
+
+def pendientes_evidencias():
+    return _conexion().execute(
+        "SELECT COUNT(*) FROM evidencias WHERE estado != 'fallida'"
+    ).fetchone()[0]
+
+
+def estadisticas_evidencias():
+    """Conteos por estado, bytes ahorrados y latencias (ms) de las subidas."""
+    con = _conexion()
+    por_estado = dict(con.execute(
+        "SELECT estado, COUNT(*) FROM evidencias GROUP BY estado"
+    ).fetchall())
+
+    def _ms(resumen):
+        return {k: (round(v * 1000, 1) if isinstance(v, float) else v)
+                for k, v in resumen.items()}
+
+    with _lock:
+        metricas = dict(_metricas)
+        subida = list(_latencias_subida)
+        total = list(_latencias_total)
+
+    return {
+        "pendientes": por_estado.get("pendiente", 0),
+        "por_enlazar": por_estado.get("subida", 0),
+        "fallidas_en_cola": por_estado.get("fallida", 0),
+        **metricas,
+        "latencia_subida_ms": _ms(resumen_latencias(subida)),
+        "latencia_total_ms": _ms(resumen_latencias(total)),
+    }
+
+
+if __name__ == "__main__":
+    print(f"📤 Cola de evidencias: {RUTA_COLA_EVIDENCIAS}")
+    print(f"   {estadisticas_evidencias()}")
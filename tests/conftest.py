@@ -0,0 +1,18 @@
+"""
+Entorno de las pruebas: datos locales (SQLite, artefactos, caches) en una
+carpeta temporal, antes de que cualquier prueba importe core.config.
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+
+_DATOS = tempfile.mkdtemp(prefix="parqueadero_pruebas_")
+os.environ["DATOS_DIR"] = _DATOS
+os.environ["RUTA_CACHE_BIOMETRIA"] = os.path.join(_DATOS, "cache_biometria")
+os.environ.setdefault("SUPABASE_URL", "http://127.0.0.1:9")
+os.environ.setdefault("SUPABASE_SERVICE_ROLE", "clave-de-prueba")
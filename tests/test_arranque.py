@@ -0,0 +1,30 @@
+"""Arranque: una carga en segundo plano que falla se puede reintentar."""
+
+import pytest
+
+from core import arranque
+
+
+def test_carga_fallida_se_vuelve_a_lanzar():
+    intentos = []
+
+    def cargar():
+        intentos.append(1)
+        if len(intentos) == 1:
+            raise OSError("modelo no encontrado")
+        return "modelo"
+
+    primera = arranque.cargar_en_segundo_plano("prueba_fallida", cargar)
+    with pytest.raises(OSError):
+        primera.result(timeout=5)
+    # El callback que la olvida puede correr un instante después de result()
+    for _ in range(100):
+        if arranque.carga("prueba_fallida") is None:
+            break
+        arranque.time.sleep(0.01)
+    assert arranque.carga("prueba_fallida") is None
+
+    segunda = arranque.cargar_en_segundo_plano("prueba_fallida", cargar)
+    assert segunda.result(timeout=5) == "modelo"
+    assert arranque.cargar_en_segundo_plano("prueba_fallida", cargar) is segunda
+    assert len(intentos) == 2
@@ -0,0 +1,71 @@
+"""Almacén de artefactos: escritura en segundo plano y retención."""
+
+import os
+import threading
+
+import numpy as np
+
+from core import artefactos
+
+
+def _imagen():
+    return np.full((64, 64, 3), 127, dtype=np.uint8)
+
+
+def test_esperar_artefacto_deja_el_archivo_en_disco(monkeypatch):
+    # La escritura queda bloqueada hasta que la prueba la suelte
+    soltar = threading.Event()
+    escribir = artefactos._escribir
+
+    def escribir_lento(*args):
+        soltar.wait(5)
+        escribir(*args)
+
+    monkeypatch.setattr(artefactos, "_escribir", escribir_lento)
+    ruta = artefactos.guardar_artefacto(_imagen(), "placa_captura.jpg", placa="ABC123")
+
+    # guardar_artefacto retorna antes de escribir: quien abre el archivo debe esperar
+    assert not os.path.exists(ruta)
+    threading.Timer(0.05, soltar.set).start()
+    assert os.path.exists(artefactos.esperar_artefacto(ruta))
+    assert artefactos.buscar_artefactos(placa="ABC123")[0]["ruta"] == ruta
+
+
+def test_esperar_artefacto_sin_pendiente_retorna_la_ruta():
+    assert artefactos.esperar_artefacto("no/existe.jpg") == "no/existe.jpg"
+    assert artefactos.esperar_artefacto(None) is None
+
+
+def test_retencion_termina_aunque_no_se_pueda_borrar(monkeypatch):
+    rutas = [artefactos.guardar_artefacto(_imagen(), f"rostro_{i}.jpg") for i in range(3)]
+    artefactos.drenar_artefactos()
+    bloqueada = rutas[0]
+    remove = os.remove
+
+    def remove_con_permisos(ruta):
+        if ruta == bloqueada:
+            raise PermissionError("archivo en uso")
+        remove(ruta)
+
+    monkeypatch.setattr(artefactos.os, "remove", remove_con_permisos)
+    borrados = artefactos.aplicar_retencion(dias=365, cuota_mb=0)
+
+    # Lo que sí se podía borrar se borró; la que falló sigue indexada y el ciclo terminó
+    assert borrados >= 2
+    assert os.path.exists(bloqueada)
+    assert [a["ruta"] for a in artefactos.buscar_artefactos()] == [bloqueada]
+
+
+def test_usar_almacen_separa_capturas_e_indice(tmp_path, monkeypatch):
+    monkeypatch.setattr(artefactos, "CARPETA_ARTEFACTOS", artefactos.CARPETA_ARTEFACTOS)
+    monkeypatch.setattr(artefactos, "RUTA_INDICE_ARTEFACTOS", artefactos.RUTA_INDICE_ARTEFACTOS)
+    artefactos.guardar_artefacto(_imagen(), "placa_captura.jpg", placa="PRD001")
+    artefactos.drenar_artefactos()
+
+    artefactos.usar_almacen(tmp_path / "replay", tmp_path / "replay.db")
+    ruta = artefactos.esperar_artefacto(
+        artefactos.guardar_artefacto(_imagen(), "placa_captura.jpg", placa="RPL001"))
+
+    assert ruta.startswith(str(tmp_path / "replay"))
+    assert artefactos.buscar_artefactos(placa="RPL001")
+    assert not artefactos.buscar_artefactos(placa="PRD001")
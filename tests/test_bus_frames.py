@@ -0,0 +1,52 @@
+"""Bus de frames: publicar y leer, casillas pisadas y frames rechazados."""
+
+import numpy as np
+import pytest
+
+from core import bus_frames
+from core.bus_frames import BusFrames
+
+
+@pytest.fixture
+def bus(request):
+    bus = BusFrames.crear(f"prueba_{request.node.name[-20:]}", casillas=3, bytes_casilla=4 * 4 * 3)
+    yield bus
+    bus_frames.olvidar_bus(bus.nombre)
+    bus.cerrar()
+
+
+def test_publicar_y_leer_desde_la_referencia(bus):
+    color = np.arange(48, dtype=np.uint8).reshape(4, 4, 3)
+    gris = np.full((2, 3), 7, dtype=np.uint8)
+
+    ref_color = bus.publicar(color)
+    ref_gris = bus.publicar(gris)
+    assert ref_color["bus"] == bus.nombre
+    assert ref_gris["secuencia"] == ref_color["secuencia"] + 1
+
+    np.testing.assert_array_equal(bus_frames.frame_desde_referencia(ref_color), color)
+    leido = bus_frames.frame_desde_referencia(ref_gris)
+    assert leido.shape == (2, 3)  # un canal vuelve sin la tercera dimensión
+    np.testing.assert_array_equal(leido, gris)
+
+
+def test_referencia_deja_de_estar_vigente_al_dar_la_vuelta_el_anillo(bus):
+    ref = bus.publicar(np.zeros((4, 4), dtype=np.uint8))
+    for _ in range(bus.casillas - 1):
+        bus.publicar(np.ones((4, 4), dtype=np.uint8))
+    assert bus.vigente(ref)  # todavía no se reutilizó su casilla
+
+    bus.publicar(np.ones((4, 4), dtype=np.uint8))
+    assert not bus.vigente(ref)
+    assert bus.leer(ref) is None
+    assert bus_frames.frame_desde_referencia(ref) is None
+    assert not bus_frames.vigente(ref)
+
+
+def test_rechaza_frames_que_no_son_uint8_o_no_caben(bus):
+    with pytest.raises(ValueError, match="uint8"):
+        bus.publicar(np.zeros((4, 4), dtype=np.float32))
+    with pytest.raises(ValueError, match="no cabe"):
+        bus.publicar(np.zeros((5, 4, 3), dtype=np.uint8))
+    # Nada se publicó: la siguiente referencia sigue la numeración
+    assert bus.publicar(np.zeros((4, 4), dtype=np.uint8))["secuencia"] == 1
@@ -0,0 +1,55 @@
+"""Cache biométrica: desalojo LRU y qué hacer con cada respuesta de Supabase."""
+
+import os
+
+import pytest
+
+from servicios import cache_biometria
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    con = cache_biometria._conexion()
+    for tabla in ("referencias", "objetos"):
+        con.execute(f"DELETE FROM {tabla}")
+    monkeypatch.setattr(cache_biometria, "CUOTA_CACHE_BIOMETRIA_MB", 1 / 1024)  # 1 KB
+    return con
+
+
+def _guardar(ruta, contenido):
+    return cache_biometria.registrar_respuesta(ruta, None, 200, contenido, {"ETag": f'"{ruta}"'})
+
+
+def test_foto_mas_grande_que_la_cuota_se_entrega(cache):
+    ruta_local = _guardar("u1/grande.jpg", b"x" * 4096)
+    assert os.path.exists(ruta_local)
+    assert cache_biometria.obtener_foto("u1/grande.jpg") == ruta_local
+
+
+def test_no_desaloja_fotos_recien_entregadas(cache, monkeypatch):
+    primera = _guardar("u1/a.jpg", b"a" * 800)
+    segunda = _guardar("u2/b.jpg", b"b" * 800)
+    # Ambas se entregaron hace un momento: quien las recibió puede estar leyéndolas
+    assert os.path.exists(primera) and os.path.exists(segunda)
+
+    # Pasada la protección, la menos usada sí se desaloja
+    monkeypatch.setattr(cache_biometria, "_PROTECCION_EN_USO", -1)
+    tercera = _guardar("u3/c.jpg", b"c" * 800)
+    assert not os.path.exists(primera)
+    assert os.path.exists(tercera)
+
+
+@pytest.mark.parametrize("codigo", [404, 410])
+def test_foto_borrada_en_supabase_no_se_sirve(cache, codigo):
+    _guardar("u4/d.jpg", b"d" * 100)
+    previa = cache_biometria._buscar("u4/d.jpg")
+    assert cache_biometria.registrar_respuesta("u4/d.jpg", previa, codigo, b"", {}) is None
+    assert cache_biometria._buscar("u4/d.jpg") is None
+
+
+def test_error_del_servidor_sirve_la_copia_vencida(cache):
+    ruta_local = _guardar("u5/e.jpg", b"e" * 100)
+    previa = cache_biometria._buscar("u5/e.jpg")
+    assert cache_biometria.registrar_respuesta("u5/e.jpg", previa, 503, b"", {}) == ruta_local
+    # Un 403 no es "Supabase caído": no se entrega la copia
+    assert cache_biometria.registrar_respuesta("u5/e.jpg", previa, 403, b"", {}) is None
@@ -0,0 +1,110 @@
+"""Outbox: 409 no es éxito, 401/403/404 no descartan, una fila mala no tumba el lote, debounce."""
+
+import json
+
+import pytest
+
+from servicios import cola_escritura, lotes
+from servicios.lotes import ErrorPermanente
+
+
+class Respuesta:
+    def __init__(self, status_code, text=""):
+        self.status_code = status_code
+        self.text = text
+
+    def raise_for_status(self):
+        pass
+
+
+@pytest.fixture
+def cola(monkeypatch):
+    con = cola_escritura._conexion()
+    for tabla in ("pendientes", "fallidos", "notificaciones_enviadas"):
+        con.execute(f"DELETE FROM {tabla}")
+    monkeypatch.setattr(cola_escritura, "VENTANA_LOTE", 0)
+    monkeypatch.setattr(cola_escritura, "_lote_unitario_hasta", 0)
+    return con
+
+
+def _servidor(monkeypatch, responder):
+    """Cada POST de lote pasa por `responder(filas)`; guarda lo que Supabase aceptó."""
+    insertadas = []
+
+    def peticion(metodo, url, operacion, json=None, **kwargs):
+        res = responder(json)
+        if res.status_code < 300:
+            insertadas.extend(json)
+        return res
+
+    monkeypatch.setattr(lotes, "peticion", peticion)
+    return insertadas
+
+
+def _vaciar():
+    while cola_escritura._procesar_lote() is not None:
+        pass
+
+
+def test_409_es_error_permanente(monkeypatch):
+    _servidor(monkeypatch, lambda filas: Respuesta(409, '{"code":"23503"}'))
+    with pytest.raises(ErrorPermanente):
+        lotes.insertar_en_bloque("registro_acceso", [{"id": "a"}])
+
+
+def test_fila_con_409_va_a_fallidos_y_el_resto_se_inserta(cola, monkeypatch):
+    def responder(filas):
+        # Llave foránea inexistente en una sola fila: PostgREST rechaza todo el arreglo con 409
+        return Respuesta(409, "23503") if any(f["vehiculo_id"] == "borrado" for f in filas) \
+            else Respuesta(201)
+
+    insertadas = _servidor(monkeypatch, responder)
+    for vehiculo in ("v1", "borrado", "v3"):
+        cola_escritura.encolar("registro_acceso", {"vehiculo_id": vehiculo})
+    _vaciar()
+
+    assert [f["vehiculo_id"] for f in insertadas] == ["v1", "v3"]
+    fallidas = cola.execute("SELECT datos FROM fallidos").fetchall()
+    assert [json.loads(f["datos"])["vehiculo_id"] for f in fallidas] == ["borrado"]
+    assert cola_escritura.profundidad() == 0
+
+
+@pytest.mark.parametrize("estado", [401, 403, 404])
+def test_credencial_o_url_mal_configurada_no_descarta_filas(cola, monkeypatch, estado):
+    _servidor(monkeypatch, lambda filas: Respuesta(estado, "JWT expired"))
+    for vehiculo in ("v1", "v2"):
+        cola_escritura.encolar("registro_acceso", {"vehiculo_id": vehiculo})
+
+    assert cola_escritura._procesar_lote() > 0  # espera antes de reintentar
+    assert cola.execute("SELECT COUNT(*) FROM fallidos").fetchone()[0] == 0
+    assert [f["intentos"] for f in cola.execute("SELECT intentos FROM pendientes ORDER BY seq")] == [1, 1]
+
+
+def test_notificacion_repetida_tras_enviar_no_se_reenvia(cola, monkeypatch):
+    insertadas = _servidor(monkeypatch, lambda filas: Respuesta(201))
+    aviso = dict(usuario_id="u1", titulo="Acceso", tipo="acceso")
+
+    primera = cola_escritura.encolar_notificacion(mensaje="Entrada 08:00", **aviso)
+    _vaciar()
+    segunda = cola_escritura.encolar_notificacion(mensaje="Entrada 08:01", **aviso)
+    _vaciar()
+
+    assert segunda == primera
+    assert [f["mensaje"] for f in insertadas] == ["Entrada 08:00"]
+
+
+def test_notificacion_no_se_fusiona_en_una_fila_que_se_esta_enviando(cola, monkeypatch):
+    aviso = dict(usuario_id="u1", titulo="Acceso", tipo="acceso")
+
+    def responder(filas):
+        # Llega otra notificación igual mientras el POST está en vuelo
+        cola_escritura.encolar_notificacion(mensaje="durante el envío", **aviso)
+        return Respuesta(201)
+
+    insertadas = _servidor(monkeypatch, responder)
+    cola_escritura.encolar_notificacion(mensaje="original", **aviso)
+    _vaciar()
+
+    # Se envía lo que se leyó; la repetida se absorbe en la que ya está en vuelo
+    assert [f["mensaje"] for f in insertadas] == ["original"]
+    assert cola_escritura.profundidad() == 0
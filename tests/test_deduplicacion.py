@@ -0,0 +1,74 @@
+"""Deduplicación: un evento vivo por placa y carril, y sus contadores."""
+
+import pytest
+
+from core import deduplicacion
+from core.deduplicacion import liberar_evento, reclamar_evento, resolver_evento
+
+
+@pytest.fixture(autouse=True)
+def limpia(monkeypatch):
+    con = deduplicacion._conexion()
+    for tabla in ("eventos", "supresiones"):
+        con.execute(f"DELETE FROM {tabla}")
+    monkeypatch.setattr(deduplicacion, "_metricas", dict.fromkeys(deduplicacion._metricas, 0))
+
+
+def _supresiones():
+    return deduplicacion.estadisticas_deduplicacion()["supresiones"]
+
+
+def test_reclamar_normaliza_la_placa_y_suprime_el_segundo_disparo():
+    assert reclamar_evento("abc-123", "e1", carril="c1") == (True, None)
+    assert reclamar_evento("ABC 123", "e2", carril="c1") == (False, None)
+    # El mismo evento puede volver a reclamar (reintento dentro del flujo)
+    assert reclamar_evento("ABC123", "e1", carril="c1") == (True, None)
+    # Otro carril es otra cola
+    assert reclamar_evento("ABC123", "e3", carril="c2") == (True, None)
+    assert _supresiones() == {"c1/en_curso": 1}
+
+
+def test_resolver_reutiliza_la_decision_durante_el_cooldown():
+    reclamar_evento("ABC123", "e1", carril="c1")
+    resolver_evento("ABC123", "e1", "permitido", carril="c1", cooldown=60)
+    assert reclamar_evento("ABC123", "e2", carril="c1") == (False, "permitido")
+    assert reclamar_evento("ABC123", "e3", carril="c1") == (False, "permitido")
+    assert _supresiones() == {"c1/reutilizada": 2}
+
+
+def test_vencido_el_cooldown_el_disparo_es_nuevo():
+    reclamar_evento("ABC123", "e1", carril="c1")
+    resolver_evento("ABC123", "e1", "denegado", carril="c1", cooldown=-1)
+    assert reclamar_evento("ABC123", "e2", carril="c1") == (True, None)
+    assert deduplicacion.purgar_vencidos() == 0  # e2 sigue en curso
+
+
+def test_liberar_solo_suelta_un_evento_en_curso_propio():
+    reclamar_evento("ABC123", "e1", carril="c1")
+    liberar_evento("ABC123", "otro", carril="c1")
+    assert reclamar_evento("ABC123", "e2", carril="c1") == (False, None)
+
+    liberar_evento("ABC123", "e1", carril="c1")
+    assert reclamar_evento("ABC123", "e2", carril="c1") == (True, None)
+
+    # Una decisión ya tomada no se libera
+    resolver_evento("ABC123", "e2", "permitido", carril="c1", cooldown=60)
+    liberar_evento("ABC123", "e2", carril="c1")
+    assert reclamar_evento("ABC123", "e3", carril="c1") == (False, "permitido")
+
+
+def test_contadores_del_proceso():
+    reclamar_evento("ABC123", "e1", carril="c1")
+    reclamar_evento("ABC123", "e2", carril="c1")
+    resolver_evento("ABC123", "e1", "permitido", carril="c1", cooldown=60)
+    reclamar_evento("ABC123", "e3", carril="c1")
+    reclamar_evento("XYZ789", "e4", carril="c1")
+    liberar_evento("XYZ789", "e4", carril="c1")
+
+    assert deduplicacion.estadisticas_deduplicacion()["proceso"] == {
+        "nuevos": 2,
+        "suprimidos_en_curso": 1,
+        "suprimidos_reutilizada": 1,
+        "resueltos": 1,
+        "liberados": 1,
+    }
@@ -0,0 +1,45 @@
+"""Trabajador DeepFace persistente: una respuesta tardía nunca se toma por la del pedido siguiente."""
+
+import sys
+import textwrap
+
+import pytest
+
+from core.deepface_persistente import TrabajadorDeepFace
+
+# Trabajador falso: "lento" responde coincide=true cuando el pedido ya venció;
+# "eco_viejo" manda antes una respuesta con otro id (como la tardía de un pedido anterior)
+_SCRIPT = textwrap.dedent("""
+    import json, sys, time
+    print(json.dumps({"ok": True, "listo": True, "modelo": "Falso"}), flush=True)
+    for linea in sys.stdin:
+        pedido = json.loads(linea)
+        if pedido["frame"] == "lento":
+            time.sleep(0.5)
+            print(json.dumps({"ok": True, "coincide": True, "distancia": 0.1, "id": pedido["id"]}), flush=True)
+            continue
+        if pedido["frame"] == "eco_viejo":
+            print(json.dumps({"ok": True, "coincide": True, "distancia": 0.1, "id": -1}), flush=True)
+        print(json.dumps({"ok": True, "coincide": False, "distancia": 0.9, "id": pedido["id"]}), flush=True)
+""")
+
+
+@pytest.fixture
+def trabajador(tmp_path):
+    script = tmp_path / "trabajador_falso.py"
+    script.write_text(_SCRIPT, encoding="utf-8")
+    trabajador = TrabajadorDeepFace(sys.executable, script=script, timeout_arranque=10).iniciar()
+    yield trabajador
+    trabajador.cerrar()
+
+
+def test_descarta_respuestas_de_otro_pedido(trabajador):
+    assert trabajador.comparar("eco_viejo", "ref.jpg") == (False, 0.9)
+
+
+def test_tras_un_timeout_la_respuesta_tardia_no_llega_al_proceso_nuevo(trabajador):
+    with pytest.raises(TimeoutError):
+        trabajador.comparar("lento", "ref.jpg", timeout=0.1)
+    # Reinicia el proceso: lo que conteste el anterior ya no cuenta
+    for _ in range(3):
+        assert trabajador.comparar("rapido", "ref.jpg") == (False, 0.9)
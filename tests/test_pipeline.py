@@ -0,0 +1,59 @@
+"""Pipeline: la etapa ordenada recibe los vehículos en el orden de llegada."""
+
+import threading
+import time
+
+from core.pipeline import Etapa, Pipeline
+
+
+def _pipeline(demoras, descartar=(), ordenada=True):
+    """referencia con 4 hilos y demoras por vehículo -> rostro (1 hilo); retorna el orden visto en rostro."""
+    vistos, lock = [], threading.Lock()
+
+    def referencia(evento):
+        time.sleep(demoras[evento.datos["n"]])
+        return evento.datos["n"] not in descartar
+
+    def rostro(evento):
+        with lock:
+            vistos.append(evento.datos["n"])
+        return True
+
+    pipeline = Pipeline([
+        Etapa("ocr", lambda evento: True),
+        Etapa("referencia", referencia, concurrencia=4),
+        Etapa("verificacion_facial", rostro, ordenada=ordenada),
+    ]).iniciar()
+    eventos = [pipeline.enviar({"n": n}) for n in range(len(demoras))]
+    pipeline.cerrar()
+    return vistos, eventos
+
+
+def test_etapa_ordenada_respeta_el_orden_de_llegada():
+    # El primero es el más lento en referencia: sin resecuenciar llegaría al final
+    vistos, eventos = _pipeline([0.2, 0.1, 0.0, 0.05])
+    assert vistos == [0, 1, 2, 3]
+    assert all(e.estado == "completado" for e in eventos)
+
+
+def test_sin_orden_la_referencia_desordena():
+    vistos, _ = _pipeline([0.2, 0.1, 0.0, 0.05], ordenada=False)
+    assert vistos != [0, 1, 2, 3]
+
+
+def test_descartados_antes_no_bloquean_la_etapa_ordenada():
+    vistos, eventos = _pipeline([0.2, 0.0, 0.1, 0.0], descartar={0, 2})
+    assert vistos == [1, 3]
+    assert [e.estado for e in eventos] == ["descartado", "completado", "descartado", "completado"]
+
+
+def test_cerrar_con_timeout_no_espera_a_una_etapa_trabada():
+    soltar = threading.Event()
+    pipeline = Pipeline([Etapa("rostro", lambda evento: soltar.wait(5))]).iniciar()
+    pipeline.enviar({"n": 0})
+    time.sleep(0.05)
+
+    inicio = time.perf_counter()
+    assert pipeline.cerrar(timeout=0.2) is False
+    assert time.perf_counter() - inicio < 1
+    soltar.set()
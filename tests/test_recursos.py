@@ -0,0 +1,39 @@
+"""Presupuesto de hilos: cuándo se aplica y qué variables fijó el usuario."""
+
+import json
+import os
+import subprocess
+import sys
+
+from core import recursos
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_el_trabajador_no_confunde_las_del_presupuesto_con_las_del_usuario(monkeypatch):
+    for variable in recursos.VARIABLES_HILOS:
+        monkeypatch.delenv(variable, raising=False)
+    monkeypatch.setenv("OMP_NUM_THREADS", "3")  # esta sí la fijó el usuario
+    monkeypatch.setattr(recursos, "_DEFINIDAS_POR_USUARIO", recursos._definidas_por_usuario())
+    monkeypatch.setattr(recursos, "USAR_PRESUPUESTO_HILOS", True)
+
+    entorno = recursos.entorno_para("deepface")
+    assert "OMP_NUM_THREADS" not in entorno
+    assert "OMP_NUM_THREADS" not in json.loads(entorno["ASIGNACION_CPU"])["variables"]
+
+    # El trabajador hereda el entorno del padre más lo que calculó entorno_para
+    for variable, valor in entorno.items():
+        monkeypatch.setenv(variable, valor)
+    assert recursos._definidas_por_usuario() == {"OMP_NUM_THREADS"}
+
+
+def test_importar_el_flujo_no_fija_hilos():
+    entorno = {k: v for k, v in os.environ.items() if k not in recursos.VARIABLES_HILOS}
+    salida = subprocess.run(
+        [sys.executable, "-c",
+         "import os, main_integrated; from core.recursos import VARIABLES_HILOS; "
+         "print([v for v in VARIABLES_HILOS if v in os.environ])"],
+        cwd=RAIZ, env=entorno, capture_output=True, text=True, timeout=60,
+    )
+    assert salida.returncode == 0, salida.stderr
+    assert salida.stdout.strip().splitlines()[-1] == "[]"
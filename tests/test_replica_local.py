@@ -0,0 +1,94 @@
+"""Réplica local: paginación con updated_at nulo, borrados y conductores consultados directo."""
+
+import pytest
+
+from servicios import replica_local
+from servicios.servidor_falso import consultar
+
+
+class Respuesta:
+    def __init__(self, filas):
+        self._filas = filas
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self._filas
+
+
+@pytest.fixture
+def supabase(monkeypatch):
+    """Tablas remotas en memoria, consultadas con los filtros de PostgREST del servidor falso."""
+    tablas = {"vehiculo_usuario": [], "perfil_usuario": []}
+
+    def peticion(metodo, url, operacion, params=None, **kwargs):
+        tabla = url.rsplit("/", 1)[-1]
+        return Respuesta(consultar(tablas[tabla], list(params.items())))
+
+    con = replica_local._conexion()
+    for tabla in ("vehiculo_usuario", "perfil_usuario", "marcas_sincronizacion", "por_refrescar"):
+        con.execute(f"DELETE FROM {tabla}")
+    con.commit()
+    monkeypatch.setattr(replica_local, "peticion", peticion)
+    return tablas
+
+
+def _vehiculo(id_, updated_at=None):
+    return {"id": id_, "placa": f"AAA{id_:03d}", "vehiculo_propietario": "u1", "updated_at": updated_at}
+
+
+def test_pagina_que_termina_en_updated_at_nulo_no_salta_filas(supabase):
+    # Ids bajos con fecha y altos sin fecha: los nulos van primero en el orden
+    supabase["vehiculo_usuario"] = [
+        _vehiculo(1, "2026-01-01T00:00:00"),
+        _vehiculo(2, "2026-01-02T00:00:00"),
+        _vehiculo(8),
+        _vehiculo(9),
+    ]
+    assert replica_local.sincronizar_tabla("vehiculo_usuario", tamano_pagina=2) == 4
+    ids = {r[0] for r in replica_local._conexion().execute("SELECT id FROM vehiculo_usuario")}
+    assert ids == {"1", "2", "8", "9"}
+
+
+def test_reconciliar_borra_lo_que_ya_no_esta_en_supabase(supabase):
+    supabase["vehiculo_usuario"] = [_vehiculo(i, f"2026-01-0{i}T00:00:00") for i in (1, 2, 3)]
+    supabase["perfil_usuario"] = [{"id": "u1", "nombre": "Ana", "updated_at": "2026-01-01T00:00:00"}]
+    replica_local.sincronizar_replica()
+    assert replica_local.buscar_conductor_local("AAA002") is not None
+
+    # Borrado en Supabase: la sincronización incremental no lo ve
+    supabase["vehiculo_usuario"] = [v for v in supabase["vehiculo_usuario"] if v["id"] != 2]
+    replica_local.sincronizar_replica()
+    assert replica_local.buscar_conductor_local("AAA002") is not None
+
+    assert replica_local.reconciliar_replica() == {"vehiculo_usuario": 1, "perfil_usuario": 0}
+    assert replica_local.buscar_conductor_local("AAA002") is None
+    assert replica_local.buscar_conductor_local("AAA003") is not None
+
+
+def test_conductor_consultado_directo_se_completa_aunque_la_marca_lo_haya_pasado(supabase):
+    supabase["vehiculo_usuario"] = [_vehiculo(5, "2026-01-05T00:00:00")]
+    supabase["perfil_usuario"] = [{"id": "u1", "nombre": "Ana", "updated_at": "2026-01-01T00:00:00"}]
+    replica_local._replicar_conductor({
+        "id": "u1", "nombre": "Ana", "placa": "AAA005", "vehiculo_id": 5,
+    })
+    # La réplica ya había sincronizado filas más nuevas que estas
+    con = replica_local._conexion()
+    for tabla in ("vehiculo_usuario", "perfil_usuario"):
+        con.execute("INSERT INTO marcas_sincronizacion (tabla, ultima_marca, ultimo_id) "
+                    "VALUES (?, '2026-02-01T00:00:00', 'z')", (tabla,))
+
+    replica_local.sincronizar_replica()
+    fila = con.execute("SELECT updated_at FROM vehiculo_usuario WHERE id = '5'").fetchone()
+    assert fila["updated_at"] == "2026-01-05T00:00:00"
+    assert con.execute("SELECT COUNT(*) FROM por_refrescar").fetchone()[0] == 0
+    assert replica_local._leer_marca("vehiculo_usuario") == ("2026-02-01T00:00:00", "z")
+
+
+def test_conductor_sin_vehiculo_id_no_se_guarda_como_none(supabase):
+    replica_local._replicar_conductor({"id": "u1", "placa": "AAA001", "vehiculo_id": None})
+    replica_local._replicar_conductor({"id": "u2", "placa": "AAA002", "vehiculo_id": None})
+    con = replica_local._conexion()
+    assert con.execute("SELECT COUNT(*) FROM vehiculo_usuario").fetchone()[0] == 0
+    assert {r[0] for r in con.execute("SELECT id FROM perfil_usuario")} == {"u1", "u2"}
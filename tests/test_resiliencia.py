@@ -0,0 +1,113 @@
+"""Circuit breaker: la llamada de prueba del semiabierto siempre se libera."""
+
+import asyncio
+
+import httpx
+import pytest
+import requests
+
+from servicios import cliente_async, resiliencia
+from servicios.resiliencia import CircuitoAbierto, Interruptor
+
+
+@pytest.fixture
+def interruptor(monkeypatch):
+    """Circuito recién pasado a semiabierto, compartido por el cliente síncrono y el async."""
+    nuevo = Interruptor(umbral_fallos=1, enfriamiento=0)
+    nuevo.fallo()
+    monkeypatch.setattr(resiliencia, "interruptor", nuevo)
+    monkeypatch.setattr(cliente_async, "interruptor", nuevo)
+    return nuevo
+
+
+def test_semiabierto_deja_pasar_una_sola_prueba():
+    i = Interruptor(umbral_fallos=1, enfriamiento=0)
+    i.fallo()
+    assert [i.permitir(), i.permitir()] == [True, False]
+    i.exito()
+    assert i.estado == "cerrado" and i.permitir()
+
+
+def test_abandonar_fuera_de_la_prueba_no_cuenta_como_fallo():
+    i = Interruptor(umbral_fallos=1, enfriamiento=60)
+    assert i.permitir()
+    i.abandonar()
+    assert i.estado == "cerrado" and i.fallos_seguidos == 0
+
+
+def test_error_desconocido_libera_la_prueba_sincrona(interruptor, monkeypatch):
+    def explota(*args, **kwargs):
+        raise ValueError("respuesta ilegible")
+
+    monkeypatch.setattr(requests, "request", explota)
+    with pytest.raises(ValueError):
+        resiliencia.peticion("POST", "http://supabase/rest/v1/x", "registro_acceso")
+
+    # La prueba contó como fallo: el circuito vuelve a abrir y tras el enfriamiento prueba otra vez
+    assert interruptor.estado == "abierto"
+    assert interruptor.permitir()
+
+
+def test_cancelacion_libera_la_prueba_async(interruptor):
+    async def colgada(request):
+        await asyncio.sleep(30)
+
+    async def escenario():
+        cliente = cliente_async.ClienteSupabaseAsync(url="http://supabase", key="k")
+        await cliente.abrir()
+        cliente._cliente._transport = httpx.MockTransport(colgada)
+        tarea = asyncio.create_task(cliente._peticion("GET", "/rest/v1/x", "consulta_placa"))
+        await asyncio.sleep(0.05)
+        tarea.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await tarea
+        await cliente.cerrar()
+
+    asyncio.run(escenario())
+    assert interruptor.estado == "abierto"
+    assert interruptor.permitir()
+
+
+def test_circuito_abierto_en_el_perfil_responde_la_replica(monkeypatch):
+    from servicios import peticiones_supaBase
+
+    class Respuesta:
+        ok = True
+
+        def json(self):
+            return [{"placa": "ABC123", "vehiculo_propietario": "u1", "id": "v1"}]
+
+    llamadas = []
+
+    def peticion(metodo, url, operacion, **kwargs):
+        llamadas.append(operacion)
+        if operacion == "consulta_perfil":
+            raise CircuitoAbierto("abierto")
+        return Respuesta()
+
+    monkeypatch.setattr(peticiones_supaBase, "peticion", peticion)
+    monkeypatch.setattr(peticiones_supaBase, "_conductor_desde_replica", lambda placa, error: {"placa": placa})
+
+    assert peticiones_supaBase.obtener_conductor_por_placa("abc123") == {"placa": "ABC123"}
+    assert llamadas == ["consulta_placa", "consulta_perfil"]
+
+
+def test_timeout_de_supabase_responde_la_replica(monkeypatch):
+    import requests
+
+    from servicios import peticiones_supaBase
+
+    def peticion(metodo, url, operacion, **kwargs):
+        raise requests.Timeout("read timed out")
+
+    errores = []
+
+    def replica(placa, error):
+        errores.append(error)
+        return {"placa": placa}
+
+    monkeypatch.setattr(peticiones_supaBase, "peticion", peticion)
+    monkeypatch.setattr(peticiones_supaBase, "_conductor_desde_replica", replica)
+
+    assert peticiones_supaBase.obtener_conductor_por_placa("abc123") == {"placa": "ABC123"}
+    assert isinstance(errores[0], requests.Timeout)
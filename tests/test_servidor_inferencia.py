@@ -0,0 +1,74 @@
+"""Servidor de inferencia: bus de frames de los carriles."""
+
+import socket
+import threading
+
+import numpy as np
+
+from core import bus_frames
+from core.bus_frames import BusFrames
+from placas.servidor_inferencia import crear_servidor, enviar_mensaje, recibir_mensaje
+
+
+def _servidor(tmp_path, inferir):
+    servidor = crear_servidor(f"unix:{tmp_path / 'inferencia.sock'}", {"detectar": inferir}, ventana_ms=1)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor
+
+
+def _conectar(servidor):
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.connect(servidor.server_address)
+    return sock
+
+
+def test_casilla_pisada_durante_la_inferencia(tmp_path):
+    bus = BusFrames.crear("prueba_pisada", casillas=2, bytes_casilla=64)
+
+    def inferir(imagenes):
+        for _ in range(2):  # el carril publica dos frames más: la casilla vuelve a usarse
+            bus.publicar(np.ones((4, 4), dtype=np.uint8))
+        return [{"cajas": []} for _ in imagenes]
+
+    servidor = _servidor(tmp_path, inferir)
+    sock = _conectar(servidor)
+    try:
+        ref = bus.publicar(np.zeros((4, 4), dtype=np.uint8))
+        enviar_mensaje(sock, {"id": 1, "op": "detectar", "cliente": "carril-1", **ref})
+        respuesta, _ = recibir_mensaje(sock)
+        assert respuesta["ok"] is False
+        assert "reemplazado" in respuesta["error"]
+    finally:
+        sock.close()
+        servidor.shutdown()
+        servidor.server_close()
+        bus.cerrar()
+
+
+def test_el_lector_suelta_el_bus_al_cerrar_la_conexion(tmp_path):
+    bus = BusFrames.crear("prueba_suelta", casillas=2, bytes_casilla=64)
+    servidor = _servidor(tmp_path, lambda imagenes: [{"cajas": []} for _ in imagenes])
+    try:
+        socks = [_conectar(servidor) for _ in range(2)]
+        for i, sock in enumerate(socks):
+            ref = bus.publicar(np.zeros((4, 4), dtype=np.uint8))
+            enviar_mensaje(sock, {"id": i, "op": "detectar", "cliente": f"carril-{i}", **ref})
+            assert recibir_mensaje(sock)[0]["ok"] is True
+        assert bus.nombre in bus_frames._abiertos
+
+        # Con una conexión todavía abierta el bus sigue mapeado
+        socks[0].close()
+        enviar_mensaje(socks[1], {"id": 9, "op": "ping"})
+        recibir_mensaje(socks[1])
+        assert bus.nombre in bus_frames._abiertos
+
+        socks[1].close()
+        for _ in range(100):
+            if bus.nombre not in bus_frames._abiertos:
+                break
+            threading.Event().wait(0.01)
+        assert bus.nombre not in bus_frames._abiertos
+    finally:
+        servidor.shutdown()
+        servidor.server_close()
+        bus.cerrar()
@@ -0,0 +1,82 @@
+"""Evidencias: no reintentar para siempre un enlace cuyo registro_acceso no llegará."""
+
+import time
+
+import pytest
+
+from servicios import cola_escritura, subida_evidencias
+
+
+@pytest.fixture
+def evidencias(monkeypatch, tmp_path):
+    con = subida_evidencias._conexion()
+    con.execute("DELETE FROM evidencias")
+    cola = cola_escritura._conexion()
+    for tabla in ("pendientes", "fallidos"):
+        cola.execute(f"DELETE FROM {tabla}")
+
+    def enlazar(registro_id, url):
+        raise subida_evidencias._RegistroNoDisponible(f"registro_acceso {registro_id} aún no está en Supabase")
+
+    monkeypatch.setattr(subida_evidencias, "_enlazar", enlazar)
+    monkeypatch.setattr(subida_evidencias, "INTENTOS_MAXIMOS_ENLACE_EVIDENCIA", 3)
+
+    def agregar(registro_id):
+        con.execute(
+            "INSERT INTO evidencias (registro_id, ruta_local, ruta_objeto, estado, url, creado) "
+            "VALUES (?, ?, ?, 'subida', ?, ?)",
+            (registro_id, str(tmp_path / f"{registro_id}.jpg"), f"ABC123/{registro_id}.jpg",
+             subida_evidencias.url_evidencia(f"ABC123/{registro_id}.jpg"), time.time())
+        )
+
+    return con, cola, agregar
+
+
+def _procesar_veces(con, registro_id, veces):
+    for _ in range(veces):
+        fila = con.execute("SELECT * FROM evidencias WHERE registro_id = ?", (registro_id,)).fetchone()
+        if fila["estado"] == "fallida":
+            break
+        subida_evidencias._procesar(fila)
+    return con.execute("SELECT estado, intentos FROM evidencias WHERE registro_id = ?", (registro_id,)).fetchone()
+
+
+def test_registro_descartado_por_la_cola_falla_enseguida(evidencias):
+    con, cola, agregar = evidencias
+    agregar("r1")
+    cola.execute("INSERT INTO fallidos (seq, tabla, clave, datos, creado, intentos) "
+                 "VALUES (1, 'registro_acceso', 'r1', '{}', 0, 1)")
+    fila = _procesar_veces(con, "r1", 1)
+    assert (fila["estado"], fila["intentos"]) == ("fallida", 1)
+
+
+def test_registro_que_nunca_llega_se_abandona(evidencias):
+    con, _, agregar = evidencias
+    agregar("r2")
+    fila = _procesar_veces(con, "r2", 10)
+    assert (fila["estado"], fila["intentos"]) == ("fallida", 3)
+
+
+def test_registro_aun_en_la_cola_se_sigue_esperando(evidencias):
+    con, cola, agregar = evidencias
+    agregar("r3")
+    cola.execute("INSERT INTO pendientes (tabla, clave, datos, creado) VALUES ('registro_acceso', 'r3', '{}', 0)")
+    fila = _procesar_veces(con, "r3", 5)
+    assert (fila["estado"], fila["intentos"]) == ("subida", 5)
+
+
+def test_403_de_storage_no_abandona_la_evidencia(evidencias, monkeypatch):
+    con, _, _ = evidencias
+
+    class Respuesta:
+        status_code = 403
+        text = "invalid signature"
+
+    monkeypatch.setattr(subida_evidencias, "comprimir_evidencia", lambda ruta: (b"jpeg", 4))
+    monkeypatch.setattr(subida_evidencias, "peticion", lambda *args, **kwargs: Respuesta())
+    con.execute(
+        "INSERT INTO evidencias (registro_id, ruta_local, ruta_objeto, creado) VALUES ('r4', 'r4.jpg', 'X/r4.jpg', ?)",
+        (time.time(),)
+    )
+    fila = _procesar_veces(con, "r4", 5)
+    assert (fila["estado"], fila["intentos"]) == ("pendiente", 5)
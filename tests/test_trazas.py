@@ -0,0 +1,58 @@
+"""Trazas: sobre OTLP JSON real y rotación del archivo."""
+
+import json
+import os
+import time
+
+from core import trazas
+from core.trazas import LineaTiempo
+
+
+def _linea():
+    linea = LineaTiempo("vehiculo")
+    ahora = time.perf_counter()
+    linea.registrar("ocr", ahora, ahora + 0.02)
+    linea.registrar("consulta", ahora + 0.02, ahora + 0.05, placa="ABC123")
+    return linea
+
+
+def test_otel_escribe_el_sobre_otlp(tmp_path):
+    ruta = str(tmp_path / "trazas.jsonl")
+    _linea().exportar(ruta=ruta, formato="otel")
+
+    with open(ruta, encoding="utf-8") as f:
+        lineas = f.read().splitlines()
+    assert len(lineas) == 1  # una solicitud por evento
+    solicitud = json.loads(lineas[0])
+    recurso = solicitud["resourceSpans"][0]
+    assert {"key": "service.name", "value": {"stringValue": "parqueadero"}} in recurso["resource"]["attributes"]
+    spans = recurso["scopeSpans"][0]["spans"]
+    assert [s["name"] for s in spans] == ["vehiculo", "ocr", "consulta"]
+
+    reporte = trazas.reporte_trazas(ruta)
+    assert set(reporte) == {"ocr", "consulta"}
+    assert reporte["consulta"]["n"] == 1
+
+
+def test_rota_por_tamano(tmp_path, monkeypatch):
+    ruta = str(tmp_path / "trazas.jsonl")
+    monkeypatch.setattr(trazas, "TAMANO_MAXIMO_TRAZAS_MB", 1 / 1024 / 1024)  # 1 byte
+    monkeypatch.setattr(trazas, "ARCHIVOS_TRAZAS_CONSERVADOS", 2)
+    for _ in range(4):
+        _linea().exportar(ruta=ruta, formato="jsonl")
+
+    assert sorted(os.listdir(tmp_path)) == ["trazas.jsonl", "trazas.jsonl.1", "trazas.jsonl.2"]
+    with open(ruta, encoding="utf-8") as f:
+        assert len(f.read().splitlines()) == 2  # solo el último evento
+
+
+def test_rota_por_antiguedad(tmp_path, monkeypatch):
+    ruta = str(tmp_path / "trazas.jsonl")
+    viejo = _linea()
+    viejo.inicio_unix -= 2 * 3600
+    viejo.exportar(ruta=ruta, formato="jsonl")
+    trazas._inicio_archivo.pop(ruta, None)  # como si el proceso recién arrancara
+
+    monkeypatch.setattr(trazas, "ANTIGUEDAD_MAXIMA_TRAZAS_H", 1)
+    _linea().exportar(ruta=ruta, formato="jsonl")
+    assert os.path.exists(f"{ruta}.1")
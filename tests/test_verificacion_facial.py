@@ -0,0 +1,88 @@
+"""Verificación facial: siempre termina (tiempo vencido o señal de parada) sin teclado."""
+
+import os
+import threading
+
+import numpy as np
+import pytest
+
+import main_integrated as flujo
+from core.visualizacion import VisorNinguno
+
+
+class CamaraFalsa:
+    def __init__(self):
+        self.liberada = False
+
+    def isOpened(self):
+        return True
+
+    def read(self):
+        threading.Event().wait(0.005)
+        return True, np.full((48, 64, 3), 90, dtype=np.uint8)
+
+    def release(self):
+        self.liberada = True
+
+
+class TrabajadorQueNoCoincide:
+    def comparar(self, frame, ruta_foto_biometria, ruta_embedding=None):
+        return False, 0.8
+
+
+@pytest.fixture
+def referencia(tmp_path):
+    ruta = tmp_path / "biometria.jpg"
+    ruta.write_bytes(b"foto")
+    return str(ruta)
+
+
+def test_sin_coincidencia_vence_y_entrega_el_ultimo_frame(referencia):
+    camara = CamaraFalsa()
+    ruta, coincide = flujo.capturar_rostro_camara(
+        "rostro_prueba.jpg", ruta_foto_biometria=referencia, cap=camara,
+        trabajador=TrabajadorQueNoCoincide(), visor=VisorNinguno(), timeout_segundos=0.2
+    )
+    assert coincide is False
+    assert ruta is not None and os.path.exists(flujo.esperar_artefacto(ruta))
+    assert camara.liberada
+
+
+def test_detener_corta_sin_decidir(referencia):
+    detener = threading.Event()
+    detener.set()
+    ruta, coincide = flujo.capturar_rostro_camara(
+        "rostro_prueba.jpg", ruta_foto_biometria=referencia, cap=CamaraFalsa(),
+        trabajador=TrabajadorQueNoCoincide(), visor=VisorNinguno(), timeout_segundos=60, detener=detener
+    )
+    assert (ruta, coincide) == (None, False)
+
+
+def test_un_conductor_que_no_coincide_no_traba_la_etapa(tmp_path, monkeypatch):
+    # Un solo hilo de rostro y en orden: si el primero no terminara, el segundo esperaría para siempre
+    fotos = {}
+    for placa in ("NOC001", "SIC002"):
+        fotos[placa] = tmp_path / f"{placa}.jpg"
+        fotos[placa].write_bytes(b"foto")
+
+    class Trabajador:
+        def comparar(self, frame, ruta_foto_biometria, ruta_embedding=None):
+            return ruta_foto_biometria == str(fotos["SIC002"]), 0.3
+
+    registrados = []
+    monkeypatch.setattr(flujo.config, "CADA_FRAMES_ROSTRO", 1)
+    monkeypatch.setattr(flujo, "obtener_visor", VisorNinguno)
+    monkeypatch.setattr(flujo, "suscribir_camara", lambda rol: CamaraFalsa())
+    monkeypatch.setattr(flujo, "preparar_referencia",
+                        lambda placa, *args: ({"id": placa}, str(fotos[placa])))
+    monkeypatch.setattr(flujo, "registrar_resultado",
+                        lambda conductor, placa, ruta, es_mismo: registrados.append((placa, es_mismo)) or es_mismo)
+
+    pipeline = flujo.crear_pipeline_parqueadero(
+        None, {"trabajador": Trabajador(), "ocr": lambda ruta: os.path.basename(ruta)},
+        timeout_rostro=0.3
+    ).iniciar()
+    for placa in ("NOC001", "SIC002"):
+        pipeline.enviar({"ruta_placa": str(tmp_path / placa)})
+    assert pipeline.cerrar(timeout=10)
+    assert registrados == [("NOC001", False), ("SIC002", True)]